@@ -1,11 +1,17 @@
-import os, sys, signal, datetime, glob, logging, time, numpy
+import os, sys, signal, datetime, glob, logging, time, numpy, hashlib, json, docutils, requests
 import geoip2.database, _geoip_geolite2, multiprocessing, multiprocessing.pool
 from bs4 import BeautifulSoup
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine, Column, String, JSON, Date, Boolean
-from rapidfuzz.fuzz import partial_ratio
+from sqlalchemy import create_engine, Column, String, JSON, Date, DateTime, Boolean, Integer, PickleType
+from rapidfuzz import process
+from rapidfuzz.fuzz import partial_ratio, ratio
+from rapidfuzz.utils import default_process
 from docutils.examples import html_parts
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from urllib.parse import urlparse
 #
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
@@ -69,6 +75,67 @@ def get_popularity_color( hpop, alpha = 1.0 ):
     color.setHsvF( h, s, v, alpha )
     return color
 
+#
+## reStructuredText to HTML conversions, memoized by content hash in memory and on disk
+_rst_html_cache = OrderedDict( )
+_rst_html_cache_lock = Lock( )
+_rst_html_cache_size = 64
+_rst_html_cache_dir = os.path.join( baseConfDir, 'rsthtml' )
+_rst_html_cache_max_files = 256
+
+def get_rst_html( myString ):
+    """
+    Converts a reStructuredText_ string into HTML, using docutils_. Because this conversion is slow, and the same documents (such as the newsletter) are converted many times, each conversion is remembered by the SHA256 hash of its input: the last 64 in memory, and the last 256 on disk in ``~/.config/howdy/rsthtml``.
+
+    :param str myString: the reStructuredText_ input.
+    :returns: a :py:class:`dict` with three keys: ``body`` is the HTML body, ``whole`` is the whole HTML document, and ``pretty`` is the whole HTML document prettified by BeautifulSoup_.
+    :rtype: dict
+
+    :raise RuntimeError: if docutils_ cannot convert the input.
+
+    .. seealso::
+
+       * :py:meth:`check_valid_RST <howdy.core.check_valid_RST>`.
+       * :py:meth:`convert_string_RST <howdy.core.convert_string_RST>`.
+       * :py:meth:`rstToHTML <howdy.core.core.rstToHTML>`.
+
+    .. _docutils: https://docutils.sourceforge.io
+    .. _BeautifulSoup: https://www.crummy.com/software/BeautifulSoup/bs4/doc
+    """
+    key = hashlib.sha256( ( '%s\n%s' % ( docutils.__version__, myString ) ).encode( 'utf-8' ) ).hexdigest( )
+    with _rst_html_cache_lock:
+        if key in _rst_html_cache:
+            _rst_html_cache.move_to_end( key )
+            return _rst_html_cache[ key ]
+    cachefile = os.path.join( _rst_html_cache_dir, '%s.json' % key )
+    parts = None
+    if os.path.isfile( cachefile ):
+        try:
+            with open( cachefile, 'r' ) as openfile: parts = json.load( openfile )
+            os.utime( cachefile )
+        except Exception as e:
+            logging.debug( 'could not read %s: %s.' % ( cachefile, str( e ) ) )
+    if parts is None:
+        allparts = html_parts( myString )
+        parts = {
+            'body' : allparts[ 'body' ], 'whole' : allparts[ 'whole' ],
+            'pretty' : BeautifulSoup( allparts[ 'whole' ], 'lxml' ).prettify( ) }
+        _put_rst_html_file( cachefile, parts )
+    with _rst_html_cache_lock:
+        _rst_html_cache[ key ] = parts
+        while len( _rst_html_cache ) > _rst_html_cache_size: _rst_html_cache.popitem( last = False )
+    return parts
+
+def _put_rst_html_file( cachefile, parts ):
+    try:
+        if not os.path.isdir( _rst_html_cache_dir ): os.makedirs( _rst_html_cache_dir, exist_ok = True )
+        with open( cachefile + '.tmp', 'w' ) as openfile: json.dump( parts, openfile )
+        os.replace( cachefile + '.tmp', cachefile )
+        cachefiles = sorted( glob.glob( os.path.join( _rst_html_cache_dir, '*.json' ) ), key = os.path.getmtime )
+        for oldfile in cachefiles[:-_rst_html_cache_max_files]: os.remove( oldfile )
+    except Exception as e:
+        logging.debug( 'could not write %s: %s.' % ( cachefile, str( e ) ) )
+
 def check_valid_RST( myString ):
     """
     Checks to see whether the input string is valid reStructuredText_.
@@ -81,7 +148,7 @@ def check_valid_RST( myString ):
 
     .. _reStructuredText: https://en.wikipedia.org/wiki/ReStructuredText
     """
-    body = html_parts( myString)[ 'body' ]
+    body = get_rst_html( myString )[ 'body' ]
     html = BeautifulSoup( body, 'lxml' )
     error_messages = html.find_all('p', { 'class' : 'system-message-title' } )
     return len( error_messages) == 0
@@ -99,9 +166,224 @@ def convert_string_RST( myString ):
     if not check_valid_RST( myString ):
         logging.error( "Error, could not convert %s into RST." % myString )
         return None
-    html_body = html_parts( myString )[ 'whole' ]
-    html = BeautifulSoup( html_body, 'lxml' )
-    return html.prettify( )
+    return get_rst_html( myString )[ 'pretty' ]
+
+class ImageCache( object ):
+    """
+    A thread safe cache of the images (posters, thumbnails, and newsletter images) that Howdy downloads over HTTP. It does the following.
+
+    * The most recently used images are kept in memory, up to ``max_memory_bytes`` in total.
+    * All images are stored on disk in ``cache_dir``, by the SHA256 hash of their content, so that the same image found at different URLs is stored once. A small key file, named by the SHA256 hash of the URL and its parameters, points to each image. When the images take up more than ``max_disk_bytes``, the least recently used are removed.
+    * Concurrent requests for the same image are coalesced into one download.
+    * Images on a Plex_ server can be resized by the server, through its ``/photo/:/transcode`` endpoint, so that small thumbnails are not downloaded at full resolution.
+
+    The Plex_ access token, ``X-Plex-Token``, is never part of the key, nor stored on disk. Use :py:meth:`get_image_cache <howdy.core.get_image_cache>` to get the shared cache of this process.
+
+    :param str cache_dir: optional argument, the directory in which images are stored. Default is ``~/.config/howdy/imagecache``.
+    :param int max_memory_bytes: optional argument, the maximum size, in bytes, of the images kept in memory. Default is 64 MB.
+    :param int max_disk_bytes: optional argument, the maximum size, in bytes, of the images stored on disk. Default is 512 MB.
+
+    :var int num_requests: the number of HTTP requests made.
+
+    .. _Plex: https://plex.tv
+    """
+    def __init__( self, cache_dir = os.path.join( baseConfDir, 'imagecache' ),
+                  max_memory_bytes = 64 * 1024 * 1024, max_disk_bytes = 512 * 1024 * 1024 ):
+        assert( max_memory_bytes >= 0 )
+        assert( max_disk_bytes >= 0 )
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.num_requests = 0
+        self._memory = OrderedDict( )
+        self._memory_bytes = 0
+        self._lock = Lock( )
+        self._disk_lock = Lock( )
+        self._disk_bytes = None
+        self._pending = { }
+
+    @classmethod
+    def _get_key( cls, url, params = { } ):
+        tokens = [ url, ] + list(map(lambda name: '%s=%s' % ( name, params[ name ] ),
+                                     sorted( set( params ) - set([ 'X-Plex-Token' ]) ) ) )
+        return hashlib.sha256( '\n'.join( tokens ).encode( 'utf-8' ) ).hexdigest( )
+
+    def _get_memory( self, key ):
+        with self._lock:
+            if key not in self._memory: return None
+            self._memory.move_to_end( key )
+            return self._memory[ key ]
+
+    def _put_memory( self, key, data ):
+        if len( data ) > self.max_memory_bytes: return
+        with self._lock:
+            if key in self._memory: self._memory_bytes -= len( self._memory.pop( key ) )
+            self._memory[ key ] = data
+            self._memory_bytes += len( data )
+            while self._memory_bytes > self.max_memory_bytes:
+                _, olddata = self._memory.popitem( last = False )
+                self._memory_bytes -= len( olddata )
+
+    def _get_disk( self, key ):
+        keyfile = os.path.join( self.cache_dir, 'keys', key )
+        try:
+            with open( keyfile, 'r' ) as openfile: digest = openfile.read( ).strip( )
+            objfile = os.path.join( self.cache_dir, 'objects', digest )
+            with open( objfile, 'rb' ) as openfile: data = openfile.read( )
+            os.utime( objfile )
+            return data
+        except FileNotFoundError: return None
+        except Exception as e:
+            logging.debug( 'could not read image %s from %s: %s.' % ( key, self.cache_dir, str( e ) ) )
+            return None
+
+    def _put_disk( self, key, data ):
+        digest = hashlib.sha256( data ).hexdigest( )
+        objfile = os.path.join( self.cache_dir, 'objects', digest )
+        keyfile = os.path.join( self.cache_dir, 'keys', key )
+        try:
+            with self._disk_lock:
+                os.makedirs( os.path.dirname( objfile ), exist_ok = True )
+                os.makedirs( os.path.dirname( keyfile ), exist_ok = True )
+                #
+                ## the total size of the images on disk is found once, then kept up to date here
+                if self._disk_bytes is None: self._disk_bytes = sum(map(
+                    lambda entry: entry.stat( ).st_size, self._get_disk_objects( ) ) )
+                if not os.path.isfile( objfile ):
+                    with open( objfile + '.%d.tmp' % os.getpid( ), 'wb' ) as openfile: openfile.write( data )
+                    os.replace( objfile + '.%d.tmp' % os.getpid( ), objfile )
+                    self._disk_bytes += len( data )
+                else: os.utime( objfile )
+                with open( keyfile + '.%d.tmp' % os.getpid( ), 'w' ) as openfile: openfile.write( digest )
+                os.replace( keyfile + '.%d.tmp' % os.getpid( ), keyfile )
+                if self._disk_bytes > self.max_disk_bytes: self._evict_disk( )
+        except Exception as e:
+            logging.debug( 'could not write image %s into %s: %s.' % ( key, self.cache_dir, str( e ) ) )
+
+    def _get_disk_objects( self ):
+        return list(filter(lambda entry: not entry.name.endswith( '.tmp' ),
+                           os.scandir( os.path.join( self.cache_dir, 'objects' ) ) ) )
+
+    def _evict_disk( self ):
+        #
+        ## remove the least recently used images, then the keys that point to them. Rescan the directory,
+        ## since other processes may have added or removed images since the total was found
+        objfiles = sorted( self._get_disk_objects( ), key = lambda entry: entry.stat( ).st_mtime )
+        self._disk_bytes = sum(map(lambda entry: entry.stat( ).st_size, objfiles ) )
+        if self._disk_bytes <= self.max_disk_bytes: return
+        removed = set( )
+        for entry in objfiles:
+            if self._disk_bytes <= self.max_disk_bytes: break
+            self._disk_bytes -= entry.stat( ).st_size
+            os.remove( entry.path )
+            removed.add( entry.name )
+        for entry in os.scandir( os.path.join( self.cache_dir, 'keys' ) ):
+            try:
+                with open( entry.path, 'r' ) as openfile:
+                    if openfile.read( ).strip( ) in removed: os.remove( entry.path )
+            except Exception: pass
+
+    def _download( self, url, params, verify ):
+        with self._lock: self.num_requests += 1
+        response = requests.get( url, params = params, verify = verify )
+        response.raise_for_status( )
+        logging.debug( 'IMAGE: %s, size = %d' % ( url, len( response.content ) ) )
+        return response.content
+
+    def put( self, url, data, params = { } ):
+        """
+        Stores an image, such as one that has just been uploaded, as if it had been downloaded from its URL.
+
+        :param str url: the image URL.
+        :param bytes data: the image data.
+        :param dict params: optional argument, the URL parameters.
+        """
+        key = self._get_key( url, params )
+        self._put_memory( key, data )
+        self._put_disk( key, data )
+
+    def get( self, url, params = { }, verify = True ):
+        """
+        Returns the image data at a URL: from memory, from disk, or, failing those, by downloading it. If another thread is already downloading this image, then waits for, and returns, its download.
+
+        :param str url: the image URL.
+        :param dict params: optional argument, the URL parameters.
+        :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+        :returns: the image data.
+        :rtype: bytes
+
+        :raise requests.RequestException: if the image cannot be downloaded. Failed downloads are not cached.
+        """
+        key = self._get_key( url, params )
+        data = self._get_memory( key )
+        if data is not None: return data
+        with self._lock:
+            future = self._pending.get( key )
+            is_owner = future is None
+            if is_owner:
+                future = Future( )
+                self._pending[ key ] = future
+        if not is_owner: return future.result( )
+        try:
+            data = self._get_disk( key )
+            if data is None:
+                data = self._download( url, params, verify )
+                self._put_disk( key, data )
+            self._put_memory( key, data )
+            future.set_result( data )
+            return data
+        except Exception as e:
+            future.set_exception( e )
+            raise
+        finally:
+            with self._lock: self._pending.pop( key, None )
+
+    def get_plex_image( self, plexPICURL, token = None, width = None, height = None, verify = False ):
+        """
+        Returns the image data of a picture URL on a Plex_ server. If ``width`` or ``height`` is given, then the Plex_ server resizes the image, keeping its aspect ratio, to fit within ``width`` by ``height`` pixels. If the server cannot resize the image, then returns the full image.
+
+        :param str plexPICURL: the picture URL, such as ``https://localhost:32400/library/metadata/<id>/thumb/<timestamp>``.
+        :param str token: optional argument, the Plex_ access token.
+        :param int width: optional argument, the maximum width, in pixels, of the image. If only ``height`` is given, the width is not limited.
+        :param int height: optional argument, the maximum height, in pixels, of the image. If only ``width`` is given, the height is not limited.
+        :param bool verify: optional argument, whether to verify SSL connections. Default is ``False``.
+        :returns: the image data.
+        :rtype: bytes
+
+        :raise requests.RequestException: if the image cannot be downloaded.
+        """
+        params = { }
+        if token is not None: params[ 'X-Plex-Token' ] = token
+        if width is None and height is None:
+            return self.get( plexPICURL, params = params, verify = verify )
+        #
+        ## an unlimited dimension is ten times the other one
+        if width is None: width = 10 * height
+        if height is None: height = 10 * width
+        parsed = urlparse( plexPICURL )
+        path = parsed.path
+        if parsed.query != '': path = '%s?%s' % ( path, parsed.query )
+        transcode_params = dict( params )
+        transcode_params.update( { 'url' : path, 'width' : int( width ), 'height' : int( height ), 'minSize' : 0 } )
+        try:
+            return self.get( '%s://%s/photo/:/transcode' % ( parsed.scheme, parsed.netloc ),
+                             params = transcode_params, verify = verify )
+        except requests.HTTPError as e:
+            logging.debug( 'could not resize %s on the Plex server: %s.' % ( plexPICURL, str( e ) ) )
+            return self.get( plexPICURL, params = params, verify = verify )
+
+_image_cache = None
+_image_cache_lock = Lock( )
+
+def get_image_cache( ):
+    """
+    :returns: the shared :py:class:`ImageCache <howdy.core.ImageCache>` of this process, through which the GUIs and the newsletter code get their images.
+    :rtype: :py:class:`ImageCache <howdy.core.ImageCache>`
+    """
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None: _image_cache = ImageCache( )
+        return _image_cache
 
 class HtmlView( QWebEngineView ):
     """
@@ -642,6 +924,89 @@ def get_maximum_matchval( check_string, input_string ):
     return partial_ratio( check_string.strip( ).lower( ),
                           input_string.strip( ).lower( ) )
 
+def get_match_string( input_string ):
+    """
+    Normalizes a title, such as a song, album, or movie name, for fuzzy matching: lower case, every character that is not a letter or number becomes a space, and runs of spaces become one space.
+
+    :param str input_string: the title.
+    :returns: the normalized title. For example, ``"Kelly, Watch the Stars!"`` becomes ``"kelly watch the stars"``.
+    :rtype: str
+    """
+    return ' '.join( default_process( input_string ).split( ) )
+
+class FuzzyMatchIndex( object ):
+    """
+    An index of titles, such as all the songs of an artist or all the movies on the Plex_ server, for fuzzy matching of many queries at once. Each title is normalized with :py:meth:`get_match_string <howdy.core.get_match_string>` once, when the index is created. Queries are scored against all titles with rapidfuzz_, using all CPU cores, instead of one comparison at a time in Python.
+
+    :param list choices: the :py:class:`list` of titles.
+    :param list keys: optional argument, a :py:class:`list` of the same length as ``choices``, of what each title identifies (such as an album and track number). If ``None``, then each key is the title's position in ``choices``.
+    :param scorer: optional argument, the rapidfuzz_ scorer. Default is :py:meth:`partial_ratio <rapidfuzz.fuzz.partial_ratio>`, as used in :py:meth:`get_maximum_matchval <howdy.core.get_maximum_matchval>`.
+
+    :var list choices: the titles.
+    :var list keys: what each title identifies.
+
+    .. _rapidfuzz: https://maxbachmann.github.io/RapidFuzz
+    """
+    def __init__( self, choices, keys = None, scorer = partial_ratio ):
+        self.choices = list( choices )
+        if keys is None: keys = list( range( len( self.choices ) ) )
+        self.keys = list( keys )
+        assert( len( self.keys ) == len( self.choices ) )
+        self.scorer = scorer
+        self._match_strings = list(map(get_match_string, self.choices ) )
+
+    def __len__( self ):
+        return len( self.choices )
+
+    def scores( self, queries ):
+        """
+        :param list queries: the :py:class:`list` of query titles.
+        :returns: the :py:class:`array <numpy.ndarray>` of scores, between ``0`` and ``100``, of shape ``( len( queries ), len( self ) )``. Each row holds the scores of a query against every title.
+        :rtype: :py:class:`array <numpy.ndarray>`
+        """
+        if len( queries ) == 0 or len( self ) == 0:
+            return numpy.zeros(( len( queries ), len( self ) ) )
+        return process.cdist(
+            list(map(get_match_string, queries ) ), self._match_strings,
+            scorer = self.scorer, processor = None, workers = -1 )
+
+    def match( self, queries, score_cutoff = 0.0 ):
+        """
+        Finds the best matching title for each query. Titles with the same best score are ranked by their :py:meth:`ratio <rapidfuzz.fuzz.ratio>`, so that an exact match wins over a title that merely contains the query.
+
+        :param list queries: the :py:class:`list` of query titles.
+        :param float score_cutoff: optional argument, the minimum score of a match. Default is ``0.0``.
+        :returns: a :py:class:`list` with one entry for each query: either a three-element :py:class:`tuple` of matching title, score, and key; or ``None`` if no title scores at least ``score_cutoff``.
+        :rtype: list
+        """
+        allscores = self.scores( queries )
+        matches = [ ]
+        for query, scores in zip( queries, allscores ):
+            if len( scores ) == 0 or scores.max( ) < score_cutoff or scores.max( ) <= 0:
+                matches.append( None )
+                continue
+            best_idxs = numpy.flatnonzero( scores == scores.max( ) )
+            if len( best_idxs ) > 1:
+                query_string = get_match_string( query )
+                best_idxs = sorted( best_idxs, key = lambda idx: -ratio( query_string, self._match_strings[ idx ] ) )
+            idx = best_idxs[ 0 ]
+            matches.append( ( self.choices[ idx ], float( scores[ idx ] ), self.keys[ idx ] ) )
+        return matches
+
+    def extract( self, query, limit = 5, score_cutoff = 0.0 ):
+        """
+        :param str query: the query title.
+        :param int limit: optional argument, the maximum number of matches. If ``None``, then return all matches. Default is ``5``.
+        :param float score_cutoff: optional argument, the minimum score of a match. Default is ``0.0``.
+        :returns: the :py:class:`list` of matches, ranked from highest to lowest score. Each match is a three-element :py:class:`tuple` of title, score, and key.
+        :rtype: list
+        """
+        if len( self ) == 0: return [ ]
+        results = process.extract(
+            get_match_string( query ), self._match_strings, scorer = self.scorer,
+            processor = None, limit = limit, score_cutoff = score_cutoff )
+        return list(map(lambda result: ( self.choices[ result[ 2 ] ], float( result[ 1 ] ), self.keys[ result[ 2 ] ] ), results ) )
+
 def returnQAppWithFonts( ):
     """
     returns a customized :py:class:`QApplication <PyQt5.QtWidgets.QApplication>` with all custom fonts loaded.
@@ -720,7 +1085,101 @@ class PlexGuestEmailMapping( Base ):
     plexemail = Column( String( 256 ), index = True, unique = True, primary_key = True )
     plexmapping = Column( String( 65536 ) )
     plexreplaceexisting = Column( Boolean )
+
+class NewsletterDelivery( Base ):
+    """
+    This SQLAlchemy_ ORM class contains the delivery status of a Howdy newsletter email to each of its recipients, so that a newsletter run that is stopped and run again does not send the same email twice. It is written by :py:class:`EmailSendQueue <howdy.email.EmailSendQueue>`. Stored in the ``newsletterdelivery`` table in the SQLite3_ configuration database.
+
+    :var newsletter: the identifier of the newsletter, the hash of its subject and body from :py:meth:`get_newsletter_id <howdy.email.get_newsletter_id>`. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 256.
+    :var email: the recipient email address (or addresses, comma separated, for a collective email). This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 65536.
+    :var status: ``SUCCESS`` if the email was delivered, ``FAILURE`` otherwise. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 256.
+    :var attempts: the number of attempts made to send the email. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing an :py:class:`Integer <sqlalchemy.types.Integer>`.
+    :var message: the result, or the last error, of sending the email. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 65536.
+    :var updated: the :py:class:`datetime <datetime.datetime>` of the last attempt. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    """
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'newsletterdelivery'
+    __table_args__ = { 'extend_existing' : True }
+    newsletter = Column( String( 256 ), index = True, primary_key = True )
+    email = Column( String( 65536 ), index = True, primary_key = True )
+    status = Column( String( 256 ) )
+    attempts = Column( Integer )
+    message = Column( String( 65536 ) )
+    updated = Column( DateTime )
     
+class PlexMovieGenreCache( Base ):
+    """
+    This SQLAlchemy_ ORM class caches the main genre of a Plex_ movie that had to be resolved through TMDB_, so that repeated library scans do not redo the lookup. Each resolved movie is stored under several keys -- its Plex_ rating key, its guid, and its title and year -- so that a movie is found even if it has been re-added to the Plex_ server. Stored in the ``plexmoviegenrecache`` table in the SQLite3_ configuration database.
+
+    :var cachekey: the lookup key, one of ``ratingkey:<RATINGKEY>``, ``guid:<GUID>``, or ``title:<TITLE>:<YEAR>``. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 65536.
+    :var genre: the main genre found through TMDB_. If ``None``, then the TMDB_ lookup found nothing (a negative result). This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 256.
+    :var fetched: the :py:class:`datetime <datetime.datetime>` at which this genre was resolved. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+
+    .. _TMDB: https://www.themoviedb.org
+    """
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'plexmoviegenrecache'
+    __table_args__ = { 'extend_existing' : True }
+    cachekey = Column( String( 65536 ), index = True, unique = True, primary_key = True )
+    genre = Column( String( 256 ) )
+    fetched = Column( DateTime )
+
+class PlexLibrarySnapshot( Base ):
+    """
+    This SQLAlchemy_ ORM class contains a local snapshot of one top level item in a Plex_ library: a movie in a movie library, a show (with all its seasons and episodes) in a TV library, or an artist (with all its albums and tracks) in a music library. The snapshot is refreshed incrementally by :py:meth:`refresh_library_snapshot <howdy.core.core.refresh_library_snapshot>`, so that only those items that changed on the Plex_ server are crawled again. Stored in the ``plexlibrarysnapshot`` table in the SQLite3_ configuration database.
+
+    :var libkey: the key number of the Plex_ library. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing an :py:class:`Integer <sqlalchemy.types.Integer>`.
+    :var ratingkey: the Plex_ rating key of this movie, show, or artist. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 256.
+    :var signature: the ``updatedAt``, ``addedAt``, ``leafCount``, and ``childCount`` attributes of the item when it was last crawled, joined by colons. If these change, then the item is crawled again. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 256.
+    :var name: the main genre of the movie, or the name of the show or artist. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 65536.
+    :var data: the movie, show, or artist data in the format described in :py:meth:`get_library_data <howdy.core.core.get_library_data>`. If ``None``, then this item has no valid media. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`PickleType <sqlalchemy.types.PickleType>`.
+    """
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'plexlibrarysnapshot'
+    __table_args__ = { 'extend_existing' : True }
+    libkey = Column( Integer, index = True, primary_key = True )
+    ratingkey = Column( String( 256 ), index = True, primary_key = True )
+    signature = Column( String( 256 ) )
+    name = Column( String( 65536 ) )
+    data = Column( PickleType )
+
+class PlexLibrarySnapshotState( Base ):
+    """
+    This SQLAlchemy_ ORM class contains, for each Plex_ library whose snapshot lives in the ``plexlibrarysnapshot`` table (see :py:class:`PlexLibrarySnapshot <howdy.core.PlexLibrarySnapshot>`), when that snapshot was last refreshed. Stored in the ``plexlibrarysnapshotstate`` table in the SQLite3_ configuration database.
+
+    :var libkey: the key number of the Plex_ library. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing an :py:class:`Integer <sqlalchemy.types.Integer>`.
+    :var mediatype: the type of the library, one of ``movie``, ``show``, or ``artist``. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 256.
+    :var refreshed: the :py:class:`datetime <datetime.datetime>` of the Plex_ server's last update (see :py:meth:`get_updated_at <howdy.core.core.get_updated_at>`) when the snapshot was last refreshed. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    """
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'plexlibrarysnapshotstate'
+    __table_args__ = { 'extend_existing' : True }
+    libkey = Column( Integer, index = True, unique = True, primary_key = True )
+    mediatype = Column( String( 256 ) )
+    refreshed = Column( DateTime )
+
+class TorrentSearchCache( Base ):
+    """
+    This SQLAlchemy_ ORM class caches the results of torrent searches, such as those of :py:meth:`get_tv_torrent_jackett <howdy.tv.tv_torrents.get_tv_torrent_jackett>` or :py:meth:`get_movie_torrent_jackett <howdy.movie.movie_torrents.get_movie_torrent_jackett>`, so that the same search is not re-run against the torrent services within a short time. :py:meth:`cache_torrent_search <howdy.core.core_torrents.cache_torrent_search>` reads and writes this cache. Stored in the ``torrentsearchcache`` table in the SQLite3_ configuration database.
+
+    :var cachekey: the name of the search function, the normalized search string, and the search filters, joined by ``|``. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 65536.
+    :var provider: the name of the search function. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` of size 256.
+    :var items: the :py:class:`list` of candidate torrents found by the search. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`PickleType <sqlalchemy.types.PickleType>`.
+    :var fetched: the :py:class:`datetime <datetime.datetime>` at which the search was run. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    """
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'torrentsearchcache'
+    __table_args__ = { 'extend_existing' : True }
+    cachekey = Column( String( 65536 ), index = True, unique = True, primary_key = True )
+    provider = Column( String( 256 ) )
+    items = Column( PickleType )
+    fetched = Column( DateTime )
+
 def create_all( ):
     """
     creates the necessary SQLite3_ tables into the database file ``~/.config/howdy/app.db`` if they don't already exist, but only if not building documentation in `Read the docs`_.
@@ -78,9 +78,12 @@ def main( ):
     if args.choose_option == 'info':
         info_torrents = args.info_torrent
         torrentIds = _get_matching_torrents( client, info_torrents, operation_if_size_1 = True )
-        torrentInfo = core_deluge.deluge_get_torrents_info( client )
+        if len( torrentIds ) == 0: return
+        torrentInfo = core_deluge.deluge_get_torrents_info(
+            client, torrent_ids = torrentIds, status_keys = core_deluge._format_info_keys )
         infos = list(map(lambda torrentId: core_deluge.deluge_format_info(
-            torrentInfo[ torrentId ], torrentId ), torrentIds ) )
+            torrentInfo[ torrentId ], torrentId ),
+                         filter(lambda torrentId: torrentId in torrentInfo, torrentIds ) ) )
         if len( infos ) == 0: return
         mystr = '\n'.join(map(lambda info: '%s\n' % info, infos))
         if args.info_do_filename:
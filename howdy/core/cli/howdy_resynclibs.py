@@ -50,6 +50,8 @@ def main( ):
                         help = 'If chosen, refresh a chosen library in the Plex server. Must give a valid name for the library.')
     parser.add_argument('--summary', dest='do_summary', action='store_true', default=False,
                         help = 'If chosen, perform a summary of the chosen library in the Plex server. Must give a valid name for the library.')
+    parser.add_argument('--prewarm', dest='do_prewarm', action='store_true', default=False,
+                        help = 'If chosen, resolve and cache the main genres of all movies in the Plex server, so that later library scans make no TMDB lookups.')
     parser.add_argument('--library', dest='library', type=str, action='store',
                         help = 'Name of a (valid) library in the Plex server.')
     parser.add_argument('--servername', dest='servername', action='store', type = str,
@@ -65,8 +67,8 @@ def main( ):
     #
     ## only one of possible actions
     assert( len( list( filter( lambda tok: tok is True, (
-        args.do_libraries, args.do_refresh, args.do_summary, args.do_servernames ) ) ) ) == 1 ), \
-        "error, must choose one of --libraries, --refresh, --summary, --servernames"
+        args.do_libraries, args.do_refresh, args.do_summary, args.do_servernames, args.do_prewarm ) ) ) ) == 1 ), \
+        "error, must choose one of --libraries, --refresh, --summary, --servernames, --prewarm"
     
     #
     ## if list of servernames, --servernames
@@ -116,6 +118,16 @@ def main( ):
                tabulate( libraries_formatted_data, headers = [ 'Name', 'Library Type' ] ) )
         return
 
+    #
+    ## if pre-warm the movie genre cache, --prewarm
+    if args.do_prewarm:
+        num_new = core.prewarm_movie_genre_cache( token, fullURL = fullURL )
+        if num_new is None:
+            print( 'COULD NOT REACH THE MOVIE LIBRARIES IN PLEX SERVER %s.' % args.servername )
+            return
+        print( 'cached %d new movie genre resolutions.' % num_new )
+        return
+
     #
     ## now gone through here, must define a --library
     assert( args.library is not None ), "error, library must be defined."
@@ -7,16 +7,20 @@ from google_auth_oauthlib.flow import Flow # does not yet work
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 #
-from docutils.examples import html_parts
 from html import unescape
 from bs4 import BeautifulSoup
+from lxml import etree
+from io import BytesIO
 from urllib.request import urlopen
 from urllib.parse import urlencode, urljoin, urlparse
 from itertools import chain
-from multiprocessing import Manager
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
 #
 from howdy import resourceDir
-from howdy.core import session, PlexConfig, LastNewsletterDate, PlexGuestEmailMapping
+from howdy.core import (
+    session, PlexConfig, LastNewsletterDate, PlexGuestEmailMapping, PlexMovieGenreCache,
+    PlexLibrarySnapshot, PlexLibrarySnapshotState, get_rst_html, get_image_cache )
 from howdy.movie import movie
 
 def add_mapping( plex_email, plex_emails, new_emails, replace_existing ):
@@ -54,7 +58,7 @@ def get_date_from_datestring( dstring ):
         return None
 
 def rstToHTML( rstString ):
-    """Converts a reStructuredText_ string into HTML, then prettifies the intermediate HTML using BeautifulSoup_.
+    """Converts a reStructuredText_ string into HTML, then prettifies the intermediate HTML using BeautifulSoup_. Conversions are memoized by :py:meth:`get_rst_html <howdy.core.get_rst_html>`.
     
     :param str rstString: the initial restructuredText_ string.
     :returns: the final prettified, formatted HTML :py:class:`string <str>`.
@@ -64,8 +68,7 @@ def rstToHTML( rstString ):
     .. _reStructuredText: https://en.wikipedia.org/wiki/ReStructuredText
     """
     try:
-        html_body = html_parts( rstString )[ 'whole' ]
-        return BeautifulSoup( html_body, 'lxml' ).prettify( )
+        return get_rst_html( rstString )[ 'pretty' ]
     except RuntimeError as e:
         logging.debug( '%s' % e )
         return None
@@ -329,20 +332,20 @@ def get_all_servers( token, verify = True ):
             'url' : 'https://%s:%d' % ( host, port ) }
     return server_dict
 
-def get_pic_data( plexPICURL, token = None ):
-    """Get the PNG_ data as a :py:class:`Response <requests.Response>` object, from a movie picture URL on the Plex_ server.
+def get_pic_data( plexPICURL, token = None, width = None, height = None ):
+    """Get the PNG_ data, from a movie picture URL on the Plex_ server. The image goes through the shared :py:class:`ImageCache <howdy.core.ImageCache>`, so it is downloaded only once.
 
     :param str plexPICURL: the movie picture URL.
     :param str token: the Plex_ access token.
+    :param int width: optional argument, if given, the Plex_ server resizes the image to at most this width, in pixels.
+    :param int height: optional argument, if given, the Plex_ server resizes the image to at most this height, in pixels.
     :returns: the PNG_ data for the movie image.
-    :rtype: :py:class:`Response <requests.Response>`
+    :rtype: bytes
+
+    .. seealso:: :py:meth:`get_plex_image <howdy.core.ImageCache.get_plex_image>`.
     """
-    if token is None: params = { }
-    else: params = { 'X-Plex-Token' : token }
-    response = requests.get( plexPICURL, params = params, verify = False )
-    logging.debug( 'FULLMOVIEPATH: %s, size = %d' %
-                   ( plexPICURL, len( response.content ) ) )
-    return response.content
+    return get_image_cache( ).get_plex_image(
+        plexPICURL, token = token, width = width, height = height )
 
 def get_updated_at( token, fullURL = 'https://localhost:32400' ):
     """Get the date and time at which the Plex_ server was last updated, as a :py:class:`datetime <datetime.datetime>` object.
@@ -424,7 +427,273 @@ def get_current_date_newsletter( ):
         return None
     return val.date
 
-def _get_main_genre_movie( movie_elem ):
+class PlexXMLRecord( object ):
+    """
+    A compact, picklable representation of one element (and its subelements) of the XML returned by the Plex_ server. It is much smaller than a :py:class:`Tag <bs4.element.Tag>` and exposes the small subset of its API used in Howdy_, so that the per-item records of a library listing can be handed to worker threads or processes instead of the whole XML document. As with the ``lxml`` parser in BeautifulSoup_, element and attribute names are lowercase.
+
+    :param str name: the lowercase name of the element, such as ``video`` or ``directory``.
+    :param dict attrs: the element's attributes, with lowercase keys.
+    :param list children: the :py:class:`list` of :py:class:`PlexXMLRecord <howdy.core.core.PlexXMLRecord>` subelements.
+
+    .. seealso::
+
+       * :py:meth:`get_plex_xml_records <howdy.core.core.get_plex_xml_records>`.
+       * :py:meth:`iter_plex_xml_records <howdy.core.core.iter_plex_xml_records>`.
+
+    .. _BeautifulSoup: https://www.crummy.com/software/BeautifulSoup/bs4/doc
+    .. _Howdy: https://howdy.readthedocs.io
+    """
+    __slots__ = ( 'name', 'attrs', 'children' )
+    
+    def __init__( self, name, attrs, children = None ):
+        self.name = name
+        self.attrs = attrs
+        if children is None: children = [ ]
+        self.children = children
+
+    @classmethod
+    def from_element( cls, elem ):
+        """
+        :param elem: an :py:class:`_Element <lxml.etree._Element>` from the Plex_ server's XML.
+        :returns: the compact :py:class:`PlexXMLRecord <howdy.core.core.PlexXMLRecord>` representation of ``elem``.
+        :rtype: :py:class:`PlexXMLRecord <howdy.core.core.PlexXMLRecord>`
+        """
+        return cls( elem.tag.lower( ),
+                    dict(map(lambda tup: ( tup[0].lower( ), tup[1] ), elem.attrib.items( ) ) ),
+                    list(map(cls.from_element, filter(lambda child: isinstance( child.tag, str ), elem ) ) ) )
+
+    def __getitem__( self, attr ): return self.attrs[ attr ]
+
+    def get( self, attr, default = None ): return self.attrs.get( attr, default )
+
+    def _matches( self, name ):
+        if callable( name ): return name( self )
+        return self.name == name
+
+    def find_all( self, name ):
+        """
+        :param name: either the lowercase name of the subelements, or a function that takes a :py:class:`PlexXMLRecord <howdy.core.core.PlexXMLRecord>` and returns ``True`` if it matches.
+        :returns: all the matching subelements, at any depth, in document order.
+        :rtype: list
+        """
+        found = [ ]
+        for child in self.children:
+            if child._matches( name ): found.append( child )
+            found += child.find_all( name )
+        return found
+
+    def find( self, name ):
+        """
+        :param name: either the lowercase name of the subelement, or a matching function as in :py:meth:`find_all <howdy.core.core.PlexXMLRecord.find_all>`.
+        :returns: the first matching subelement, or ``None`` if there are none.
+        :rtype: :py:class:`PlexXMLRecord <howdy.core.core.PlexXMLRecord>`
+        """
+        found = self.find_all( name )
+        if len( found ) == 0: return None
+        return found[ 0 ]
+
+def _iterparse_plex_xml_records( source, tag ):
+    for _, elem in etree.iterparse( source, events = ( 'end', ) ):
+        parent = elem.getparent( )
+        #
+        ## only top level items, the children of the MediaContainer
+        if parent is None or parent.getparent( ) is not None: continue
+        if elem.tag == tag: yield PlexXMLRecord.from_element( elem )
+        #
+        ## free what has been parsed so far, so memory does not grow with library size
+        elem.clear( )
+        while elem.getprevious( ) is not None: del parent[ 0 ]
+
+def get_plex_xml_records( content, tag ):
+    """
+    Parses the XML returned by the Plex_ server into a :py:class:`list` of compact records, one for each top level element of a given type.
+
+    :param bytes content: the XML document returned by the Plex_ server.
+    :param str tag: the XML element name of the items to return, such as ``Video``, ``Directory``, or ``Track``.
+    :returns: a :py:class:`list` of :py:class:`PlexXMLRecord <howdy.core.core.PlexXMLRecord>`, one per item.
+    :rtype: list
+
+    .. seealso:: :py:meth:`iter_plex_xml_records <howdy.core.core.iter_plex_xml_records>`.
+    """
+    return list( _iterparse_plex_xml_records( BytesIO( content ), tag ) )
+
+def iter_plex_xml_records( url, tag, params = { }, session = None, timeout = None ):
+    """
+    Streams the XML at a Plex_ server endpoint, such as ``/library/sections/N/all``, and yields a compact record of each top level element of a given type as soon as it is parsed. The whole XML document is never held in memory.
+
+    :param str url: the full URL of the Plex_ server endpoint.
+    :param str tag: the XML element name of the items to return, such as ``Video``, ``Directory``, or ``Track``.
+    :param dict params: the query parameters, such as the ``X-Plex-Token``.
+    :param session: optional :py:class:`Session <requests.Session>` with which to make the request. If ``None``, then use :py:meth:`requests.get`.
+    :param int timeout: optional time, in seconds, to wait for an HTTP conection to the Plex_ server.
+    :returns: a generator of :py:class:`PlexXMLRecord <howdy.core.core.PlexXMLRecord>`. If the Plex_ server endpoint cannot be reached, then returns ``None``.
+
+    .. seealso:: :py:meth:`get_plex_xml_records <howdy.core.core.get_plex_xml_records>`.
+    """
+    if session is None: session = requests
+    response = session.get( url, params = params, verify = False, timeout = timeout, stream = True )
+    if response.status_code != 200:
+        response.close( )
+        return None
+    response.raw.decode_content = True
+    def _iter_records( ):
+        try: yield from _iterparse_plex_xml_records( response.raw, tag )
+        finally: response.close( )
+    return _iter_records( )
+
+class PlexIOExecutor( object ):
+    """
+    A bounded pool of I/O threads that share one keep-alive :py:class:`Session <requests.Session>` to the Plex_ server. All the Plex_ library crawlers use this to make their requests concurrently. At most ``num_threads`` requests are in flight at once, and the duration of every request made through :py:attr:`session` is recorded.
+
+    .. code-block:: python
+
+       with PlexIOExecutor( num_threads = 8 ) as executor:
+           datums = executor.map( lambda elem: _get_show_datum(
+               elem, fullURL, params, session = executor.session ), show_records )
+           executor.log_timing( 'shows' )
+
+    :param int num_threads: the maximum number of concurrent threads, and of connections to the Plex_ server. Must be at least 1.
+
+    :var session: the :py:class:`Session <requests.Session>` shared by all threads, whose connection pool holds ``num_threads`` connections.
+    :var list request_times: the :py:class:`list` of durations, in seconds, of every request made through :py:attr:`session`.
+    """
+    def __init__( self, num_threads = 2 * multiprocessing.cpu_count( ) ):
+        assert( num_threads >= 1 )
+        self.num_threads = num_threads
+        self.session = requests.Session( )
+        for prefix in ( 'https://', 'http://' ):
+            self.session.mount( prefix, requests.adapters.HTTPAdapter(
+                pool_connections = num_threads,
+                pool_maxsize = num_threads ) )
+        self.request_times = [ ]
+        self._lock = Lock( )
+        self.session.hooks[ 'response' ].append( self._record_time )
+        self._executor = ThreadPoolExecutor( max_workers = num_threads )
+        self._time0 = time.time( )
+
+    def _record_time( self, response, *args, **kwargs ):
+        with self._lock: self.request_times.append( response.elapsed.total_seconds( ) )
+
+    def map( self, func, items ):
+        """
+        :param func: the function to apply to each item. It should make its requests through :py:attr:`session`.
+        :param items: the iterable of items.
+        :returns: the :py:class:`list` of ``func`` applied to each item, in the same order as ``items``.
+        :rtype: list
+        """
+        return list( self._executor.map( func, items ) )
+
+    def log_timing( self, title ):
+        """
+        Logs, at the ``DEBUG`` level, the number of requests, the wall clock time, and the average and maximum request durations since this executor was created.
+
+        :param str title: a short description of what was crawled.
+        """
+        with self._lock: request_times = numpy.array( self.request_times )
+        logging.debug( '%s: %d requests with %d threads in %0.3f seconds.' % (
+            title, len( request_times ), self.num_threads, time.time( ) - self._time0 ) )
+        if len( request_times ) == 0: return
+        logging.debug( '%s: average request time = %0.3e seconds, maximum = %0.3e seconds.' % (
+            title, request_times.mean( ), request_times.max( ) ) )
+
+    def shutdown( self ):
+        """
+        Waits for all running threads to finish, and closes the connections to the Plex_ server.
+        """
+        self._executor.shutdown( wait = True )
+        self.session.close( )
+
+    def __enter__( self ): return self
+
+    def __exit__( self, *args ): self.shutdown( )
+
+_plex_page_size = 2000
+
+def _get_plex_xml_records_paged( url, tag, params = { }, session = None, timeout = None,
+                                 page_size = _plex_page_size ):
+    #
+    ## page through a large listing using X-Plex-Container-Start/Size
+    records = [ ]
+    start = 0
+    while True:
+        page_params = dict( params )
+        page_params[ 'X-Plex-Container-Start' ] = start
+        page_params[ 'X-Plex-Container-Size' ] = page_size
+        page_records = iter_plex_xml_records(
+            url, tag, params = page_params, session = session, timeout = timeout )
+        if page_records is None: return None
+        page_records = list( page_records )
+        records += page_records
+        if len( page_records ) < page_size: return records
+        start += page_size
+
+_movie_genre_cache_ttl = datetime.timedelta( days = 180 )
+_movie_genre_cache_negative_ttl = datetime.timedelta( days = 14 )
+
+def _get_movie_genre_cache_keys( movie_elem ):
+    keys = [ ]
+    if movie_elem.get( 'ratingkey' ) is not None:
+        keys.append( 'ratingkey:%s' % movie_elem.get( 'ratingkey' ) )
+    if movie_elem.get( 'guid' ) is not None:
+        keys.append( 'guid:%s' % movie_elem.get( 'guid' ) )
+    keys.append( 'title:%s:%s' % ( movie_elem.get( 'title', '' ).strip( ).lower( ),
+                                   movie_elem.get( 'year', '' ) ) )
+    return keys
+
+def get_movie_genre_cache( ):
+    """
+    Returns the unexpired genre resolutions of Plex_ movies, stored in the ``plexmoviegenrecache`` table in the SQLite3_ configuration database. Positive results expire after 180 days, and negative results (where TMDB_ answered, but found no genre) expire after 14 days. Failed TMDB_ lookups are not cached.
+
+    :returns: a :py:class:`dict` whose key is the cache key (see :py:class:`PlexMovieGenreCache <howdy.core.PlexMovieGenreCache>`), and whose value is the main genre or ``None`` if TMDB_ found nothing.
+    :rtype: dict
+
+    .. seealso::
+
+       * :py:meth:`push_movie_genre_cache <howdy.core.core.push_movie_genre_cache>`.
+       * :py:meth:`prewarm_movie_genre_cache <howdy.core.core.prewarm_movie_genre_cache>`.
+
+    .. _TMDB: https://www.themoviedb.org
+    """
+    now = datetime.datetime.now( )
+    def _is_valid( val ):
+        if val.fetched is None: return False
+        if val.genre is None: return now - val.fetched < _movie_genre_cache_negative_ttl
+        return now - val.fetched < _movie_genre_cache_ttl
+    return dict(map(lambda val: ( val.cachekey, val.genre ),
+                    filter(_is_valid, session.query( PlexMovieGenreCache ).all( ) ) ) )
+
+def push_movie_genre_cache( cache_entries ):
+    """
+    Stores new genre resolutions of Plex_ movies into the ``plexmoviegenrecache`` table in the SQLite3_ configuration database, replacing older entries with the same keys.
+
+    :param dict cache_entries: a :py:class:`dict` whose key is the cache key, and whose value is the main genre or ``None`` (a negative result).
+
+    .. seealso:: :py:meth:`get_movie_genre_cache <howdy.core.core.get_movie_genre_cache>`.
+    """
+    if len( cache_entries ) == 0: return
+    now = datetime.datetime.now( )
+    for cachekey in cache_entries:
+        session.merge( PlexMovieGenreCache(
+            cachekey = cachekey, genre = cache_entries[ cachekey ], fetched = now ) )
+    session.commit( )
+
+def _get_genre_movie_cached( movie_elem, genre_cache = None, new_entries = None ):
+    if genre_cache is None: genre_cache = { }
+    keys = _get_movie_genre_cache_keys( movie_elem )
+    for cachekey in keys:
+        if cachekey in genre_cache: return genre_cache[ cachekey ]
+    #
+    ## only cache what TMDB actually answered, so that a rate limit or a dropped connection is retried later
+    try: val = movie.get_genre_movie( movie_elem[ 'title' ], verify = False, raise_errors = True )
+    except Exception as e:
+        logging.info( 'could not look up the genre of %s: %s' % ( movie_elem[ 'title' ], str( e ) ) )
+        return None
+    for cachekey in keys:
+        genre_cache[ cachekey ] = val
+        if new_entries is not None: new_entries[ cachekey ] = val
+    return val
+
+def _get_main_genre_movie( movie_elem, genre_cache = None, new_entries = None ):
     postprocess_genre_dict = {
         'sci-fi' : 'science fiction',
         'adventure' : 'action',
@@ -436,7 +705,7 @@ def _get_main_genre_movie( movie_elem ):
         'mystery' : 'horror' }
     
     if len(movie_elem.find_all('genre') ) == 0:
-        val = movie.get_genre_movie( movie_elem[ 'title' ], verify = False )
+        val = _get_genre_movie_cached( movie_elem, genre_cache, new_entries )
         if val is None: return 'unclassified'
         return val
     classic_genres = [ 'horror', 'comedy', 'animation', 'documentary', 'drama',
@@ -445,12 +714,99 @@ def _get_main_genre_movie( movie_elem ):
     for genre in genres:
         if genre in classic_genres:
             return genre
-    val = movie.get_genre_movie( movie_elem[ 'title' ], verify = False )
+    val = _get_genre_movie_cached( movie_elem, genre_cache, new_entries )
     if val is not None: return val
     if genres[ 0 ] in postprocess_genre_dict:
         return postprocess_genre_dict[ genres[ 0 ] ]
     return genres[ 0 ]                             
 
+def prewarm_movie_genre_cache( token, fullURL = 'http://localhost:32400', refresh = False, timeout = None ):
+    """
+    Resolves, and stores into the ``plexmoviegenrecache`` table, the main genre of every movie in every movie library on the Plex_ server, so that later calls to :py:meth:`get_library_data <howdy.core.core.get_library_data>` and :py:meth:`get_library_stats <howdy.core.core.get_library_stats>` do not make any TMDB_ calls for these movies.
+
+    :param str token: the Plex_ server access token.
+    :param str fullURL: the Plex_ server address.
+    :param bool refresh: optional argument. If ``True``, then ignore what is already cached and redo all the TMDB_ lookups. Default is ``False``.
+    :param int timeout: optional time, in seconds, to wait for an HTTP conection to the Plex_ server.
+
+    :returns: the number of new genre resolutions stored into the cache, or ``None`` if the Plex_ server could not be reached.
+    :rtype: int
+
+    .. seealso:: :py:meth:`get_movie_genre_cache <howdy.core.core.get_movie_genre_cache>`.
+
+    .. _TMDB: https://www.themoviedb.org
+    """
+    keys = get_movies_libraries( token, fullURL = fullURL )
+    if keys is None: return None
+    if refresh: genre_cache = { }
+    else: genre_cache = get_movie_genre_cache( )
+    new_entries = { }
+    params = { 'X-Plex-Token' : token }
+    #
+    ## store what was resolved even if the run stops partway
+    try:
+        for key in keys:
+            movie_records = iter_plex_xml_records(
+                '%s/library/sections/%d/all' % ( fullURL, key ), 'Video',
+                params = params, timeout = timeout )
+            if movie_records is None: continue
+            for movie_elem in movie_records:
+                _get_main_genre_movie( movie_elem, genre_cache, new_entries )
+    finally: push_movie_genre_cache( new_entries )
+    logging.info( 'stored %d new movie genre resolutions.' % len( new_entries ) )
+    return len( new_entries )
+
+def _get_bitrate_size_movie( movie_elem ):
+    bitrate_elem = list(filter(lambda elem: 'bitrate' in elem.attrs, movie_elem.find_all('media')))
+    if len( bitrate_elem ) != 0: bitrate = int( bitrate_elem[0]['bitrate'] ) * 1e3 / 8.0
+    else: bitrate = -1
+    size_elem = list( chain.from_iterable(
+        map(lambda media_elem: media_elem.find_all('part'),
+            movie_elem.find_all('media'))))
+    size_elem = list(filter(lambda elem: 'size' in elem.attrs, size_elem) )
+    if len(size_elem) != 0: totsize = int( size_elem[0]['size'] ) * 1.0
+    else: totsize = -1
+    return bitrate, totsize
+
+def _get_movie_datum( movie_elem, fullURL, genre_cache = None, new_entries = None ):
+    first_genre = _get_main_genre_movie( movie_elem, genre_cache, new_entries )
+    title = movie_elem['title']
+    if 'rating' in movie_elem.attrs:
+        rating = float( movie_elem.get('rating') )
+    else: rating = None
+    summary = movie_elem.get('summary')
+    if 'art' in movie_elem.attrs: picurl = '%s%s' % ( fullURL, movie_elem.get('art') )
+    else: picurl = None
+    if 'originallyavailableat' in movie_elem.attrs:
+        releasedate = datetime.datetime.strptime(
+            movie_elem.get( 'originallyavailableat' ), '%Y-%m-%d' ).date( )
+    else: releasedate = None
+    addedat = datetime.datetime.fromtimestamp( float( movie_elem.get( 'addedat' ) ) ).date( )
+    if 'contentrating' in movie_elem.attrs:
+        contentrating = movie_elem.get('contentrating')
+    else: contentrating = 'NR'
+    duration = 1e-3 * int( movie_elem[ 'duration' ] )
+    bitrate, totsize = _get_bitrate_size_movie( movie_elem )
+    if bitrate == -1 and totsize != -1: bitrate = 1.0 * totsize / duration
+    imdb_id = None
+    if 'guid' in movie_elem.attrs:
+        guid = movie_elem.get( 'guid' )
+        if 'imdb' in guid: imdb_id = urlparse( guid ).netloc
+        
+    data = {
+        'title' : title,
+        'rating' : rating,
+        'contentrating' : contentrating,
+        'picurl' : picurl,
+        'releasedate' : releasedate,
+        'addedat' : addedat,
+        'summary' : summary,
+        'duration' : duration,
+        'totsize' : totsize,
+        'localpic' : True,
+        'imdb_id' : imdb_id }
+    return first_genre, data
+
 def _get_library_data_movie( key, token, fullURL = 'http://localhost:32400', sinceDate = None,
                              num_threads = 2 * multiprocessing.cpu_count( ), timeout = None ):
     assert( num_threads >= 1 )
@@ -458,94 +814,36 @@ def _get_library_data_movie( key, token, fullURL = 'http://localhost:32400', sin
     if sinceDate is None:
         sinceDate = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date( )
         
-    response = requests.get( '%s/library/sections/%d/all' % ( fullURL, key ),
-                             params = params, verify = False, timeout = timeout )
-    if response.status_code != 200: return None
-    def _get_bitrate_size( movie_elem ):
-        bitrate_elem = list(filter(lambda elem: 'bitrate' in elem.attrs, movie_elem.find_all('media')))
-        if len( bitrate_elem ) != 0: bitrate = int( bitrate_elem[0]['bitrate'] ) * 1e3 / 8.0
-        else: bitrate = -1
-        size_elem = list( chain.from_iterable(
-            map(lambda media_elem: media_elem.find_all('part'),
-                movie_elem.find_all('media'))))
-        size_elem = list(filter(lambda elem: 'size' in elem.attrs, size_elem) )
-        if len(size_elem) != 0: totsize = int( size_elem[0]['size'] ) * 1.0
-        else: totsize = -1
-        return bitrate, totsize
+    movie_records = iter_plex_xml_records(
+        '%s/library/sections/%d/all' % ( fullURL, key ), 'Video',
+        params = params, timeout = timeout )
+    if movie_records is None: return None
+    movie_records = list( movie_records )
     #
-    def _get_movie_data( input_tuple ):
-        cont, indices = input_tuple
-        html = BeautifulSoup( cont, 'lxml' )
-        movie_elems = html.find_all('video' )
-        movie_data_sub = [ ]
-        for idx in indices:
-            movie_elem = movie_elems[ idx ]
-            if datetime.datetime.fromtimestamp( float( movie_elem.get('addedat') ) ).date() < sinceDate:
-                continue
-            genres = list(map(lambda elem: elem.get('tag').lower( ),
-                              filter(lambda elem: 'tag' in elem.attrs, movie_elem.find_all('genre'))))
-            #if len( genres ) != 0:
-            #    first_genre = genres[ 0 ]
-            #else:
-            #    logging.debug( 'genre not found for %s.' % movie_elem[ 'title' ] )
-            first_genre = _get_main_genre_movie( movie_elem )
-            title = movie_elem['title']
-            if 'rating' in movie_elem.attrs:
-                rating = float( movie_elem.get('rating') )
-            else: rating = None
-            summary = movie_elem.get('summary')
-            if 'art' in movie_elem.attrs: picurl = '%s%s' % ( fullURL, movie_elem.get('art') )
-            else: picurl = None
-            if 'originallyavailableat' in movie_elem.attrs:
-                releasedate = datetime.datetime.strptime(
-                    movie_elem.get( 'originallyavailableat' ), '%Y-%m-%d' ).date( )
-            else: releasedate = None
-            addedat = datetime.datetime.fromtimestamp( float( movie_elem.get( 'addedat' ) ) ).date( )
-            if 'contentrating' in movie_elem.attrs:
-                contentrating = movie_elem.get('contentrating')
-            else: contentrating = 'NR'
-            duration = 1e-3 * int( movie_elem[ 'duration' ] )
-            bitrate, totsize = _get_bitrate_size( movie_elem )
-            if bitrate == -1 and totsize != -1: bitrate = 1.0 * totsize / duration
-            imdb_id = None
-            if 'guid' in movie_elem.attrs:
-                guid = movie_elem.get( 'guid' )
-                if 'imdb' in guid: imdb_id = urlparse( guid ).netloc
-                
-            data = {
-                'title' : title,
-                'rating' : rating,
-                'contentrating' : contentrating,
-                'picurl' : picurl,
-                'releasedate' : releasedate,
-                'addedat' : addedat,
-                'summary' : summary,
-                'duration' : duration,
-                'totsize' : totsize,
-                'localpic' : True,
-                'imdb_id' : imdb_id }
-            
-            movie_data_sub.append( ( first_genre, data ) )
-        return movie_data_sub
-
-    act_num_threads = max( num_threads, multiprocessing.cpu_count( ) )
-    len_movie_elems = len( BeautifulSoup( response.content, 'lxml' ).find_all('video') )
-    with multiprocessing.Pool( processes = act_num_threads ) as pool:
-        input_tuples = list(
-            map(lambda idx: ( response.content, list(
-                range(idx, len_movie_elems, act_num_threads ) ) ),
-                range( act_num_threads ) ) )
+    ## genres already resolved through TMDB, and newly resolved ones
+    genre_cache = get_movie_genre_cache( )
+    new_entries = { }
+    movie_records = list(filter(lambda movie_elem: datetime.datetime.fromtimestamp(
+        float( movie_elem.get('addedat') ) ).date() >= sinceDate, movie_records ) )
+    #
+    ## movies whose genres are not cached need a TMDB lookup, so do these concurrently
+    with PlexIOExecutor( num_threads = num_threads ) as executor:
         movie_data = { }
-        movie_data_list = list( chain.from_iterable(
-            map( _get_movie_data, input_tuples ) ) ) # change back to pool.map
+        movie_data_list = executor.map( lambda movie_elem: _get_movie_datum(
+            movie_elem, fullURL, genre_cache, new_entries ), movie_records )
         for first_genre, data in movie_data_list:
             movie_data.setdefault( first_genre, [ ] ).append( data )
-        return key, movie_data
-        
-def _get_library_stats_movie( key, token, fullURL ='http://localhost:32400', sinceDate = None ):
-    tup = _get_library_data_movie( key, token, fullURL = fullURL, sinceDate = sinceDate )
-    if tup is None: return None
-    _, movie_data = tup
+    push_movie_genre_cache( new_entries )
+    return key, movie_data
+
+def _filter_movie_data_since( movie_data, sinceDate = None ):
+    if sinceDate is None: return movie_data
+    movie_data_since = dict(map(lambda genre: (
+        genre, list(filter(lambda entry: entry[ 'addedat' ] >= sinceDate, movie_data[ genre ] ) ) ),
+                                movie_data ) )
+    return dict(filter(lambda tup: len( tup[1] ) != 0, movie_data_since.items( ) ) )
+
+def _summarize_movie_data( movie_data ):
     sorted_by_genres = {
         genre : { 'totnum' : len( movie_data[ genre ] ),
                   'totdur' : sum(list(map(lambda entry: entry['duration'], movie_data[ genre ] ) ) ),
@@ -554,252 +852,373 @@ def _get_library_stats_movie( key, token, fullURL ='http://localhost:32400', sin
     totnum  = sum(list(map(lambda genre: sorted_by_genres[ genre ][ 'totnum' ], sorted_by_genres ) ) )
     totdur  = sum(list(map(lambda genre: sorted_by_genres[ genre ][ 'totdur' ], sorted_by_genres ) ) )
     totsize = sum(list(map(lambda genre: sorted_by_genres[ genre ][ 'totsize'], sorted_by_genres ) ) )
-    return key, totnum, totdur, totsize, sorted_by_genres
+    return totnum, totdur, totsize, sorted_by_genres
+
+def _get_library_stats_movie( key, token, fullURL ='http://localhost:32400', sinceDate = None ):
+    tup = _get_library_data_movie( key, token, fullURL = fullURL, sinceDate = sinceDate )
+    if tup is None: return None
+    _, movie_data = tup
+    return ( key, ) + _summarize_movie_data( movie_data )
+
+def _valid_videlem( elem ):
+    if elem.name != 'video':
+        return False
+    if len( elem.find_all('media')) != 1:
+        return False
+    media_elem = elem.find( 'media' )
+    if len(set([ 'duration', 'bitrate' ]) -
+           set( media_elem.attrs ) ) != 0:
+        return False
+    part_elem = media_elem.find( 'part' )
+    return 'size' in part_elem.attrs
+
+#
+## for videlems in shows
+## videlem.get('index') == episode # in season
+## videlem.get('parentindex') == season # of show ( season 0 means Specials )
+## videlem.get('originallyavailableat') == when first aired
+def _get_episode_datum( videlem, fullURL ):
+    seasno = int( videlem['parentindex'] )
+    epno = int( videlem[ 'index' ] )
+    pthumb = videlem.get( 'parentthumb' )
+    if pthumb is not None: seasonpicurl = '%s%s' % ( fullURL, videlem.get( 'parentthumb' ) )
+    else: seasonpicurl = fullURL
+    episodepicurl = '%s%s' % ( fullURL, videlem.get( 'thumb' ) )
+    episodesummary = videlem.get('summary')
+    try:
+        dateaired = datetime.datetime.strptime(
+            videlem['originallyavailableat'], '%Y-%m-%d' ).date( )
+    except:
+        dateaired = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date( )
+    dateadded = datetime.datetime.fromtimestamp( float( videlem['addedat'] ) ).date( )
+    title = videlem[ 'title' ]
+    duration = 1e-3 * int( videlem[ 'duration' ] )
+    media_elem = videlem.find('media')
+    bitrate = int( media_elem[ 'bitrate' ] ) * 1e3 / 8.0
+    part_elem = media_elem.find('part')
+    filename = part_elem[ 'file' ]
+    size = int( part_elem[ 'size' ] )
+    episode = {
+        'title' : title,
+        'episodepicurl' : episodepicurl,
+        'date aired' : dateaired,
+        'date added' : dateadded,
+        'summary' : episodesummary,
+        'duration' : duration,
+        'size' : size,
+        'path' : filename }
+    #
+    ## look for directors and writers
+    director_elems = videlem.find_all( 'director' )
+    if len( director_elems ) != 0:
+        directors = list(
+            map(lambda elem: elem['tag'].strip( ),
+                filter(lambda elem: 'tag' in elem.attrs,
+                       director_elems ) ) )
+        episode[ 'director' ] = directors
+    writer_elems = videlem.find_all( 'writer' )
+    if len( writer_elems ) != 0:
+        writers = list(
+            map(lambda elem: elem['tag'].strip( ),
+                filter(lambda elem: 'tag' in elem.attrs,
+                       writer_elems ) ) )
+        episode[ 'writer' ] = writers
+    return seasno, epno, seasonpicurl, episode
+
+def _add_episode_datum( seasons, seasno, epno, seasonpicurl, episode ):
+    seasons.setdefault( seasno, { } )
+    if 'episodes' not in seasons[ seasno ]:
+        seasons[ seasno ].setdefault( 'episodes', { } )
+        seasons[ seasno ][ 'seasonpicurl' ] = seasonpicurl
+    seasons[ seasno ]['episodes'][ epno ] = episode
+
+def _get_show_datum( direlem, fullURL, params, session = requests, sinceDate = None,
+                     timeout = None ):
+    if sinceDate is None:
+        sinceDate = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date()
+    show = unescape( direlem['title'] )
+    if 'summary' in direlem.attrs: summary = direlem['summary']
+    else: summary = ''
+    if 'art' in direlem.attrs: picurl = '%s%s' % ( fullURL, direlem.get('art') )
+    else: picurl = None
+    newURL = urljoin( fullURL, direlem['key'] )
+    resp2 = session.get( newURL, params = params, verify = False, timeout = timeout )
+    if resp2.status_code != 200: return None
+    leafElems = list( filter(lambda le: 'allLeaves' not in le['key'],
+                             get_plex_xml_records( resp2.content, 'Directory' ) ) )
+    if len(leafElems) == 0: return None
+    seasons = { }
+    showdata = {
+        'title' : show,
+        'summary' : summary,
+        'picurl' : picurl
+    }
+    #
+    ## now look for tvdb ID for series
+    tvdbID = None
+    for leafElem in leafElems:
+        if 'parentguid' not in leafElem.attrs: continue
+        pguid = leafElem.attrs[ 'parentguid']
+        prs = urlparse( pguid )
+        scheme = prs.scheme
+        if 'themoviedb' in scheme: continue
+        try:                  
+          tvdbID = int( prs.netloc )
+          break
+        except: pass
+    if tvdbID is not None: showdata[ 'tvdbid' ] = tvdbID
+    #
+    for idx, leafElem in enumerate(leafElems):
+        newURL = urljoin( fullURL, leafElem[ 'key' ] )
+        resp3 = session.get( newURL, params = params, verify = False, timeout = timeout )
+        for videlem in filter( _valid_videlem, get_plex_xml_records( resp3.content, 'Video' ) ):
+            if datetime.datetime.fromtimestamp( float( videlem['addedat'] ) ).date( ) < sinceDate:
+                continue
+            _add_episode_datum( seasons, *_get_episode_datum( videlem, fullURL ) )
+    showdata[ 'seasons' ] = seasons
+    return show, showdata
+
+def _get_show_datums_bulk(
+        key, token, fullURL = 'http://localhost:32400',
+        sinceDate = None, timeout = None, page_size = _plex_page_size ):
+    params = { 'X-Plex-Token' : token }
+    if sinceDate is None:
+        sinceDate = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date()
+    url = '%s/library/sections/%d/all' % ( fullURL, key )
+    #
+    ## shows, seasons (type = 3), and episodes (type = 4) concurrently, each in a few requests
+    with PlexIOExecutor( num_threads = 3 ) as executor:
+        show_records, season_records, episode_records = executor.map(
+            lambda tup: _get_plex_xml_records_paged(
+                url, tup[ 0 ], params = dict( params, **tup[ 1 ] ), session = executor.session,
+                timeout = timeout, page_size = page_size ),
+            ( ( 'Directory', { } ), ( 'Directory', { 'type' : 3 } ), ( 'Video', { 'type' : 4 } ) ) )
+        executor.log_timing( url )
+    if show_records is None:
+        logging.debug('ERROR TANIM: COULD NOT REACH PLEX LIBRARIES AT %s' % url )
+        return None
+    if season_records is None or episode_records is None: return None
+    seasons_by_show = { }
+    for season_elem in season_records:
+        seasons_by_show.setdefault( season_elem.get( 'parentratingkey' ), [ ] ).append( season_elem )
+    episodes_by_show = { }
+    for videlem in filter( _valid_videlem, episode_records ):
+        episodes_by_show.setdefault( videlem.get( 'grandparentratingkey' ), [ ] ).append( videlem )
+    #
+    show_datums = { }
+    for direlem in show_records:
+        ratingkey = direlem.get( 'ratingkey' )
+        if ratingkey not in seasons_by_show:
+            show_datums[ ratingkey ] = None
+            continue
+        show = unescape( direlem['title'] )
+        if 'summary' in direlem.attrs: summary = direlem['summary']
+        else: summary = ''
+        if 'art' in direlem.attrs: picurl = '%s%s' % ( fullURL, direlem.get('art') )
+        else: picurl = None
+        showdata = {
+            'title' : show,
+            'summary' : summary,
+            'picurl' : picurl
+        }
+        #
+        ## now look for tvdb ID for series
+        tvdbID = None
+        for leafElem in seasons_by_show[ ratingkey ]:
+            if 'parentguid' not in leafElem.attrs: continue
+            prs = urlparse( leafElem.attrs[ 'parentguid' ] )
+            if 'themoviedb' in prs.scheme: continue
+            try:
+                tvdbID = int( prs.netloc )
+                break
+            except: pass
+        if tvdbID is not None: showdata[ 'tvdbid' ] = tvdbID
+        #
+        seasons = { }
+        for videlem in episodes_by_show.get( ratingkey, [ ] ):
+            if datetime.datetime.fromtimestamp( float( videlem['addedat'] ) ).date( ) < sinceDate:
+                continue
+            _add_episode_datum( seasons, *_get_episode_datum( videlem, fullURL ) )
+        showdata[ 'seasons' ] = seasons
+        show_datums[ ratingkey ] = ( show, showdata )
+    logging.debug( 'found %d shows, %d seasons, %d episodes in %d requests at %s.' % (
+        len( show_records ), len( season_records ), len( episode_records ),
+        3 + ( len( show_records ) + len( season_records ) + len( episode_records ) ) // page_size, url ) )
+    return show_datums
+
+def _get_library_data_show_bulk(
+        key, token, fullURL = 'http://localhost:32400',
+        sinceDate = None, timeout = None, page_size = _plex_page_size ):
+    show_datums = _get_show_datums_bulk(
+        key, token, fullURL = fullURL, sinceDate = sinceDate, timeout = timeout,
+        page_size = page_size )
+    if show_datums is None: return None
+    return key, dict( filter( None, show_datums.values( ) ) )
 
 def _get_library_data_show(
         key, token, fullURL = 'http://localhost:32400',
         sinceDate = None, num_threads = 2 * multiprocessing.cpu_count( ),
-        timeout = None ):
+        timeout = None, bulk = True ):
     assert( num_threads >= 1 )
+    #
+    ## section-wide season and episode listings, instead of one request per show and season
+    if bulk:
+        return _get_library_data_show_bulk(
+            key, token, fullURL = fullURL, sinceDate = sinceDate, timeout = timeout )
     params = { 'X-Plex-Token' : token }
     if sinceDate is None:
         sinceDate = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date()
-    response = requests.get( '%s/library/sections/%d/all' % ( fullURL, key ),
-                             params = params, verify = False, timeout = timeout )
-    if response.status_code != 200:
+    show_records = iter_plex_xml_records(
+        '%s/library/sections/%d/all' % ( fullURL, key ), 'Directory',
+        params = params, timeout = timeout )
+    if show_records is None:
         logging.debug('ERROR TANIM: COULD NOT REACH PLEX LIBRARIES AT %s/library/sections/%d/all' % ( fullURL, key ) )
         return None
+    show_records = list( show_records )
 
     logging.debug('SUCCESS AT %s/library/sections/%d/all' %
                   ( fullURL, key ) )
     
-    def _valid_videlem( elem ):
-        if elem.name != 'video':
-            return False
-        if len( elem.find_all('media')) != 1:
-            return False
-        media_elem = elem.find( 'media' )
-        if len(set([ 'duration', 'bitrate' ]) -
-               set( media_elem.attrs ) ) != 0:
-            return False
-        part_elem = media_elem.find( 'part' )
-        return 'size' in part_elem.attrs
-    
+    with PlexIOExecutor( num_threads = num_threads ) as executor:
+        tvdata = dict( filter( None, executor.map( lambda direlem: _get_show_datum(
+            direlem, fullURL, params, session = executor.session, sinceDate = sinceDate,
+            timeout = timeout ), show_records ) ) )
+        executor.log_timing( '%s/library/sections/%d/all' % ( fullURL, key ) )
+    return key, tvdata
+
+def _filter_tv_data_since( tvdata, sinceDate = None ):
+    if sinceDate is None: return tvdata
+    def _filter_seasons( seasons ):
+        seasons_since = { }
+        for seasno in seasons:
+            episodes = dict(filter(lambda tup: tup[1][ 'date added' ] >= sinceDate,
+                                   seasons[ seasno ][ 'episodes' ].items( ) ) )
+            if len( episodes ) == 0: continue
+            seasons_since[ seasno ] = seasons[ seasno ].copy( )
+            seasons_since[ seasno ][ 'episodes' ] = episodes
+        return seasons_since
     #
-    ## for videlems in shows
-    ## videlem.get('index') == episode # in season
-    ## videlem.get('parentindex') == season # of show ( season 0 means Specials )
-    ## videlem.get('originallyavailableat') == when first aired
-    def _get_show_data( input_data ):
-        times_requests_given = [ ]
-        cont =    input_data[ 'cont' ]
-        session = input_data[ 'session' ]
-        slist =   input_data[ 'slist' ]
-        t0 =      input_data[ 't0' ]
-        timeout = input_data[ 'timeout' ]
-        indices = input_data[ 'indices' ]
-        #
-        html = BeautifulSoup( cont, 'lxml' )
-        direlems = html.find_all('directory')
-        tvdata_tup = [ ]
-        for idx in indices:
-            direlem = direlems[ idx ]
-            show = unescape( direlem['title'] )
-            if 'summary' in direlem.attrs: summary = direlem['summary']
-            else: summary = ''
-            if 'art' in direlem.attrs: picurl = '%s%s' % ( fullURL, direlem.get('art') )
-            else: picurl = None
-            newURL = urljoin( fullURL, direlem['key'] )
-            resp2 = session.get( newURL, params = params, verify = False, timeout = timeout )
-            times_requests_given.append( time.time( ) - t0 )
-            if resp2.status_code != 200: continue
-            h2 = BeautifulSoup( resp2.content, 'lxml' )
-            leafElems = list( filter(lambda le: 'allLeaves' not in le['key'], h2.find_all('directory') ) )
-            if len(leafElems) == 0: continue
-            seasons = { }
-            showdata = {
-                'title' : show,
-                'summary' : summary,
-                'picurl' : picurl
-            }
-            #
-            ## now look for tvdb ID for series
-            tvdbID = None
-            for leafElem in leafElems:
-                if 'parentguid' not in leafElem.attrs: continue
-                pguid = leafElem.attrs[ 'parentguid']
-                prs = urlparse( pguid )
-                scheme = prs.scheme
-                if 'themoviedb' in scheme: continue
-                try:                  
-                  tvdbID = int( prs.netloc )
-                  break
-                except: pass
-            if tvdbID is not None: showdata[ 'tvdbid' ] = tvdbID
-            #
-            for idx, leafElem in enumerate(leafElems):
-                newURL = urljoin( fullURL, leafElem[ 'key' ] )
-                resp3 = session.get( newURL, params = params, verify = False, timeout = timeout )
-                times_requests_given.append( time.time( ) - t0 )
-                h3 = BeautifulSoup( resp3.content, 'lxml' )
-                for videlem in h3.find_all( _valid_videlem ):
-                    if datetime.datetime.fromtimestamp( float( videlem['addedat'] ) ).date() < sinceDate:
-                        continue
-                    seasno = int( videlem['parentindex'] )
-                    epno = int( videlem[ 'index' ] )
-                    pthumb = videlem.get( 'parentthumb' )
-                    if pthumb is not None: seasonpicurl = '%s%s' % ( fullURL, videlem.get( 'parentthumb' ) )
-                    else: seasonpicurl = fullURL
-                    episodepicurl = '%s%s' % ( fullURL, videlem.get( 'thumb' ) )
-                    episodesummary = videlem.get('summary')
-                    try:
-                        dateaired = datetime.datetime.strptime(
-                            videlem['originallyavailableat'], '%Y-%m-%d' ).date( )
-                    except:
-                        dateaired = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date( )
-                    title = videlem[ 'title' ]
-                    duration = 1e-3 * int( videlem[ 'duration' ] )
-                    media_elem = videlem.find('media')
-                    bitrate = int( media_elem[ 'bitrate' ] ) * 1e3 / 8.0
-                    part_elem = media_elem.find('part')
-                    filename = part_elem[ 'file' ]
-                    size = int( part_elem[ 'size' ] )
-                    seasons.setdefault( seasno, { } )
-                    if 'episodes' not in seasons[ seasno ]:
-                        seasons[ seasno ].setdefault( 'episodes', { } )
-                        seasons[ seasno ][ 'seasonpicurl' ] = seasonpicurl
-                    seasons[ seasno ]['episodes'][ epno ] = {
-                        'title' : title,
-                        'episodepicurl' : episodepicurl,
-                        'date aired' : dateaired,
-                        'summary' : episodesummary,
-                        'duration' : duration,
-                        'size' : size,
-                        'path' : filename }
-                    #
-                    ## look for directors and writers
-                    director_elems = videlem.find_all( 'director' )
-                    if len( director_elems ) != 0:
-                        directors = list(
-                            map(lambda elem: elem['tag'].strip( ),
-                                filter(lambda elem: 'tag' in elem.attrs,
-                                       director_elems ) ) )
-                        seasons[ seasno ]['episodes'][ epno ][ 'director' ] = directors
-                    writer_elems = videlem.find_all( 'writer' )
-                    if len( writer_elems ) != 0:
-                        writers = list(
-                            map(lambda elem: elem['tag'].strip( ),
-                                filter(lambda elem: 'tag' in elem.attrs,
-                                       writer_elems ) ) )
-                        seasons[ seasno ]['episodes'][ epno ][ 'writer' ] = writers
-                                                                              
-            showdata[ 'seasons' ] = seasons
-            tvdata_tup.append( ( show, showdata ) )
-        slist.append( times_requests_given )
-        return tvdata_tup
-    
-    num_direlems = len( BeautifulSoup( response.content, 'lxml' ).find_all('directory' ) )
-    max_of_num_vals = max( num_direlems, multiprocessing.cpu_count( ) )
-    act_num_threads = min( num_threads, max_of_num_vals )
-    with multiprocessing.Pool( processes = act_num_threads ) as pool:
-        #
-        ## manager with shared memory objects
-        manager = Manager( )
-        shared_list = manager.list( )
-        #
-        ## setting up a connection pool to minimize the number of connections we have
-        sess = requests.Session( )
-        sess.mount( 'https://', requests.adapters.HTTPAdapter(
-            pool_connections = act_num_threads,
-            pool_maxsize = act_num_threads ) )
-        sess.mount( 'http://', requests.adapters.HTTPAdapter(
-            pool_connections = act_num_threads,
-            pool_maxsize = act_num_threads ) )
-        #
-        ## multiprocess chunking of input data among act_num_threads processes
-        time0 = time.time( )
-        input_tuples = list(
-            map(lambda idx: {
-                'cont'    : response.content,
-                'session' : sess,
-                'slist'   : shared_list,
-                't0'      : time0,
-                'timeout' : timeout,
-                'indices' : list( range( idx, num_direlems, act_num_threads ) ) },
-                range( act_num_threads ) ) )
-        #
-        ## final result reduced after a multiprocessing map
-        tvdata = dict(
-            chain.from_iterable(filter(
-                None, pool.map( _get_show_data, input_tuples ) ) ) )
-        total_times_requests_given = numpy.sort( numpy.array(
-            list( chain.from_iterable( shared_list ) ) ) )
-        dts = total_times_requests_given[1:] - total_times_requests_given[:-1]
-        logging.debug( 'total number of requests given = %d.' % len( total_times_requests_given ) )
-        logging.debug( 'minimum time between requests = %0.3e seconds.' % dts.min( ) )
-        logging.debug( 'maximum time between requests = %0.3e seconds.' % dts.max( ) )
-        logging.debug( 'average time between requests = %0.3e seconds.' % dts.mean( ) )            
-        return key, tvdata
+    ## as with _get_library_data_show, keep the shows that have no episodes since sinceDate
+    tvdata_since = { }
+    for show in tvdata:
+        tvdata_since[ show ] = tvdata[ show ].copy( )
+        tvdata_since[ show ][ 'seasons' ] = _filter_seasons( tvdata[ show ][ 'seasons' ] )
+    return tvdata_since
+
+def _summarize_tv_data( tvdata ):
+    numTVshows = len( tvdata )
+    episodes = list( chain.from_iterable(
+        map(lambda show: chain.from_iterable(
+            map(lambda season: season[ 'episodes' ].values( ),
+                tvdata[ show ][ 'seasons' ].values( ) ) ), tvdata ) ) )
+    numTVeps = len( episodes )
+    totdur = sum(list(map(lambda episode: episode[ 'duration' ], episodes ) ) )
+    totsize = sum(list(map(lambda episode: episode[ 'size' ], episodes ) ) )
+    return numTVeps, numTVshows, totdur, totsize
 
 def _get_library_stats_show(
         key, token, fullURL = 'http://localhost:32400',
         sinceDate = None ):
-    _, tvdata = _get_library_data_show( key, token, fullURL = fullURL,
-                                        sinceDate = sinceDate )
-    numTVshows = len( tvdata )
-    numTVeps = sum(list(
-        map(lambda show:
-            sum(list(
-                map(lambda seasno: len( tvdata[ show ]['seasons'][ seasno ]['episodes'] ),
-                    tvdata[ show ]['seasons'] ) ) ),
-            tvdata ) ) )
-    totdur = sum(list(
-        map(lambda show:
-            sum(list(
-                map(lambda seasno:
-                    sum(list(
-                        map(lambda epno: tvdata[ show ]['seasons'][ seasno ]['episodes'][epno]['duration'],
-                            tvdata[ show ]['seasons'][ seasno ]['episodes'] ) ) ),
-                    tvdata[ show ]['seasons'] ) ) ),
-            tvdata ) ) )
-    totsize = sum(list(
-        map(lambda show:
-            sum(list(
-                map(lambda seasno:
-                    sum(list(
-                        map(lambda epno: tvdata[ show ]['seasons'][ seasno ]['episodes'][epno]['size'],
-                            tvdata[ show ]['seasons'][ seasno ]['episodes'] ) ) ),
-                    tvdata[ show ]['seasons'] ) ) ),
-            tvdata ) ) )
-    return key, numTVeps, numTVshows, totdur, totsize
-
-def _get_library_stats_artist( key, token, fullURL = 'http://localhost:32400',
-                               sinceDate = None ):
-    _, music_data = _get_library_data_artist(
-        key, token, fullURL = fullURL, sinceDate = sinceDate )
+    tup = _get_library_data_show( key, token, fullURL = fullURL,
+                                  sinceDate = sinceDate )
+    if tup is None: return None
+    _, tvdata = tup
+    return ( key, ) + _summarize_tv_data( tvdata )
+
+def _filter_music_data_since( music_data, sinceDate = None ):
+    if sinceDate is None: return music_data
+    music_data_since = { }
+    for artist in music_data:
+        artist_data = { }
+        for album in music_data[ artist ]:
+            tracks = list(filter(lambda track: track[ 'curdate' ] >= sinceDate,
+                                 music_data[ artist ][ album ][ 'tracks' ] ) )
+            if len( tracks ) == 0: continue
+            artist_data[ album ] = music_data[ artist ][ album ].copy( )
+            artist_data[ album ][ 'tracks' ] = tracks
+        if len( artist_data ) == 0: continue
+        music_data_since[ artist ] = artist_data
+    return music_data_since
+
+def _summarize_music_data( music_data ):
     num_artists = len( music_data )
     num_albums = sum(list(
         map(lambda artist: len( music_data[ artist ] ), music_data ) ) )
-    num_songs = sum(list(
-        map(lambda artist: sum(list(
-            map(lambda album: len( music_data[ artist ][ album ][ 'tracks' ] ),
-                music_data[ artist ] ) ) ),
-            music_data ) ) )
-    totdur = sum(list(
-        map(lambda artist: sum(list(
-            map(lambda album: sum(list(
-                map(lambda track: track[ 'duration' ],
-                    music_data[ artist ][ album ][ 'tracks' ] ) ) ),
-                music_data[ artist ] ) ) ),
+    tracks = list( chain.from_iterable(
+        map(lambda artist: chain.from_iterable(
+            map(lambda album: album[ 'tracks' ], music_data[ artist ].values( ) ) ),
             music_data ) ) )
-    totsize = sum(list(
-        map(lambda artist: sum(list(
-            map(lambda album: sum(list(
-                map(lambda track: track[ 'size' ],
-                    music_data[ artist ][ album ][ 'tracks' ] ) ) ),
-                music_data[ artist ] ) ) ),
-            music_data ) ) )                
-    return key, num_songs, num_albums, num_artists, totdur, totsize
+    num_songs = len( tracks )
+    totdur = sum(list(map(lambda track: track[ 'duration' ], tracks ) ) )
+    totsize = sum(list(map(lambda track: track[ 'size' ], tracks ) ) )
+    return num_songs, num_albums, num_artists, totdur, totsize
+
+def _get_library_stats_artist( key, token, fullURL = 'http://localhost:32400',
+                               sinceDate = None ):
+    tup = _get_library_data_artist(
+        key, token, fullURL = fullURL, sinceDate = sinceDate )
+    if tup is None: return None
+    _, music_data = tup
+    return ( key, ) + _summarize_music_data( music_data )
+
+def _valid_track( track_elem ):
+    if len(list(track_elem.find_all('media'))) != 1:
+        return False
+    media_elem = track_elem.find( 'media' )
+    if len(set([ 'bitrate', 'duration' ]) -
+           set(media_elem.attrs)) != 0:
+        return False
+    return True
+
+def _get_artist_datum( artist_elem, fullURL, params, session = requests, sinceDate = None,
+                       timeout = None ):
+    if sinceDate is None:
+        sinceDate = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date( )
+    newURL = '%s%s' % ( fullURL, artist_elem.get('key') )
+    resp2 = session.get( newURL, params = params, verify = False, timeout = timeout )        
+    if resp2.status_code != 200: return None
+    album_elems = get_plex_xml_records( resp2.content, 'Directory' )
+    artist_name = artist_elem[ 'title' ]
+    artist_data = { }
+    for album_elem in album_elems:
+        newURL = '%s%s' % ( fullURL, album_elem.get('key') )
+        resp3 = session.get( newURL, params = params, verify = False, timeout = timeout )
+        if resp3.status_code != 200: continue
+        track_elems = list( filter(_valid_track, get_plex_xml_records( resp3.content, 'Track' ) ) )
+        album_name = album_elem[ 'title' ]
+        artist_data.setdefault( album_name, [ ] )
+        tracks = [ ]
+        if 'thumb' in album_elem.attrs: picurl = '%s%s' % ( fullURL, album_elem.get('thumb') )
+        else: picurl = None
+        if 'year' in album_elem.attrs: year = int( album_elem.get('year'))
+        else: year = 1900
+        for track_elem in track_elems:
+            if datetime.datetime.fromtimestamp( float(
+                    track_elem.get('addedat') ) ).date() < sinceDate:
+                continue
+            media_elem = track_elem.find( 'media' )
+            duration = 1e-3 * int( media_elem[ 'duration' ] )
+            bitrate = int( media_elem[ 'bitrate' ] ) * 1e3 / 8.0
+            curdate = datetime.datetime.fromtimestamp( float( track_elem[ 'addedat' ] ) ).date( )
+            track_name = track_elem[ 'title' ]
+            part_elem = track_elem.find( 'part' )
+            fname = part_elem[ 'file' ]
+            if 'index' in track_elem.attrs: track = int( track_elem.get('index'))
+            else: track = 0
+            tracks.append(
+                { 'track_name' : track_name,
+                  'curdate' : curdate,
+                  'duration' : duration,
+                  'size' : bitrate * duration,
+                  'track' : track,
+                  'file' : fname } )
+        if len( tracks ) == 0: continue
+        artist_data[ album_name ] = {
+            'year' : year,
+            'picurl' : picurl,
+            'tracks' : sorted(tracks, key = lambda track: track[ 'track' ] ) }
+    if len( artist_data ) == 0: return None
+    return artist_name, artist_data
 
 def _get_library_data_artist( key, token, fullURL = 'http://localhost:32400',
                               sinceDate = None, num_threads = 2 * multiprocessing.cpu_count( ),
@@ -809,103 +1228,20 @@ def _get_library_data_artist( key, token, fullURL = 'http://localhost:32400',
     if sinceDate is None:
         sinceDate = datetime.datetime.strptime( '1900-01-01', '%Y-%m-%d' ).date( )
         
-    response = requests.get( '%s/library/sections/%d/all' % ( fullURL, key ),
-                             params = params, verify = False, timeout = timeout )
-    if response.status_code != 200:
+    artist_records = iter_plex_xml_records(
+        '%s/library/sections/%d/all' % ( fullURL, key ), 'Directory',
+        params = params, timeout = timeout )
+    if artist_records is None:
         logging.error('ERROR: COULD NOT REACH PLEX LIBRARIES AT %s/library/sections/%d/all' %
                       ( fullURL, key ) )
         return None
+    artist_records = list( artist_records )
     
-    def valid_track( track_elem ):
-        if len(list(track_elem.find_all('media'))) != 1:
-            return False
-        media_elem = max( track_elem.find_all('media') )
-        if len(set([ 'bitrate', 'duration' ]) -
-               set(media_elem.attrs)) != 0:
-            return False
-        return True
-    #
-    def _get_artist_data( input_data ):
-        cont    = input_data[ 'cont' ]
-        session = input_data[ 'session' ]
-        timeout = input_data[ 'timeout' ]
-        indices = input_data[ 'indices' ]
-        #
-        html = BeautifulSoup( cont, 'lxml' )
-        artist_elems = html.find_all('directory')
-        song_data_sub = [ ]
-        for idx in indices:
-            artist_elem = artist_elems[ idx ]
-            newURL = '%s%s' % ( fullURL, artist_elem.get('key') )
-            resp2 = session.get( newURL, params = params, verify = False, timeout = timeout )        
-            if resp2.status_code != 200: continue
-            h2 = BeautifulSoup( resp2.content, 'lxml' )
-            album_elems = list( h2.find_all('directory') )
-            artist_name = artist_elem[ 'title' ]
-            artist_data = { }
-            for album_elem in album_elems:
-                newURL = '%s%s' % ( fullURL, album_elem.get('key') )
-                resp3 = session.get( newURL, params = params, verify = False, timeout = timeout )
-                if resp3.status_code != 200: continue
-                h3 = BeautifulSoup( resp3.content, 'lxml' )
-                track_elems = list( filter(valid_track, h3.find_all( 'track' ) ) )
-                album_name = album_elem[ 'title' ]
-                artist_data.setdefault( album_name, [ ] )
-                tracks = [ ]
-                if 'thumb' in album_elem.attrs: picurl = '%s%s' % ( fullURL, album_elem.get('thumb') )
-                else: picurl = None
-                if 'year' in album_elem.attrs: year = int( album_elem.get('year'))
-                else: year = 1900
-                for track_elem in track_elems:
-                    if datetime.datetime.fromtimestamp( float(
-                            track_elem.get('addedat') ) ).date() < sinceDate:
-                        continue
-                    media_elem = max(track_elem.find_all('media'))
-                    duration = 1e-3 * int( media_elem[ 'duration' ] )
-                    bitrate = int( media_elem[ 'bitrate' ] ) * 1e3 / 8.0
-                    curdate = datetime.datetime.fromtimestamp( float( track_elem[ 'addedat' ] ) ).date( )
-                    track_name = track_elem[ 'title' ]
-                    part_elem = max( track_elem.find_all( 'part' ) )
-                    fname = part_elem[ 'file' ]
-                    if 'index' in track_elem.attrs: track = int( track_elem.get('index'))
-                    else: track = 0
-                    tracks.append(
-                        { 'track_name' : track_name,
-                          'curdate' : curdate,
-                          'duration' : duration,
-                          'size' : bitrate * duration,
-                          'track' : track,
-                          'file' : fname } )
-                if len( tracks ) == 0: continue
-                artist_data[ album_name ] = {
-                    'year' : year,
-                    'picurl' : picurl,
-                    'tracks' : sorted(tracks, key = lambda track: track[ 'track' ] ) }
-            if len( artist_data ) == 0: continue
-            song_data_sub.append( ( artist_name, artist_data ) )
-        return song_data_sub
-
-    act_num_threads = max( num_threads, multiprocessing.cpu_count( ) )
-    len_artistelems = len( BeautifulSoup( response.content, 'lxml' ).find_all('directory') )
-    
-    s = requests.Session( )
-    s.mount( 'https://', requests.adapters.HTTPAdapter(
-        pool_connections = act_num_threads,
-        pool_maxsize = act_num_threads ) )
-    s.mount( 'http://', requests.adapters.HTTPAdapter(
-        pool_connections = act_num_threads,
-        pool_maxsize = act_num_threads ) )
-    
-    with multiprocessing.Pool( processes = act_num_threads ) as pool:
-        input_tuples = list(
-            map(lambda idx: {
-                'cont'    : response.content,
-                'session' : s,
-                'timeout' : timeout,
-                'indices' : list(range( idx, len_artistelems, act_num_threads ) ) },
-                range( act_num_threads ) ) )
-        song_data = dict(chain.from_iterable(pool.map(
-            _get_artist_data, input_tuples ) ) )
+    with PlexIOExecutor( num_threads = num_threads ) as executor:
+        song_data = dict( filter( None, executor.map( lambda artist_elem: _get_artist_datum(
+            artist_elem, fullURL, params, session = executor.session, sinceDate = sinceDate,
+            timeout = timeout ), artist_records ) ) )
+        executor.log_timing( '%s/library/sections/%d/all' % ( fullURL, key ) )
         #
         ## now go through each artist + album. If nothing there, then pop.
         for artist in song_data:
@@ -940,8 +1276,152 @@ def get_movies_libraries( token, fullURL = 'http://localhost:32400' ):
     return sorted(set(filter(lambda key: library_dict[ key ][1] == 'movie',
                              library_dict ) ) )
 
+#
+## above this many changed shows, one section-wide crawl is cheaper than one crawl per show
+_snapshot_bulk_threshold = 10
+
+def _get_snapshot_signature( elem ):
+    return ':'.join(map(lambda attr: elem.get( attr, '' ),
+                        ( 'updatedat', 'addedat', 'leafcount', 'childcount' ) ) )
+
+def _get_library_snapshot_data( key, mediatype ):
+    rows = list(filter(lambda row: row.data is not None,
+                       session.query( PlexLibrarySnapshot ).filter(
+                           PlexLibrarySnapshot.libkey == key ) ) )
+    if mediatype == 'movie':
+        movie_data = { }
+        for row in rows: movie_data.setdefault( row.name, [ ] ).append( row.data )
+        return movie_data
+    return dict(map(lambda row: ( row.name, row.data ), rows ) )
+
+def _get_snapshot_dirty_keys( key, mediatype, token, fullURL, since, timeout = None ):
+    #
+    ## episodes (type = 4) or tracks (type = 10) added or updated since last refresh
+    leaftype, tag = { 'show' : ( 4, 'Video' ), 'artist' : ( 10, 'Track' ) }[ mediatype ]
+    dirty_keys = set( )
+    for attr in ( 'addedAt', 'updatedAt' ):
+        params = { 'X-Plex-Token' : token, 'type' : leaftype, '%s>>' % attr : int( since.timestamp( ) ) }
+        leaf_records = iter_plex_xml_records(
+            '%s/library/sections/%d/all' % ( fullURL, key ), tag,
+            params = params, timeout = timeout )
+        if leaf_records is None: return None
+        dirty_keys.update( filter(None, map(lambda elem: elem.get( 'grandparentratingkey' ), leaf_records ) ) )
+    return dirty_keys
+
+def refresh_library_snapshot( key, token, fullURL = 'http://localhost:32400', mediatype = None,
+                              num_threads = 2 * multiprocessing.cpu_count( ), timeout = None,
+                              force = False ):
+    """
+    Incrementally refreshes the local snapshot of a Plex_ library, stored in the ``plexlibrarysnapshot`` table of the SQLite3_ configuration database (see :py:class:`PlexLibrarySnapshot <howdy.core.PlexLibrarySnapshot>`), and returns the library data. The refresh proceeds in the following way.
+
+    * If the Plex_ server has not been updated (see :py:meth:`get_updated_at <howdy.core.core.get_updated_at>`) since the last refresh, then return the snapshot without further requests.
+
+    * Otherwise, get the list of movies, shows, or artists in the library with one request. Find the episodes or tracks that were added or updated since the last refresh with two more requests, using the Plex_ ``addedAt`` and ``updatedAt`` filters.
+
+    * Crawl again only those movies, shows, or artists that are new, whose ``updatedAt``, ``addedAt``, ``leafCount``, or ``childCount`` changed, or that contain a new or updated episode or track. If many shows changed, then instead get all the seasons and episodes in the TV library with a few section-wide requests. Remove those items that are no longer in the library.
+
+    :param int key: the key number of the library in the Plex_ server.
+    :param str token: the Plex_ server access token.
+    :param str fullURL: the Plex_ server address.
+    :param str mediatype: optional type of the library, one of ``movie``, ``show``, or ``artist``. If ``None``, then it is found from the Plex_ server.
+    :param int num_threads: the maximum number of concurrent requests made to the Plex_ server to get the library data (see :py:class:`PlexIOExecutor <howdy.core.core.PlexIOExecutor>`).
+    :param int timeout: optional time, in seconds, to wait for an HTTP conection to the Plex_ server.
+    :param bool force: if ``True``, then throw away the existing snapshot and crawl the whole library. Default is ``False``.
+
+    :returns: the library data, in the format described in :py:meth:`get_library_data <howdy.core.core.get_library_data>`. If the library cannot be reached, returns ``None``.
+    :rtype: dict
+
+    .. seealso:: :py:meth:`get_library_data <howdy.core.core.get_library_data>`.
+    """
+    assert( num_threads >= 1 )
+    if mediatype is None:
+        library_dict = get_libraries( token, fullURL = fullURL, do_full = True, timeout = timeout )
+        if library_dict is None or key not in library_dict: return None
+        _, mediatype = library_dict[ key ]
+    if mediatype not in ( 'movie', 'show', 'artist' ): return None
+    params = { 'X-Plex-Token' : token }
+    #
+    ## if server has not changed since last refresh, nothing to do
+    state = session.query( PlexLibrarySnapshotState ).filter(
+        PlexLibrarySnapshotState.libkey == key ).first( )
+    if state is not None and state.mediatype != mediatype: force = True
+    updated_at = get_updated_at( token, fullURL = fullURL )
+    if not force and state is not None and updated_at is not None and updated_at <= state.refreshed:
+        logging.info( 'snapshot of library %d is current as of %s.' % ( key, state.refreshed ) )
+        return _get_library_snapshot_data( key, mediatype )
+    if updated_at is None: updated_at = datetime.datetime.now( )
+    #
+    tag = { 'movie' : 'Video', 'show' : 'Directory', 'artist' : 'Directory' }[ mediatype ]
+    records = iter_plex_xml_records(
+        '%s/library/sections/%d/all' % ( fullURL, key ), tag,
+        params = params, timeout = timeout )
+    if records is None:
+        logging.error( 'ERROR: COULD NOT REACH PLEX LIBRARIES AT %s/library/sections/%d/all' %
+                       ( fullURL, key ) )
+        return None
+    records = list(filter(lambda elem: 'ratingkey' in elem.attrs, records ) )
+    current_keys = set(map(lambda elem: elem[ 'ratingkey' ], records ) )
+    if force: stored = { }
+    else:
+        stored = dict(map(lambda row: ( row.ratingkey, row.signature ),
+                          session.query( PlexLibrarySnapshot ).filter(
+                              PlexLibrarySnapshot.libkey == key ) ) )
+    dirty_keys = set(map(lambda elem: elem[ 'ratingkey' ], filter(
+        lambda elem: stored.get( elem[ 'ratingkey' ] ) != _get_snapshot_signature( elem ), records ) ) )
+    if mediatype != 'movie' and state is not None and len( stored ) != 0:
+        leaf_dirty_keys = _get_snapshot_dirty_keys(
+            key, mediatype, token, fullURL, state.refreshed, timeout = timeout )
+        if leaf_dirty_keys is None: dirty_keys = current_keys
+        else: dirty_keys |= ( leaf_dirty_keys & current_keys )
+    dirty_records = list(filter(lambda elem: elem[ 'ratingkey' ] in dirty_keys, records ) )
+    logging.info( 'refreshing %d of %d items in snapshot of library %d.' % (
+        len( dirty_records ), len( records ), key ) )
+    #
+    ## now crawl the dirty items
+    if mediatype == 'movie':
+        genre_cache = get_movie_genre_cache( )
+        new_entries = { }
+        crawled = list(map(lambda elem: ( elem[ 'ratingkey' ], _get_movie_datum(
+            elem, fullURL, genre_cache, new_entries ) ), dirty_records ) )
+        push_movie_genre_cache( new_entries )
+    elif len( dirty_records ) == 0: crawled = [ ]
+    elif mediatype == 'show' and len( dirty_records ) > _snapshot_bulk_threshold:
+        show_datums = _get_show_datums_bulk( key, token, fullURL = fullURL, timeout = timeout )
+        if show_datums is None: return None
+        crawled = list(map(lambda elem: ( elem[ 'ratingkey' ], show_datums.get( elem[ 'ratingkey' ] ) ),
+                           dirty_records ) )
+    else:
+        if mediatype == 'show': _get_datum = _get_show_datum
+        else: _get_datum = _get_artist_datum
+        with PlexIOExecutor( num_threads = min( num_threads, len( dirty_records ) ) ) as executor:
+            crawled = executor.map( lambda elem: ( elem[ 'ratingkey' ], _get_datum(
+                elem, fullURL, params, session = executor.session, timeout = timeout ) ), dirty_records )
+            executor.log_timing( 'snapshot of library %d' % key )
+    #
+    ## store crawled items, remove items no longer in library
+    signatures = dict(map(lambda elem: ( elem[ 'ratingkey' ], _get_snapshot_signature( elem ) ), records ) )
+    if force:
+        session.query( PlexLibrarySnapshot ).filter(
+            PlexLibrarySnapshot.libkey == key ).delete( synchronize_session = False )
+    else:
+        for ratingkey in set( stored ) - current_keys:
+            session.query( PlexLibrarySnapshot ).filter(
+                PlexLibrarySnapshot.libkey == key ).filter(
+                    PlexLibrarySnapshot.ratingkey == ratingkey ).delete( synchronize_session = False )
+    for ratingkey, datum in crawled:
+        if datum is None: name, data = None, None
+        else: name, data = datum
+        session.merge( PlexLibrarySnapshot(
+            libkey = key, ratingkey = ratingkey, signature = signatures[ ratingkey ],
+            name = name, data = data ) )
+    session.merge( PlexLibrarySnapshotState(
+        libkey = key, mediatype = mediatype, refreshed = updated_at ) )
+    session.commit( )
+    return _get_library_snapshot_data( key, mediatype )
+
 def get_library_data( title, token, fullURL = 'http://localhost:32400',
-                      num_threads = 2 * multiprocessing.cpu_count( ), timeout = None ):
+                      num_threads = 2 * multiprocessing.cpu_count( ), timeout = None,
+                      use_snapshot = False ):
     """
     Returns the data on the specific Plex library, as a :py:class:`dict`. This lower level functionality lives in the same space as `PlexAPI <https://python-plexapi.readthedocs.io/en/latest>`_. Three types of library data can be returned: movies, TV shows, and music.
     
@@ -975,11 +1455,12 @@ def get_library_data( title, token, fullURL = 'http://localhost:32400',
         * ``tvdata[<showname>]['seasons']`` is a :py:class:`dict` whose keys are the seasons. If the show has specials, then those episodes are in season 0.
         
           * this :py:class:`dict` has two keys: ``seasonpicurl`` (:py:class:`str` URL of the poster for the season), and ``episodes`` (:py:class:`dict` of the episodes for that season).
-          * ``tvdata[<showname>]['seasons']['episodes']`` is a :py:class:`dict` whose keys are the episode numbers, and whose value is a :py:class:`dict` with the following nine keys and values.
+          * ``tvdata[<showname>]['seasons']['episodes']`` is a :py:class:`dict` whose keys are the episode numbers, and whose value is a :py:class:`dict` with the following ten keys and values.
           
             * ``title``: :py:class:`str` title of the episode.
             * ``episodepicurl``: :py:class:`str` URL of the poster of the episode.
             * ``date aired``: :py:class:`date <datetime.date>` of when the episode first aired.
+            * ``date added``: :py:class:`date <datetime.date>` of when the episode was added to the Plex_ server.
             * ``summary``: :py:class:`str` summary of the episode's plot.
             * ``duration:``: :py:class:`float` episode duration in seconds.
             * ``size``: :py:class:`int` size of the episode file in bytes.
@@ -1015,8 +1496,9 @@ def get_library_data( title, token, fullURL = 'http://localhost:32400',
     :param str title: the name of the library.
     :param str token: the Plex_ server access token.
     :param str fullURL: the Plex_ server address.
-    :param int num_threads: the number of concurrent threads used to access the Plex_ server and get the library data.
+    :param int num_threads: the maximum number of concurrent requests made to the Plex_ server to get the library data (see :py:class:`PlexIOExecutor <howdy.core.core.PlexIOExecutor>`).
     :param int timeout: optional time, in seconds, to wait for an HTTP conection to the Plex_ server.
+    :param bool use_snapshot: if ``True``, then incrementally refresh and return the local snapshot of this library (see :py:meth:`refresh_library_snapshot <howdy.core.core.refresh_library_snapshot>`) instead of crawling the whole library. Default is ``False``.
     
     :returns: a :py:class:`dict` of library data on the Plex_ server.
     :rtype: dict
@@ -1038,7 +1520,14 @@ def get_library_data( title, token, fullURL = 'http://localhost:32400',
                      direlem in html.find_all('directory') }
     assert( title in library_dict )
     key, mediatype = library_dict[ title ]
-    if mediatype == 'movie':
+    if use_snapshot and mediatype in ( 'movie', 'show', 'artist' ):
+        data = refresh_library_snapshot(
+            key, token, fullURL = fullURL, mediatype = mediatype,
+            num_threads = num_threads, timeout = timeout )
+        if data is None:
+            logging.error( "could not refresh snapshot of library = %s. Exiting..." % title )
+            return None
+    elif mediatype == 'movie':
         _, data = _get_library_data_movie( key, token, fullURL = fullURL,
                                            num_threads = num_threads, timeout = timeout )
     elif mediatype == 'show':
@@ -1122,7 +1611,36 @@ def get_library_stats( key, token, fullURL = 'http://localhost:32400', sinceDate
     :returns: a :py:class:`dict` of summary statistics on the Plex_ library.
     :rtype: dict
 
-    .. seealso:: :py:meth:`get_library_data <howdy.core.core.get_library_data>`.
+    .. seealso::
+
+       * :py:meth:`get_library_data <howdy.core.core.get_library_data>`.
+       * :py:meth:`get_library_stats_windows <howdy.core.core.get_library_stats_windows>`.
+    """
+    stats = get_library_stats_windows(
+        key, token, fullURL = fullURL, windows = [ sinceDate ] )
+    if stats is None: return None
+    return stats[ 0 ]
+
+def get_library_stats_windows( key, token, fullURL = 'http://localhost:32400', windows = [ None ],
+                               use_snapshot = False ):
+    """
+    Gets summary data on a specific library on the Plex_ server, for several date windows at once, from a single crawl of that library. For example, the Plex_ newsletter needs summary data on everything in a library, and on everything added since some date. This returns the same information as two calls to :py:meth:`get_library_stats <howdy.core.core.get_library_stats>`, but only crawls the library once.
+
+    .. code-block:: python
+
+       all_stats, stats_since = get_library_stats_windows(
+           key, token, fullURL = fullURL, windows = [ None, sinceDate ] )
+
+    :param int key: the key number of the library in the Plex_ server.
+    :param str token: the Plex_ server access token.
+    :param str fullURL: the Plex_ server address.
+    :param list windows: the :py:class:`list` of windows over which to tally the library media. Each window is either ``None`` (tally everything), or a :py:class:`date <datetime.date>` (only tally the media added after this date).
+    :param bool use_snapshot: if ``True``, then tally the incrementally refreshed local snapshot of this library (see :py:meth:`refresh_library_snapshot <howdy.core.core.refresh_library_snapshot>`) instead of crawling the library. Default is ``False``.
+
+    :returns: a :py:class:`list`, one per window in ``windows`` and in the same order, of the summary statistics :py:class:`dict` described in :py:meth:`get_library_stats <howdy.core.core.get_library_stats>`. If the library cannot be reached, returns ``None``.
+    :rtype: list
+
+    .. seealso:: :py:meth:`get_library_stats <howdy.core.core.get_library_stats>`.
     """
     library_dict = get_libraries( token, fullURL = fullURL, do_full = True )
     if library_dict is None: return None
@@ -1133,41 +1651,60 @@ def get_library_stats( key, token, fullURL = 'http://localhost:32400', sinceDate
         'title'     : title,
         'mediatype' : mediatype
     }
-    if mediatype == 'movie':
-        data = _get_library_stats_movie( key, token, fullURL = fullURL, sinceDate = sinceDate )
+    #
+    ## only crawl as far back as the earliest window needs
+    if any(map(lambda sinceDate: sinceDate is None, windows ) ): crawlDate = None
+    else: crawlDate = min( windows )
+    def _get_data( _get_library_data ):
+        if not use_snapshot:
+            return _get_library_data( key, token, fullURL = fullURL, sinceDate = crawlDate )
+        data = refresh_library_snapshot( key, token, fullURL = fullURL, mediatype = mediatype )
         if data is None: return None
-        actkey, num_movies, totdur, totsize, sorted_by_genre = data
-        extra_vals = {
-            'num_movies' : num_movies,
-            'totdur'     : totdur,
-            'totsize'    : totsize,
-            'genres'     : sorted_by_genre
-        }
+        return key, data
+    if mediatype == 'movie':
+        tup = _get_data( _get_library_data_movie )
+        if tup is None: return None
+        _, movie_data = tup
+        def _get_extra_vals( sinceDate ):
+            num_movies, totdur, totsize, sorted_by_genre = _summarize_movie_data(
+                _filter_movie_data_since( movie_data, sinceDate ) )
+            return {
+                'num_movies' : num_movies,
+                'totdur'     : totdur,
+                'totsize'    : totsize,
+                'genres'     : sorted_by_genre
+            }
     elif mediatype == 'show':
-        data =  _get_library_stats_show( key, token, fullURL = fullURL, sinceDate = sinceDate )
-        if data is None: return None
-        actkey, num_tveps, num_tvshows, totdur, totsize = data
-        extra_vals = {
-            'num_tveps'   : num_tveps,
-            'num_tvshows' : num_tvshows,
-            'totdur'      : totdur,
-            'totsize'     : totsize
-        }
+        tup = _get_data( _get_library_data_show )
+        if tup is None: return None
+        _, tvdata = tup
+        def _get_extra_vals( sinceDate ):
+            num_tveps, num_tvshows, totdur, totsize = _summarize_tv_data(
+                _filter_tv_data_since( tvdata, sinceDate ) )
+            return {
+                'num_tveps'   : num_tveps,
+                'num_tvshows' : num_tvshows,
+                'totdur'      : totdur,
+                'totsize'     : totsize
+            }
     elif mediatype == 'artist':
-        data = _get_library_stats_artist( key, token, fullURL = fullURL, sinceDate = sinceDate )
-        if data is None:
-            return None
-        actkey, num_songs, num_albums, num_artists, totdur, totsize = data
-        extra_vals = {
-            'num_songs'   : num_songs,
-            'num_albums'  : num_albums,
-            'num_artists' : num_artists,
-            'totdur'      : totdur,
-            'totsize'     : totsize
-        }
-    else: return common_data
-    return dict( list( common_data.items( ) ) +
-                 list( extra_vals.items( ) ) )
+        tup = _get_data( _get_library_data_artist )
+        if tup is None: return None
+        _, music_data = tup
+        def _get_extra_vals( sinceDate ):
+            num_songs, num_albums, num_artists, totdur, totsize = _summarize_music_data(
+                _filter_music_data_since( music_data, sinceDate ) )
+            return {
+                'num_songs'   : num_songs,
+                'num_albums'  : num_albums,
+                'num_artists' : num_artists,
+                'totdur'      : totdur,
+                'totsize'     : totsize
+            }
+    else: return list(map(lambda sinceDate: common_data.copy( ), windows ) )
+    return list(map(lambda sinceDate: dict(
+        list( common_data.items( ) ) +
+        list( _get_extra_vals( sinceDate ).items( ) ) ), windows ) )
         
 def get_libraries( token, fullURL = 'http://localhost:32400', do_full = False, timeout = None ):
     """
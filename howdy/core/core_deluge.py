@@ -1,4 +1,6 @@
-import os, sys, numpy, logging, magic, base64, subprocess
+import os, sys, numpy, logging, magic, base64, subprocess, time
+from threading import Lock, Event, Thread
+from concurrent.futures import Future
 from urllib.parse import parse_qs
 from distutils.spawn import find_executable
 #
@@ -141,16 +143,139 @@ _status_keys = [
     'time_added',
 ]
 
+#
+## the status keys that deluge_format_info needs
+_format_info_keys = [
+    'name',
+    'state',
+    'download_payload_rate',
+    'upload_payload_rate',
+    'eta',
+    'num_seeds',
+    'total_seeds',
+    'num_peers',
+    'total_peers',
+    'distributed_copies',
+    'total_done',
+    'total_size',
+    'ratio',
+    'seeding_time',
+    'active_time',
+    'tracker_status',
+    'is_finished',
+    'progress',
+]
+
+def _get_connection_errors( ):
+    connection_errors = [ OSError, EOFError ]
+    try: import deluge_client.client as deluge_rpc
+    except ImportError: return tuple( connection_errors )
+    connection_errors += list(filter(None, map(lambda name: getattr( deluge_rpc, name, None ),
+                                               ( 'ConnectionLostException', 'CallTimeoutException' ) ) ) )
+    return tuple( connection_errors )
+
+class DelugeClient( object ):
+    """
+    A thread safe, connection-managed wrapper around a `Deluge RPC client`_. The connection is made lazily, on the first call, and is reused by every later call. If a call fails because the connection was lost or timed out, then this reconnects and tries that call once more. Errors raised *by* the Deluge server are passed through.
+
+    :param str url: URL of the Deluge server.
+    :param int port: port used to access the Deluge server.
+    :param str username: server account username.
+    :param str password: server account password.
+    :param client_factory: optional argument, a callable that takes ``( url, port, username, password )`` and returns an unconnected `Deluge RPC client`_. If ``None``, then use the `Deluge RPC client`_ class.
+
+    :var str host: URL of the Deluge server.
+    :var int port: port used to access the Deluge server.
+    :var str username: server account username.
+    :var str password: server account password.
+    :var int num_connects: the number of times this has connected to the Deluge server.
+
+    .. seealso::
+
+       * :py:meth:`create_deluge_client <howdy.core.core_deluge.create_deluge_client>`.
+       * :py:meth:`get_deluge_client <howdy.core.core_deluge.get_deluge_client>`.
+    """
+    def __init__( self, url, port, username, password, client_factory = None ):
+        if client_factory is None:
+            from deluge_client import DelugeRPCClient
+            client_factory = DelugeRPCClient
+        self.host = url
+        self.port = port
+        self.username = username
+        self.password = password
+        self.num_connects = 0
+        self._client_factory = client_factory
+        self._client = None
+        self._lock = Lock( )
+        self._connection_errors = _get_connection_errors( )
+
+    @property
+    def connected( self ):
+        """
+        ``True`` if there is a live connection to the Deluge server, ``False`` otherwise.
+        """
+        return self._client is not None and self._client.connected
+
+    def _connect( self ):
+        self._disconnect( )
+        client = self._client_factory( self.host, self.port, self.username, self.password )
+        client.connect( )
+        assert( client.connected ) # make sure we can connect
+        self._client = client
+        self.num_connects += 1
+
+    def _disconnect( self ):
+        if self._client is None: return
+        try: self._client.disconnect( )
+        except: pass
+        self._client = None
+
+    def connect( self ):
+        """
+        Connects to the Deluge server, if not already connected.
+        """
+        with self._lock:
+            if not self.connected: self._connect( )
+
+    def disconnect( self ):
+        """
+        Closes the connection to the Deluge server. The next call reconnects.
+        """
+        with self._lock:
+            self._disconnect( )
+
+    def call( self, method, *args, **kwargs ):
+        """
+        Makes a single call to the Deluge server, reconnecting and retrying once if the connection was lost. Only one thread at a time talks to the Deluge server.
+
+        :param str method: the Deluge RPC method, such as ``'core.get_torrents_status'``.
+        :returns: whatever the Deluge server returns.
+        """
+        with self._lock:
+            if not self.connected: self._connect( )
+            try: return self._client.call( method, *args, **kwargs )
+            except self._connection_errors as e:
+                logging.info( 'lost connection to Deluge server %s:%d, reconnecting: %s.' % (
+                    self.host, self.port, str( e ) ) )
+                self._connect( )
+                return self._client.call( method, *args, **kwargs )
+
+#
+## the process-wide Deluge clients, one for each set of credentials
+_deluge_clients = { }
+_deluge_clients_lock = Lock( )
+
 def create_deluge_client( url, port, username, password ):
     """
-    Creates a minimal Deluge torrent client to the Deluge seedbox server.
+    Creates a minimal Deluge torrent client to the Deluge seedbox server, and connects to it. This client is *not* shared with anything else.
 
     :param str url: URL of the Deluge server.
     :param int port: port used to access the Deluge server.
     :param str username: server account username.
     :param str password: server account password.
 
-    :returns: a lightweight `Deluge RPC client`_.
+    :returns: a connected :py:class:`DelugeClient <howdy.core.core_deluge.DelugeClient>` around a lightweight `Deluge RPC client`_.
+    :rtype: :py:class:`DelugeClient <howdy.core.core_deluge.DelugeClient>`
 
     .. seealso::
     
@@ -160,17 +285,15 @@ def create_deluge_client( url, port, username, password ):
 
     .. _`Deluge RPC client`: https://github.com/JohnDoee/deluge-client
     """
-    from deluge_client import DelugeRPCClient
-    client = DelugeRPCClient( url, port, username, password )
+    client = DelugeClient( url, port, username, password )
     client.connect( )
-    assert( client.connected ) # make sure we can connect
     return client
     
 def get_deluge_client( ):
     """
-    Using a minimal Deluge torrent client from server credentials stored in the SQLite3_ configuration database.
+    Using a minimal Deluge torrent client from server credentials stored in the SQLite3_ configuration database. This client is shared by everything in this process that uses the same credentials, so that the connection (and its TLS handshake and login) is made once.
 
-    :returns: a :py:class:`tuple`. If successful, the first element is a lightweight `Deluge RPC client`_ and the second element is the string ``'SUCCESS'``. If unsuccessful, the first element is ``None`` and the second element is an error string.
+    :returns: a :py:class:`tuple`. If successful, the first element is the shared :py:class:`DelugeClient <howdy.core.core_deluge.DelugeClient>` and the second element is the string ``'SUCCESS'``. If unsuccessful, the first element is ``None`` and the second element is an error string.
     :rtype: tuple
 
     .. seealso::
@@ -193,12 +316,18 @@ def get_deluge_client( ):
     password = data['password']
     #
     ## now check that we have the correct info
-    try:
-        client = create_deluge_client( url, port, username, password )
-        return client, 'SUCCESS'
-    except: # cannot connect to these settings
-        error_message = 'ERROR, INVALID SETTINGS FOR DELUGE CLIENT.'        
-        return None, error_message
+    key = ( url, port, username, password )
+    with _deluge_clients_lock:
+        try:
+            if key not in _deluge_clients:
+                _deluge_clients[ key ] = create_deluge_client( url, port, username, password )
+            client = _deluge_clients[ key ]
+            client.connect( )
+            return client, 'SUCCESS'
+        except: # cannot connect to these settings
+            _deluge_clients.pop( key, None )
+            error_message = 'ERROR, INVALID SETTINGS FOR DELUGE CLIENT.'        
+            return None, error_message
 
 def get_deluge_credentials( ):
     """
@@ -248,6 +377,7 @@ def push_deluge_credentials( url, port, username, password ):
     ## first check that the configurations are valid
     try:
         client = create_deluge_client( url, port, username, password )
+        client.disconnect( )
     except:
         error_message = 'ERROR, INVALID SETTINGS FOR DELUGE CLIENT.'
         logging.debug( error_message )
@@ -270,16 +400,218 @@ def push_deluge_credentials( url, port, username, password ):
     session.commit( )
     return 'SUCCESS'
 
-def deluge_get_torrents_info( client ):
+def deluge_get_torrents_info( client, torrent_ids = None, status_keys = _status_keys ):
     """
     Returns a :py:class:`dict` of status info for every torrent on the Deluge server through the `Deluge RPC client`_. The key in this :py:class:`dict` is the MD5 hash of the torrent, and its value is a status :py:class:`dict`.  For each torrent, here are the keys in the status :py:class:`dict`: ``active_time``, ``all_time_download``, ``distributed_copies``, ``download_location``, ``download_payload_rate``, ``eta``, ``file_priorities``, ``file_progress``, ``files``, ``is_finished``, ``is_seed``, ``last_seen_complete``, ``name``, ``next_announce``, ``num_peers``, ``num_pieces``, ``num_seeds``, ``peers``, ``piece_length``, ``progress``, ``ratio``, ``seed_rank``, ``seeding_time``, ``state``, ``time_added``, ``time_since_transfer``, ``total_done``, ``total_payload_download``, ``total_payload_upload``, ``total_peers``, ``total_seeds``, ``total_size``, ``total_uploaded``, ``tracker_host``, ``tracker_status``, ``upload_payload_rate``.
 
     :param client: the `Deluge RPC client`_.
+    :param list torrent_ids: optional :py:class:`list` of MD5 hashes of torrents on the Deluge server. If ``None``, then return status info for every torrent on the Deluge server.
+    :param list status_keys: optional :py:class:`list` of keys to put into each status :py:class:`dict`. By default, these are all the keys listed above. Callers should ask for only the keys they need, since the Deluge server builds and sends each one for every torrent.
     :returns: a :py:class:`dict` of status :py:class:`dict` for each torrent on the Deluge server.
     :rtype: dict
     """
-    return client.call('core.get_torrents_status', {},
-                       _status_keys )
+    filter_dict = { }
+    if torrent_ids is not None: filter_dict[ 'id' ] = list( torrent_ids )
+    return client.call('core.get_torrents_status', filter_dict,
+                       status_keys )
+
+#
+## the smaller set of status keys used to track a torrent download
+_monitor_status_keys = [ 'state', 'progress', 'name' ]
+#
+## the status keys of a finished torrent download, needed to move its file
+_monitor_finished_keys = _monitor_status_keys + [ 'files', 'total_size', 'download_location' ]
+
+class DelugeTorrentMonitor( object ):
+    """
+    A central monitor of torrent downloads on the Deluge server. It holds a single `Deluge RPC client`_, shared by every thread that adds, removes, or waits on torrents, and a single polling thread. Each poll makes *one* RPC call, for the status of only the torrents being watched, using a reduced set of status keys (``state``, ``progress``, and ``name``). A thread that waits on a torrent gets a :py:class:`Future <concurrent.futures.Future>` that resolves when the download finishes, stalls, fails, or disappears from the Deluge server.
+
+    The `Deluge RPC client`_ does not expose the Deluge_ event subscriptions, so this monitor polls instead.
+
+    :param client: optional argument, the `Deluge RPC client`_. If ``None``, then this client is created using :py:meth:`get_deluge_client <howdy.core.core_deluge.get_deluge_client>`.
+    :param float poll_interval: optional argument, the number of seconds between polls of the Deluge server. Default is 30 seconds.
+
+    :var client: the `Deluge RPC client`_.
+    :var float poll_interval: the number of seconds between polls.
+
+    .. seealso::
+
+       * :py:meth:`deluge_get_torrents_info <howdy.core.core_deluge.deluge_get_torrents_info>`.
+       * :py:meth:`worker_process_download_tvtorrent <howdy.tv.tv_torrents.worker_process_download_tvtorrent>`.
+
+    .. _Deluge: https://en.wikipedia.org/wiki/Deluge_(software)
+    """
+    def __init__( self, client = None, poll_interval = 30 ):
+        if client is None:
+            client, status = get_deluge_client( )
+            assert( client is not None ), status
+        self.client = client
+        self.poll_interval = poll_interval
+        self._lock = Lock( )
+        self._watch_lock = Lock( )
+        self._watched = { }
+        self._stop = Event( )
+        self._wake = Event( )
+        self._thread = Thread( target = self._run, daemon = True )
+        self._thread.start( )
+
+    def call( self, method, *args, **kwargs ):
+        """
+        Makes a single call to the Deluge server through the shared `Deluge RPC client`_. Only one thread at a time talks to the Deluge server.
+
+        :param str method: the Deluge RPC method, such as ``'core.add_torrent_magnet'``.
+        :returns: whatever the Deluge server returns.
+        """
+        with self._lock:
+            return self.client.call( method, *args, **kwargs )
+
+    def add_magnet_file( self, magnet_uri ):
+        """
+        Thread safe version of :py:meth:`deluge_add_magnet_file <howdy.core.core_deluge.deluge_add_magnet_file>`.
+
+        :param str magnet_uri: the Magnet URI to upload.
+        :returns: if successful, returns the MD5 hash of the uploaded torrent. If unsuccessful, returns ``None``.
+        """
+        with self._lock:
+            return deluge_add_magnet_file( self.client, magnet_uri )
+
+    def remove_torrent( self, torrent_ids, remove_data = False ):
+        """
+        Thread safe version of :py:meth:`deluge_remove_torrent <howdy.core.core_deluge.deluge_remove_torrent>`. Any of these torrents being watched are no longer watched.
+
+        :param torrent_ids: :py:class:`list` of MD5 hashes on the Deluge server.
+        :param bool remove_data: if ``True``, remove the torrent and delete all data associated with the torrent on disk. If ``False``, just remove the torrent.
+        """
+        for torrentId in torrent_ids: self.unwatch( torrentId )
+        with self._lock:
+            deluge_remove_torrent( self.client, torrent_ids, remove_data = remove_data )
+
+    def get_torrents_info( self, torrent_ids, status_keys = _status_keys ):
+        """
+        Thread safe version of :py:meth:`deluge_get_torrents_info <howdy.core.core_deluge.deluge_get_torrents_info>`, for a chosen collection of torrents.
+
+        :param torrent_ids: :py:class:`list` of MD5 hashes on the Deluge server.
+        :param list status_keys: optional :py:class:`list` of keys to put into each status :py:class:`dict`.
+        :returns: a :py:class:`dict` of status :py:class:`dict` for each torrent.
+        :rtype: dict
+        """
+        with self._lock:
+            return deluge_get_torrents_info(
+                self.client, torrent_ids = torrent_ids, status_keys = status_keys )
+
+    def watch( self, torrent_id, name = None, max_stalled_polls = None ):
+        """
+        Start watching a torrent on the Deluge server.
+
+        :param torrent_id: the MD5 hash of the torrent.
+        :param str name: optional argument, the name used in log messages about this torrent.
+        :param int max_stalled_polls: optional argument. If not ``None``, then give up on this torrent once it has shown zero progress for more than this number of polls.
+
+        :returns: a :py:class:`Future <concurrent.futures.Future>` whose result is a two element :py:class:`tuple`. If the download finishes (its state is ``SEEDING`` or ``PAUSED``), then the first element is the status :py:class:`dict` of the torrent (with keys ``state``, ``progress``, ``name``, ``files``, ``total_size``, and ``download_location``), and the second element is ``'SUCCESS'``. Otherwise the first element is ``None`` and the second element is an error string. Cancelling this :py:class:`Future <concurrent.futures.Future>` stops watching the torrent.
+        :rtype: :py:class:`Future <concurrent.futures.Future>`
+        """
+        fut = Future( )
+        fut.set_running_or_notify_cancel( )
+        with self._watch_lock:
+            self._watched[ torrent_id ] = {
+                'future' : fut, 'name' : name, 'time0' : time.time( ),
+                'max_stalled_polls' : max_stalled_polls, 'num_stalled' : 0 }
+        return fut
+
+    def unwatch( self, torrent_id ):
+        """
+        Stop watching a torrent. If it is still being waited on, its :py:class:`Future <concurrent.futures.Future>` resolves as a failure.
+
+        :param torrent_id: the MD5 hash of the torrent.
+        """
+        with self._watch_lock:
+            entry = self._watched.pop( torrent_id, None )
+        if entry is None: return
+        if not entry[ 'future' ].done( ):
+            entry[ 'future' ].set_result( ( None, 'ERROR, STOPPED WATCHING TORRENT ID = %s.' % _torrent_id_string( torrent_id ) ) )
+
+    def poll( self ):
+        """
+        Polls the Deluge server once for the status of all the watched torrents, and resolves the :py:class:`Future <concurrent.futures.Future>` of every torrent that has finished, stalled, failed, or disappeared. This is called periodically by the polling thread.
+        """
+        with self._watch_lock:
+            watched = dict( self._watched )
+        if len( watched ) == 0: return
+        try: torrent_info = self.get_torrents_info(
+                list( watched ), status_keys = _monitor_status_keys )
+        except Exception as e:
+            logging.error( 'could not poll the Deluge server: %s.' % str( e ) )
+            return
+        finished = [ ]
+        for torrentId in watched:
+            entry = watched[ torrentId ]
+            name = entry[ 'name' ]
+            if name is None: name = _torrent_id_string( torrentId )
+            if torrentId not in torrent_info:
+                self._resolve( torrentId, None, 'ERROR, COULD NOT GET TORRENT ID = %s.' % _torrent_id_string( torrentId ) )
+                continue
+            tor_info = torrent_info[ torrentId ]
+            status = tor_info[ b'state' ].decode( 'utf-8' ).upper( )
+            progress = tor_info[ b'progress' ]
+            logging.info( 'after %0.3f seconds, for %s: status = %s, progress = %0.1f%%' % (
+                time.time( ) - entry[ 'time0' ], name, status, progress ) )
+            if status in ( 'SEEDING', 'PAUSED' ):
+                finished.append( torrentId )
+                continue
+            if status == 'ERROR':
+                self._resolve( torrentId, None, 'ERROR, %s FAILED ON THE DELUGE SERVER.' % name )
+                continue
+            if progress == 0.0: entry[ 'num_stalled' ] += 1
+            else: entry[ 'num_stalled' ] = 0
+            if entry[ 'max_stalled_polls' ] is not None and entry[ 'num_stalled' ] > entry[ 'max_stalled_polls' ]:
+                self._resolve( torrentId, None, '%s is probably not downloading' % name )
+        #
+        ## only get the file listing of those torrents that have finished
+        if len( finished ) == 0: return
+        try: torrent_info = self.get_torrents_info(
+                finished, status_keys = _monitor_finished_keys )
+        except Exception as e:
+            logging.error( 'could not get status of finished torrents: %s.' % str( e ) )
+            return
+        for torrentId in finished:
+            if torrentId not in torrent_info:
+                self._resolve( torrentId, None, 'ERROR, COULD NOT GET TORRENT ID = %s.' % _torrent_id_string( torrentId ) )
+                continue
+            self._resolve( torrentId, torrent_info[ torrentId ], 'SUCCESS' )
+
+    def _resolve( self, torrent_id, tor_info, status ):
+        with self._watch_lock:
+            entry = self._watched.pop( torrent_id, None )
+        if entry is None or entry[ 'future' ].done( ): return
+        entry[ 'future' ].set_result( ( tor_info, status ) )
+
+    def _run( self ):
+        while not self._stop.is_set( ):
+            self._wake.wait( self.poll_interval )
+            self._wake.clear( )
+            if self._stop.is_set( ): break
+            self.poll( )
+
+    def shutdown( self ):
+        """
+        Stops the polling thread, and resolves every torrent still being watched as a failure.
+        """
+        self._stop.set( )
+        self._wake.set( )
+        self._thread.join( )
+        with self._watch_lock:
+            torrent_ids = list( self._watched )
+        for torrentId in torrent_ids: self.unwatch( torrentId )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.shutdown( )
+
+def _torrent_id_string( torrent_id ):
+    if isinstance( torrent_id, bytes ): torrent_id = torrent_id.decode( 'utf-8' )
+    return torrent_id.lower( )[:6]
 
 def deluge_is_torrent_file( torrent_file_name ):
     """
@@ -393,7 +725,9 @@ def deluge_get_matching_torrents( client, torrent_id_strings ):
     :rtype: list
     
     """
-    torrentIds = list( deluge_get_torrents_info( client ).keys( ) )
+    #
+    ## only the torrent IDs, no status
+    torrentIds = list( client.call( 'core.get_session_state' ) )
     if torrent_id_strings == [ "*" ]: return torrentIds
     act_torrentIds = [ ]
     torrentIdDicts = dict(map(lambda torrentId: (
@@ -415,9 +749,31 @@ def deluge_remove_torrent( client, torrent_ids, remove_data = False ):
     :param client: the `Deluge RPC client`_.
     :param torrent_ids: :py:class:`list` of MD5 hashes on the Deluge server.
     :param bool remove_data: if ``True``, remove the torrent and delete all data associated with the torrent on disk. If ``False``, just remove the torrent.
+
+    Torrents that the Deluge server fails to remove are tried once more, one at a time, and those that still fail are logged.
     """
-    for torrentId in torrent_ids:
-        client.call( 'core.remove_torrent', torrentId, remove_data )
+    torrent_ids = list( torrent_ids )
+    if len( torrent_ids ) == 0: return
+    #
+    ## one call for all the torrents, on Deluge servers (version 2 and later) that support it. It returns
+    ## the ( torrent ID, error message ) of each torrent that it could not remove
+    try: errors = client.call( 'core.remove_torrents', torrent_ids, remove_data )
+    except Exception as e:
+        logging.debug( 'could not remove torrents in one call, removing one at a time: %s.' % str( e ) )
+        errors = list(map(lambda torrentId: ( torrentId, None ), torrent_ids ) )
+    if errors is None: return
+    #
+    ## try those that failed once more, one at a time
+    for torrentId, error in errors:
+        if error is not None:
+            if isinstance( error, bytes ): error = error.decode( 'utf-8' )
+            logging.info( 'could not remove torrent ID = %s, trying again: %s.' % (
+                _torrent_id_string( torrentId ), error ) )
+        try:
+            if client.call( 'core.remove_torrent', torrentId, remove_data ) is False:
+                logging.error( 'could not remove torrent ID = %s.' % _torrent_id_string( torrentId ) )
+        except Exception as e:
+            logging.error( 'could not remove torrent ID = %s: %s.' % ( _torrent_id_string( torrentId ), str( e ) ) )
 
 def deluge_pause_torrent( client, torrent_ids ):
     """
@@ -471,7 +827,7 @@ def deluge_format_info( status, torrent_id ):
        Tracker status: ubuntu.com: Announce OK
        Progress: 21.64% [##################################~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~]
     
-    :param dict status: the status :py:class:`dict` for a given torrent, generated from :py:meth:`deluge_get_torrents_info <howdy.core.core_deluge.deluge_get_torrents_info>`.
+    :param dict status: the status :py:class:`dict` for a given torrent, generated from :py:meth:`deluge_get_torrents_info <howdy.core.core_deluge.deluge_get_torrents_info>`. It only needs the keys in ``_format_info_keys``.
     :param str torrent_id: the MD5 hash of that torrent.
     
     :returns: a nicely formatted representation of that torrent on the Deluge server.
@@ -1,4 +1,7 @@
-import os, subprocess, time, logging, shlex, sys
+import os, subprocess, time, logging, shlex, sys, hashlib, queue
+from contextlib import contextmanager
+from threading import Lock, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
 from distutils.spawn import find_executable
 from fabric import Connection
 from patchwork.files import exists, directory
@@ -224,3 +227,319 @@ def download_upload_files( glob_string, numtries = 10, debug_string = False,
         numtries, time.time( ) - time0 ) )
     if debug_string: print( mystr_split[-1] )
     return "FAILURE", '\n'.join( mystr_split )
+
+#
+## SFTP transfers move in chunks of this many bytes
+_transfer_chunk_size = 1 << 20
+
+#
+## suffix of a partially transferred file, so that an interrupted transfer resumes where it left off
+_partial_suffix = '.howdypart'
+
+def get_local_checksum( filename ):
+    """
+    Returns the MD5 checksum of a local file, computed in the same way as ``md5sum`` on the remote SSH server.
+
+    :param str filename: the name of the local file.
+    :returns: the hexadecimal MD5 checksum of the file.
+    :rtype: str
+    """
+    md5 = hashlib.md5( )
+    with open( filename, 'rb' ) as openfile:
+        for chunk in iter( lambda: openfile.read( _transfer_chunk_size ), b'' ):
+            md5.update( chunk )
+    return md5.hexdigest( )
+
+class _BandwidthLimiter( object ):
+    #
+    ## schedules every chunk, across all the threads, so that the total rate stays below bwlimit kB/s
+    def __init__( self, bwlimit = None ):
+        self.rate = None
+        if bwlimit is not None and bwlimit > 0: self.rate = 1024.0 * bwlimit
+        self._lock = Lock( )
+        self._next_time = time.time( )
+
+    def consume( self, nbytes ):
+        if self.rate is None: return
+        with self._lock:
+            now = time.time( )
+            start = max( now, self._next_time )
+            self._next_time = start + nbytes / self.rate
+        if start > now: time.sleep( start - now )
+
+class SSHTransferPool( object ):
+    """
+    A small pool of persistent SSH connections to the remote SSH server. It runs remote commands, and moves files between the remote SSH server and the Plex_ server over SFTP. Unlike :py:meth:`download_upload_files <howdy.core.core_rsync.download_upload_files>`, which launches a new rsync_ process and SSH login for each transfer, each connection here is opened once and then reused.
+
+    * many files transfer in parallel, at most one per connection.
+    * the total transfer rate over all connections can be capped.
+    * an interrupted transfer leaves behind a partial file, and the next attempt resumes from where it left off.
+    * the source of a transfer is deleted only after the MD5 checksums of the source and destination agree.
+
+    :param str sshpath: the full path with username and host name for the SSH server. Format is ``'username@hostname'``.
+    :param str password: optional argument, the password to connect as the SSH server. If ``None``, then connect using SSH keys.
+    :param int num_connections: optional argument, the maximum number of SSH connections. Must be :math:`\ge 1`. Default is 4.
+    :param float bwlimit: optional argument, the maximum total transfer rate, in kB/s, over all connections. If ``None``, then there is no limit.
+    :param connection_factory: optional argument, a function with no arguments that returns a new, connected :py:class:`Connection <fabric.connection.Connection>`-like object. If ``None``, then connect to ``sshpath`` with fabric_. Use this to point the pool at, e.g., a local SSH server.
+
+    :var str hostname: the host name of the SSH server.
+    :var str username: the user name on the SSH server.
+    :var int num_connections: the maximum number of SSH connections.
+
+    .. seealso::
+
+       * :py:meth:`get_transfer_pool <howdy.core.core_rsync.get_transfer_pool>`.
+       * :py:meth:`download_batched_tvtorrent_shows <howdy.tv.tv.download_batched_tvtorrent_shows>`.
+
+    .. _fabric: https://www.fabfile.org
+    """
+    def __init__( self, sshpath, password = None, num_connections = 4, bwlimit = None,
+                  connection_factory = None ):
+        assert( num_connections >= 1 ), "error, number of SSH connections must be >= 1."
+        self.username, self.hostname = sshpath.strip( ).split( '@' )
+        self.num_connections = num_connections
+        if connection_factory is None:
+            def connection_factory( ):
+                connect_kwargs = { }
+                if password is not None:
+                    connect_kwargs = { 'password' : password, 'look_for_keys' : False }
+                conn = Connection( self.hostname, user = self.username, connect_kwargs = connect_kwargs )
+                if password is not None and 'key_filename' in conn.connect_kwargs:
+                    conn.connect_kwargs.pop( 'key_filename' )
+                return conn
+        self.connection_factory = connection_factory
+        self._limiter = _BandwidthLimiter( bwlimit )
+        self._idle = queue.LifoQueue( )
+        self._available = BoundedSemaphore( num_connections )
+        self._lock = Lock( )
+        self._connections = [ ]
+        self._executor = None
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.close( )
+
+    @contextmanager
+    def connection( self ):
+        """
+        A context manager that checks out one SSH connection from the pool, opening a new one if none is idle, and returns it to the pool when done. A connection that breaks is dropped from the pool.
+
+        **Usage**
+
+        .. code-block:: python
+
+           >>> with pool.connection( ) as conn:
+                   conn.run( 'ls', hide = True )
+        """
+        self._available.acquire( )
+        conn = None
+        try:
+            try: conn = self._idle.get_nowait( )
+            except queue.Empty:
+                conn = self.connection_factory( )
+                with self._lock: self._connections.append( conn )
+            yield conn
+        except Exception:
+            if conn is not None and not getattr( conn, 'is_connected', True ):
+                self._discard( conn )
+                conn = None
+            raise
+        finally:
+            if conn is not None: self._idle.put( conn )
+            self._available.release( )
+
+    def _discard( self, conn ):
+        with self._lock:
+            if conn in self._connections: self._connections.remove( conn )
+        try: conn.close( )
+        except Exception: pass
+
+    def run( self, cmd ):
+        """
+        Runs a shell command on the remote SSH server, through one of the pooled connections.
+
+        :param str cmd: the shell command.
+        :returns: the fabric_ result of the command. Raises an exception if the command fails.
+        """
+        with self.connection( ) as conn:
+            return conn.run( cmd, hide = True )
+
+    def _get_remote_checksum( self, conn, remote_path ):
+        result = conn.run( 'md5sum %s' % shlex.quote( remote_path ), hide = True, warn = True )
+        if not result.ok: return None
+        return result.stdout.strip( ).split( )[ 0 ].lower( )
+
+    def _copy( self, infile, outfile ):
+        while True:
+            chunk = infile.read( _transfer_chunk_size )
+            if not chunk: break
+            self._limiter.consume( len( chunk ) )
+            outfile.write( chunk )
+
+    def _transfer( self, do_download, remote_path, local_path, remove_source, numtries ):
+        assert( numtries > 0 )
+        if do_download: partial_path = local_path + _partial_suffix
+        else: partial_path = remote_path + _partial_suffix
+        mystr_split = [ ]
+        time0 = time.time( )
+        for idx in range( numtries ):
+            time00 = time.time( )
+            try:
+                with self.connection( ) as conn:
+                    sftp = conn.sftp( )
+                    if do_download:
+                        tot_size = sftp.stat( remote_path ).st_size
+                        offset = 0
+                        if os.path.isfile( partial_path ): offset = os.path.getsize( partial_path )
+                        if offset > tot_size: offset = 0
+                        with sftp.open( remote_path, 'rb' ) as infile, open(
+                                partial_path, 'ab' if offset > 0 else 'wb' ) as outfile:
+                            infile.seek( offset )
+                            infile.prefetch( tot_size )
+                            self._copy( infile, outfile )
+                        checksum = self._get_remote_checksum( conn, remote_path )
+                        if checksum is not None and checksum != get_local_checksum( partial_path ):
+                            os.remove( partial_path )
+                            raise ValueError( 'checksums of %s and %s do not agree' % ( remote_path, local_path ) )
+                        os.replace( partial_path, local_path )
+                        if remove_source and checksum is not None: sftp.remove( remote_path )
+                    else:
+                        tot_size = os.path.getsize( local_path )
+                        offset = 0
+                        try: offset = sftp.stat( partial_path ).st_size
+                        except IOError: pass
+                        if offset > tot_size: offset = 0
+                        with open( local_path, 'rb' ) as infile, sftp.open(
+                                partial_path, 'ab' if offset > 0 else 'wb' ) as outfile:
+                            infile.seek( offset )
+                            self._copy( infile, outfile )
+                        checksum = self._get_remote_checksum( conn, partial_path )
+                        if checksum is not None and checksum != get_local_checksum( local_path ):
+                            sftp.remove( partial_path )
+                            raise ValueError( 'checksums of %s and %s do not agree' % ( local_path, remote_path ) )
+                        sftp.posix_rename( partial_path, remote_path )
+                        if remove_source and checksum is not None: os.remove( local_path )
+                mystr_split.append( 'SUCCESSFUL ATTEMPT %d / %d, RESUMED AT %d / %d BYTES, IN %0.3f SECONDS.' % (
+                    idx + 1, numtries, offset, tot_size, time.time( ) - time00 ) )
+                if remove_source and checksum is None:
+                    mystr_split.append( 'COULD NOT GET CHECKSUM, SO DID NOT DELETE SOURCE.' )
+                logging.debug( mystr_split[ -1 ] )
+                return 'SUCCESS', '\n'.join( mystr_split )
+            except Exception as e:
+                mystr_split.append( 'FAILED ATTEMPT %d / %d IN %0.3f SECONDS: %s.' % (
+                    idx + 1, numtries, time.time( ) - time00, str( e ) ) )
+                logging.debug( mystr_split[ -1 ] )
+        mystr_split.append( 'ATTEMPTED AND FAILED %d TIMES IN %0.3f SECONDS TOTAL.' % (
+            numtries, time.time( ) - time0 ) )
+        return 'FAILURE', '\n'.join( mystr_split )
+
+    def download( self, remote_path, local_path, remove_source = True, numtries = 3 ):
+        """
+        Downloads a file from the remote SSH server, resuming a partial download if one exists. *If the checksums agree, then the remote file is deleted on completion*.
+
+        :param str remote_path: the file on the remote SSH server. Relative paths are relative to the home directory.
+        :param str local_path: the file on the Plex_ server.
+        :param bool remove_source: optional argument, if ``True`` (the default), then delete the remote file once it has been downloaded and verified.
+        :param int numtries: optional argument, the number of attempts to download before giving up. Each attempt resumes from where the last one stopped. Default is 3.
+
+        :returns: a :py:class:`tuple` of status and message. If successful, the status is ``'SUCCESS'``. If not, the status is ``'FAILURE'`` and the message describes each failing attempt.
+        :rtype: tuple
+        """
+        return self._transfer( True, remote_path, local_path, remove_source, numtries )
+
+    def upload( self, local_path, remote_path, remove_source = True, numtries = 3 ):
+        """
+        Uploads a file to the remote SSH server, resuming a partial upload if one exists. *If the checksums agree, then the local file is deleted on completion*.
+
+        :param str local_path: the file on the Plex_ server.
+        :param str remote_path: the file on the remote SSH server. Relative paths are relative to the home directory.
+        :param bool remove_source: optional argument, if ``True`` (the default), then delete the local file once it has been uploaded and verified.
+        :param int numtries: optional argument, the number of attempts to upload before giving up. Each attempt resumes from where the last one stopped. Default is 3.
+
+        :returns: a :py:class:`tuple` of status and message, in the same format as :py:meth:`download <howdy.core.core_rsync.SSHTransferPool.download>`.
+        :rtype: tuple
+        """
+        return self._transfer( False, remote_path, local_path, remove_source, numtries )
+
+    def _get_executor( self ):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor( max_workers = self.num_connections )
+            return self._executor
+
+    def download_files( self, remote_paths, local_dir, remove_source = True, numtries = 3 ):
+        """
+        Downloads many files from the remote SSH server into a local directory, in parallel over the pooled connections.
+
+        :param list remote_paths: the :py:class:`list` of files on the remote SSH server.
+        :param str local_dir: the directory on the Plex_ server into which to download the files.
+        :param bool remove_source: optional argument, if ``True`` (the default), then delete each remote file once it has been downloaded and verified.
+        :param int numtries: optional argument, the number of attempts to download each file. Default is 3.
+
+        :returns: a :py:class:`dict` whose keys are the remote files, and whose values are the status :py:class:`tuple` returned by :py:meth:`download <howdy.core.core_rsync.SSHTransferPool.download>`.
+        :rtype: dict
+        """
+        executor = self._get_executor( )
+        futures = dict(map(lambda remote_path: (
+            remote_path, executor.submit(
+                self.download, remote_path, os.path.join( local_dir, os.path.basename( remote_path ) ),
+                remove_source, numtries ) ), remote_paths ) )
+        return dict(map(lambda remote_path: ( remote_path, futures[ remote_path ].result( ) ), futures ) )
+
+    def upload_files( self, local_paths, remote_dir, remove_source = True, numtries = 3 ):
+        """
+        Uploads many files to a directory on the remote SSH server, in parallel over the pooled connections.
+
+        :param list local_paths: the :py:class:`list` of files on the Plex_ server.
+        :param str remote_dir: the directory on the remote SSH server into which to upload the files.
+        :param bool remove_source: optional argument, if ``True`` (the default), then delete each local file once it has been uploaded and verified.
+        :param int numtries: optional argument, the number of attempts to upload each file. Default is 3.
+
+        :returns: a :py:class:`dict` whose keys are the local files, and whose values are the status :py:class:`tuple` returned by :py:meth:`upload <howdy.core.core_rsync.SSHTransferPool.upload>`.
+        :rtype: dict
+        """
+        executor = self._get_executor( )
+        futures = dict(map(lambda local_path: (
+            local_path, executor.submit(
+                self.upload, local_path, os.path.join( remote_dir, os.path.basename( local_path ) ),
+                remove_source, numtries ) ), local_paths ) )
+        return dict(map(lambda local_path: ( local_path, futures[ local_path ].result( ) ), futures ) )
+
+    def close( self ):
+        """
+        Waits for running transfers to finish, then closes all the SSH connections.
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None: executor.shutdown( wait = True )
+        with self._lock:
+            connections = self._connections
+            self._connections = [ ]
+        for conn in connections:
+            try: conn.close( )
+            except Exception: pass
+        self._idle = queue.LifoQueue( )
+
+def get_transfer_pool( num_connections = 4, bwlimit = None ):
+    """
+    Creates an :py:class:`SSHTransferPool <howdy.core.core_rsync.SSHTransferPool>` to the remote SSH server whose rsync'ing setup is stored in the SQLite3_ configuration database.
+
+    :param int num_connections: optional argument, the maximum number of SSH connections. Default is 4.
+    :param float bwlimit: optional argument, the maximum total transfer rate, in kB/s. If ``None``, then there is no limit.
+
+    :returns: a :py:class:`tuple`. If successful, the first element is the :py:class:`SSHTransferPool <howdy.core.core_rsync.SSHTransferPool>` and the second element is the string ``'SUCCESS'``. If unsuccessful, the first element is ``None`` and the second element is an error string.
+    :rtype: tuple
+
+    .. seealso::
+
+       * :py:meth:`get_credentials <howdy.core.core_rsync.get_credentials>`.
+    """
+    data = get_credentials( )
+    if data is None:
+        return None, "ERROR, could not get credentials for the remote SSH server."
+    return SSHTransferPool(
+        data[ 'sshpath' ], data[ 'password' ], num_connections = num_connections,
+        bwlimit = bwlimit ), 'SUCCESS'
@@ -1,20 +1,238 @@
 import requests, re, threading, cfscrape
-import os, time, numpy, logging, datetime, pickle, gzip
+import os, time, numpy, logging, datetime, pickle, gzip, base64, copy, inspect, atexit
 from itertools import chain
+from functools import wraps
+from threading import Lock
 from requests.compat import urljoin
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from multiprocessing import Process, Manager
 from pathos.multiprocessing import Pool
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 #
 from howdy.core import core_deluge, get_formatted_size, get_maximum_matchval, return_error_raw, core
+from howdy.core import session, TorrentSearchCache, PlexConfig
 
-def get_book_torrent_jackett( name, maxnum = 10, keywords = [ ], verify = True ):
+#
+## how long a torrent search is reused, and how long it stays in the database
+_torrent_search_ttl = datetime.timedelta( hours = 2 )
+_torrent_search_max_age = datetime.timedelta( days = 7 )
+#
+## these arguments do not change the search results
+_torrent_search_nokey_args = ( 'session', 'verify' )
+_torrent_search_lock = Lock( )
+_torrent_search_cache = None
+_torrent_search_session = None
+_torrent_search_dirty = set( )
+_torrent_search_offline = False
+
+def load_torrent_search_cache( ):
+    """
+    Loads the cached torrent searches from the ``torrentsearchcache`` table (see :py:class:`TorrentSearchCache <howdy.core.TorrentSearchCache>`) into memory, and deletes those older than a week. This only happens once per process, and registers :py:meth:`flush_torrent_search_cache <howdy.core.core_torrents.flush_torrent_search_cache>` to run at exit. The cache uses its own SQLAlchemy_ session, only under a lock, so that it does not touch the shared ``session`` from the threads running the searches. :py:class:`TorrentSearchAggregator <howdy.core.core_torrents.TorrentSearchAggregator>` and :py:meth:`set_torrent_search_offline <howdy.core.core_torrents.set_torrent_search_offline>` call this in the main thread.
+
+    .. seealso:: :py:meth:`cache_torrent_search <howdy.core.core_torrents.cache_torrent_search>`.
+    """
+    global _torrent_search_cache, _torrent_search_session
+    with _torrent_search_lock:
+        if _torrent_search_cache is not None: return
+        _torrent_search_session = sessionmaker( bind = create_engine(
+            session.get_bind( ).url, connect_args = { 'check_same_thread' : False } ) )( )
+        now = datetime.datetime.now( )
+        cache = { }
+        stale = [ ]
+        for val in _torrent_search_session.query( TorrentSearchCache ).all( ):
+            if val.fetched is None or now - val.fetched > _torrent_search_max_age:
+                stale.append( val )
+                continue
+            cache[ val.cachekey ] = ( val.items, val.fetched )
+        for val in stale: _torrent_search_session.delete( val )
+        if len( stale ) != 0: _torrent_search_session.commit( )
+        _torrent_search_cache = cache
+    atexit.register( flush_torrent_search_cache )
+
+def flush_torrent_search_cache( ):
+    """
+    Writes the new torrent searches into the ``torrentsearchcache`` table. :py:class:`TorrentSearchAggregator <howdy.core.core_torrents.TorrentSearchAggregator>` calls this when it shuts down, and it runs again at exit, after the threads of all searches have finished.
+
+    .. seealso:: :py:meth:`cache_torrent_search <howdy.core.core_torrents.cache_torrent_search>`.
+    """
+    global _torrent_search_dirty
+    with _torrent_search_lock:
+        if _torrent_search_cache is None or len( _torrent_search_dirty ) == 0: return
+        for key in _torrent_search_dirty:
+            items, fetched = _torrent_search_cache[ key ]
+            _torrent_search_session.merge( TorrentSearchCache(
+                cachekey = key, provider = key.split( '|' )[ 0 ],
+                items = items, fetched = fetched ) )
+        _torrent_search_session.commit( )
+        logging.debug( 'stored %d torrent searches.' % len( _torrent_search_dirty ) )
+        _torrent_search_dirty = set( )
+
+def set_torrent_search_offline( offline = True ):
+    """
+    Turns the offline replay of torrent searches on or off. When on, searches wrapped by :py:meth:`cache_torrent_search <howdy.core.core_torrents.cache_torrent_search>` return cached results however old they are, and never query the torrent services. This also loads the cached torrent searches (see :py:meth:`load_torrent_search_cache <howdy.core.core_torrents.load_torrent_search_cache>`), so call this from the main thread.
+
+    :param bool offline: optional argument. If ``True``, then turn offline replay on. If ``False``, turn it off. Default is ``True``.
+    """
+    global _torrent_search_offline
+    load_torrent_search_cache( )
+    _torrent_search_offline = offline
+
+def get_torrent_search_key( provider, name, filters = { } ):
+    """
+    Returns the key under which a torrent search is cached: the search function, the search string normalized to lowercase with apostrophes and extra whitespace removed, and the search filters sorted by name.
+
+    :param str provider: the name of the search function, such as ``tv_torrents.get_tv_torrent_jackett``.
+    :param str name: the search string.
+    :param dict filters: optional argument, the other arguments to the search function that change its results.
+    :returns: the cache key.
+    :rtype: str
+
+    **Usage**
+
+    >>> get_torrent_search_key( 'tv_torrents.get_tv_torrent_zooqle', "Marvel's  Daredevil S01E02", { 'maxnum' : 100 } )
+    'tv_torrents.get_tv_torrent_zooqle|marvels daredevil s01e02|maxnum=100'
+    """
+    normname = ' '.join( name.lower( ).replace( "'", '' ).split( ) )
+    return '|'.join([ provider, normname, '&'.join(map(lambda key: '%s=%r' % ( key, filters[ key ] ), sorted( filters ) ) ) ])
+
+def _dedupe_torrent_items( items ):
+    if not all(map(lambda item: isinstance( item, dict ) and 'link' in item, items ) ):
+        return items
+    seen = set( )
+    items_dedupe = [ ]
+    for item in items:
+        key = get_magnet_info_hash( item[ 'link' ] )
+        if key is None: key = item[ 'link' ]
+        if key in seen: continue
+        seen.add( key )
+        items_dedupe.append( item )
+    return items_dedupe
+
+def cache_torrent_search( func ):
+    """
+    Decorator that caches the successful results of a torrent search function, such as :py:meth:`get_tv_torrent_jackett <howdy.tv.tv_torrents.get_tv_torrent_jackett>`, for two hours. The first argument of the search function must be the search string. Results are cached under :py:meth:`get_torrent_search_key <howdy.core.core_torrents.get_torrent_search_key>`, made from the search string and every other argument except ``session`` and ``verify``. Candidates with the same info hash (see :py:meth:`get_magnet_info_hash <howdy.core.core_torrents.get_magnet_info_hash>`) are stored once.
+
+    The decorated function takes one more keyword argument, ``use_cache``. If ``False``, then always query the torrent service and do not cache the result. By default it is ``True``.
+
+    The cache lives in memory, and is loaded from and written to the ``torrentsearchcache`` table by :py:meth:`load_torrent_search_cache <howdy.core.core_torrents.load_torrent_search_cache>` and :py:meth:`flush_torrent_search_cache <howdy.core.core_torrents.flush_torrent_search_cache>`. When offline replay is on (see :py:meth:`set_torrent_search_offline <howdy.core.core_torrents.set_torrent_search_offline>`), cached results of any age are returned, and a search that is not cached fails.
+
+    :param func: the torrent search function.
+    :returns: the decorated torrent search function.
+    """
+    sig = inspect.signature( func )
+    name_arg = list( sig.parameters )[ 0 ]
+    provider = '%s.%s' % ( func.__module__.split( '.' )[ -1 ], func.__name__ )
+    @wraps( func )
+    def wrapped( *args, **kwargs ):
+        use_cache = kwargs.pop( 'use_cache', True )
+        if not use_cache: return func( *args, **kwargs )
+        bound = sig.bind( *args, **kwargs )
+        bound.apply_defaults( )
+        filters = dict(filter(lambda tup: tup[ 0 ] not in _torrent_search_nokey_args + ( name_arg, ),
+                              bound.arguments.items( ) ) )
+        key = get_torrent_search_key( provider, bound.arguments[ name_arg ], filters )
+        load_torrent_search_cache( )
+        with _torrent_search_lock: entry = _torrent_search_cache.get( key )
+        if entry is not None:
+            items, fetched = entry
+            if _torrent_search_offline or datetime.datetime.now( ) - fetched < _torrent_search_ttl:
+                logging.debug( 'found cached torrent search %s.' % key )
+                return copy.deepcopy( items ), 'SUCCESS'
+        if _torrent_search_offline:
+            return return_error_raw( 'ERROR, NO CACHED TORRENT SEARCH FOR %s.' % key )
+        items, status = func( *args, **kwargs )
+        if status != 'SUCCESS': return items, status
+        items = _dedupe_torrent_items( items )
+        with _torrent_search_lock:
+            _torrent_search_cache[ key ] = ( items, datetime.datetime.now( ) )
+            _torrent_search_dirty.add( key )
+        return copy.deepcopy( items ), status
+    return wrapped
+
+#
+## guid -> magnet link of those Jackett items that do not carry their magnet link
+_jackett_magnet_cache = { }
+_jackett_magnet_lock = Lock( )
+
+def get_jackett_item_link( item ):
+    """
+    Returns the `Magnet URI`_ of a Torznab_ item from the Jackett_ server, if the item carries it in its ``magneturl`` attribute. Otherwise returns the ``guid`` page URL from which the Magnet URI must be resolved with :py:meth:`resolve_jackett_magnet_links <howdy.core.core_torrents.resolve_jackett_magnet_links>`. No network access happens here.
+
+    :param item: the Torznab_ ``item`` element, as a :py:class:`Tag <bs4.element.Tag>`.
+    :returns: a two element :py:class:`tuple`. The first element is the Magnet URI, or ``None``. The second element is the ``guid`` URL if there is no Magnet URI, or ``None``.
+    :rtype: tuple
+
+    .. _Torznab: https://torznab.github.io/spec-1.3-draft/index.html
+    """
+    magnet_url = item.find( 'torznab:attr', { 'name' : 'magneturl' } )
+    if magnet_url is not None and 'magnet' in magnet_url['value']:
+        return magnet_url['value'], None
+    guid = item.find( 'guid' )
+    if guid is None: return None, None
+    return None, guid.text
+
+def _get_jackett_guid_magnet_url( guid, session = requests, verify = True ):
+    import validators
+    with _jackett_magnet_lock:
+        if guid in _jackett_magnet_cache: return _jackett_magnet_cache[ guid ]
+    magnet_url = None
+    if validators.url( guid ):
+        try:
+            resp = session.get( guid, verify = verify )
+            if resp.status_code == 200:
+                h2 = BeautifulSoup( resp.content, 'lxml', parse_only = SoupStrainer( 'a' ) )
+                valid_magnet_links = set(map(lambda elem: elem['href'],
+                                             filter(lambda elem: 'href' in elem.attrs and 'magnet' in elem['href'],
+                                                    h2.find_all('a'))))
+                if len( valid_magnet_links ) != 0: magnet_url = max( valid_magnet_links )
+        except Exception as e:
+            logging.debug( 'could not get magnet link from %s: %s.' % ( guid, str( e ) ) )
+            return None
+    with _jackett_magnet_lock: _jackett_magnet_cache[ guid ] = magnet_url
+    return magnet_url
+
+def resolve_jackett_magnet_links( items, maxnum, session = requests, verify = True, num_threads = 8 ):
+    """
+    Fills in the Magnet URIs of the *top* ``maxnum`` candidate torrents found by the Jackett_ server, after they have been filtered and ranked. Candidates that already have a ``link`` need no network access. The others have a ``guid`` page URL (see :py:meth:`get_jackett_item_link <howdy.core.core_torrents.get_jackett_item_link>`), and their pages are fetched concurrently, only as many as are needed to make up ``maxnum`` candidates. The Magnet URI found on each ``guid`` page is cached for the rest of the process.
+
+    :param list items: the filtered and ranked :py:class:`list` of candidate torrents. Each is a :py:class:`dict` with a ``link`` key, whose value is the Magnet URI or ``None``, and if that is ``None``, a ``guid`` key.
+    :param int maxnum: the maximum number of candidate torrents to return.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param int num_threads: optional argument, the maximum number of ``guid`` pages to fetch at the same time. Default is 8.
+
+    :returns: the first ``maxnum`` candidate torrents, in the same order, whose Magnet URI could be found. The ``guid`` key is removed.
+    :rtype: list
+    """
+    resolved = [ ]
+    remaining = list( items )
+    while len( resolved ) < maxnum and len( remaining ) != 0:
+        batch = remaining[:maxnum - len( resolved ) ]
+        remaining = remaining[ len( batch ): ]
+        need = list(filter(lambda item: item.get( 'link' ) is None and item.get( 'guid' ) is not None, batch ) )
+        if len( need ) != 0:
+            with ThreadPoolExecutor( max_workers = max( 1, min( num_threads, len( need ) ) ) ) as pool:
+                links = list( pool.map( lambda item: _get_jackett_guid_magnet_url(
+                    item[ 'guid' ], session = session, verify = verify ), need ) )
+            for item, link in zip( need, links ): item[ 'link' ] = link
+        for item in batch:
+            if item.get( 'link' ) is None: continue
+            item.pop( 'guid', None )
+            resolved.append( item )
+    return resolved
+
+@cache_torrent_search
+def get_book_torrent_jackett( name, maxnum = 10, keywords = [ ], keywords_exc = [ ], must_have = [ ], verify = True ):
     """
     Returns a :py:class:`tuple` of candidate book Magnet links found using the main Jackett_ torrent searching service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the book to search for.
     :param int maxnum: optional argumeent, the maximum number of magnet links to return. Default is 10. Must be :math:`\ge 5`.
     :param list keywords: optional argument. If not empty, the title of the candidate element must have at least one of the keywords in ``keywords``.
+    :param list keywords_exc: optional argument. If not empty, then reject candidate element if title has any keyword in ``keywords_exc``.
+    :param list must_have: optional argument. If not empty, then title of the candidate element must have *all* the keywords in ``must_have``.
     :param bool verify:  optional argument, whether to verify SSL connections. Default is ``True``.
     
     :returns: if successful, then returns a two member :py:class:`tuple` the first member is a :py:class:`list` of elements that match the searched episode, ordered from *most* seeds and leechers to least. The second element is the string ``"SUCCESS"``. The keys in each element of the list are,
@@ -32,7 +250,6 @@ def get_book_torrent_jackett( name, maxnum = 10, keywords = [ ], verify = True )
 
     .. _Jackett: https://github.com/Jackett/Jackett
     """
-    import validators
     assert( maxnum >= 5 )
     data = core.get_jackett_credentials( )
     if data is None:
@@ -62,25 +279,6 @@ def get_book_torrent_jackett( name, maxnum = 10, keywords = [ ], verify = True )
         return return_error_raw( 'FAILURE, NO BOOKS SATISFYING CRITERIA FOR GETTING %s' % name )
     items = [ ]
     
-    def _get_magnet_url( item ):
-        magnet_url = item.find( 'torznab:attr', { 'name' : 'magneturl' } )
-        if magnet_url is not None and 'magnet' in magnet_url['value']:
-            return magnet_url['value']
-        #
-        ## not found it here, must go into URL
-        url2 = item.find('guid')
-        if url2 is None: return None
-        url2 = url2.text
-        if not validators.url( url2 ): return None
-        resp2 = requests.get( url2, verify = verify )
-        if resp2.status_code != 200: return None
-        h2 = BeautifulSoup( resp2.content, 'lxml' )
-        valid_magnet_links = set(map(lambda elem: elem['href'],
-                                     filter(lambda elem: 'href' in elem.attrs and 'magnet' in elem['href'],
-                                            h2.find_all('a'))))
-        if len( valid_magnet_links ) == 0: return None
-        return max( valid_magnet_links )
-
     if status is None: last_tok = None
     for item in html('item'):
         title = item.find('title')
@@ -100,14 +298,15 @@ def get_book_torrent_jackett( name, maxnum = 10, keywords = [ ], verify = True )
         if leechers is None: leechers = -1
         else: leechers = int( leechers[ 'value' ] )
         #
-        ## now do one of two things to get the magnet URL
-        magnet_url = _get_magnet_url( item )
-        if magnet_url is None: continue
+        ## get the magnet URL, or else the page from which to get it later
+        magnet_url, guid = get_jackett_item_link( item )
+        if magnet_url is None and guid is None: continue
         myitem = { 'title' : title,
                    'rawtitle' : title,
                    'seeders' : seeders,
                    'leechers' : leechers,
                    'link' : magnet_url }
+        if magnet_url is None: myitem[ 'guid' ] = guid # resolved later, only if needed
         if torrent_size is not None:
             myitem[ 'title' ] = '%s (%0.1f MiB)' % ( title, torrent_size )
             myitem[ 'torrent_size' ] = torrent_size
@@ -131,4 +330,414 @@ def get_book_torrent_jackett( name, maxnum = 10, keywords = [ ], verify = True )
     if len( items ) == 0:
         return return_error_raw( 'FAILURE, NO BOOKS SATISFYING CRITERIA FOR GETTING %s' % name )
         
-    return items[:maxnum], 'SUCCESS'
+    #
+    ## only now get the magnet links of the top candidates
+    items = resolve_jackett_magnet_links( items, maxnum, verify = verify )
+    if len( items ) == 0:
+        return return_error_raw( 'FAILURE, NO BOOKS SATISFYING CRITERIA FOR GETTING %s' % name )
+    return items, 'SUCCESS'
+
+def get_magnet_info_hash( magnet_link ):
+    """
+    Returns the info hash of a torrent, as a lowercase hexadecimal string, from its `Magnet URI`_. Both the hexadecimal and the base32 encoded forms of the ``xt=urn:btih:`` parameter are understood.
+
+    :param str magnet_link: the Magnet URI.
+    :returns: the 40 character lowercase hexadecimal info hash, or ``None`` if ``magnet_link`` has no info hash.
+    :rtype: str
+
+    .. _`Magnet URI`: https://en.wikipedia.org/wiki/Magnet_URI_scheme
+    """
+    if magnet_link is None: return None
+    mat = re.search( 'xt=urn:btih:([0-9A-Za-z]+)', magnet_link )
+    if mat is None: return None
+    info_hash = mat.group( 1 )
+    if len( info_hash ) == 32:
+        try: return base64.b32decode( info_hash.upper( ) ).hex( )
+        except: return None
+    return info_hash.lower( )
+
+def merge_torrent_items( items ):
+    """
+    Merges candidate torrents, found by one or more torrent searching services, into a single :py:class:`list` with no duplicates. Two candidates are the same torrent if they have the same info hash (see :py:meth:`get_magnet_info_hash <howdy.core.core_torrents.get_magnet_info_hash>`), or else the same ``link``. Of the duplicates, the one with the most seeders + leechers is kept.
+
+    :param items: an iterable of candidate torrents. Each one is a :py:class:`dict` with at least the keys ``link``, ``seeders``, and ``leechers``.
+    :returns: the :py:class:`list` of distinct candidate torrents, ordered from *most* seeders + leechers to least.
+    :rtype: list
+    """
+    def _num_peers( item ):
+        return max( 0, item.get( 'seeders' ) or 0 ) + max( 0, item.get( 'leechers' ) or 0 )
+    items_merged = { }
+    for item in items:
+        key = get_magnet_info_hash( item[ 'link' ] )
+        if key is None: key = item[ 'link' ]
+        if key in items_merged and _num_peers( items_merged[ key ] ) >= _num_peers( item ):
+            continue
+        items_merged[ key ] = item
+    return sorted( items_merged.values( ), key = _num_peers, reverse = True )
+
+#
+## bit rates, in kbps, of the smallest and largest acceptable H264 and H265/HEVC videos
+_torrent_bitrates = {
+    'x264' : ( 700, 2000 ),
+    'x265' : ( 500, 1600 ) }
+
+def get_torrent_size_limits( runtime_mins ):
+    """
+    Returns the smallest and largest acceptable sizes, in MB, of H264_ and `H265/HEVC`_ encoded videos of a given running time, rounded up to the next 50 MB. The limits follow from bit rates of 700 to 2000 kbps for H264_, and 500 to 1600 kbps for `H265/HEVC`_.
+
+    :param float runtime_mins: the running time of the video, in minutes.
+    :returns: a four element :py:class:`tuple`: the minimum H264_ size, the maximum H264_ size, the minimum `H265/HEVC`_ size, and the maximum `H265/HEVC`_ size.
+    :rtype: tuple
+
+    **Usage**
+
+    >>> get_torrent_size_limits( 22.0 )
+    (150, 350, 100, 300)
+
+    .. _H264: https://en.wikipedia.org/wiki/Advanced_Video_Coding
+    .. _`H265/HEVC`: https://en.wikipedia.org/wiki/High_Efficiency_Video_Coding
+    """
+    def _size_in_50( kbps ):
+        return 50 * int( runtime_mins * 60.0 * kbps / 8.0 / 1024 / 50 + 1 )
+    minSize, maxSize = map( _size_in_50, _torrent_bitrates[ 'x264' ] )
+    minSize_x265, maxSize_x265 = map( _size_in_50, _torrent_bitrates[ 'x265' ] )
+    return minSize, maxSize, minSize_x265, maxSize_x265
+
+_default_ranking_config = {
+    #
+    ## relative importance of each score
+    'weights' : {
+        'size' : 1.0,
+        'codec' : 0.5,
+        'resolution' : 0.5,
+        'seeders' : 1.0,
+        'group' : 0.25,
+        'match' : 1.0 },
+    #
+    ## score of each video codec found in the title; the first one found wins
+    'codecs' : {
+        'xvid' : 0.0,
+        'x265' : 1.0,
+        'hevc' : 1.0,
+        'x264' : 0.9,
+        'h264' : 0.9,
+        'h.264' : 0.9 },
+    #
+    ## score of each resolution found in the title; the first one found wins
+    'resolutions' : {
+        '2160p' : 0.5,
+        '1080p' : 0.9,
+        '720p' : 1.0,
+        '480p' : 0.3 },
+    'preferred_groups' : [ ],
+    'avoided_groups' : [ ] }
+
+def get_torrent_ranking_config( ):
+    """
+    Returns the configuration used by :py:class:`TorrentCandidateRanker <howdy.core.core_torrents.TorrentCandidateRanker>`: the default configuration, updated with whatever is stored in the SQLite3_ configuration database (see :py:meth:`push_torrent_ranking_config <howdy.core.core_torrents.push_torrent_ranking_config>`). Its keys are,
+
+    * ``weights``, the relative importance of each score: ``size``, ``codec``, ``resolution``, ``seeders``, ``group``, and ``match``.
+    * ``codecs``, the score (between 0 and 1) of each video codec token that can be in a title, such as ``x265`` or ``xvid``.
+    * ``resolutions``, the score (between 0 and 1) of each resolution token that can be in a title, such as ``720p``.
+    * ``preferred_groups`` and ``avoided_groups``, the :py:class:`list` of release groups to prefer or avoid.
+
+    :returns: the ranking configuration.
+    :rtype: dict
+
+    .. _SQLite3: https://www.sqlite.org/index.html
+    """
+    config = copy.deepcopy( _default_ranking_config )
+    val = session.query( PlexConfig ).filter(
+        PlexConfig.service == 'torrentranking' ).first( )
+    if val is None: return config
+    for key in val.data:
+        if isinstance( config.get( key ), dict ): config[ key ].update( val.data[ key ] )
+        else: config[ key ] = val.data[ key ]
+    return config
+
+def push_torrent_ranking_config( config ):
+    """
+    Stores a (partial) ranking configuration, in the format described in :py:meth:`get_torrent_ranking_config <howdy.core.core_torrents.get_torrent_ranking_config>`, into the SQLite3_ configuration database. Whatever is not given here keeps its default.
+
+    :param dict config: the ranking configuration to store.
+    :returns: ``"SUCCESS"`` if the configuration is valid, otherwise an error message.
+    :rtype: str
+    """
+    bad_keys = set( config ) - set( _default_ranking_config )
+    if len( bad_keys ) != 0:
+        return 'ERROR, INVALID TORRENT RANKING KEYS: %s.' % ', '.join( sorted( bad_keys ) )
+    bad_weights = set( config.get( 'weights', { } ) ) - set( _default_ranking_config[ 'weights' ] )
+    if len( bad_weights ) != 0:
+        return 'ERROR, INVALID TORRENT RANKING WEIGHTS: %s.' % ', '.join( sorted( bad_weights ) )
+    query = session.query( PlexConfig ).filter( PlexConfig.service == 'torrentranking' )
+    val = query.first( )
+    if val is not None:
+        session.delete( val )
+        session.commit( )
+    session.add( PlexConfig( service = 'torrentranking', data = config ) )
+    session.commit( )
+    return 'SUCCESS'
+
+def _score_tokens( titles, token_scores, default = 0.5 ):
+    scores = numpy.full( len( titles ), numpy.nan )
+    for token in token_scores:
+        found = ( numpy.char.find( titles, token.lower( ) ) >= 0 ) & numpy.isnan( scores )
+        scores[ found ] = token_scores[ token ]
+    scores[ numpy.isnan( scores ) ] = default
+    return scores
+
+def _score_size( features, config ):
+    rates = features[ 'sizes' ] / features[ 'runtime' ]
+    is_x265 = ( numpy.char.find( features[ 'titles' ], 'x265' ) >= 0 ) | (
+        numpy.char.find( features[ 'titles' ], 'hevc' ) >= 0 )
+    #
+    ## MB per minute of running time
+    to_rate = 60.0 / 8.0 / 1024
+    lo = numpy.where( is_x265, _torrent_bitrates[ 'x265' ][ 0 ], _torrent_bitrates[ 'x264' ][ 0 ] ) * to_rate
+    hi = numpy.where( is_x265, _torrent_bitrates[ 'x265' ][ 1 ], _torrent_bitrates[ 'x264' ][ 1 ] ) * to_rate
+    with numpy.errstate( divide = 'ignore', invalid = 'ignore' ):
+        scores = numpy.where( rates < lo, ( rates / lo )**2,
+                              numpy.where( rates > hi, ( hi / rates )**2, 1.0 ) )
+    scores[ ~numpy.isfinite( scores ) | ~( rates > 0 ) ] = 0.5 # unknown size or running time
+    return scores
+
+def _score_codec( features, config ):
+    return _score_tokens( features[ 'titles' ], config[ 'codecs' ] )
+
+def _score_resolution( features, config ):
+    return _score_tokens( features[ 'titles' ], config[ 'resolutions' ] )
+
+def _score_seeders( features, config ):
+    seeders = numpy.maximum( features[ 'seeders' ], 0 )
+    leechers = numpy.maximum( features[ 'leechers' ], 0 )
+    health = numpy.log1p( seeders + 0.5 * leechers )
+    health[ seeders == 0 ] = 0.0
+    if health.max( ) <= 0: return health
+    return health / health.max( )
+
+def _score_group( features, config ):
+    titles = features[ 'titles' ]
+    scores = numpy.full( len( titles ), 0.5 )
+    for group in config[ 'avoided_groups' ]:
+        scores[ numpy.char.find( titles, group.lower( ) ) >= 0 ] = 0.0
+    for group in config[ 'preferred_groups' ]:
+        scores[ numpy.char.find( titles, group.lower( ) ) >= 0 ] = 1.0
+    return scores
+
+def _score_match( features, config ):
+    from rapidfuzz import process
+    from rapidfuzz.fuzz import partial_ratio
+    name = features[ 'name' ]
+    if name is None: return numpy.ones( len( features[ 'titles' ] ) )
+    return process.cdist(
+        [ name ], list( features[ 'titles' ] ), scorer = partial_ratio )[ 0 ] / 100.0
+
+class TorrentCandidateRanker( object ):
+    """
+    Scores and ranks candidate torrents, such as those merged from all the torrent searching services by :py:class:`TorrentSearchAggregator <howdy.core.core_torrents.TorrentSearchAggregator>`. Every candidate gets a score between 0 and 1 from each of these scorers, and its final score is their weighted mean.
+
+    * ``size``: whether its size per minute of running time lies within the bit rates of :py:meth:`get_torrent_size_limits <howdy.core.core_torrents.get_torrent_size_limits>` for its codec. Outside, the score falls off as the square of the ratio to the nearest limit. If the size or running time is unknown, the score is 0.5.
+    * ``codec``: the score of the first video codec token found in its title (0.5 if none).
+    * ``resolution``: the score of the first resolution token found in its title (0.5 if none).
+    * ``seeders``: :math:`\\log(1 + S + L/2)`, where :math:`S` and :math:`L` are its number of seeders and leechers, relative to the best candidate. It is 0 with no seeders.
+    * ``group``: 1 if its title has a preferred release group, 0 if it has an avoided one, and 0.5 otherwise.
+    * ``match``: how well its title matches the search string, using the `partial ratio <https://maxbachmann.github.io/RapidFuzz/Usage/fuzz.html#partial-ratio>`_.
+
+    All scores are computed over :py:mod:`numpy` arrays of the candidates, so thousands of candidates are ranked in milliseconds. New scorers can be added with :py:meth:`add_scorer <howdy.core.core_torrents.TorrentCandidateRanker.add_scorer>`. Scoring does not change the ranker, so one ranker may be shared by many threads; create it in the main thread, since by default it reads its configuration from the SQLite3_ configuration database.
+
+    :param dict config: optional argument, the ranking configuration in the format described in :py:meth:`get_torrent_ranking_config <howdy.core.core_torrents.get_torrent_ranking_config>`. If ``None``, then use :py:meth:`get_torrent_ranking_config <howdy.core.core_torrents.get_torrent_ranking_config>`.
+
+    :var dict config: the ranking configuration.
+    :var dict scorers: the scorers. Each key is the name of the scorer, and each value is a function that takes the candidate features and the configuration, and returns an array of scores between 0 and 1.
+    """
+    def __init__( self, config = None ):
+        if config is None: config = get_torrent_ranking_config( )
+        else:
+            config_act = copy.deepcopy( _default_ranking_config )
+            for key in config:
+                if isinstance( config_act.get( key ), dict ): config_act[ key ].update( config[ key ] )
+                else: config_act[ key ] = config[ key ]
+            config = config_act
+        self.config = config
+        self.scorers = {
+            'size' : _score_size,
+            'codec' : _score_codec,
+            'resolution' : _score_resolution,
+            'seeders' : _score_seeders,
+            'group' : _score_group,
+            'match' : _score_match }
+
+    def add_scorer( self, name, func, weight = 1.0 ):
+        """
+        Adds (or replaces) a scorer.
+
+        :param str name: the name of the scorer.
+        :param func: the function that takes the candidate features and the configuration, and returns a :py:class:`numpy array <numpy.ndarray>` of scores between 0 and 1. The features are a :py:class:`dict` of :py:mod:`numpy` arrays: ``titles`` (lowercase), ``sizes`` (in MB, ``nan`` if unknown), ``seeders``, ``leechers``, and ``runtime`` (in minutes, ``nan`` if unknown), and the ``name`` (lowercase search string, or ``None``).
+        :param float weight: optional argument, the weight of this scorer. Default is 1.
+        """
+        self.scorers[ name ] = func
+        self.config[ 'weights' ][ name ] = weight
+
+    def get_features( self, items, name = None, runtime_mins = None ):
+        """
+        Returns the features of the candidate torrents that the scorers use.
+
+        :param list items: the candidate torrents. Each is a :py:class:`dict` with a ``title`` (or ``rawtitle`` or ``raw_title``), ``seeders``, ``leechers``, and optionally ``torrent_size`` in MB.
+        :param str name: optional argument, the search string.
+        :param float runtime_mins: optional argument, the running time of the video in minutes.
+        :returns: the candidate features described in :py:meth:`add_scorer <howdy.core.core_torrents.TorrentCandidateRanker.add_scorer>`.
+        :rtype: dict
+        """
+        def _get_title( item ):
+            for key in ( 'rawtitle', 'raw_title', 'title' ):
+                if item.get( key ) is not None: return item[ key ]
+            return ''
+        def _get_float( item, key, default ):
+            val = item.get( key )
+            if val is None: return default
+            try: return float( val )
+            except: return default
+        titles = numpy.char.lower( numpy.array( list( map( _get_title, items ) ), dtype = str ) )
+        if runtime_mins is None or runtime_mins <= 0: runtime_mins = numpy.nan
+        if name is not None: name = ' '.join( name.lower( ).split( ) )
+        return {
+            'titles' : titles,
+            'sizes' : numpy.array( list( map( lambda item: _get_float( item, 'torrent_size', numpy.nan ), items ) ) ),
+            'seeders' : numpy.array( list( map( lambda item: _get_float( item, 'seeders', 0 ), items ) ) ),
+            'leechers' : numpy.array( list( map( lambda item: _get_float( item, 'leechers', 0 ), items ) ) ),
+            'runtime' : numpy.full( len( items ), float( runtime_mins ) ),
+            'name' : name }
+
+    def score( self, items, name = None, runtime_mins = None ):
+        """
+        Returns the final score of each candidate torrent.
+
+        :param list items: the candidate torrents, in the format described in :py:meth:`get_features <howdy.core.core_torrents.TorrentCandidateRanker.get_features>`.
+        :param str name: optional argument, the search string.
+        :param float runtime_mins: optional argument, the running time of the video in minutes.
+        :returns: the weighted mean score of each candidate, between 0 and 1.
+        :rtype: :py:class:`numpy array <numpy.ndarray>`
+        """
+        if len( items ) == 0: return numpy.zeros( 0 )
+        features = self.get_features( items, name = name, runtime_mins = runtime_mins )
+        weights = self.config[ 'weights' ]
+        active = list(filter(lambda scorer: weights.get( scorer, 0 ) > 0, self.scorers ) )
+        if len( active ) == 0: return numpy.zeros( len( items ) )
+        total = sum(map(lambda scorer: weights[ scorer ] * self.scorers[ scorer ]( features, self.config ), active ) )
+        return total / sum(map(lambda scorer: weights[ scorer ], active ) )
+
+    def rank( self, items, name = None, runtime_mins = None ):
+        """
+        Ranks the candidate torrents by their final score.
+
+        :param list items: the candidate torrents, in the format described in :py:meth:`get_features <howdy.core.core_torrents.TorrentCandidateRanker.get_features>`.
+        :param str name: optional argument, the search string.
+        :param float runtime_mins: optional argument, the running time of the video in minutes.
+        :returns: copies of the candidate torrents, each with a new ``score`` key, ordered from *highest* score to lowest. Ties keep their original order.
+        :rtype: list
+        """
+        scores = self.score( items, name = name, runtime_mins = runtime_mins )
+        order = numpy.argsort( -scores, kind = 'stable' )
+        return list(map(lambda idx: dict( items[ idx ], score = float( scores[ idx ] ) ), order ) )
+
+class TorrentSearchAggregator( object ):
+    """
+    Runs several torrent searching services at the same time, on a bounded pool of threads that share one keep-alive :py:class:`Session <requests.Session>`, and merges their results. It replaces the separate processes (and :py:class:`Manager <multiprocessing.Manager>` shared lists) that were spawned for every search. One aggregator may be shared by many searches running in different threads, for instance all the episodes in :py:meth:`download_batched_tvtorrent_shows <howdy.tv.tv.download_batched_tvtorrent_shows>`.
+
+    Each search service is a function that takes the shared :py:class:`Session <requests.Session>` and returns a :py:class:`tuple` of the form used throughout Howdy: a :py:class:`list` of candidate torrents and ``"SUCCESS"``, or the error :py:class:`tuple` of :py:meth:`return_error_raw <howdy.core.return_error_raw>`. For example,
+
+    .. code-block:: python
+
+       with TorrentSearchAggregator( ) as aggregator:
+           items, statuses = aggregator.search( {
+               'jackett' : lambda session: tv_torrents.get_tv_torrent_jackett(
+                   'The Simpsons S31E01', maxnum = 100, session = session ),
+               'eztv.io' : lambda session: tv_torrents.get_tv_torrent_eztv_io(
+                   'The Simpsons S31E01', maxnum = 100, session = session ) } )
+
+    :param int num_threads: optional argument, the maximum number of searches that run at the same time. Default is 8.
+    :param float timeout: optional argument, the default number of seconds to wait for each search service. Default is 60 seconds.
+
+    :var session: the :py:class:`Session <requests.Session>` shared by all the searches.
+    :var float timeout: the default number of seconds to wait for each search service.
+
+    .. seealso::
+
+       * :py:meth:`merge_torrent_items <howdy.core.core_torrents.merge_torrent_items>`.
+       * :py:meth:`worker_process_download_tvtorrent <howdy.tv.tv_torrents.worker_process_download_tvtorrent>`.
+    """
+    def __init__( self, num_threads = 8, timeout = 60 ):
+        assert( num_threads >= 1 )
+        self.timeout = timeout
+        self.session = requests.Session( )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections = num_threads, pool_maxsize = num_threads )
+        self.session.mount( 'http://', adapter )
+        self.session.mount( 'https://', adapter )
+        self._executor = ThreadPoolExecutor( max_workers = num_threads )
+        load_torrent_search_cache( )
+
+    def search( self, providers, timeouts = { }, first_good = False, min_good = 1 ):
+        """
+        Runs the search services at the same time, and returns their merged and de-duplicated candidate torrents.
+
+        :param dict providers: the search services. Each key is the name of the search service, and each value is a function that takes the shared :py:class:`Session <requests.Session>` and returns the candidate torrents.
+        :param dict timeouts: optional argument, the number of seconds to wait for each named search service. Those not named here wait for :py:attr:`timeout` seconds. A search service that has not finished in time is given up on, although its thread runs to completion.
+        :param bool first_good: optional argument. If ``True``, then return as soon as *one* search service gives at least ``min_good`` candidates, and give up on the others. Default is ``False``.
+        :param int min_good: optional argument, the smallest number of candidates that makes a search service result good enough to stop, if ``first_good`` is ``True``. Default is 1.
+
+        :returns: a :py:class:`tuple` of two elements. The first element is the :py:class:`list` of candidate torrents, merged using :py:meth:`merge_torrent_items <howdy.core.core_torrents.merge_torrent_items>`. The second element is a :py:class:`dict` whose keys are the names of the search services and whose values are either ``"SUCCESS"`` or an error message.
+        :rtype: tuple
+        """
+        time0 = time.time( )
+        futures = dict(map(lambda name: (
+            self._executor.submit( providers[ name ], self.session ), name ), providers ) )
+        deadlines = dict(map(lambda name: (
+            name, time0 + timeouts.get( name, self.timeout ) ), providers ) )
+        statuses = { }
+        items_lists = [ ]
+        pending = set( futures )
+        found_good = False
+        while len( pending ) != 0 and not found_good:
+            timeout = max( 0.0, min(map(lambda fut: deadlines[ futures[ fut ] ], pending ) ) - time.time( ) )
+            done, pending = wait( pending, timeout = timeout, return_when = FIRST_COMPLETED )
+            for fut in done:
+                name = futures[ fut ]
+                try: items, status = fut.result( )
+                except Exception as e: items, status = None, 'ERROR, %s FAILED: %s.' % ( name, str( e ) )
+                if status != 'SUCCESS' or items is None or len( items ) == 0:
+                    if status == 'SUCCESS': status = 'ERROR, %s FOUND NO CANDIDATES.' % name
+                    statuses[ name ] = status
+                    continue
+                logging.info( '%s found %d candidates in %0.3f seconds.' % (
+                    name, len( items ), time.time( ) - time0 ) )
+                statuses[ name ] = 'SUCCESS'
+                items_lists.append( items )
+                if first_good and len( items ) >= min_good: found_good = True
+            #
+            ## give up on those searches that ran out of time
+            for fut in list( pending ):
+                name = futures[ fut ]
+                if not found_good and time.time( ) < deadlines[ name ]: continue
+                pending.remove( fut )
+                fut.cancel( )
+                if found_good:
+                    statuses[ name ] = 'ERROR, %s NOT NEEDED.' % name
+                    continue
+                statuses[ name ] = 'ERROR, %s TIMED OUT AFTER %0.3f SECONDS.' % (
+                    name, time.time( ) - time0 )
+        return merge_torrent_items( chain.from_iterable( items_lists ) ), statuses
+
+    def shutdown( self ):
+        """
+        Shuts down the pool of threads, closes the shared :py:class:`Session <requests.Session>`, and writes the new torrent searches into the ``torrentsearchcache`` table (see :py:meth:`flush_torrent_search_cache <howdy.core.core_torrents.flush_torrent_search_cache>`). Searches that timed out may still be running; those that finish later are written at exit.
+        """
+        self._executor.shutdown( wait = False )
+        self.session.close( )
+        flush_torrent_search_cache( )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.shutdown( )
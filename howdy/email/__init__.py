@@ -1,12 +1,14 @@
 import os, sys, base64, httplib2, numpy, glob, traceback
-import hashlib, requests, io, datetime, logging
-import pathos.multiprocessing as multiprocessing
+import hashlib, requests, io, datetime, logging, smtplib, time
+from threading import Lock, local
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import getaddresses
 from googleapiclient.discovery import build
 from PIL import Image
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 #
-from howdy.core import core
+from howdy.core import core, session, NewsletterDelivery, get_image_cache
 
 def get_email_service( verify = True ):
     """
@@ -38,35 +40,245 @@ def send_email_lowlevel( msg, email_service = None, verify = True ):
     .. _`Google Contacts API`: https://developers.google.com/contacts/v3
     .. _Ubuntu: https://www.ubuntu.com
     """
-    
-    data = { 'raw' : base64.urlsafe_b64encode(
-        msg.as_bytes( ) ).decode('utf-8') }
     #
     #credentials = core.oauthGetGoogleCredentials(
     #    verify = verify )
     #email_service = build('gmail', 'v1', credentials = credentials,
     #                      cache_discovery = False )
     if email_service is None: email_service = get_email_service( verify = verify )
-    try: message = email_service.users( ).messages( ).send( userId='me', body = data ).execute( )
+    try: message = _send_email_gmail( msg, email_service )
     except Exception as e:
         traceback.print_exc(file=sys.stdout)
         logging.error('here is exception: %s' % str( e ) )
         logging.error('problem with %s' % msg['To'] )
     
-def send_email_localsmtp( msg ):
+def _send_email_gmail( msg, email_service ):
+    data = { 'raw' : base64.urlsafe_b64encode(
+        msg.as_bytes( ) ).decode('utf-8') }
+    return email_service.users( ).messages( ).send( userId='me', body = data ).execute( )
+
+def send_email_localsmtp( msg, smtp_conn = None ):
     """
     Sends the email using the :py:class:`SMTP <smtplib.SMTP>` Python functionality to send through a local SMTP_ server. `This blog post`_ describes how I set up a GMail relay using my local SMTP_ server on my Ubuntu_ machine.
 
     :param MIMEMultiPart msg: the :py:class:`MIMEMultiPart <email.mime.multipart.MIMEMultiPart>` email message to send. At a high level, this is an email with body, sender, recipients, and optional attachments.
-    
+    :param smtp_conn: optional argument, an open :py:class:`SMTP <smtplib.SMTP>` connection to reuse. If ``None``, then a connection to the local SMTP_ server is opened here, and closed after sending.
+
     .. _SMTP: https://en.wikipedia.org/wiki/Simple_Mail_Transfer_Protocol
     .. _`This blog post`: https://tanimislamblog.wordpress.com/2018/11/19/sendmail-relay-setup-and-implementation
     """
+    if smtp_conn is not None:
+        smtp_conn.sendmail( msg['From'], [ msg["To"], ], msg.as_string( ) )
+        return
     smtp_conn = smtplib.SMTP('localhost', 25 )
     smtp_conn.ehlo( 'test' )
     smtp_conn.sendmail( msg['From'], [ msg["To"], ], msg.as_string( ) )
     smtp_conn.quit( )
 
+def _is_permanent_email_error( e ):
+    #
+    ## SMTP rejections of the recipient or message with 5XX codes will never succeed
+    if isinstance( e, smtplib.SMTPRecipientsRefused ):
+        return all(map(lambda code_msg: code_msg[ 0 ] >= 500, e.recipients.values( ) ) )
+    if isinstance( e, smtplib.SMTPResponseException ):
+        return e.smtp_code >= 500
+    #
+    ## GMail API errors, other than rate limiting, with 4XX codes will never succeed
+    status = getattr( getattr( e, 'resp', None ), 'status', None )
+    if status is not None:
+        return 400 <= int( status ) < 500 and int( status ) != 429
+    return False
+
+def _get_email_recipients( msg ):
+    return ', '.join(sorted(set(map(lambda name_email: name_email[ 1 ], filter(
+        lambda name_email: len( name_email[ 1 ] ) != 0, getaddresses(
+            msg.get_all( 'To', [ ] ) + msg.get_all( 'Cc', [ ] ) + msg.get_all( 'Bcc', [ ] ) ) ) ) ) ) )
+
+def get_newsletter_id( subject, mainHTML ):
+    """
+    Returns the identifier under which the delivery of a newsletter is stored (see :py:class:`EmailSendQueue <howdy.email.EmailSendQueue>`): the SHA256 hash of its subject and HTML body. A corrected newsletter, or a new notification that reuses a subject, gets a new identifier, and is sent to everyone again.
+
+    :param str subject: the email subject.
+    :param str mainHTML: the email body as an HTML :py:class:`str` document.
+    :returns: the newsletter identifier.
+    :rtype: str
+    """
+    return hashlib.sha256( '\n'.join([ subject, mainHTML ]).encode( 'utf-8' ) ).hexdigest( )
+
+class EmailSendQueue( object ):
+    """
+    A queue of email messages that are sent out together, such as the Howdy newsletter to each of its recipients. Emails are sent by a bounded pool of threads. Each thread opens *one* connection -- an authenticated GMail service (see :py:meth:`get_email_service <howdy.email.get_email_service>`) or an SMTP_ connection -- and reuses it for every email it sends. An email that fails with a temporary error is tried again, after an exponentially growing wait, up to a maximum number of attempts. An email that fails with a permanent error, such as a bad address, is not tried again.
+
+    If a newsletter identifier is given, then the delivery status of each email is stored in the ``newsletterdelivery`` table (see :py:class:`NewsletterDelivery <howdy.core.NewsletterDelivery>`), and those emails of this newsletter that were already delivered are skipped, unless ``resend`` is ``True``.
+
+    :param str newsletter: optional argument, the identifier of this newsletter, from :py:meth:`get_newsletter_id <howdy.email.get_newsletter_id>`. If ``None``, then delivery status is not stored.
+    :param bool resend: optional argument. If ``True``, then send every email, even those of this newsletter that were already delivered. Default is ``False``.
+    :param bool use_smtp: optional argument. If ``True``, then send through an SMTP_ server. If ``False``, then send through the `GMail API`_. Default is ``False``.
+    :param str smtp_host: optional argument, the SMTP_ server. Default is ``localhost``.
+    :param int smtp_port: optional argument, the SMTP_ server port. Default is ``25``.
+    :param int max_workers: optional argument, the maximum number of emails sent at the same time, and the maximum number of connections. Default is ``4``.
+    :param int max_attempts: optional argument, the maximum number of attempts to send each email. Default is ``5``.
+    :param float backoff: optional argument, the number of seconds to wait before the second attempt. Each later wait is twice as long as the one before. Default is ``1`` second.
+    :param float max_backoff: optional argument, the maximum number of seconds to wait between attempts. Default is ``60`` seconds.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+
+    **Usage**
+
+    .. code-block:: python
+
+       with EmailSendQueue( newsletter = get_newsletter_id( subject, mainHTML ) ) as queue:
+           for msg in msgs: queue.put( msg )
+           statuses = queue.send_all( )
+
+    .. seealso:: :py:meth:`send_individual_emails <howdy.email.email.send_individual_emails>`.
+
+    .. _`GMail API`: https://developers.google.com/gmail/api
+    """
+    def __init__( self, newsletter = None, use_smtp = False, smtp_host = 'localhost', smtp_port = 25,
+                  max_workers = 4, max_attempts = 5, backoff = 1.0, max_backoff = 60.0, verify = True,
+                  resend = False ):
+        assert( max_workers > 0 )
+        assert( max_attempts > 0 )
+        self.newsletter = newsletter
+        self.resend = resend
+        self.use_smtp = use_smtp
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.verify = verify
+        self._msgs = [ ]
+        self._local = local( )
+        self._lock = Lock( )
+        self._connections = [ ]
+
+    def __len__( self ):
+        return len( self._msgs )
+
+    def put( self, msg ):
+        """
+        Adds an email to this queue.
+
+        :param MIMEMultiPart msg: the :py:class:`MIMEMultiPart <email.mime.multipart.MIMEMultiPart>` email message to send.
+        """
+        self._msgs.append( msg )
+
+    def _get_connection( self ):
+        conn = getattr( self._local, 'conn', None )
+        if conn is not None: return conn
+        if self.use_smtp:
+            conn = smtplib.SMTP( self.smtp_host, self.smtp_port )
+            conn.ehlo( 'howdy' )
+        else: conn = get_email_service( verify = self.verify )
+        self._local.conn = conn
+        with self._lock: self._connections.append( conn )
+        return conn
+
+    def _drop_connection( self ):
+        conn = getattr( self._local, 'conn', None )
+        self._local.conn = None
+        if conn is None: return
+        with self._lock:
+            if conn in self._connections: self._connections.remove( conn )
+        if not self.use_smtp: return
+        try: conn.close( )
+        except: pass
+
+    def _send( self, msg ):
+        for attempt in range( 1, self.max_attempts + 1 ):
+            try:
+                conn = self._get_connection( )
+                if self.use_smtp: conn.send_message( msg )
+                else: _send_email_gmail( msg, conn )
+                return 'SUCCESS', attempt, 'SENT AFTER %d ATTEMPTS.' % attempt
+            except Exception as e:
+                error_message = '%s: %s' % ( type( e ).__name__, str( e ) )
+                if _is_permanent_email_error( e ): return 'FAILURE', attempt, error_message
+                #
+                ## rejections leave the connection usable, anything else may have broken it
+                if not isinstance( e, ( smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused ) ) and \
+                   getattr( e, 'resp', None ) is None:
+                    self._drop_connection( )
+                if attempt == self.max_attempts: return 'FAILURE', attempt, error_message
+                logging.info( 'attempt %d to send to %s failed, trying again: %s.' % (
+                    attempt, msg[ 'To' ], error_message ) )
+                time.sleep( min( self.max_backoff, self.backoff * 2 ** ( attempt - 1 ) ) )
+
+    def _record( self, recipients, status, attempts, message ):
+        if self.newsletter is None: return
+        val = session.query( NewsletterDelivery ).filter(
+            NewsletterDelivery.newsletter == self.newsletter ).filter(
+                NewsletterDelivery.email == recipients ).first( )
+        if val is not None:
+            session.delete( val )
+            session.commit( )
+        session.add( NewsletterDelivery(
+            newsletter = self.newsletter, email = recipients, status = status,
+            attempts = attempts, message = message, updated = datetime.datetime.now( ) ) )
+        session.commit( )
+
+    def get_delivered( self ):
+        """
+        :returns: the :py:class:`set` of recipients of this newsletter whose emails were delivered. If there is no newsletter identifier, then returns an empty :py:class:`set`.
+        :rtype: set
+        """
+        if self.newsletter is None: return set( )
+        return set(map(lambda val: val.email, session.query( NewsletterDelivery ).filter(
+            NewsletterDelivery.newsletter == self.newsletter ).filter(
+                NewsletterDelivery.status == 'SUCCESS' ) ) )
+
+    def send_all( self ):
+        """
+        Sends every email in this queue, and empties the queue.
+
+        :returns: a :py:class:`dict` of the delivery status of each email. The key is the comma-separated recipient email addresses. The value is a two-element :py:class:`tuple`: the first element is ``'SUCCESS'``, ``'FAILURE'``, or ``'SKIPPED'`` (if this newsletter was already delivered to these recipients), and the second element is a message or the last error.
+        :rtype: dict
+        """
+        msgs = self._msgs
+        self._msgs = [ ]
+        delivered = set( )
+        if not self.resend: delivered = self.get_delivered( )
+        statuses = { }
+        msgs_todo = [ ]
+        for msg in msgs:
+            recipients = _get_email_recipients( msg )
+            if recipients in delivered:
+                statuses[ recipients ] = ( 'SKIPPED', 'ALREADY SENT.' )
+                continue
+            msgs_todo.append( ( recipients, msg ) )
+        if len( msgs_todo ) == 0: return statuses
+        with ThreadPoolExecutor( max_workers = min( self.max_workers, len( msgs_todo ) ) ) as pool:
+            futures = dict(map(lambda tup: ( pool.submit( self._send, tup[ 1 ] ), tup[ 0 ] ), msgs_todo ) )
+            #
+            ## delivery status is stored from this thread only, as each email finishes
+            for fut in as_completed( futures ):
+                recipients = futures[ fut ]
+                status, attempts, message = fut.result( )
+                if status != 'SUCCESS': logging.error( 'problem with %s: %s' % ( recipients, message ) )
+                self._record( recipients, status, attempts, message )
+                statuses[ recipients ] = ( status, message )
+        return statuses
+
+    def close( self ):
+        """
+        Closes every open connection.
+        """
+        with self._lock:
+            connections = self._connections
+            self._connections = [ ]
+        if not self.use_smtp: return
+        for conn in connections:
+            try: conn.quit( )
+            except: pass
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close( )
+
 def get_all_email_contacts_dict( verify = True, pagesize = 4000 ):
     """
     Returns *all* the Google contacts using the `Google Contacts API`_.
@@ -549,7 +761,7 @@ class HowdyIMGClient( object ):
 
 class PNGPicObject( object ):
     """
-    This provides a GUI widget to the Imgur_ interface implemented in :py:class:`PlexIMGClient <howdy.email.HowdyIMGClient>`. Initializaton of the image can either upload this image to the Imgur_ account, or retrieve the image from the main Imgur_ album. This object can also launch a GUI dialog window through :py:meth:`getInfoGUI <howdy.email.PNGPicObject.getInfoGUI>`.
+    This provides a GUI widget to the Imgur_ interface implemented in :py:class:`PlexIMGClient <howdy.email.HowdyIMGClient>`. Initializaton of the image can either upload this image to the Imgur_ account, or retrieve the image from the main Imgur_ album. This object can also launch a GUI dialog window through :py:meth:`getInfoGUI <howdy.email.PNGPicObject.getInfoGUI>`. Images in the main Imgur_ album are downloaded through the shared :py:class:`ImageCache <howdy.core.ImageCache>`, so that each is downloaded only once.
 
     :param dict initdata: the low-level dictionary that contains important information on the image, located in a file, that will either be uploaded into the main Imgur_ album or merely kept in memory. The main key that determines operation is ``initialization``. It can be one of ``"FILE"`` or ``"SERVER"``.
 
@@ -603,9 +815,11 @@ class PNGPicObject( object ):
                 return newObj
             except: return None
 
-        with multiprocessing.Pool( processes = multiprocessing.cpu_count( ) ) as pool:
+        #
+        ## the images are downloaded at the same time
+        with ThreadPoolExecutor( max_workers = 8 ) as executor:
             pngPICObjects = list( filter(
-                None, map( _create_object, pImgClient.imghashes ) ) )
+                None, executor.map( _create_object, pImgClient.imghashes ) ) )
             return pngPICObjects
                 
     def __init__( self, initdata, pImgClient ):
@@ -635,6 +849,7 @@ class PNGPicObject( object ):
                 self.b64string, self.actName, imgMD5 = self.imgMD5 )
             self.imgurlLink = link
             self.imgDateTime = imgDateTime
+            if link is not None: get_image_cache( ).put( link, buf.getvalue( ) )
 
         # imgurlLink, imgName, imgMD5, imgDatetime
         elif initdata[ 'initialization' ] == 'SERVER':
@@ -646,15 +861,17 @@ class PNGPicObject( object ):
             self.actName = imgName
             self.imgMD5 = imgMD5
             self.imgDateTime = imgDateTime
-            cnt = requests.get( self.imgurlLink, verify = False ).content
-            self.originalImage = Image.open( io.BytesIO( cnt ) )
+            pngdata = get_image_cache( ).get( self.imgurlLink, verify = False )
+            if not pngdata.startswith( b'\x89PNG' ):
+                buf = io.BytesIO( )
+                Image.open( io.BytesIO( pngdata ) ).save( buf, format = 'PNG' )
+                pngdata = buf.getvalue( )
+            self.originalImage = Image.open( io.BytesIO( pngdata ) )
             self.img = QImage( )
-            self.img.loadFromData( cnt )
+            self.img.loadFromData( pngdata )
             self.originalWidth = self.originalImage.size[ 0 ] * 2.54 / dpi
             self.currentWidth = self.originalWidth
-            buf = io.BytesIO( )
-            self.originalImage.save( buf, format = 'PNG' )
-            self.b64string = base64.b64encode( buf.getvalue( ) )
+            self.b64string = base64.b64encode( pngdata )
         
     def getInfoGUI( self, parent ):
         """
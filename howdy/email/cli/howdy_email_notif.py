@@ -3,7 +3,7 @@ from email.utils import formataddr
 from argparse import ArgumentParser
 #
 from howdy.core import core
-from howdy.email import email, get_email_contacts_dict, emailAddress, emailName, get_email_service
+from howdy.email import email, get_email_contacts_dict, get_newsletter_id, emailAddress, emailName
 
 def main( ):
     time0 = time.time( )
@@ -13,12 +13,16 @@ def main( ):
                       default = False, help = 'Run debug mode if chosen.')
     parser.add_argument('--test', dest='do_test', action='store_true',
                       default = False, help = 'Send a test notification email if chosen.')
+    parser.add_argument('--dryrun', dest='do_dryrun', action='store_true',
+                      default = False, help = 'If chosen, create the notification emails for all recipients, but do not send them.')
     parser.add_argument('--subject', dest='subject', action='store', type=str,
                       default = 'Plex notification for %s.' % date_now.strftime( '%B %d, %Y' ),
                       help = 'Subject of notification email. Default is "%s".' %
                       ( 'Plex notification for %s.' % date_now.strftime( '%B %d, %Y' ) ) )
     parser.add_argument('--body', dest='body', action='store', type=str, default = 'This is a test.',
                       help = 'Body of the email to be sent. Default is "This is a test."')
+    parser.add_argument('--resend', dest='do_resend', action='store_true',
+                      default = False, help = 'If chosen, also send to those recipients who already got this notification.')
     
     args = parser.parse_args( )
     logger = logging.getLogger( )
@@ -52,19 +56,25 @@ def main( ):
     ## now do the email sending out
     print( 'processed all checks in %0.3f seconds.' % ( time.time( ) - time0 ) )
     time0 = time.time( )
-    if args.do_test:
+    if args.do_dryrun:
+        msgs = list(map(lambda name_email: email.create_individual_email_full(
+            htmlString, args.subject, name_email[ 1 ], name = name_email[ 0 ] ),
+                        name_emails + [ ( emailName, emailAddress ) ] ) )
+        print( 'created %d emails, without sending, in %0.3f seconds.' % ( len( msgs ), time.time( ) - time0 ) )
+    elif args.do_test:
         email.send_individual_email_full(
             htmlString, args.subject, emailAddress, name = emailName, verify = False )
         print( 'processed test email in %0.3f seconds.' % ( time.time( ) - time0 ) )
     else:
-        email_service = get_email_service( verify = False )
-        def _send_email_perproc( input_tuple ):
-            name, fullEmail = input_tuple
-            email.send_individual_email_full(
-                htmlString, args.subject, fullEmail, name = name,
-                email_service = email_service )
-            return True
-        arrs = list( map(
-            _send_email_perproc, name_emails +
-            [ ( emailName, emailAddress ) ] ) )
-        print( 'processed %d emails in %0.3f seconds.' % ( len(arrs), time.time( ) - time0 ) )
+        statuses = email.send_individual_emails(
+            htmlString, args.subject, name_emails + [ ( emailName, emailAddress ) ],
+            newsletter = get_newsletter_id( args.subject, htmlString ),
+            verify = False, resend = args.do_resend )
+        for recipients in sorted(filter(lambda recipients: statuses[ recipients ][ 0 ] == 'FAILURE', statuses ) ):
+            print( 'could not send to %s: %s' % ( recipients, statuses[ recipients ][ 1 ] ) )
+        num_skipped = len(list(filter(lambda status: status[ 0 ] == 'SKIPPED', statuses.values( ) ) ) )
+        if num_skipped != 0:
+            print( 'skipped %d recipients who already got this notification. Rerun with --resend to send to them again.' % num_skipped )
+        print( 'sent %d of %d emails in %0.3f seconds.' % (
+            len(list(filter(lambda status: status[ 0 ] == 'SUCCESS', statuses.values( ) ) ) ),
+            len( statuses ), time.time( ) - time0 ) )
@@ -1,20 +1,60 @@
-import os, sys, titlecase, datetime, re, time, requests, mimetypes, logging
-import mutagen.mp3, mutagen.mp4, glob, multiprocessing, re, httplib2
+import os, sys, titlecase, datetime, time, requests, mimetypes, logging
+import mutagen.mp3, mutagen.mp4, glob, multiprocessing, httplib2
 from email.utils import formataddr
-from docutils.examples import html_parts
 from itertools import chain
-from bs4 import BeautifulSoup
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 from email.mime.audio import MIMEAudio
 from email.mime.image import MIMEImage
-from jinja2 import Environment, FileSystemLoader, Template
+from jinja2 import Environment, FileSystemLoader
+from functools import lru_cache
 #
 from howdy import resourceDir
-from howdy.core import session, core, get_lastupdated_string
+from howdy.core import session, core, get_lastupdated_string, get_rst_html
 from howdy.core import get_formatted_size, get_formatted_duration
-from howdy.email import get_email_service, send_email_lowlevel, send_email_localsmtp, emailAddress, emailName
+from howdy.email import get_email_service, send_email_lowlevel, send_email_localsmtp, emailAddress, emailName, EmailSendQueue
+#
+## one jinja2 environment for all the templates in resourceDir, so that each template is loaded and compiled once
+_template_env = Environment( loader = FileSystemLoader( resourceDir ), auto_reload = False )
+
+def get_template( name ):
+    """
+    Returns a compiled jinja2_ template, either a template file in the resource directory or a template string. Every template is compiled only once, and then reused.
+
+    :param str name: the name of the template file in the resource directory, such as ``'summary_data_tv_template.rst'``, or else the template string itself.
+    :returns: the compiled jinja2_ :py:class:`Template <jinja2.Template>`.
+    :rtype: :py:class:`Template <jinja2.Template>`
+
+    .. _jinja2: https://jinja.palletsprojects.com
+    """
+    if os.path.isfile( os.path.join( resourceDir, name ) ): return _template_env.get_template( name )
+    return _get_string_template( name )
+
+@lru_cache( maxsize = None )
+def _get_string_template( source ):
+    return _template_env.from_string( source )
+
+@lru_cache( maxsize = None )
+def _get_resource_string( name ):
+    return open( os.path.join( resourceDir, name ), 'r' ).read( )
+
+@lru_cache( maxsize = 8 )
+def _split_on_greeting( mainHTML ):
+    return tuple( mainHTML.split( 'Hello Friend,' ) )
+
+def personalize_html( mainHTML, name = None ):
+    """
+    Personalizes an HTML email body, such as the Plex_ newsletter, to a recipient: every ``Hello Friend,`` is replaced with ``Hello <FIRSTNAME>,``. The body is split on its greeting only once, and each recipient's body is then a cheap join of the same pieces.
+
+    :param str mainHTML: the email body as an HTML :py:class:`str` document.
+    :param str name: optional argument. If given, the recipient's name.
+    :returns: the personalized HTML :py:class:`str` document. If there is no name, then returns ``mainHTML``.
+    :rtype: str
+    """
+    if name is None or len( name.split( ) ) == 0: return mainHTML
+    firstname = name.split( )[ 0 ].strip( )
+    return ( 'Hello %s,' % firstname ).join( _split_on_greeting( mainHTML ) )
 #
 def send_email_movie_torrent( movieName, data, isJackett = False, verify = True ):
     """
@@ -44,21 +84,20 @@ def send_email_movie_torrent( movieName, data, isJackett = False, verify = True
     msg['From'] = emailString
     msg['To']  = emailString
     if emailName is not None:
-        template = Template('{{ name }}, can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
+        template = get_template('{{ name }}, can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
         msg[ 'Subject' ] = template.render( name = name, movieName = movieName, dtstring = dtstring )
     else:
-        template = Template('Can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
+        template = get_template('Can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
         msg[ 'Subject' ] = template.render( movieName = movieName, dtstring = dtstring )
 
     #
     ## JINJA load in the directory in which these templates live, http://zetcode.com/python/jinja/
-    env = Environment( loader = FileSystemLoader( resourceDir ) )
     if not isJackett:
         torrent_data = data
         torfile = '%s.torrent' % '_'.join( movieName.split( ) ) # change to get to work
         torfile_mystr = '%s.torrent' % '_'.join( movieName.split( ) ) # change to get to work
         email_torrent = { 'name' : name, 'torfile_mystr' : torfile_mystr, 'dtstring' : dtstring }
-        template = env.get_template( 'howdy_sendmovie_torrent.rst' )
+        template = get_template( 'howdy_sendmovie_torrent.rst' )
         wholestr = template.render( email_torrent = email_torrent )
         #
         htmlString = core.rstToHTML( wholestr )
@@ -72,7 +111,7 @@ def send_email_movie_torrent( movieName, data, isJackett = False, verify = True
     else:
         mag_link = data
         email_magnet = { 'name' : name, 'mag_link' : data, 'movieName' : movieName, 'dtstring' : dtstring }
-        template = env.get_template(  'howdy_sendmovie_magnet.rst' )
+        template = get_template( 'howdy_sendmovie_magnet.rst' )
         wholestr = template.render( email_magnet = email_magnet )
         #
         htmlString = core.rstToHTML( wholestr )
@@ -107,14 +146,13 @@ def send_email_movie_none( movieName, verify = True ):
     msg['From'] = emailString
     msg['To']  = emailString
     if emailName is not None:
-        template = Template('{{ name }}, can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
+        template = get_template('{{ name }}, can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
         msg[ 'Subject' ] = template.render( name = name, movieName = movieName, dtstring = dtstring )
     else:
-        template = Template('Can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
+        template = get_template('Can you download this movie, {{ movieName }}, requested on {{ dtstring }}?' )
         msg[ 'Subject' ] = template.render( movieName = movieName, dtstring = dtstring )
     #
-    env = Environment( loader = FileSystemLoader( resourceDir ) )
-    template = env.get_template( 'howdy_sendmovie_none.rst' )
+    template = get_template( 'howdy_sendmovie_none.rst' )
     email_none = { 'name' : name, 'movieName' : movieName, 'dtstring' : dtstring }
     wholestr = template.render( email_none = email_none )
     #
@@ -153,29 +191,37 @@ def get_summary_body( token, nameSection = False, fullURL = 'http://localhost:32
             fullURL = fullURL, token = token ) ), #2
         get_summary_data_television_remote( fullURL = fullURL, token = token ), #3
     )
-    wholestr = open( os.path.join( resourceDir, 'howdy_body_template.rst' ), 'r' ).read( )
+    wholestr = _get_resource_string( 'howdy_body_template.rst' )
     wholestr = wholestr % tup_formatting
     if nameSection: wholestr = '\n'.join([ 'SUMMARY', '==========', wholestr ])
     return wholestr
 
+#
+## the maximum number of attempts to send a single email
+_max_send_attempts = 5
+
 def send_individual_email_perproc( input_tuple ):
     """
-    A tuple-ized version of :py:meth:`send_individual_email <howdy.email.email.send_individual_email>` used by the :py:mod:`multiprocessing` module to send out emails.
+    A tuple-ized version of :py:meth:`send_individual_email <howdy.email.email.send_individual_email>` used by the :py:mod:`multiprocessing` module to send out emails. Sending is tried at most ``_max_send_attempts`` (``5``) times, waiting twice as long after each failure.
 
     :param tuple input_tuple: an expected four-element :py:class:`tuple`: the HTML email body, the recipient's email, the recipient's name, and the :py:class:`email service resource <googleapiclient.discovery.Resource>`.
 
     .. seealso:: :py:meth:`send_individual_email <howdy.email.email.send_individual_email>`.
     """
     mainHTML, email, name, email_service = input_tuple
-    while True:
+    for attempt in range( 1, _max_send_attempts + 1 ):
         try:
             send_individual_email( mainHTML, email, name = name, email_service = email_service )
             return
         except Exception as e:
+            if attempt == _max_send_attempts: break
             if name is None:
                 print('Problem sending to %s. Trying again...' % email)
             else:
                 print('Problem sending to %s <%s>. Trying again...' % ( name, email ) )
+            time.sleep( 2 ** ( attempt - 1 ) )
+    if name is None: print( 'Could not send to %s after %d attempts.' % ( email, _max_send_attempts ) )
+    else: print( 'Could not send to %s <%s> after %d attempts.' % ( name, email, _max_send_attempts ) )
     
 def test_email( subject = None, htmlstring = None, verify = True ):
     """
@@ -243,13 +289,38 @@ def send_individual_email_full(
     :param str subject: the email subject.
     :param str emailAddress: the recipient email address.
     :param str name: optional argument. If given, the recipient's name.
-    :param date mydate: optional argument. The :py:class:`date <datetime.date>` at which the email is sent. Default is :py:meth:`now( ) <datetime.datetime.now>`.
     :param str attach: optional argument. If defined, the Base64_ encoded attachment.
     :param str attachName: optional argument. The :py:class:`list` of attachment names, if there is an attachment. If defined, then ``attachData`` must also be defined.
     :param str attachType: the attachment type. Default is ``txt``.
     :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
     :param email_service: optional argument, the :py:class:`Resource <googleapiclient.discovery.Resource>` representing the Google email service used to send and receive emails. If ``None``, then generated here.
 
+    :raise AssertionError: if the current Plex_ account user's email address does not exist.
+
+    .. seealso:: :py:meth:`create_individual_email_full <howdy.email.email.create_individual_email_full>`.
+    """
+    msg = create_individual_email_full(
+        mainHTML, subject, emailAddress, name = name, attach = attach,
+        attachName = attachName, attachType = attachType )
+    send_email_lowlevel( msg, email_service = email_service, verify = verify )
+
+def create_individual_email_full(
+    mainHTML, subject, emailAddress, name = None, attach = None,
+    attachName = None, attachType = 'txt' ):
+    """
+    Creates the HTML email, with optional *single* attachment, to a single recipient email address, that :py:meth:`send_individual_email_full <howdy.email.email.send_individual_email_full>` sends. If the recipient's name is given, then ``Hello Friend,`` in the body is replaced with ``Hello <FIRSTNAME>,``.
+
+    :param str mainHTML: the email body as an HTML :py:class:`str` document.
+    :param str subject: the email subject.
+    :param str emailAddress: the recipient email address.
+    :param str name: optional argument. If given, the recipient's name.
+    :param str attach: optional argument. If defined, the Base64_ encoded attachment.
+    :param str attachName: optional argument. The :py:class:`list` of attachment names, if there is an attachment. If defined, then ``attachData`` must also be defined.
+    :param str attachType: the attachment type. Default is ``txt``.
+
+    :returns: the :py:class:`MIMEMultiPart <email.mime.multipart.MIMEMultiPart>` email message.
+    :rtype: :py:class:`MIMEMultiPart <email.mime.multipart.MIMEMultiPart>`
+
     :raise AssertionError: if the current Plex_ account user's email address does not exist.
     """
     assert( emailAddress is not None ), "Error, email address must not be None"
@@ -264,15 +335,43 @@ def send_individual_email_full(
         htmlstring = mainHTML
     else:
         msg['To'] = formataddr( ( name, emailAddress ) )
-        firstname = name.split()[0].strip()
-        htmlstring = re.sub( 'Hello Friend,', 'Hello %s,' % firstname, mainHTML )
+        htmlstring = personalize_html( mainHTML, name = name )
     body = MIMEText( htmlstring, 'html', 'utf-8' )
     msg.attach( body )
     if attach is not None and attachName is not None:
         att = MIMEApplication( attach, _subtype = 'text' )
         att.add_header( 'content-disposition', 'attachment', filename = attachName )
         msg.attach( att )
-    send_email_lowlevel( msg, email_service = email_service, verify = verify )
+    return msg
+
+def send_individual_emails(
+    mainHTML, subject, name_emails, newsletter = None, use_smtp = False,
+    max_workers = 4, max_attempts = 5, verify = True, resend = False ):
+    """
+    Sends the HTML email to each of many recipients, such as the Howdy newsletter to all its recipients, through an :py:class:`EmailSendQueue <howdy.email.EmailSendQueue>`. A few connections, to the `GMail API`_ or the local SMTP_ server, are opened and reused for all the emails. Each email is tried at most ``max_attempts`` times, and an email to a bad address does not hold up the others.
+
+    :param str mainHTML: the email body as an HTML :py:class:`str` document. Each ``Hello Friend,`` is replaced with ``Hello <FIRSTNAME>,`` for those recipients whose names are known.
+    :param str subject: the email subject.
+    :param list name_emails: the :py:class:`list` of two-element :py:class:`tuple`, the recipient's name (or ``None``) and email address.
+    :param str newsletter: optional argument, the identifier of this newsletter, from :py:meth:`get_newsletter_id <howdy.email.get_newsletter_id>`. If not ``None``, then the delivery status of each email is stored, and those recipients who already got this newsletter are skipped.
+    :param bool use_smtp: optional argument. If ``True``, then send through the local SMTP_ server. If ``False``, then send through the `GMail API`_. Default is ``False``.
+    :param int max_workers: optional argument, the maximum number of emails sent at the same time. Default is ``4``.
+    :param int max_attempts: optional argument, the maximum number of attempts to send each email. Default is ``5``.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param bool resend: optional argument. If ``True``, then also send to those recipients who already got this newsletter. Default is ``False``.
+
+    :returns: a :py:class:`dict` of the delivery status of each email, as described in :py:meth:`send_all <howdy.email.EmailSendQueue.send_all>`.
+    :rtype: dict
+
+    .. seealso:: :py:meth:`create_individual_email_full <howdy.email.email.create_individual_email_full>`.
+
+    .. _SMTP: https://en.wikipedia.org/wiki/Simple_Mail_Transfer_Protocol
+    """
+    with EmailSendQueue( newsletter = newsletter, use_smtp = use_smtp, max_workers = max_workers,
+                         max_attempts = max_attempts, verify = verify, resend = resend ) as queue:
+        for name, fullEmail in name_emails:
+            queue.put( create_individual_email_full( mainHTML, subject, fullEmail, name = name ) )
+        return queue.send_all( )
 
 def send_individual_email_full_withsingleattach(
         mainHTML, subject, email, name = None,
@@ -305,8 +404,7 @@ def send_individual_email_full_withsingleattach(
         htmlstring = mainHTML
     else:
         msg['To'] = '%s <%s>' % ( name, email )
-        firstname = name.split()[0].strip()
-        htmlstring = re.sub( 'Hello Friend,', 'Hello %s,' % firstname, mainHTML )
+        htmlstring = personalize_html( mainHTML, name = name )
     body = MIMEText( htmlstring, 'html', 'utf-8' )
     msg.attach( body )
     if attachData is not None:
@@ -350,8 +448,7 @@ def send_individual_email_full_withattachs(
         htmlstring = mainHTML
     else:
         msg['To'] = '%s <%s>' % ( name, email )
-        firstname = name.split()[0].strip()
-        htmlstring = re.sub( 'Hello Friend,', 'Hello %s,' % firstname, mainHTML )
+        htmlstring = personalize_html( mainHTML, name = name )
     body = MIMEText( htmlstring, 'html', 'utf-8' )
     msg.attach( body )
     if attachNames is not None:
@@ -403,8 +500,7 @@ def send_individual_email(
         htmlstring = mainHTML
     else:
         msg['To'] = '%s <%s>' % ( name, email )
-        firstname = name.split()[0].strip()
-        htmlstring = re.sub( 'Hello Friend,', 'Hello %s,' % firstname, mainHTML )
+        htmlstring = personalize_html( mainHTML, name = name )
     #
     body = MIMEText( htmlstring, 'html', 'utf-8' )
     msg.attach( body )
@@ -439,11 +535,9 @@ def get_summary_html(
         get_summary_body( token, nameSection = nameSection, fullURL = fullURL ),
         postambleText,
     )
-    wholestr = open( os.path.join( resourceDir, 'howdy_template.rst' ), 'r' ).read( )
+    wholestr = _get_resource_string( 'howdy_template.rst' )
     wholestr = wholestr % tup_formatting
-    htmlString = html_parts( wholestr )[ 'whole' ]
-    html = BeautifulSoup( htmlString, 'lxml' )
-    return html.prettify( ), wholestr
+    return get_rst_html( wholestr )[ 'pretty' ], wholestr
 
 def _get_itemized_string( stringtup ):
     mainstring, maindict = stringtup
@@ -488,6 +582,17 @@ def _get_album_prifile( prifile ):
         return ( prifile, album )
     else: return None
 
+def _get_library_stats_since( keynums, token, fullURL, sinceDate ):
+    #
+    ## one crawl per library, for everything and for everything since sinceDate. Libraries that
+    ## cannot be crawled are skipped, so if none can, both lists are empty and the totals are zero
+    stats = list(filter(None, map(lambda keynum: core.get_library_stats_windows(
+        keynum, token, fullURL = fullURL, windows = [ None, sinceDate ],
+        use_snapshot = True ), keynums ) ) )
+    datas = list(map(lambda stat: stat[ 0 ], stats ) )
+    datas_since = list(map(lambda stat: stat[ 1 ], stats ) )
+    return datas, datas_since
+
 def get_summary_data_music_remote(
     token, fullURL = 'http://localhost:32400',
     sinceDate = datetime.datetime.strptime('January 1, 2020', '%B %d, %Y' ).date( ) ):
@@ -512,7 +617,8 @@ def get_summary_data_music_remote(
     keynums = set(filter(lambda keynum: libraries_dict[ keynum ][ 1 ] == 'artist', libraries_dict ) )
     if len( keynums ) == 0: return None
     # sinceDate = core.get_current_date_newsletter( )
-    datas = list(map(lambda keynum: core.get_library_stats( keynum, token, fullURL = fullURL ), keynums))
+    datas, datas_since = _get_library_stats_since(
+        keynums, token, fullURL = fullURL, sinceDate = sinceDate )
     music_summ = {
         'current_date_string' : datetime.datetime.now( ).date( ).strftime( '%B %d, %Y' ),
         'num_songs' : f'{sum(list(map(lambda data: data[ "num_songs" ], datas))):,}',
@@ -523,9 +629,7 @@ def get_summary_data_music_remote(
     #
     ## now since sinceDate
     datas_since = list(filter(
-        lambda data_since: data_since[ 'num_songs' ] > 0,
-        map(lambda keynum: core.get_library_stats(
-            keynum, token, fullURL = fullURL, sinceDate = sinceDate ), keynums ) ) )
+        lambda data_since: data_since[ 'num_songs' ] > 0, datas_since ) )
     music_summ[ 'len_datas_since' ] = len( datas_since )
     if len( datas_since ) > 0:
         music_summ[ 'since_date_string' ] = sinceDate.strftime( '%B %d, %Y' )
@@ -535,8 +639,7 @@ def get_summary_data_music_remote(
         music_summ[ 'formatted_size_since' ] = get_formatted_size( sum(list(map(lambda data_since: data_since[ 'totsize'], datas_since))))
         music_summ[ 'formatted_duration_since' ] = get_formatted_duration( sum(list(map(lambda data_since: data_since[ 'totdur' ], datas_since))) )
     #
-    env = Environment( loader = FileSystemLoader( resourceDir ) )
-    template = env.get_template( 'summary_data_music_template.rst' )
+    template = get_template( 'summary_data_music_template.rst' )
     musicstring = template.render( music_summ = music_summ )
     return musicstring
 
@@ -565,7 +668,8 @@ def get_summary_data_television_remote(
     if len( keynums ) == 0: return None
     #
     # sinceDate = core.get_current_date_newsletter( )
-    datas = list(map(lambda keynum: core.get_library_stats( keynum, token, fullURL = fullURL ), keynums))
+    datas, datas_since = _get_library_stats_since(
+        keynums, token, fullURL = fullURL, sinceDate = sinceDate )
     tv_summ = {
         'current_date_string' : datetime.datetime.now( ).date( ).strftime( '%B %d, %Y' ),
         'num_episodes' : f'{sum(list(map(lambda data: data[ "num_tveps" ], datas))):,}',
@@ -573,9 +677,7 @@ def get_summary_data_television_remote(
         'formatted_size' : get_formatted_size(sum(list(map(lambda data: data[ 'totsize' ], datas)))),
         'formatted_duration' : get_formatted_duration(sum(list(map(lambda data: data[ 'totdur' ], datas)))) }
     datas_since = list(filter(
-        lambda data_since: data_since[ 'num_tveps' ] > 0,
-        map(lambda keynum: core.get_library_stats(
-            keynum, token, fullURL = fullURL, sinceDate = sinceDate ), keynums) ) )
+        lambda data_since: data_since[ 'num_tveps' ] > 0, datas_since ) )
     tv_summ[ 'len_datas_since' ] = len( datas_since )
     if len( datas_since ) > 0:
         tv_summ[ 'since_date_string' ] = sinceDate.strftime( '%B %d, %Y' )
@@ -583,8 +685,7 @@ def get_summary_data_television_remote(
         tv_summ[ 'num_shows_since' ] = f'{sum(list(map(lambda data_since: data_since[ "num_tvshows" ], datas_since))):,}'
         tv_summ[ 'formatted_size_since' ] = get_formatted_size( sum(list(map(lambda data_since: data_since[ 'totsize'], datas_since))))
         tv_summ[ 'formatted_duration_since' ] = get_formatted_duration( sum(list(map(lambda data_since: data_since[ 'totdur' ], datas_since))) )
-    env = Environment( loader = FileSystemLoader( resourceDir ) )
-    template = env.get_template( 'summary_data_tv_template.rst' )
+    template = get_template( 'summary_data_tv_template.rst' )
     tvstring = template.render( tv_summ = tv_summ )
     return tvstring
 
@@ -632,7 +733,8 @@ def get_summary_data_movies_remote(
                 sort_by_genre.pop( g2 )
     #
     current_date_string = datetime.datetime.now( ).date( ).strftime( '%B %d, %Y' )
-    datas = list(map(lambda keynum: core.get_library_stats( keynum, token, fullURL = fullURL ), keynums ) )
+    datas, datas_since = _get_library_stats_since(
+        keynums, token, fullURL = fullURL, sinceDate = sinceDate )
     num_movies_since = -1
     sorted_by_genres = { }
     sorted_by_genres_since = { }
@@ -658,9 +760,7 @@ def get_summary_data_movies_remote(
         'formatted_duration' : totdur }
     #
     datas_since = list(filter(
-        lambda data_since: data_since[ 'num_movies' ] > 0,
-        map(lambda keynum: core.get_library_stats(
-            keynum, token, fullURL = fullURL, sinceDate = sinceDate ), keynums ) ) )
+        lambda data_since: data_since[ 'num_movies' ] > 0, datas_since ) )
     movie_summ[ 'len_datas_since' ] = len( datas_since )
     if len( datas_since ) != 0:
         for data_since in datas_since:
@@ -705,11 +805,11 @@ def get_summary_data_movies_remote(
     last_N_movies = list(map(_get_nth_movie, lastN_movies ) )
     #
     ## catmovstrings list to pass to JINJA template
-    template_mainstring = Template(' '.join([
+    template_mainstring = get_template(' '.join([
         'As of ``{{ current_date_string }}``, there are {{ num_movies }} movies in this category.',
         'The total size of movie media here is {{ totsize }}.',
         'The total duration of movie media here is {{ totdur }}.' ]) )
-    template_sincestring = Template(' '.join([
+    template_sincestring = get_template(' '.join([
         'Since ``{{ since_date_string }}``, I have added {{ num_movies_since }} movies in this category.',
         'The total size of movie media I added here is {{ totsize_since }}.',
         'The total duration of movie media I added here is {{ totdur_since }}.' ] ) )
@@ -732,7 +832,6 @@ def get_summary_data_movies_remote(
             return { 'category' : cat, 'description' : description }
         return { 'category' : cat, 'description' : mainstring }
     catmovs = list(map(_get_category_entry, sorted( sorted_by_genres ) ) )
-    env = Environment( loader = FileSystemLoader( resourceDir ) )
-    template = env.get_template( 'summary_data_movie_template.rst' )
+    template = get_template( 'summary_data_movie_template.rst' )
     movstring = template.render( movie_summ = movie_summ, last_N_movies = last_N_movies, catmovs = catmovs )
     return movstring
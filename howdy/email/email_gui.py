@@ -1,5 +1,4 @@
 import os, sys, titlecase, datetime, json, re, urllib, time, glob
-import pathos.multiprocessing as multiprocessing
 from email.utils import formataddr
 from bs4 import BeautifulSoup
 from itertools import chain
@@ -9,7 +8,7 @@ from PyQt5.QtCore import *
 #
 from howdy import resourceDir
 from howdy.core import core, QDialogWithPrinting, check_valid_RST, convert_string_RST, HtmlView
-from howdy.email import email, email_basegui, emailAddress, emailName, get_email_contacts_dict, get_email_service
+from howdy.email import email, email_basegui, emailAddress, emailName, get_email_contacts_dict, get_newsletter_id
 from howdy.email.email_mygui import HowdyGuestEmailTV
 #from howdy.email.email_demo_gui import HowdyEmailDemoGUI
 
@@ -101,6 +100,8 @@ class HowdyEmailGUI( QDialogWithPrinting ):
             self.selectTestButton = QPushButton( 'TEST ADDRESS' )
             self.selectAllButton = QPushButton( 'ALL ADDRESSES' )
             self.sendEmailButton = QPushButton( 'SEND EMAIL' )
+            self.resendCheckBox = QCheckBox( 'RESEND' )
+            self.resendCheckBox.setToolTip( 'ALSO SEND TO THOSE WHO ALREADY GOT THIS NEWSLETTER.' )
             self.selectTestButton.clicked.connect( self.selectTest )
             self.selectAllButton.clicked.connect( self.selectAll )
             self.sendEmailButton.clicked.connect( self.sendEmail )
@@ -164,22 +165,18 @@ class HowdyEmailGUI( QDialogWithPrinting ):
             ## now send the emails
             time0 = time.time( )
             self.statusSignal.emit( 'STARTING TO SEND EMAILS...' )
-            email_service = get_email_service( verify = self.verify )
             mydate = datetime.datetime.now( ).date( )
-            def _send_email_perproc( input_tuple ):
-                name, fullEmail = input_tuple
-                subject = titlecase.titlecase(
-                    'Plex Email Newsletter For %s' % mydate.strftime( '%B %Y' ) )
-                email.send_individual_email_full(
-                    self.mainHtml, subject, fullEmail, name = name,
-                    email_service = email_service )
-                return True
-            with multiprocessing.Pool( processes = min(
-                multiprocessing.cpu_count( ), len( input_tuples ) ) ) as pool:
-                arrs = list( map( _send_email_perproc, input_tuples ) )
+            subject = titlecase.titlecase(
+                'Plex Email Newsletter For %s' % mydate.strftime( '%B %Y' ) )
+            statuses = email.send_individual_emails(
+                self.mainHtml, subject, input_tuples,
+                newsletter = get_newsletter_id( subject, self.mainHtml ),
+                verify = self.verify, resend = self.resendCheckBox.isChecked( ) )
+            num_sent = len(list(filter(lambda status: status[ 0 ] == 'SUCCESS', statuses.values( ) ) ) )
+            num_skipped = len(list(filter(lambda status: status[ 0 ] == 'SKIPPED', statuses.values( ) ) ) )
             self.statusSignal.emit(
-                'SENT %d EMAILS IN %0.3f SECONDS.' %
-                ( len( input_tuples ), time.time() - time0 ) )
+                'SENT %d OF %d EMAILS, SKIPPED %d ALREADY SENT, IN %0.3f SECONDS.' %
+                ( num_sent, len( input_tuples ), num_skipped, time.time() - time0 ) )
             #
             ## if I have sent out ALL EMAILS, then I mean to update the newsletter
             if all(self.should_email): core.set_date_newsletter( )
@@ -302,6 +299,7 @@ class HowdyEmailGUI( QDialogWithPrinting ):
             topLayout.addWidget( self.emailSendDialogTableModel.selectTestButton, 0, 0, 1, 1 )
             topLayout.addWidget( self.emailSendDialogTableModel.selectAllButton, 0, 1, 1, 1 )
             topLayout.addWidget( self.emailSendDialogTableModel.sendEmailButton, 0, 2, 1, 1 )
+            topLayout.addWidget( self.emailSendDialogTableModel.resendCheckBox, 0, 3, 1, 1 )
             #
             topLayout.addWidget( QLabel( 'FILTER' ), 1, 0, 1, 1 )
             topLayout.addWidget( self.emailSendDialogTableModel.filterOnNamesOrEmails, 1, 1, 1, 2 )
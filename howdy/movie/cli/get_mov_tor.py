@@ -2,11 +2,9 @@ import sys, signal
 from howdy import signal_handler
 signal.signal( signal.SIGINT, signal_handler )
 import re, codecs, requests, time, logging
-from itertools import chain
-from pathos.multiprocessing import Pool
 from argparse import ArgumentParser
 #
-from howdy.core import core_deluge
+from howdy.core import core_deluge, core_torrents
 from howdy.movie import movie_torrents, movie
 from howdy.tv import tv_torrents
 from howdy.core.core import get_jackett_credentials
@@ -73,6 +71,10 @@ def get_items_torrentz( name, maxnum = 100, verify = True ):
         return None
     return items
 
+def _get_items_status( items ):
+    if items is None: return None, 'FAILURE'
+    return items, 'SUCCESS'
+
 def get_movie_torrent_items( items, filename = None, to_torrent = False ):    
     if len( items ) != 1:
         sortdict = { idx + 1 : item for ( idx, item ) in enumerate(items) }
@@ -215,30 +217,28 @@ def main( ):
             return
         except ValueError: pass
 
-    pool = Pool( processes = 4 )
-    if not args.do_nozooq: jobs = [
-            pool.apply_async( get_items_zooqle, args = ( args.name, args.maxnum ) ) ]
-    else: jobs = [ ]
+    providers = { }
+    if not args.do_nozooq:
+        providers[ 'zooqle' ] = lambda session: movie_torrents.get_movie_torrent_zooqle(
+            args.name, maxnum = args.maxnum, session = session )
     #
     ## check for jackett
     if get_jackett_credentials( ) is None:
-        jobs += list(map(lambda func: pool.apply_async( func, args = ( args.name, args.maxnum ) ),
-                         ( get_items_rarbg, get_items_tpb ) ) )
+        providers[ 'rarbg' ] = lambda session: movie_torrents.get_movie_torrent_rarbg(
+            args.name, maxnum = args.maxnum, session = session )
+        providers[ 'tpb' ] = lambda session: _get_items_status( get_items_tpb( args.name, args.maxnum ) )
         #if args.do_torrentz:
-        #    jobs.append( pool.apply_async( get_items_torrentz, args = ( args.name, args.maxnum ) ) )
+        #    providers[ 'torrentz' ] = lambda session: _get_items_status( get_items_torrentz( args.name, args.maxnum ) )
     else:
-        jobs.append( pool.apply_async(
-            get_items_jackett, args = ( args.name, tmdb_id, args.maxnum, args.do_verify, args.do_raw ) ) )
-        jobs.append( pool.apply_async(
-            get_items_eztv_io, args = ( args.name, tmdb_id, args.maxnum, args.do_verify ) ) )
-    items_lists = [ ]
-    for job in jobs:
-        try:
-            items = job.get( args.timeout )   # 60 second timeout on process
-            if items is None: continue
-            items_lists.append( items )
-        except: pass
-    items = list( chain.from_iterable( items_lists ) )
+        providers[ 'jackett' ] = lambda session: movie_torrents.get_movie_torrent_jackett(
+            args.name, maxnum = args.maxnum, doRaw = args.do_raw, verify = args.do_verify,
+            tmdb_id = tmdb_id, session = session )
+        providers[ 'eztv.io' ] = lambda session: movie_torrents.get_movie_torrent_eztv_io(
+            args.name, maxnum = args.maxnum, verify = args.do_verify,
+            tmdb_id = tmdb_id, session = session )
+    with core_torrents.TorrentSearchAggregator(
+            num_threads = len( providers ), timeout = args.timeout ) as aggregator:
+        items, statuses = aggregator.search( providers )
     logging.info( 'search for %d torrents took %0.3f seconds.' % (
         len( items ), time.time( ) - time0 ) )    
     if len( items ) == 0: return
@@ -524,7 +524,7 @@ def get_movie_tmdbids( title, year = None, getAll = False, verify = True ):
 
 #
 ## funky logic needed here...
-def get_genre_movie( title, year = None, checkMultiple = True, verify = True ):
+def get_genre_movie( title, year = None, checkMultiple = True, verify = True, raise_errors = False ):
     """
     Gets the main genre of a movie.
     
@@ -532,6 +532,7 @@ def get_genre_movie( title, year = None, checkMultiple = True, verify = True ):
     :param int year: optional argument. If defined, check only on movies released that year.
     :param bool checkMultiple: optional argument. If ``True``, then do an involved search where each word in the ``title`` is individually capitalized. This functionality was developed to make TMDB_ movie searches more robust. Default is ``True``.
     :param bool verify: optional argument, whether to verify SSL connections. Default is ``False``.
+    :param bool raise_errors: optional argument. If ``True``, then raise a :py:class:`ValueError` when TMDB_ returns an error (such as a rate limit) instead of search results, so that an error is not mistaken for a movie with no genre. Default is ``False``.
     :returns: the main movie genre, which can be one of action, animation, comedy, documentary, drama, hindi, horror, horror, science fiction.
     :rtype: str
     """
@@ -545,6 +546,9 @@ def get_genre_movie( title, year = None, checkMultiple = True, verify = True ):
         movieSearchMainURL, params = params,
         verify = verify )
     data = response.json( )
+    if raise_errors and ( response.status_code != 200 or 'total_pages' not in data ):
+        raise ValueError( 'TMDB search for %s failed with status %d: %s.' % (
+            title, response.status_code, data.get( 'status_message', '' ) ) )
     if 'total_pages' in data:
         total_pages = data['total_pages']
         results = list( filter(lambda result: rapidfuzz.fuzz.ratio( result['title'], title ) >= 90.0,
@@ -558,7 +562,8 @@ def get_genre_movie( title, year = None, checkMultiple = True, verify = True ):
                 split_titles = title.split()
                 split_titles[idx] = split_titles[idx].upper( )
                 newtitle = ' '.join( split_titles )
-                val = get_genre_movie( newtitle, year = year, checkMultiple = False )
+                val = get_genre_movie( newtitle, year = year, checkMultiple = False,
+                                       verify = verify, raise_errors = raise_errors )
                 if val is not None:
                     return val
         return None
@@ -1,14 +1,13 @@
 import numpy, os, sys, requests, json, base64, time
 import logging, glob, datetime, textwrap, titlecase
-from pathos.multiprocessing import Pool
-from itertools import chain
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 #
 from howdy.movie import movie, movie_torrents
-from howdy.core import core, get_popularity_color, get_formatted_size_MB, core_deluge
-from howdy.core import QDialogWithPrinting, ProgressDialog
+from howdy.core import core, get_popularity_color, get_formatted_size_MB, core_deluge, core_torrents
+from howdy.core import QDialogWithPrinting, ProgressDialog, FuzzyMatchIndex, get_image_cache
+from rapidfuzz.fuzz import ratio
 from howdy.email import email
 
 _headers = [ 'title', 'release date', 'popularity', 'rating', 'overview' ]
@@ -18,6 +17,9 @@ _colmap = { 0 : 'title',
             3 : 'vote_average' }
 
 _minyear = 1900
+#
+## minimum title similarity, from 0 to 100, of a TMDB movie to a Plex movie of about the same year
+_min_title_matchval = 95
 
 class HowdyRefreshMoviesThread( QThread ):
     emitString = pyqtSignal( str )
@@ -225,10 +227,10 @@ class HowdyMovieMovieInfo( QDialogWithPrinting ):
         qte.setFrameStyle( QFrame.NoFrame )
         myLayout.addWidget( qte )
         if movie_full_path is not None:
-            response = requests.get( movie_full_path, verify = False )
+            cont = get_image_cache( ).get( movie_full_path, verify = False )
             logging.debug( 'FULLMOVIEPATH: %s, size = %d' %
-                           ( movie_full_path, len( response.content ) ) )
-            qpm = QPixmap.fromImage( QImage.fromData( response.content ) )
+                           ( movie_full_path, len( cont ) ) )
+            qpm = QPixmap.fromImage( QImage.fromData( cont ) )
             qpm = qpm.scaledToWidth( 450 )
             qlabel = QLabel( )
             qlabel.setPixmap( qpm )
@@ -517,29 +519,18 @@ class HowdyMovieTorrents( QDialogWithPrinting ):
                 self, data_torrents, 0 )
 
         # get magnet links, now use Jackett AND OTHERS for downloading movies
-        data = [ ]
-        with Pool( processes = 3 ) as pool:
-            jobs = [ ]
-            if tmdb_id is not None and useIMDB:
-                jobs.append( pool.apply_async(
-                    movie_torrents.get_movie_torrent_jackett,
-                    args = ( movie_name, maxnum, self.verify, False, tmdb_id ) ) )
-            else:
-                jobs.append( pool.apply_async(
-                    movie_torrents.get_movie_torrent_jackett,
-                    args = ( movie_name, maxnum, self.verify, False ) ) )
-            jobs+= list(map(
-                lambda func: pool.apply_async( func, args = ( movie_name, maxnum, self.verify ) ),
-                ( movie_torrents.get_movie_torrent_zooqle,
-                  movie_torrents.get_movie_torrent_eztv_io ) ) )
-            items_lists = [ ]
-            for job in jobs:
-                try:
-                    items, status = job.get( 60 ) # 60 second timeout on process
-                    if items is None: continue
-                    items_lists.append( items )
-                except: pass
-            data = list( chain.from_iterable( items_lists ) )
+        if tmdb_id is not None and useIMDB: jackett_tmdb_id = tmdb_id
+        else: jackett_tmdb_id = None
+        providers = {
+            'jackett' : lambda session: movie_torrents.get_movie_torrent_jackett(
+                movie_name, maxnum, self.verify, False, jackett_tmdb_id, session = session ),
+            'zooqle' : lambda session: movie_torrents.get_movie_torrent_zooqle(
+                movie_name, maxnum, self.verify, session = session ),
+            'eztv.io' : lambda session: movie_torrents.get_movie_torrent_eztv_io(
+                movie_name, maxnum, self.verify, session = session ) }
+        with core_torrents.TorrentSearchAggregator( # 60 second timeout on each search
+                num_threads = len( providers ), timeout = 60 ) as aggregator:
+            data, statuses = aggregator.search( providers )
         #
         if len( data ) == 0:
             return HowdyMovieTorrents.HowdyMovieTorrentsTableModel( self, [ ], -1 )
@@ -1283,6 +1274,21 @@ class HowdyMovieTableModel( QAbstractTableModel ):
                                     datum['imdb_id'] in intersect_imdbids,
                                     self.actualMovieData )) )
         total_set = init_set | second_set
+        #
+        ## finally, fuzzy match the remaining titles (such as "Star Wars: Episode IV" and
+        ## "Star Wars - Episode IV") against the Plex movies released within a year of each other
+        remaining = list(filter(lambda datum: ( datum[ 'title' ], datum[ 'release_date' ].year ) not in total_set,
+                                self.actualMovieData ) )
+        plex_index = FuzzyMatchIndex(
+            list(map(lambda datum: datum[ 'title' ], allMoviesInPlex ) ), scorer = ratio )
+        if len( remaining ) != 0 and len( plex_index ) != 0:
+            plex_years = numpy.array(list(map(lambda datum: datum[ 'year' ] if datum[ 'year' ] is not None else numpy.nan,
+                                              allMoviesInPlex ) ), dtype = float )
+            tmdb_years = numpy.array(list(map(lambda datum: datum[ 'release_date' ].year, remaining ) ), dtype = float )
+            scores = plex_index.scores(list(map(lambda datum: datum[ 'title' ], remaining ) ) )
+            scores[ ~( numpy.abs( tmdb_years[:,None] - plex_years[None,:] ) <= 1 ) ] = 0
+            total_set |= set(map(lambda idx: ( remaining[ idx ][ 'title' ], remaining[ idx ][ 'release_date' ].year ),
+                                 numpy.flatnonzero( scores.max( axis = 1 ) >= _min_title_matchval ) ) )
         self.emitMoviesHave.emit( sorted( total_set ) )
         for datum in self.actualMovieData:
             tup = ( datum['title'], datum['release_date'].year )
@@ -1,11 +1,11 @@
-import numpy, os, sys, requests, validators
+import numpy, os, sys, validators
 import logging, glob, datetime, pickle, gzip
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 #
 from howdy.movie import movie
-from howdy.core import core, QDialogWithPrinting, get_popularity_color
+from howdy.core import core, QDialogWithPrinting, get_popularity_color, get_image_cache
 
 _headers = [ 'title',  'popularity', 'rating', 'release date', 'added date',
              'genre' ]
@@ -395,10 +395,10 @@ class MyMovieTableModel( QAbstractTableModel ):
         if movie_full_path is not None and validators.url( movie_full_path ):
             if is_local_pic:
                 cont = core.get_pic_data(
-                    movie_full_path, token = self.parent.token )
+                    movie_full_path, token = self.parent.token, width = 450 )
             else:
-                cont = requests.get(
-                    movie_full_path, verify = self.parent.verify ).content
+                cont = get_image_cache( ).get(
+                    movie_full_path, verify = self.parent.verify )
             qpm = QPixmap.fromImage( QImage.fromData( cont ) )
             qpm = qpm.scaledToWidth( 450 )
             qlabel.setPixmap( qpm )
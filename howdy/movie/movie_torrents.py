@@ -1,19 +1,21 @@
 import threading, requests, rapidfuzz, os, sys
-import re, time, logging, validators
+import re, time, logging
 from tpb import CATEGORIES, ORDERS
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 #
-from howdy.core import get_maximum_matchval, get_formatted_size, return_error_raw, core
+from howdy.core import get_maximum_matchval, get_formatted_size, return_error_raw, core, core_torrents
 from howdy.movie import movie
 
-def get_movie_torrent_jackett( name, maxnum = 10, verify = True, doRaw = False, tmdb_id = None ):
+@core_torrents.cache_torrent_search
+def get_movie_torrent_jackett( name, maxnum = 10, verify = True, doRaw = False, tmdb_id = None, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate movie Magnet links found using the main Jackett_ torrent searching service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the movie string on which to search.
     :param int maxnum: optional argumeent, the maximum number of magnet links to return. Default is 10. Must be :math:`\ge 5`.
     :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     :param bool doRaw: optional argument. If ``True``, uses the IMDb_ information to search for the movie. Otherwise, uses the full string in ``name`` to search for the movie.
     :param int tmdb_id: optional argument. If defined, use this TMDB_ movie ID to search for magnet links.
     
@@ -73,7 +75,7 @@ def get_movie_torrent_jackett( name, maxnum = 10, verify = True, doRaw = False,
     if popName and 'q' in params: params.pop( 'q' )
     logging.info( 'params: %s, mainURL = %s' % (
         params, urljoin( url, endpoint ) ) )                                                 
-    response = requests.get(
+    response = session.get(
         urljoin( url, endpoint ), verify = verify,
         params = params )
     if response.status_code != 200:
@@ -89,25 +91,6 @@ def get_movie_torrent_jackett( name, maxnum = 10, verify = True, doRaw = False,
             'failure, could not find movie %s with jackett.' % name )
     items = [ ]
     
-    def _get_magnet_url( item ):
-        magnet_url = item.find( 'torznab:attr', { 'name' : 'magneturl' } )
-        if magnet_url is not None and 'magnet' in magnet_url['value']:
-            return magnet_url['value']
-        #
-        ## not found it here, must go into URL
-        url2 = item.find('guid')
-        if url2 is None: return None
-        url2 = url2.text
-        if not validators.url( url2 ): return None
-        resp2 = requests.get( url2, verify = verify )
-        if resp2.status_code != 200: return None
-        h2 = BeautifulSoup( resp2.content, 'lxml' )
-        valid_magnet_links = set(map(lambda elem: elem['href'],
-                                     filter(lambda elem: 'href' in elem.attrs and
-                                            'magnet' in elem['href'], h2.find_all('a'))))
-        if len( valid_magnet_links ) == 0: return None
-        return max( valid_magnet_links )
-
     for item in html.find_all('item'):
         title = item.find('title')
         if title is None: continue
@@ -122,15 +105,16 @@ def get_movie_torrent_jackett( name, maxnum = 10, verify = True, doRaw = False,
         if leechers is None: leechers = -1
         else: leechers = int( leechers[ 'value' ] )
         #
-        ## now do one of two things to get the magnet URL
-        magnet_url = _get_magnet_url( item )
-        if magnet_url is None: continue
+        ## get the magnet URL, or else the page from which to get it later
+        magnet_url, guid = core_torrents.get_jackett_item_link( item )
+        if magnet_url is None and guid is None: continue
         myitem = {
             'raw_title' : title,
             'title' : title,
             'seeders' : seeders,
             'leechers' : leechers,
             'link' : magnet_url }
+        if magnet_url is None: myitem[ 'guid' ] = guid # resolved later, only if needed
         if torrent_size is not None:
             myitem[ 'title' ] = '%s (%s)' % (
                 title, get_formatted_size( torrent_size * 1024**2 ) )
@@ -139,15 +123,24 @@ def get_movie_torrent_jackett( name, maxnum = 10, verify = True, doRaw = False,
     if len( items ) == 0:
         return return_error_raw(
             'FAILURE, JACKETT CANNOT FIND %s' % name )
-    return items[:maxnum], 'SUCCESS'
+    items = sorted(items, key = lambda elem: elem['seeders'] + elem['leechers' ] )[::-1]
+    #
+    ## only now get the magnet links of the top candidates
+    items = core_torrents.resolve_jackett_magnet_links( items, maxnum, session = session, verify = verify )
+    if len( items ) == 0:
+        return return_error_raw(
+            'FAILURE, JACKETT CANNOT FIND %s' % name )
+    return items, 'SUCCESS'
 
-def get_movie_torrent_eztv_io( name, maxnum = 10, verify = True, tmdb_id = None ):
+@core_torrents.cache_torrent_search
+def get_movie_torrent_eztv_io( name, maxnum = 10, verify = True, tmdb_id = None, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate movie Magnet links found using the `EZTV.IO`_ torrent service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the movie on which to search.
     :param int maxnum: optional argument, the maximum number of magnet links to return. Default is 10. Must be :math:`\ge 5`.
     :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     :param str tmdb_id: optional argument. The TMDB_ ID of the movie.
     
     :returns: if successful, then returns a two member :py:class:`tuple` the first member is a :py:class:`list` of elements that match the searched movie, ordered from *most* seeds and leechers to least. The second element is the string ``"SUCCESS"``. The keys in each element of the list are,
@@ -181,7 +174,7 @@ def get_movie_torrent_eztv_io( name, maxnum = 10, verify = True, tmdb_id = None
     imdb_id = movie.get_imdbid_from_id( tmdb_id, verify = verify )
     if imdb_id is None:
         return return_error_raw( 'FAILURE, COULD NOT FIND IMDB ID FOR %s.' % name )
-    response = requests.get( 'https://eztv.io/api/get-torrents',
+    response = session.get( 'https://eztv.io/api/get-torrents',
                              params = { 'imdb_id' : int( imdb_id.replace('t','')),
                                         'limit' : 100, 'page' : 0 },
                              verify = verify )
@@ -195,7 +188,7 @@ def get_movie_torrent_eztv_io( name, maxnum = 10, verify = True, tmdb_id = None
     all_torrents = alldat[ 'torrents' ]
     for pageno in range( 1, 101 ):
         if alldat[ 'torrents_count' ] < 100: break
-        response = requests.get( 'https://eztv.io/api/get-torrents',
+        response = session.get( 'https://eztv.io/api/get-torrents',
                              params = { 'imdb_id' : int( imdb_id.replace('t','')),
                                         'limit' : 100, 'page' : pageno },
                              verify = verify )
@@ -219,13 +212,15 @@ def get_movie_torrent_eztv_io( name, maxnum = 10, verify = True, tmdb_id = None
             all_torrents_mine ) ), 'SUCCESS'
     
 
-def get_movie_torrent_zooqle( name, maxnum = 10, verify = True ):
+@core_torrents.cache_torrent_search
+def get_movie_torrent_zooqle( name, maxnum = 10, verify = True, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate movie Magnet links found using the Zooqle_ torrent service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the movie string on which to search.
     :param int maxnum: optional argument, the maximum number of magnet links to return. Default is 100. Must be :math:`\ge 5`.
     :param bool verify:  optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     
     :returns: if successful, then returns a two member :py:class:`tuple` the first member is a :py:class:`list` of elements that match the searched movie, ordered from *most* seeds and leechers to least. The second element is the string ``"SUCCESS"``. The keys in each element of the list are,
 
@@ -267,7 +262,7 @@ def get_movie_torrent_zooqle( name, maxnum = 10, verify = True ):
                'fmt' : 'rss' }
     paramurl = '?' + '&'.join(map(lambda tok: '%s=%s' % ( tok, params[ tok ] ), params ) )                                  
     fullurl = urljoin( url, paramurl )
-    response = requests.get( fullurl, verify = verify )
+    response = session.get( fullurl, verify = verify )
     if response.status_code != 200:
         return return_error_raw( 'ERROR, COULD NOT FIND ZOOQLE TORRENTS FOR %s' % candname )
     myxml = BeautifulSoup( response.content, 'lxml' )
@@ -308,13 +303,15 @@ def get_movie_torrent_zooqle( name, maxnum = 10, verify = True ):
         return return_error_raw( 'ERROR, COULD NOT FIND ZOOQLE TORRENTS FOR %s' % candname )
     return sorted( items_toshow, key = lambda item: -item['seeders'] - item['leechers'] )[:maxnum], 'SUCCESS'
 
-def get_movie_torrent_rarbg( name, maxnum = 10, verify = True ):
+@core_torrents.cache_torrent_search
+def get_movie_torrent_rarbg( name, maxnum = 10, verify = True, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate movie Magnet links found using the RARBG_ torrent service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the movie string on which to search.
     :param int maxnum: optional argument, the maximum number of magnet links to return. Default is 10. Must be :math:`\ge 5`.
     :param bool verify:  optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     
     :returns: if successful, then returns a two member :py:class:`tuple` the first member is a :py:class:`list` of elements that match the searched movie, ordered from *most* seeds and leechers to least. The second element is the string ``"SUCCESS"``. The keys in each element of the list are,
 
@@ -338,7 +335,7 @@ def get_movie_torrent_rarbg( name, maxnum = 10, verify = True ):
     #
     ## got app_id and apiurl from https://www.rubydoc.info/github/epistrephein/rarbg/master/RARBG/API
     apiurl = "https://torrentapi.org/pubapi_v2.php"
-    response = requests.get(apiurl,
+    response = session.get(apiurl,
                             params={ "get_token": "get_token",
                                      "format": "json",
                                      "app_id": "rarbg-rubygem" }, verify = verify )
@@ -354,7 +351,7 @@ def get_movie_torrent_rarbg( name, maxnum = 10, verify = True ):
     ## wait 4 seconds
     ## this is a diamond hard limit for RARBG
     time.sleep( 4.0 )
-    response = requests.get( apiurl, params = params, verify = verify )
+    response = session.get( apiurl, params = params, verify = verify )
     if response.status_code != 200:
         status = '. '.join([ 'ERROR, problem with rarbg.to: %d' % response.status_code,
                              'Unable to connect to provider.' ])
@@ -380,6 +377,7 @@ def get_movie_torrent_rarbg( name, maxnum = 10, verify = True ):
                                        'link' : elem['download'] }, data ) ) 
     return actdata, 'SUCCESS'
         
+@core_torrents.cache_torrent_search
 def get_movie_torrent_tpb( name, maxnum = 10, doAny = False, verify = True ):
     """
     Returns a :py:class:`tuple` of candidate movie Magnet links found using the `The Pirate Bay`_ torrent service and the string ``"SUCCESS"``, if successful.
@@ -542,6 +540,7 @@ def get_movie_torrent_tpb( name, maxnum = 10, doAny = False, verify = True ):
         'link' : item[ 'link' ],
         'torrent_size' : item[ 'size' ] }, items ) ), 'SUCCESS'
 
+@core_torrents.cache_torrent_search
 def get_movie_torrent_kickass( name, maxnum = 10, verify = True ):
     """
     Returns a :py:class:`tuple` of candidate movie Magnet links found using the KickAssTorrents_ torrent service and the string ``"SUCCESS"``, if successful.
@@ -624,6 +623,7 @@ def get_movie_torrent_kickass( name, maxnum = 10, verify = True ):
     
     return items_toshow, 'SUCCESS'
     
+@core_torrents.cache_torrent_search
 def get_movie_torrent( name, verify = True ):
     """
     Returns a :py:class:`tuple` of candidate movie found using `Torrent files <torrent file_>`_ using the `YTS API`_ torrent service and the string ``"SUCCESS"``, if successful.
@@ -1,6 +1,9 @@
-import os, sys, datetime, re, isodate, mutagen.mp4
+import os, sys, datetime, re, isodate, mutagen.mp4, musicbrainzngs, hashlib, json, time, logging
 from dateutil.relativedelta import relativedelta
+from concurrent.futures import Future
+from threading import Lock
 #
+from howdy import baseConfDir
 from howdy.core import core
 
 _dt0 = datetime.datetime.strptime("00", "%S")
@@ -58,3 +61,224 @@ def get_failing_artistalbum( filename ):
         return filename
 
     return None
+
+#
+## time to live of each kind of cached MusicBrainz response. Releases and recordings hardly ever change
+_musicbrainz_ttls = {
+    'artist' : datetime.timedelta( days = 7 ),
+    'artist-search' : datetime.timedelta( days = 1 ),
+    'release-group' : datetime.timedelta( days = 30 ),
+    'release' : datetime.timedelta( days = 90 ),
+    'recording' : datetime.timedelta( days = 90 ),
+    'image-list' : datetime.timedelta( days = 30 ) }
+
+class MusicBrainzClient( object ):
+    """
+    A thread safe access layer to the MusicBrainz_ API, through :py:mod:`musicbrainzngs`, that follows the MusicBrainz_ rate limit of one request per second. It does the following.
+
+    * Every request waits for a token from a token bucket, which refills at ``rate`` tokens per second and holds at most ``burst`` tokens.
+    * Requests that are throttled (HTTP 503) or that fail with network errors are tried again, waiting twice as long after each failure, at most ``max_attempts`` times.
+    * Concurrent requests for the same entity are coalesced into one request.
+    * Responses are cached on disk, as JSON files keyed by MBID in ``~/.config/howdy/musicbrainz/<kind>``. Artists are cached for 7 days, artist searches for 1 day, release groups and cover art listings for 30 days, and releases and recordings for 90 days.
+
+    Use :py:meth:`get_musicbrainz_client <howdy.music.get_musicbrainz_client>` to get the shared client of this process.
+
+    :param float rate: optional argument, the maximum sustained number of requests per second. Default is ``1.0``.
+    :param int burst: optional argument, the maximum number of requests made at once after a pause. Default is ``1``.
+    :param str cache_dir: optional argument, the directory in which responses are cached. Default is ``~/.config/howdy/musicbrainz``.
+    :param int max_attempts: optional argument, the maximum number of attempts for each request. Default is ``4``.
+    :param float backoff: optional argument, the time, in seconds, to wait after the first failed attempt. Default is ``1.0``.
+
+    :var int num_requests: the number of requests made to the MusicBrainz_ API.
+
+    .. _MusicBrainz: https://musicbrainz.org/doc/MusicBrainz_API/Rate_Limiting
+    """
+    def __init__( self, rate = 1.0, burst = 1, cache_dir = os.path.join( baseConfDir, 'musicbrainz' ),
+                  max_attempts = 4, backoff = 1.0 ):
+        assert( rate > 0 )
+        assert( burst >= 1 )
+        assert( max_attempts >= 1 )
+        self.rate = rate
+        self.burst = burst
+        self.cache_dir = cache_dir
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.num_requests = 0
+        self._tokens = float( burst )
+        self._time_tokens = time.time( )
+        self._bucket_lock = Lock( )
+        self._lock = Lock( )
+        self._pending = { }
+
+    def _acquire( self ):
+        #
+        ## wait until a token is available, then take it
+        with self._bucket_lock:
+            time_now = time.time( )
+            self._tokens = min( self.burst, self._tokens + ( time_now - self._time_tokens ) * self.rate )
+            self._time_tokens = time_now
+            if self._tokens < 1:
+                time.sleep( ( 1 - self._tokens ) / self.rate )
+                self._tokens = 1.0
+                self._time_tokens = time.time( )
+            self._tokens -= 1
+            self.num_requests += 1
+
+    def _get_cachefile( self, kind, key ):
+        return os.path.join( self.cache_dir, kind, '%s.json' % key )
+
+    def _get_cached( self, kind, key ):
+        cachefile = self._get_cachefile( kind, key )
+        if not os.path.isfile( cachefile ): return None
+        age = time.time( ) - os.path.getmtime( cachefile )
+        if age > _musicbrainz_ttls[ kind ].total_seconds( ): return None
+        try:
+            with open( cachefile, 'r' ) as openfile: return json.load( openfile )
+        except Exception as e:
+            logging.debug( 'could not read %s: %s.' % ( cachefile, str( e ) ) )
+            return None
+
+    def _put_cached( self, kind, key, data ):
+        cachefile = self._get_cachefile( kind, key )
+        try:
+            os.makedirs( os.path.dirname( cachefile ), exist_ok = True )
+            with open( cachefile + '.%d.tmp' % os.getpid( ), 'w' ) as openfile: json.dump( data, openfile )
+            os.replace( cachefile + '.%d.tmp' % os.getpid( ), cachefile )
+        except Exception as e:
+            logging.debug( 'could not write %s: %s.' % ( cachefile, str( e ) ) )
+
+    def _is_transient( self, e ):
+        if isinstance( e, musicbrainzngs.NetworkError ): return True
+        if not isinstance( e, musicbrainzngs.ResponseError ): return False
+        return getattr( e.cause, 'code', None ) in ( 500, 502, 503, 504 )
+
+    def _request( self, func, *args, **kwargs ):
+        for attempt in range( 1, self.max_attempts + 1 ):
+            self._acquire( )
+            try: return func( *args, **kwargs )
+            except Exception as e:
+                if attempt == self.max_attempts or not self._is_transient( e ): raise
+                logging.debug( 'MusicBrainz request failed on attempt %d: %s. Trying again...' % (
+                    attempt, str( e ) ) )
+                time.sleep( self.backoff * 2 ** ( attempt - 1 ) )
+
+    def call( self, kind, key, func, *args, **kwargs ):
+        """
+        The lower level method that the other methods use. Returns the cached response for this entity if it is not too old. Otherwise waits for the rate limit, calls ``func``, and caches its response. If another thread is already requesting this entity, then waits for, and returns, its response.
+
+        :param str kind: the kind of entity, one of ``artist``, ``artist-search``, ``release-group``, ``release``, ``recording``, or ``image-list``.
+        :param str key: the key of this entity, such as its MBID.
+        :param func: the :py:mod:`musicbrainzngs` function that requests this entity.
+        :returns: the response of ``func( *args, **kwargs )``.
+        :rtype: dict
+
+        :raise musicbrainzngs.WebServiceError: if the request fails.
+        """
+        assert( kind in _musicbrainz_ttls )
+        data = self._get_cached( kind, key )
+        if data is not None: return data
+        with self._lock:
+            future = self._pending.get( ( kind, key ) )
+            is_owner = future is None
+            if is_owner:
+                future = Future( )
+                self._pending[ ( kind, key ) ] = future
+        if not is_owner: return future.result( )
+        try:
+            data = self._request( func, *args, **kwargs )
+            self._put_cached( kind, key, data )
+            future.set_result( data )
+            return data
+        except Exception as e:
+            future.set_exception( e )
+            raise
+        finally:
+            with self._lock: self._pending.pop( ( kind, key ), None )
+
+    @classmethod
+    def _get_key( cls, mbid, includes = [ ], **kwargs ):
+        tokens = [ mbid, ] + sorted( includes ) + list(map(lambda name: '%s=%s' % (
+            name, '+'.join( sorted( kwargs[ name ] ) ) ), sorted( kwargs ) ) )
+        if len( tokens ) == 1: return mbid
+        return '%s.%s' % ( mbid, hashlib.md5( ':'.join( tokens ).encode( 'utf-8' ) ).hexdigest( )[:12] )
+
+    def search_artists( self, artist_name, strict = True ):
+        """
+        :param str artist_name: the artist over which to search.
+        :param bool strict: optional argument, whether to perform a strict search. Default is ``True``.
+        :returns: the response of :py:meth:`search_artists <musicbrainzngs.search_artists>`.
+        :rtype: dict
+        """
+        key = hashlib.md5( ( '%s:%s' % ( artist_name.lower( ), strict ) ).encode( 'utf-8' ) ).hexdigest( )
+        return self.call( 'artist-search', key, musicbrainzngs.search_artists,
+                          artist = artist_name, strict = strict )
+
+    def get_artist_by_id( self, ambid, includes = [ ], release_type = [ ] ):
+        """
+        :param str ambid: the MusicBrainz_ artist ID.
+        :param list includes: optional argument, the extra information to include.
+        :param list release_type: optional argument, the release types to include.
+        :returns: the response of :py:meth:`get_artist_by_id <musicbrainzngs.get_artist_by_id>`.
+        :rtype: dict
+        """
+        return self.call( 'artist', self._get_key( ambid, includes, release_type = release_type ),
+                          musicbrainzngs.get_artist_by_id, ambid, includes = includes,
+                          release_type = release_type )
+
+    def get_release_group_by_id( self, rgid, includes = [ ] ):
+        """
+        :param str rgid: the MusicBrainz_ release group ID.
+        :param list includes: optional argument, the extra information to include.
+        :returns: the response of :py:meth:`get_release_group_by_id <musicbrainzngs.get_release_group_by_id>`.
+        :rtype: dict
+        """
+        return self.call( 'release-group', self._get_key( rgid, includes ),
+                          musicbrainzngs.get_release_group_by_id, rgid, includes = includes )
+
+    def get_release_by_id( self, rid, includes = [ ] ):
+        """
+        :param str rid: the MusicBrainz_ release ID.
+        :param list includes: optional argument, the extra information to include.
+        :returns: the response of :py:meth:`get_release_by_id <musicbrainzngs.get_release_by_id>`.
+        :rtype: dict
+        """
+        return self.call( 'release', self._get_key( rid, includes ),
+                          musicbrainzngs.get_release_by_id, rid, includes = includes )
+
+    def get_recording_by_id( self, recid, includes = [ ] ):
+        """
+        :param str recid: the MusicBrainz_ recording ID.
+        :param list includes: optional argument, the extra information to include.
+        :returns: the response of :py:meth:`get_recording_by_id <musicbrainzngs.get_recording_by_id>`.
+        :rtype: dict
+        """
+        return self.call( 'recording', self._get_key( recid, includes ),
+                          musicbrainzngs.get_recording_by_id, recid, includes = includes )
+
+    def get_image_list( self, rid ):
+        """
+        :param str rid: the MusicBrainz_ release ID.
+        :returns: the response of :py:meth:`get_image_list <musicbrainzngs.get_image_list>`. If the release has no cover art, then returns ``{ 'images' : [ ] }``, which is also cached.
+        :rtype: dict
+        """
+        def _get_image_list( rid ):
+            try: return musicbrainzngs.get_image_list( rid )
+            except musicbrainzngs.ResponseError as e:
+                if getattr( e.cause, 'code', None ) != 404: raise
+                return { 'images' : [ ] }
+        return self.call( 'image-list', rid, _get_image_list, rid )
+
+_musicbrainz_client = None
+_musicbrainz_client_lock = Lock( )
+
+def get_musicbrainz_client( ):
+    """
+    :returns: the shared :py:class:`MusicBrainzClient <howdy.music.MusicBrainzClient>` of this process, so that all the MusicBrainz_ requests of this process share one rate limit and one cache.
+    :rtype: :py:class:`MusicBrainzClient <howdy.music.MusicBrainzClient>`
+
+    .. _MusicBrainz: https://musicbrainz.org/doc/MusicBrainz_API/Rate_Limiting
+    """
+    global _musicbrainz_client
+    with _musicbrainz_client_lock:
+        if _musicbrainz_client is None: _musicbrainz_client = MusicBrainzClient( )
+        return _musicbrainz_client
@@ -66,6 +66,8 @@ def main( ):
         print( 'ACTUAL ALBUM: %s' % album_name )
         print( 'ACTUAL YEAR: %d' % album_year )
         print( 'ACTUAL NUM TRACKS: %d' % album_tracks )
+        filenames = [ ]
+        downloaded_data_dicts = [ ]
         for data_dict in album_data_dict:
             song_name = data_dict[ 'song' ]
             print( 'ACTUAL SONG: %s' % song_name )
@@ -81,11 +83,15 @@ def main( ):
             ## now download the song into the given filename
             filename = '%s.%s.m4a' % ( artist_name, song_name )
             music.get_youtube_file( youtubeURL, filename )
-            #
-            ## now fill out the metadata
-            music.fill_m4a_metadata( filename, data_dict )
-            #
-            ##
+            filenames.append( filename )
+            downloaded_data_dicts.append( data_dict )
+        #
+        ## now fill out the metadata of all the songs, getting the album image once
+        statuses = music.fill_album_metadata(
+            filenames, album_data_dict[ 0 ], track_data_dicts = downloaded_data_dicts,
+            verify = args.do_verify )
+        for filename in filenames:
+            if statuses[ filename ] != 'SUCCESS': print( statuses[ filename ] )
             os.chmod( filename, 0o644 )
     else:
         assert( args.song_names is not None )
@@ -1,7 +1,7 @@
 import signal
 from howdy import signal_handler
 signal.signal( signal.SIGINT, signal_handler )
-import os, sys, datetime, io, zipfile, logging, requests
+import os, sys, datetime, io, zipfile, logging
 from argparse import ArgumentParser
 #
 from howdy.core import core, return_error_raw
@@ -304,17 +304,26 @@ def _download_songs_oldformat( args ):
         artist_name = data_dict[ 'artist' ]
         album_name = data_dict[ 'album' ]
         album_tracks = data_dict[ 'total tracks' ]
-        album_url = data_dict[ 'album url' ]
-        image_data = None
-        if album_url != '':
-            image_data = io.BytesIO(
-                requests.get( album_url, verify = args.do_verify ).content )
         print( 'ACTUAL ARTIST: %s' % artist_name )
         print( 'ACTUAL ALBUM: %s' % album_name )
         if 'year' in data_dict:
             album_year = data_dict[ 'year' ]
             print( 'ACTUAL YEAR: %d' % album_year )
         print( 'ACTUAL NUM TRACKS: %d' % album_tracks )
+        if args.do_auto:
+            #
+            ## take the first YouTube clip of each song, and search, download, transcode, and tag
+            ## the songs at the same time
+            pipeline = music.YouTubeAlbumPipeline( album_data_dict[ 0 ], verify = hm.verify )
+            results = pipeline.run( album_data_dict )
+            for data_dict, ( filename, status ) in zip( album_data_dict, results ):
+                if status != 'SUCCESS':
+                    print( status )
+                    continue
+                all_songs_downloaded.append( ( artist_name, data_dict[ 'song' ], filename ) )
+            print( pipeline.get_summary( ) )
+            return all_songs_downloaded
+        downloaded_data_dicts = [ ]
         for data_dict in album_data_dict:
             song_name = data_dict[ 'song' ]
             track_number = data_dict[ 'tracknumber' ]
@@ -335,14 +344,16 @@ def _download_songs_oldformat( args ):
             ## now download the song into the given filename
             filename = '%s.%s.m4a' % ( artist_name, song_name )
             music.get_youtube_file( youtubeURL, filename )
-            #
-            ## now fill out the metadata
-            music.fill_m4a_metadata( filename, data_dict, verify = hm.verify,
-                                         image_data = image_data )
-            #
-            ##
-            os.chmod( filename, 0o644 )
+            downloaded_data_dicts.append( data_dict )
             all_songs_downloaded.append( ( artist_name, song_name, filename ) )
+        #
+        ## now fill out the metadata of all the songs, getting the album image once
+        statuses = music.fill_album_metadata(
+            list(map(lambda tup: tup[ -1 ], all_songs_downloaded ) ),
+            album_data_dict[ 0 ], track_data_dicts = downloaded_data_dicts, verify = hm.verify )
+        for filename in statuses:
+            if statuses[ filename ] != 'SUCCESS': print( statuses[ filename ] )
+            os.chmod( filename, 0o644 )
     else: # use --artist= --songs=
         assert( args.song_names is not None )
         #0
@@ -379,6 +390,10 @@ def main( ):
                              'Default is 10.' ]))
     parser.add_argument( '-A', '--album', dest='album_name', type=str, action='store',
                          help = 'If defined, then get all the songs in order from the album.' )
+    parser.add_argument( '--auto', dest='do_auto', action='store_true', default = False,
+                         help = ' '.join([
+                             'Only works if --album is defined. If chosen, take the first YouTube video of each song,',
+                             'and download, transcode, and tag the songs in parallel.' ]))
     #parser.add_argument( '--albums', dest='do_albums', action='store_true', default = False,
     #                   help = 'If chosen, then print out all the studio albums this artist has put out.' )
     #parser.add_argument( '-e', '--email', dest='email', type=str, action='store',
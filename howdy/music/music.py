@@ -1,7 +1,10 @@
-import os, sys, glob, numpy, titlecase, mutagen.mp4, httplib2, json, logging, oauth2client.client
-import requests, youtube_dl, gmusicapi, datetime, musicbrainzngs, time, io, tabulate, validators, subprocess, uuid
-import pathos.multiprocessing as multiprocessing
+import os, sys, glob, numpy, titlecase, mutagen.mp4, mutagen.mp3, mutagen.id3, httplib2, json, logging, oauth2client.client
+import requests, youtube_dl, gmusicapi, datetime, musicbrainzngs, time, io, tabulate, validators, subprocess, uuid, hashlib
+import queue, tempfile, shutil
 from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock, Thread
 from googleapiclient.discovery import build
 from itertools import chain
 from PIL import Image
@@ -10,8 +13,8 @@ from distutils.spawn import find_executable
 #
 from howdy import resourceDir
 from howdy.core import core, baseConfDir, session, PlexConfig
-from howdy.core import return_error_raw, get_maximum_matchval
-from howdy.music import pygn, parse_youtube_date, format_youtube_date
+from howdy.core import return_error_raw, FuzzyMatchIndex
+from howdy.music import pygn, parse_youtube_date, format_youtube_date, get_musicbrainz_client
 
 def oauth_store_google_credentials( credentials ):
     """
@@ -55,7 +58,9 @@ def oauth_get_google_credentials( ):
 ## this is not tested all that much, but perhaps it is useful to some people
 class MusicInfo( object ):
     """
-    This object uses the MusicBrainz_ API, through the higher level :py:mod:`musicbrainzngs` Python module, to get information on songs, albums, and artists.
+    This object uses the MusicBrainz_ API, through the higher level :py:mod:`musicbrainzngs` Python module, to get information on songs, albums, and artists. All requests go through the shared :py:class:`MusicBrainzClient <howdy.music.MusicBrainzClient>`, which follows the MusicBrainz_ rate limit and caches responses on disk.
+
+    This object is built lazily. The constructor only finds the artist and the artist's studio albums. Track information on each album is requested the first time it is needed, so that asking for one album's songs costs a few requests instead of a few for each album.
 
     :param str artist_name: the artist over which to search.
     :param str artist_mbid: optional argument. If not ``None``, then information on this artist uses this MusicBrainz_ artist ID to get its info. Default is ``None``.
@@ -112,7 +117,7 @@ class MusicInfo( object ):
 
     :var str artist_name: the artist's name.
     :var int ambid: the MusicBrainz_ artist ID.
-    :var dict alltrackdata: the low-level :py:class:`dict` of information on all studio albums produced by the artist. Each key in this top level dictionary is a studio album. Each value is a lower level dictionary of summary information on that album, with the following keys.
+    :var dict alltrackdata: the low-level :py:class:`dict` of information on all studio albums produced by the artist. Accessing it requests information on every album that has not been requested yet. Each key in this top level dictionary is a studio album. Each value is a lower level dictionary of summary information on that album, with the following keys.
       
       * ``release-date`` is the :py:class:`date <datetime.date>` when that album was released.
       * ``album-url`` if defined, is the URL to the album's image. If not defined, then it is an empty :py:class:`str`.
@@ -153,13 +158,14 @@ class MusicInfo( object ):
         :returns: a :py:class:`list` of artist information matches to ``artist_name``. If ``artist_mbid`` is not ``None``, then gets a *SINGLE* artist match. Otherwise gets all matches found.
         :rtype: list
         """
+        mbc = get_musicbrainz_client( )
         if artist_mbid is not None:
-            adata = [ musicbrainzngs.get_artist_by_id( artist_mbid )[ 'artist' ] ]
+            adata = [ mbc.get_artist_by_id( artist_mbid )[ 'artist' ] ]
             return adata
         assert( min_score <= 100 and min_score >= 0 )
         adata = list(filter(lambda entry: int(entry['ext:score']) >= min_score,
-                            musicbrainzngs.search_artists(
-                                artist=artist_name, strict = do_strict )['artist-list'] ) )
+                            mbc.search_artists(
+                                artist_name, strict = do_strict )['artist-list'] ) )
         return adata
 
     @classmethod
@@ -247,7 +253,7 @@ class MusicInfo( object ):
 
         :rtype: list
         """
-        rgdata = musicbrainzngs.get_artist_by_id(
+        rgdata = get_musicbrainz_client( ).get_artist_by_id(
             ambid, includes=[ 'release-groups' ],
             release_type=['album'] )['artist']['release-group-list']
         if do_all: return rgdata
@@ -282,7 +288,8 @@ class MusicInfo( object ):
         if rgdate is None:
             print("Error, could not find correct release info for %s because no date defined." % rtitle )
             return None
-        rdata = musicbrainzngs.get_release_group_by_id( rgid, includes=['releases'] )[
+        mbc = get_musicbrainz_client( )
+        rdata = mbc.get_release_group_by_id( rgid, includes=['releases'] )[
             'release-group']['release-list']
         try:
             release = list(filter(lambda dat: 'date' in dat and dat['date'] == rgdate, rdata ) )
@@ -294,10 +301,10 @@ class MusicInfo( object ):
             logging.debug("Error, could not find correct release info for %s." % rtitle )
             return None
         rid = release['id']
-        trackinfo = musicbrainzngs.get_release_by_id( rid, includes = ['recordings'] )[
+        trackinfo = mbc.get_release_by_id( rid, includes = ['recordings'] )[
             'release']['medium-list']
         try:
-            image_datas = musicbrainzngs.get_image_list( rid )[ 'images' ]
+            image_datas = mbc.get_image_list( rid )[ 'images' ]
             if len( image_datas ) == 0:
                 album_url = ''
             else:
@@ -344,11 +351,41 @@ class MusicInfo( object ):
             artist_name, self.ambid ) )
         rgdata = MusicInfo.get_albums_lowlevel( self.ambid )
         albums = list( filter(lambda dat: dat['type'] == 'Album', rgdata ) )
-        with multiprocessing.Pool( processes = multiprocessing.cpu_count( ) ) as pool:
-            self.alltrackdata = dict( filter(None, 
-                pool.map( MusicInfo.get_album_info, albums  ) ) )
-        logging.debug( 'processed %d albums for %s in %0.3f seconds.' % (
-            len( self.alltrackdata ), artist_name, time.time( ) - time0 ) )
+        #
+        ## track information on each album is requested when it is first needed
+        self._albums = dict(map(lambda album: ( titlecase.titlecase( album[ 'title' ] ), album ), albums ) )
+        self._alltrackdata = { }
+        self._failed_albums = set( )
+        self._track_index = None
+        logging.debug( 'found %d albums for %s in %0.3f seconds.' % (
+            len( self._albums ), artist_name, time.time( ) - time0 ) )
+
+    @property
+    def alltrackdata( self ):
+        for album_name in sorted( self._albums ): self.get_album_data( album_name )
+        return self._alltrackdata
+
+    def get_album_names( self ):
+        """
+        :returns: the sorted :py:class:`list` of studio albums released by this artist, without requesting their track information. An album whose track information cannot be found is no longer listed once it has been requested.
+        :rtype: list
+        """
+        return sorted( set( self._albums ) - self._failed_albums )
+
+    def get_album_data( self, album_name ):
+        """
+        :param str album_name: a studio album released by this artist.
+        :returns: the summary information on this album, as described in the ``alltrackdata`` dictionary of :py:class:`MusicInfo <howdy.music.music.MusicInfo>`. The information is requested from MusicBrainz_ only the first time. If the album has not been published by this artist, or if its information cannot be found, then returns ``None``.
+        :rtype: dict
+        """
+        if album_name in self._alltrackdata: return self._alltrackdata[ album_name ]
+        if album_name not in self._albums or album_name in self._failed_albums: return None
+        result = MusicInfo.get_album_info( self._albums[ album_name ] )
+        if result is None:
+            self._failed_albums.add( album_name )
+            return None
+        self._alltrackdata[ album_name ] = result[ 1 ]
+        return result[ 1 ]
 
     def get_music_metadatas_album( self, album_name ):
         """
@@ -370,11 +407,11 @@ class MusicInfo( object ):
 
         :rtype: tuple
         """
-        if album_name not in self.alltrackdata:
+        album_info = self.get_album_data( album_name )
+        if album_info is None:
             return return_error_raw(
                 'Could not find album = %s for artist = %s with Musicbrainz.' % (
                     album_name, self.artist_name ) )
-        album_info = self.alltrackdata[ album_name ]
         album_data_dict = [ ]
         total_tracks = len( album_info[ 'tracks' ] )
         for trackno in sorted( album_info[ 'tracks' ] ):
@@ -397,11 +434,11 @@ class MusicInfo( object ):
         :returns: If successful, downloads the album image into a PNG_ file named "artist_name.album_name.png", and returns a two-element :py:class:`tuple`, whose first element is the PNG_ filename, and whose second element is the string ``"SUCCESS"``. If unsuccessful, then returns a :py:class:`tuple` of format :py:meth:`return_error_raw <howdy.core.return_error_raw>`.
         :rtype: tuple
         """
-        if album_name not in self.alltrackdata:
+        album_info = self.get_album_data( album_name )
+        if album_info is None:
             return return_error_raw(
                 'Could not find album = %s for artist = %s with Musicbrainz.' % (
                     album_name, self.artist_name ) )
-        album_info = self.alltrackdata[ album_name ]
         album_url = album_info[ 'album url' ]
         filename = '%s.%s.png' % ( self.artist_name, album_name.replace('/', '-' ) )
         img = Image.open( io.BytesIO( requests.get( album_url, verify = False ).content ) )
@@ -412,7 +449,7 @@ class MusicInfo( object ):
     def get_music_metadata( self, song_name, min_criterion_score = 85 ):
         """
         :param str song_name: name of the song.
-        :param int min_criterion_score: the minimum score to accept for a string similarity comparison between ``song_name`` and any track created by this artist. ``70`` :math:`\le` ``min_criterion_score`` :math:`\le` ``100``, and the default is ``85``. The :py:meth:`get_maximum_matchval <howdy.core.get_maximum_matchval>` performs the string comparison. If no track matches ``song_name``, then track data for a track that is the closest match (while having a similarity score :math:`\ge` ``min_criterion_score``) to ``song_name`` is returned.
+        :param int min_criterion_score: the minimum score to accept for a string similarity comparison between ``song_name`` and any track created by this artist. ``70`` :math:`\le` ``min_criterion_score`` :math:`\le` ``100``, and the default is ``85``. The :py:class:`FuzzyMatchIndex <howdy.core.FuzzyMatchIndex>` of :py:meth:`get_track_index <howdy.music.music.MusicInfo.get_track_index>` performs the string comparison. If no track matches ``song_name``, then track data for a track that is the closest match (while having a similarity score :math:`\ge` ``min_criterion_score``) to ``song_name`` is returned.
         :returns: if successful, a two element :py:class:`tuple`. First element is a :py:class:`dict` of information on the song, and the second element is the string ``"SUCCESS"``. For example, for the Air_ song `Kelly Watch the Stars`_ in `Moon Safari`_, the closest match is ``Kelly, Watch the Stars!``.
 
           .. code-block:: python
@@ -430,56 +467,65 @@ class MusicInfo( object ):
         
         :rtype: tuple
         """
+        return self.get_music_metadatas( [ song_name ], min_criterion_score = min_criterion_score )[ 0 ]
+
+    def get_track_index( self ):
+        """
+        :returns: the :py:class:`FuzzyMatchIndex <howdy.core.FuzzyMatchIndex>` of all the songs by this artist, whose keys are two-element :py:class:`tuple` of album and track number. It is built once, which requests information on all the albums.
+        :rtype: :py:class:`FuzzyMatchIndex <howdy.core.FuzzyMatchIndex>`
+        """
+        if self._track_index is not None: return self._track_index
+        alltrackdata = self.alltrackdata
+        keys = sorted(chain.from_iterable(map(lambda album_name: map(
+            lambda trkno: ( album_name, trkno ), alltrackdata[ album_name ][ 'tracks' ] ), alltrackdata ) ) )
+        self._track_index = FuzzyMatchIndex(
+            list(map(lambda key: alltrackdata[ key[ 0 ] ][ 'tracks' ][ key[ 1 ] ][ 0 ], keys ) ), keys = keys )
+        return self._track_index
+
+    def get_music_metadatas( self, song_names, min_criterion_score = 85 ):
+        """
+        Finds information on many songs at once, such as all the songs of a playlist by this artist. All the songs are matched in one call to the :py:class:`FuzzyMatchIndex <howdy.core.FuzzyMatchIndex>` of :py:meth:`get_track_index <howdy.music.music.MusicInfo.get_track_index>`.
+
+        :param list song_names: the :py:class:`list` of song names.
+        :param int min_criterion_score: the minimum score to accept for a string similarity comparison, as described in :py:meth:`get_music_metadata <howdy.music.music.MusicInfo.get_music_metadata>`.
+        :returns: a :py:class:`list` with, for each song, the two-element :py:class:`tuple` that :py:meth:`get_music_metadata <howdy.music.music.MusicInfo.get_music_metadata>` returns.
+        :rtype: list
+        """
         assert( min_criterion_score >= 70 and min_criterion_score <= 100 )
-        
-        def is_track_in_album( album_name, song_name ):
-            trackdata = self.alltrackdata[ album_name ][ 'tracks' ]
-            matches = len(list(filter(lambda trkno: trackdata[ trkno ][ 0 ] == song_name,
-                                      trackdata)))
-            return matches > 0
-
-        def best_song_match( song_name ):
-            alltracks = set( chain.from_iterable(
-                map(lambda album_name: set(
-                    map(lambda trkno: self.alltrackdata[ album_name ][ 'tracks' ][ trkno ][ 0 ],
-                        self.alltrackdata[ album_name ][ 'tracks' ] ) ),
-                    self.alltrackdata ) ) )
-            best_matches = list( filter(lambda song: get_maximum_matchval( song, song_name ) >= 
-                                        min_criterion_score, alltracks ) )
-            if len( best_matches ) == 0: return None
-            return max( best_matches, key = lambda song: get_maximum_matchval( song, song_name ) )
-            
+        track_index = self.get_track_index( )
         #
-        ## find the single album in which the song is found
-        album_matches = list(filter(lambda album_name: is_track_in_album( album_name, song_name ),
-                                    self.alltrackdata ) )
-        if len( album_matches ) == 0:
-            best_match = best_song_match( song_name )
-            if best_match is None:
-                return return_error_raw( 'Could not find song = %s produced by artist = %s.' % (
-                    song_name, self.artist_name ) )
-            album_match = max(list(filter(
-                lambda album_name: is_track_in_album( album_name, best_match ),
-                                    self.alltrackdata ) ) )
-        else:
-            best_match = song_name
-            album_match = max( album_matches )
+        ## all the albums and track numbers of each song
+        song_keys = { }
+        for song, key in zip( track_index.choices, track_index.keys ):
+            song_keys.setdefault( song, [ ] ).append( key )
         #
-        ## now get all the info for this song
-        albumdata = self.alltrackdata[ album_match ]
-        trackdata = albumdata[ 'tracks' ]
-        tracknumber = min(list(filter(
-            lambda trkno: trackdata[ trkno ][ 0 ] == best_match,
-            trackdata)))
-        return {
-            'album'  : album_match,
-            'artist' : self.artist_name,
-            'tracknumber' : tracknumber,
-            'year' : albumdata[ 'release-date' ].year,
-            'total tracks' : len( trackdata ),
-            'song' : best_match,
-            'duration' : trackdata[ tracknumber ][ 1 ],
-            'album url' : albumdata[ 'album url' ] }, 'SUCCESS'
+        ## exact matches first, then the best fuzzy match
+        matches = track_index.match( song_names, score_cutoff = min_criterion_score )
+        results = [ ]
+        for song_name, match in zip( song_names, matches ):
+            if song_name in song_keys: best_match = song_name
+            elif match is not None: best_match = match[ 0 ]
+            else:
+                results.append( return_error_raw( 'Could not find song = %s produced by artist = %s.' % (
+                    song_name, self.artist_name ) ) )
+                continue
+            album_match = max(map(lambda key: key[ 0 ], song_keys[ best_match ] ) )
+            tracknumber = min(map(lambda key: key[ 1 ], filter(
+                lambda key: key[ 0 ] == album_match, song_keys[ best_match ] ) ) )
+            #
+            ## now get all the info for this song
+            albumdata = self.alltrackdata[ album_match ]
+            trackdata = albumdata[ 'tracks' ]
+            results.append( ( {
+                'album'  : album_match,
+                'artist' : self.artist_name,
+                'tracknumber' : tracknumber,
+                'year' : albumdata[ 'release-date' ].year,
+                'total tracks' : len( trackdata ),
+                'song' : best_match,
+                'duration' : trackdata[ tracknumber ][ 1 ],
+                'album url' : albumdata[ 'album url' ] }, 'SUCCESS' ) )
+        return results
 
     def get_song_listing( self, album_name ):
         """
@@ -503,11 +549,8 @@ class MusicInfo( object ):
         
         :rtype: tuple
         """
-        if album_name not in self.alltrackdata:
-            return return_error_raw(
-                'Could not find album = %s for artist = %s with Musicbrainz.' % (
-                    album_name, self.artist_name ) )
         data, status = self.get_music_metadatas_album( album_name )
+        if status != 'SUCCESS': return return_error_raw( status )
         track_listing = sorted(map(lambda elem: ( elem[ 'song' ], elem[ 'tracknumber' ] ), data ),
                                key = lambda tup: tup[1] )
         return track_listing, 'SUCCESS'
@@ -799,21 +842,99 @@ def get_youtube_service( verify = True ):
     #                 cache_discovery = False ) 
     return youtube
 
-def fill_m4a_metadata( filename, data_dict, verify = True, image_data = None ):
+#
+## album cover art, encoded for music file tags, cached in memory and on disk by the SHA256 hash of its URL
+_cover_art_cache = OrderedDict( )
+_cover_art_pending = { }
+_cover_art_lock = Lock( )
+_cover_art_cache_size = 32
+_cover_art_cache_dir = os.path.join( baseConfDir, 'coverart' )
+
+def _encode_cover_art( image_data ):
+    img = Image.open( image_data )
+    with io.BytesIO( ) as csio:
+        try:
+            img.save( csio, format = 'png' )
+            return csio.getvalue( ), 'png'
+        except:
+            #
+            ## had a CMYK colormap for the JPEG file, so just store the JPEG image
+            csio.seek( 0 )
+            csio.truncate( )
+            img.save( csio, format = 'jpeg' )
+            return csio.getvalue( ), 'jpeg'
+
+def _load_cover_art( album_url, key, verify = True ):
+    #
+    ## from disk if stored there, otherwise download, encode, and store it
+    for fmt in ( 'png', 'jpeg' ):
+        cachefile = os.path.join( _cover_art_cache_dir, '%s.%s' % ( key, fmt ) )
+        if not os.path.isfile( cachefile ): continue
+        with open( cachefile, 'rb' ) as openfile: return ( openfile.read( ), fmt )
+    try:
+        response = requests.get( album_url, verify = verify )
+        if response.status_code != 200:
+            logging.debug( 'could not download %s, status code = %d.' % (
+                album_url, response.status_code ) )
+            return None
+        with io.BytesIO( response.content ) as csio: cover_art = _encode_cover_art( csio )
+    except Exception as e:
+        logging.debug( 'could not get cover art from %s: %s.' % ( album_url, str( e ) ) )
+        return None
+    try:
+        os.makedirs( _cover_art_cache_dir, exist_ok = True )
+        cachefile = os.path.join( _cover_art_cache_dir, '%s.%s' % ( key, cover_art[ 1 ] ) )
+        with open( cachefile + '.tmp', 'wb' ) as openfile: openfile.write( cover_art[ 0 ] )
+        os.replace( cachefile + '.tmp', cachefile )
+    except Exception as e:
+        logging.debug( 'could not store cover art from %s: %s.' % ( album_url, str( e ) ) )
+    return cover_art
+
+def get_cover_art( album_url = None, image_data = None, verify = True ):
     """
-    Low level method that populates the metadata of an M4A_ music file.
+    Gets the album cover art, encoded as a PNG_ image (or as a JPEG_ image, if it cannot be stored as PNG_), ready to put into music files. Cover art from a URL is downloaded and encoded once: the last 32 are remembered in memory, and all are stored on disk in ``~/.config/howdy/coverart`` by the SHA256 hash of their URL. Concurrent requests for the same URL wait for one download, while different URLs download at the same time.
+
+    :param str album_url: optional argument, the URL of the album image.
+    :param BytesIO image_data: optional argument. If defined, is a :py:class:`BytesIO <io.BytesIO>` binary data representation of *usually* a candidate PNG_ image file, and ``album_url`` is ignored.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :returns: a two-element :py:class:`tuple`: the encoded image as :py:class:`bytes`, and its format, either ``"png"`` or ``"jpeg"``. If there is no ``album_url`` or ``image_data``, or if the image cannot be downloaded, then returns ``None``.
+    :rtype: tuple
 
-    :param str filename: a candidate M4A_ music file name.
-    :param dict data_dict: a dictionary of candidate music metadata with the following obligatory keys: ``song``, ``album``, ``artist``, ``year``, ``tracknumber``, and ``total tracks``. If the URL of the album image, ``album url``, is defined, then also provides the album image into the M4A_ file.
-    :param BytesIO image_data: optional argument. If defined, is a :py:class:`BytesIO <io.BytesIO>` binary data representation of *usually* a candidate PNG_ image file.
-    
     .. _PNG: https://en.wikipedia.org/wiki/Portable_Network_Graphics
-    .. _M4A: https://en.wikipedia.org/wiki/MPEG-4_Part_14
+    .. _JPEG: https://en.wikipedia.org/wiki/JPEG
     """
-    assert( os.path.isfile( filename ) )
-    assert( os.path.basename( filename ).lower( ).endswith( '.m4a' ) )
+    if image_data is not None:
+        image_data.seek( 0 )
+        return _encode_cover_art( image_data )
+    if album_url is None or album_url == '': return None
+    key = hashlib.sha256( album_url.encode( 'utf-8' ) ).hexdigest( )
     #
-    ## now start it off
+    ## concurrent requests for the same image wait for the one that loads it
+    with _cover_art_lock:
+        if key in _cover_art_cache:
+            _cover_art_cache.move_to_end( key )
+            return _cover_art_cache[ key ]
+        future = _cover_art_pending.get( key )
+        is_owner = future is None
+        if is_owner:
+            future = Future( )
+            _cover_art_pending[ key ] = future
+    if not is_owner: return future.result( )
+    try:
+        cover_art = _load_cover_art( album_url, key, verify = verify )
+        if cover_art is not None:
+            with _cover_art_lock:
+                _cover_art_cache[ key ] = cover_art
+                while len( _cover_art_cache ) > _cover_art_cache_size: _cover_art_cache.popitem( last = False )
+        future.set_result( cover_art )
+        return cover_art
+    except Exception as e:
+        future.set_exception( e )
+        raise
+    finally:
+        with _cover_art_lock: _cover_art_pending.pop( key, None )
+
+def _fill_m4a_tags( filename, data_dict, cover_art = None ):
     mp4tags = mutagen.mp4.MP4( filename )
     mp4tags[ '\xa9nam' ] = [ data_dict[ 'song' ], ]
     mp4tags[ '\xa9alb' ] = [ data_dict[ 'album' ], ]
@@ -822,37 +943,103 @@ def fill_m4a_metadata( filename, data_dict, verify = True, image_data = None ):
     if 'year' in data_dict: mp4tags[ '\xa9day' ] = [ str(data_dict[ 'year' ]), ]
     mp4tags[ 'trkn' ] = [ ( data_dict[ 'tracknumber' ],
                             data_dict[ 'total tracks' ] ), ]
-    if image_data is not None:
-        with io.BytesIO( ) as csio2:
-            img = Image.open( image_data )
-            try:
-                img.save( csio2, format = 'png' )
-                mp4tags[ 'covr' ] = [
-                    mutagen.mp4.MP4Cover( csio2.getvalue( ),
-                                        mutagen.mp4.MP4Cover.FORMAT_PNG ), ]
-            except:
-                #
-                ## had a CMYK colormap for the JPEG file, so just store the JPEG image into the M4A file
-                img.save( csio2, format = 'jpeg' )
-                mp4tags[ 'covr' ] = [
-                    mutagen.mp4.MP4Cover( csio2.getvalue( ),
-                                         mutagen.mp4.MP4Cover.FORMAT_JPEG ), ]              
-    elif data_dict[ 'album url' ] != '':
-        with io.BytesIO( requests.get(
-                data_dict[ 'album url' ], verify = verify ).content ) as csio, io.BytesIO( ) as csio2:
-            try:
-                mp4tags[ 'covr' ] = [
-                    mutagen.mp4.MP4Cover( csio2.getvalue( ),
-                                        mutagen.mp4.MP4Cover.FORMAT_PNG ), ]
-            except:
-                #
-                ## had a CMYK colormap for the JPEG file, so just store the JPEG image into the M4A file
-                img.save( csio2, format = 'jpeg' )
-                mp4tags[ 'covr' ] = [
-                    mutagen.mp4.MP4Cover( csio2.getvalue( ),
-                                         mutagen.mp4.MP4Cover.FORMAT_JPEG ), ]
+    if cover_art is not None:
+        image_bytes, fmt = cover_art
+        mp4tags[ 'covr' ] = [
+            mutagen.mp4.MP4Cover( image_bytes, {
+                'png' : mutagen.mp4.MP4Cover.FORMAT_PNG,
+                'jpeg' : mutagen.mp4.MP4Cover.FORMAT_JPEG }[ fmt ] ), ]
     mp4tags.save( )
 
+def _fill_mp3_tags( filename, data_dict, cover_art = None ):
+    mp3 = mutagen.mp3.MP3( filename )
+    if mp3.tags is None: mp3.add_tags( )
+    mp3tags = mp3.tags
+    mp3tags.add( mutagen.id3.TIT2( encoding = 3, text = [ data_dict[ 'song' ], ] ) )
+    mp3tags.add( mutagen.id3.TALB( encoding = 3, text = [ data_dict[ 'album' ], ] ) )
+    mp3tags.add( mutagen.id3.TPE1( encoding = 3, text = [ data_dict[ 'artist' ], ] ) )
+    mp3tags.add( mutagen.id3.TPE2( encoding = 3, text = [ data_dict[ 'artist' ], ] ) )
+    if 'year' in data_dict:
+        mp3tags.add( mutagen.id3.TDRC( encoding = 3, text = [ str( data_dict[ 'year' ] ), ] ) )
+    mp3tags.add( mutagen.id3.TRCK( encoding = 3, text = [ '%d/%d' % (
+        data_dict[ 'tracknumber' ], data_dict[ 'total tracks' ] ), ] ) )
+    if cover_art is not None:
+        image_bytes, fmt = cover_art
+        mp3tags.delall( 'APIC' )
+        mp3tags.add( mutagen.id3.APIC(
+            encoding = 3, mime = 'image/%s' % fmt, type = 3, desc = 'Cover', data = image_bytes ) )
+    mp3.save( )
+
+#
+## writes the tags of each kind of music file, by file extension
+_fill_music_tags = { 'm4a' : _fill_m4a_tags, 'mp4' : _fill_m4a_tags, 'mp3' : _fill_mp3_tags }
+
+def fill_m4a_metadata( filename, data_dict, verify = True, image_data = None ):
+    """
+    Low level method that populates the metadata of an M4A_ music file. The album image comes from :py:meth:`get_cover_art <howdy.music.music.get_cover_art>`, so it is downloaded only once for all the songs of an album.
+
+    :param str filename: a candidate M4A_ music file name.
+    :param dict data_dict: a dictionary of candidate music metadata with the following obligatory keys: ``song``, ``album``, ``artist``, ``year``, ``tracknumber``, and ``total tracks``. If the URL of the album image, ``album url``, is defined, then also provides the album image into the M4A_ file.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param BytesIO image_data: optional argument. If defined, is a :py:class:`BytesIO <io.BytesIO>` binary data representation of *usually* a candidate PNG_ image file.
+    
+    .. seealso:: :py:meth:`fill_album_metadata <howdy.music.music.fill_album_metadata>`.
+
+    .. _PNG: https://en.wikipedia.org/wiki/Portable_Network_Graphics
+    .. _M4A: https://en.wikipedia.org/wiki/MPEG-4_Part_14
+    """
+    assert( os.path.isfile( filename ) )
+    assert( os.path.basename( filename ).lower( ).endswith( '.m4a' ) )
+    cover_art = get_cover_art(
+        album_url = data_dict.get( 'album url' ), image_data = image_data, verify = verify )
+    _fill_m4a_tags( filename, data_dict, cover_art = cover_art )
+
+def fill_album_metadata(
+    filenames, album_data_dict, track_data_dicts = None, verify = True,
+    image_data = None, max_workers = 8 ):
+    """
+    Populates the metadata of an album's worth of music files, either M4A_ or MP3_. The album image is downloaded and encoded once, through :py:meth:`get_cover_art <howdy.music.music.get_cover_art>`, and the tags of the files are written concurrently.
+
+    :param list filenames: the :py:class:`list` of music file names, each ending in ``.m4a`` or ``.mp3``.
+    :param dict album_data_dict: a dictionary of music metadata shared by all the files, such as ``album``, ``artist``, ``year``, ``total tracks``, and ``album url``.
+    :param list track_data_dicts: optional argument, a :py:class:`list`, of the same length as ``filenames``, of dictionaries of the music metadata of each file, such as ``song`` and ``tracknumber``. These take precedence over ``album_data_dict``. Each element of the :py:class:`list` returned by :py:meth:`HowdyMusic.get_music_metadatas_album <howdy.music.music.HowdyMusic.get_music_metadatas_album>` is such a dictionary. Between ``album_data_dict`` and these dictionaries, each file must have all the obligatory keys described in :py:meth:`fill_m4a_metadata <howdy.music.music.fill_m4a_metadata>`.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param BytesIO image_data: optional argument. If defined, is a :py:class:`BytesIO <io.BytesIO>` binary data representation of the album image, used instead of ``album url``.
+    :param int max_workers: optional argument, the maximum number of files whose tags are written at the same time. Default is ``8``.
+    :returns: a :py:class:`dict` whose keys are the file names, and whose values are ``"SUCCESS"`` if the metadata was written, otherwise an error message.
+    :rtype: dict
+
+    .. _PNG: https://en.wikipedia.org/wiki/Portable_Network_Graphics
+    .. _M4A: https://en.wikipedia.org/wiki/MPEG-4_Part_14
+    .. _MP3: https://en.wikipedia.org/wiki/MP3
+    """
+    if track_data_dicts is None: track_data_dicts = list(map(lambda filename: { }, filenames ) )
+    assert( len( track_data_dicts ) == len( filenames ) )
+    if len( filenames ) == 0: return { }
+    try:
+        cover_art = get_cover_art(
+            album_url = album_data_dict.get( 'album url' ), image_data = image_data, verify = verify )
+    except Exception as e:
+        logging.debug( 'could not encode the album image: %s.' % str( e ) )
+        cover_art = None
+    #
+    def _fill_metadata( input_tuple ):
+        filename, track_data_dict = input_tuple
+        data_dict = dict( album_data_dict )
+        data_dict.update( track_data_dict )
+        suffix = os.path.basename( filename ).lower( ).split( '.' )[ -1 ]
+        if suffix not in _fill_music_tags:
+            return 'ERROR, %s is not an M4A or MP3 file.' % filename
+        if not os.path.isfile( filename ):
+            return 'ERROR, %s does not exist.' % filename
+        try:
+            _fill_music_tags[ suffix ]( filename, data_dict, cover_art = cover_art )
+            return 'SUCCESS'
+        except Exception as e:
+            return 'ERROR, could not fill metadata of %s: %s.' % ( filename, str( e ) )
+    with ThreadPoolExecutor( max_workers = max( 1, min( max_workers, len( filenames ) ) ) ) as pool:
+        return dict( zip( filenames, pool.map( _fill_metadata, zip( filenames, track_data_dicts ) ) ) )
+
 def get_youtube_file( youtube_URL, outputfile ):
     """
     Uses youtube-dl_ programmatically to download into an M4A_ file.
@@ -942,6 +1129,196 @@ def youtube_search(youtube, query, max_results = 10):
             pass
     return videos
 
+class YouTubeAlbumPipeline( object ):
+    """
+    Downloads the songs of an album from YouTube_ into tagged M4A_ files, through four stages that run at the same time: ``search`` finds each song's YouTube_ clip, ``download`` downloads its audio with youtube-dl_, ``transcode`` converts the audio into an M4A_ file with ffmpeg_ (unless it already is one), and ``tag`` fills out the M4A_ file's metadata. Each stage has its own pool of worker threads, and passes songs to the next stage through a bounded queue, so that one song is transcoded while others are still downloading.
+
+    A stage that fails on a song tries again, waiting twice as long after each failure, at most ``max_attempts`` times. A stage function may also return an error message, which fails the song without trying again.
+
+    :param dict album_data_dict: the music metadata shared by all the songs, such as ``album``, ``artist``, ``year``, ``total tracks``, and ``album url``, as described in :py:meth:`fill_album_metadata <howdy.music.music.fill_album_metadata>`.
+    :param str outputdir: optional argument, the directory into which to put the M4A_ files. Default is the current directory.
+    :param dict num_workers: optional argument, the number of worker threads of each stage. Default is ``{ 'search' : 1, 'download' : 4, 'transcode' : 2, 'tag' : 2 }``. Stages not given here keep their default.
+    :param int queue_size: optional argument, the maximum number of songs waiting in front of each stage. Default is ``4``.
+    :param int max_attempts: optional argument, the maximum number of attempts of each stage on each song. Default is ``3``.
+    :param float backoff: optional argument, the time, in seconds, to wait after the first failed attempt. Default is ``1.0``.
+    :param search_func: optional argument, the function that takes a song's metadata :py:class:`dict` and returns the URL of its clip, or ``None`` if there is none. By default, this is the first clip found by :py:meth:`youtube_search <howdy.music.music.youtube_search>`, searching for the artist and song name.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+
+    :var dict stats: for each stage, a :py:class:`dict` of the number of songs ``done`` and ``failed``, the number of ``retries``, and the ``busy`` time, in seconds, summed over its worker threads.
+
+    .. _YouTube: https://www.youtube.com
+    .. _youtube-dl: https://ytdl-org.github.io/youtube-dl/index.html
+    .. _ffmpeg: https://ffmpeg.org
+    .. _M4A: https://en.wikipedia.org/wiki/MPEG-4_Part_14
+    """
+    stages = ( 'search', 'download', 'transcode', 'tag' )
+    
+    def __init__( self, album_data_dict, outputdir = None, num_workers = { }, queue_size = 4,
+                  max_attempts = 3, backoff = 1.0, search_func = None, verify = True ):
+        assert( queue_size >= 1 )
+        assert( max_attempts >= 1 )
+        self.album_data_dict = album_data_dict
+        self.outputdir = outputdir if outputdir is not None else os.getcwd( )
+        self.num_workers = { 'search' : 1, 'download' : 4, 'transcode' : 2, 'tag' : 2 }
+        self.num_workers.update( num_workers )
+        assert( all(map(lambda stage: self.num_workers[ stage ] >= 1, self.stages ) ) )
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.search_func = search_func
+        self.verify = verify
+        self.stats = dict(map(lambda stage: ( stage, {
+            'done' : 0, 'failed' : 0, 'retries' : 0, 'busy' : 0.0 } ), self.stages ) )
+        self._lock = Lock( )
+        self._youtube = None
+
+    def _search( self, item ):
+        data_dict = item[ 'data_dict' ]
+        if self.search_func is not None: url = self.search_func( data_dict )
+        else:
+            #
+            ## the YouTube service is not thread safe
+            with self._lock:
+                if self._youtube is None: self._youtube = get_youtube_service( verify = self.verify )
+                videos = youtube_search( self._youtube, '%s %s' % ( data_dict[ 'artist' ], data_dict[ 'song' ] ) )
+            url = None
+            if videos is not None and len( videos ) != 0: _, url = videos[ 0 ]
+        if url is None: return 'ERROR, could not find a YouTube clip for %s.' % data_dict[ 'song' ]
+        item[ 'url' ] = url
+        return 'SUCCESS'
+
+    def _download( self, item ):
+        ydl_opts = { 'format' : 'bestaudio[ext=m4a]/bestaudio/best',
+                     'outtmpl' : os.path.join( self._tmpdir, '%d.%%(ext)s' % item[ 'index' ] ),
+                     'nocheckcertificate' : not self.verify,
+                     'quiet' : True, 'no_warnings' : True, 'noprogress' : True }
+        with youtube_dl.YoutubeDL( ydl_opts ) as ydl:
+            info = ydl.extract_info( item[ 'url' ], download = True )
+            item[ 'download' ] = ydl.prepare_filename( info )
+        return 'SUCCESS'
+
+    def _transcode( self, item ):
+        data_dict = item[ 'data_dict' ]
+        filename = os.path.join( self.outputdir, '%s.%s.m4a' % (
+            data_dict[ 'artist' ].replace( '/', '-' ), data_dict[ 'song' ].replace( '/', '-' ) ) )
+        if item[ 'download' ].lower( ).endswith( '.m4a' ):
+            shutil.move( item[ 'download' ], filename )
+        else:
+            ffmpeg_exec = find_executable( 'ffmpeg' )
+            if ffmpeg_exec is None: return 'ERROR, no FFMPEG executable found.'
+            proc = subprocess.Popen(
+                [ ffmpeg_exec, '-y', '-i', item[ 'download' ], '-vn',
+                  '-strict', 'experimental', '-acodec',
+                  'aac', '-ab', '128k', "file:%s" % filename ],
+                stdout = subprocess.PIPE, stderr = subprocess.STDOUT )
+            stdout_val, _ = proc.communicate( )
+            if proc.returncode != 0:
+                raise ValueError( 'could not transcode %s: %s' % (
+                    item[ 'download' ], stdout_val.decode( 'utf-8', 'replace' )[-256:] ) )
+            os.remove( item[ 'download' ] )
+        os.chmod( filename, 0o644 )
+        item[ 'filename' ] = filename
+        return 'SUCCESS'
+
+    def _tag( self, item ):
+        data_dict = dict( self.album_data_dict )
+        data_dict.update( item[ 'data_dict' ] )
+        _fill_m4a_tags( item[ 'filename' ], data_dict, cover_art = get_cover_art(
+            album_url = data_dict.get( 'album url' ), verify = self.verify ) )
+        return 'SUCCESS'
+
+    def _run_stage( self, stage, item ):
+        func = getattr( self, '_%s' % stage )
+        time0 = time.time( )
+        for attempt in range( 1, self.max_attempts + 1 ):
+            try:
+                status = func( item )
+                break
+            except Exception as e:
+                status = 'ERROR, %s failed for %s after %d attempts: %s.' % (
+                    stage, item[ 'data_dict' ][ 'song' ], attempt, str( e ) )
+                if attempt == self.max_attempts: break
+                with self._lock: self.stats[ stage ][ 'retries' ] += 1
+                time.sleep( self.backoff * 2 ** ( attempt - 1 ) )
+        with self._lock:
+            self.stats[ stage ][ 'busy' ] += time.time( ) - time0
+            if status == 'SUCCESS': self.stats[ stage ][ 'done' ] += 1
+            else: self.stats[ stage ][ 'failed' ] += 1
+        return status
+
+    def run( self, track_data_dicts ):
+        """
+        Runs all the songs through the pipeline.
+
+        :param list track_data_dicts: the :py:class:`list` of dictionaries of the music metadata of each song, such as ``song`` and ``tracknumber``. These take precedence over ``album_data_dict``. Each element of the :py:class:`list` returned by :py:meth:`HowdyMusic.get_music_metadatas_album <howdy.music.music.HowdyMusic.get_music_metadatas_album>` is such a dictionary.
+        :returns: a :py:class:`list`, in the same order as ``track_data_dicts``, of two-element :py:class:`tuple`. If a song succeeds, the tuple is its M4A_ file name and ``"SUCCESS"``. Otherwise, it is of format :py:meth:`return_error_raw <howdy.core.return_error_raw>`.
+        :rtype: list
+        """
+        results = list(map(lambda data_dict: return_error_raw( 'ERROR, not processed.' ), track_data_dicts ) )
+        if len( track_data_dicts ) == 0: return results
+        queues = list(map(lambda stage: queue.Queue( maxsize = self.queue_size ), self.stages ) )
+        num_running = dict(map(lambda stage: ( stage, self.num_workers[ stage ] ), self.stages ) )
+        time0 = time.time( )
+        #
+        ## each stage's workers pass their songs to the next stage. The last worker of a stage to
+        ## finish tells the next stage's workers to finish
+        def _worker( idx ):
+            stage = self.stages[ idx ]
+            while True:
+                item = queues[ idx ].get( )
+                if item is None: break
+                status = self._run_stage( stage, item )
+                if status != 'SUCCESS':
+                    results[ item[ 'index' ] ] = return_error_raw( status )
+                    logging.info( 'FAILED %s: %s' % ( item[ 'data_dict' ][ 'song' ], status ) )
+                elif idx + 1 < len( self.stages ): queues[ idx + 1 ].put( item )
+                else:
+                    results[ item[ 'index' ] ] = ( item[ 'filename' ], 'SUCCESS' )
+                    logging.info( 'FINISHED %s in %0.3f seconds.' % (
+                        item[ 'data_dict' ][ 'song' ], time.time( ) - time0 ) )
+            with self._lock:
+                num_running[ stage ] -= 1
+                is_last = num_running[ stage ] == 0
+            if is_last and idx + 1 < len( self.stages ):
+                for _ in range( self.num_workers[ self.stages[ idx + 1 ] ] ): queues[ idx + 1 ].put( None )
+
+        self._tmpdir = tempfile.mkdtemp( dir = self.outputdir )
+        try:
+            threads = list(chain.from_iterable(map(lambda idx: map(
+                lambda _: Thread( target = _worker, args = ( idx, ), daemon = True ),
+                range( self.num_workers[ self.stages[ idx ] ] ) ), range( len( self.stages ) ) ) ) )
+            for thread in threads: thread.start( )
+            for index, data_dict in enumerate( track_data_dicts ):
+                track_data_dict = dict( self.album_data_dict )
+                track_data_dict.update( data_dict )
+                queues[ 0 ].put( { 'index' : index, 'data_dict' : track_data_dict } )
+            for _ in range( self.num_workers[ self.stages[ 0 ] ] ): queues[ 0 ].put( None )
+            for thread in threads: thread.join( )
+        finally:
+            shutil.rmtree( self._tmpdir, ignore_errors = True )
+        return results
+
+    def get_summary( self ):
+        """
+        :returns: a table of the number of songs done and failed, the number of retries, and the busy time of each stage. For example,
+
+          .. code-block:: console
+
+             Stage        Done    Failed    Retries    Busy (s)
+             ---------  ------  --------  ---------  ----------
+             search         10         0          0       4.512
+             download       10         0          1      61.208
+             transcode      10         0          0      12.033
+             tag            10         0          0       0.871
+
+        :rtype: str
+        """
+        return tabulate.tabulate(
+            list(map(lambda stage: ( stage, self.stats[ stage ][ 'done' ], self.stats[ stage ][ 'failed' ],
+                                     self.stats[ stage ][ 'retries' ], '%0.3f' % self.stats[ stage ][ 'busy' ] ),
+                     self.stages ) ),
+            headers = [ 'Stage', 'Done', 'Failed', 'Retries', 'Busy (s)' ] )
+
 class HowdyLastFM( object ):
     """
     This object uses the LastFM_ API, through the higher level :py:mod:`musicbrainzngs` Python module, to get information on songs, albums, and artists. Where possible, this extracts additional song metadata using the MusicBrainz_ API.
@@ -1212,7 +1589,7 @@ class HowdyLastFM( object ):
         if 'mbid' in track[ 'album' ]:
             music_metadata = { }
             album_mbid = track[ 'album' ][ 'mbid' ]
-            data = musicbrainzngs.get_release_by_id(
+            data = get_musicbrainz_client( ).get_release_by_id(
                 album_mbid, includes = [ 'recordings', 'artists' ] )['release']
             music_metadata[ 'album' ] = data[ 'title' ]
             music_metadata[ 'artist' ] = data[ 'artist-credit' ][ 0 ][ 'artist' ][ 'name' ]
@@ -1258,29 +1635,11 @@ class HowdyLastFM( object ):
             return music_metadata, 'SUCCESS'
 
         elif 'mbid' in track[ 'artist' ]:
-            pass # not working now for reasons cannot debug
-            music_metadata = { }
             artist_mbid = track[ 'artist' ][ 'mbid' ]
             mi = MusicInfo( artist_name, artist_mbid = artist_mbid )
             #
-            ## now find song name in list of stuff
-            alltracks = list(chain.from_iterable(map(lambda album: map(lambda trackno: (
-                mi.alltrackdata[album]['tracks'][trackno][0], trackno, album ), mi.alltrackdata[album]['tracks'] ),
-                                                     mi.alltrackdata.keys( ))))
-            matches = list( filter( lambda tup: tup[0] == song_name, alltracks ) )
-            if len( matches ) != 1: pass
-            match = matches[ 0 ]
-            trackno = match[ 1 ]
-            album = match[ 2 ]
-            music_metadata[ 'album' ] = album
-            music_metadata[ 'artist' ] = mi.artist_name
-            trackdata = mi.alltrackdata[ album ]
-            music_metadata[ 'total tracks' ] = len( trackdata[ 'tracks' ] )
-            music_metadata[ 'song' ] = match[ 0 ]
-            music_metadata[ 'tracknumber' ] = trackno
-            music_metadata[ 'year' ] = trackdata[ 'release-date' ].year
-            music_metadata[ 'duration' ] = trackdata[ 'tracks' ][ trackno ][ 1 ]
-            return music_metadata, 'SUCCESS'
+            ## now find song name in the artist's songs
+            return mi.get_music_metadata( song_name )
             
 
         #
@@ -1347,7 +1706,7 @@ class HowdyLastFM( object ):
                     artist_name, album_name ) )
         if 'mbid' in album:
             album_mbid = album['mbid']
-            data = musicbrainzngs.get_release_by_id(
+            data = get_musicbrainz_client( ).get_release_by_id(
                 album_mbid, includes = [ 'recordings', 'artists' ] )['release']
             album_name = data['title']
             artist = data[ 'artist-credit' ][ 0 ][ 'artist' ][ 'name' ]
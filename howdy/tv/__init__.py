@@ -1,5 +1,9 @@
-import os, requests, json, sys, logging
-from sqlalchemy import Column, String
+import os, requests, json, sys, logging, datetime, atexit
+from sqlalchemy import Column, String, JSON, Date, DateTime, Integer, PickleType, create_engine
+from sqlalchemy.orm import sessionmaker
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 #
 from howdy.core import session, create_all, PlexConfig, Base
 
@@ -21,8 +25,92 @@ class ShowsToExclude( Base ): # these are shows you want to exclude
     __table_args__ = { 'extend_existing': True }
     show = Column( String( 65536 ), index = True, primary_key = True )
 
-# class CurrentGetTVBatchSession( Base ): # this acts as a single 
-#    pass
+class TVDBSeriesCache( Base ):
+    """
+    This SQLAlchemy_ ORM class contains, for each TV show on the Plex_ server, its TVDB_ series ID and whether it ended. These facts rarely change, so they are only looked up again once stale. Stored into the ``tvdbseriescache`` table in the SQLite3_ configuration database. :py:meth:`refresh_series_cache <howdy.tv.tv.refresh_series_cache>` refreshes the stale rows.
+
+    :var show: the show name on the Plex_ server. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 65536.
+    :var seriesid: the TVDB_ series ID. If ``None``, then the series could not be found. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing an :py:class:`Integer <sqlalchemy.types.Integer>`.
+    :var idfetched: the :py:class:`datetime <datetime.datetime>` at which the series ID was found. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    :var status: the TVDB_ status of the series, such as ``Ended`` or ``Continuing``. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 256.
+    :var lastaired: the :py:class:`date <datetime.date>` of the last aired episode, only found if the series has ended. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`Date <sqlalchemy.types.Date>` object.
+    :var statusfetched: the :py:class:`datetime <datetime.datetime>` at which the status was found. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    """
+    
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'tvdbseriescache'
+    __table_args__ = { 'extend_existing': True }
+    show = Column( String( 65536 ), index = True, primary_key = True )
+    seriesid = Column( Integer )
+    idfetched = Column( DateTime )
+    status = Column( String( 256 ) )
+    lastaired = Column( Date )
+    statusfetched = Column( DateTime )
+
+class TVDBResponseCache( Base ):
+    """
+    This SQLAlchemy_ ORM class contains TVDB_ API responses, so that repeated queries for the same TV show information are answered locally, or revalidated cheaply with their ETag. :py:class:`TVDBClient <howdy.tv.TVDBClient>` reads and writes this cache. Stored into the ``tvdbresponsecache`` table in the SQLite3_ configuration database.
+
+    :var url: the TVDB_ API path and its sorted query string, such as ``/series/71663/episodes?page=2``. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 65536.
+    :var etag: the ETag of the response, if given. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 256.
+    :var data: the JSON body of the response. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`JSON <sqlalchemy.types.JSON>` object.
+    :var fetched: the :py:class:`datetime <datetime.datetime>` at which the response was fetched or last revalidated. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    """
+    
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'tvdbresponsecache'
+    __table_args__ = { 'extend_existing': True }
+    url = Column( String( 65536 ), index = True, unique = True, primary_key = True )
+    etag = Column( String( 256 ) )
+    data = Column( JSON )
+    fetched = Column( DateTime )
+
+class TVBatchJob( Base ):
+    """
+    This SQLAlchemy_ ORM class contains one run of :ref:`get_tv_batch`, and the outputs of those of its stages that are slow to redo, so that a run that crashes can resume where it stopped. :py:class:`TVBatchJournal <howdy.tv.TVBatchJournal>` reads and writes this table. Stored into the ``tvbatchjob`` table in the SQLite3_ configuration database.
+
+    :var jobid: the ID of the run. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing an :py:class:`Integer <sqlalchemy.types.Integer>`.
+    :var started: the :py:class:`datetime <datetime.datetime>` at which the run started. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    :var finished: the :py:class:`datetime <datetime.datetime>` at which the run finished. If ``None``, then the run has not finished. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    :var stages: the :py:class:`dict` of stage name to stage output. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`PickleType <sqlalchemy.types.PickleType>`.
+    """
+    
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'tvbatchjob'
+    __table_args__ = { 'extend_existing': True }
+    jobid = Column( Integer, index = True, primary_key = True )
+    started = Column( DateTime )
+    finished = Column( DateTime )
+    stages = Column( PickleType )
+
+class TVBatchEpisode( Base ):
+    """
+    This SQLAlchemy_ ORM class contains the state of each missing episode in a run of :ref:`get_tv_batch` (see :py:class:`TVBatchJob <howdy.tv.TVBatchJob>`). :py:class:`TVBatchJournal <howdy.tv.TVBatchJournal>` reads and writes this table. Stored into the ``tvbatchepisode`` table in the SQLite3_ configuration database.
+
+    :var jobid: the ID of the run. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing an :py:class:`Integer <sqlalchemy.types.Integer>`.
+    :var torfname: the episode's search string, such as ``'The Simpsons S31E01'``. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 65536.
+    :var state: one of ``searching``, ``downloading``, ``tagged``, ``transferred``, ``done``, or ``failed``. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 64.
+    :var torrentids: the :py:class:`list` of IDs of the torrents downloading this episode on the Deluge server. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`JSON <sqlalchemy.types.JSON>` object.
+    :var remotefilename: the base name of the finished episode on the remote SSH server. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 65536.
+    :var message: the last status message. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`String <sqlalchemy.types.String>` object of size 65536.
+    :var updated: the :py:class:`datetime <datetime.datetime>` at which the state last changed. This is a :py:class:`Column <sqlalchemy.schema.Column>` containing a :py:class:`DateTime <sqlalchemy.types.DateTime>` object.
+    """
+    
+    #
+    ## create the table using Base.metadata.create_all( _engine )
+    __tablename__ = 'tvbatchepisode'
+    __table_args__ = { 'extend_existing': True }
+    jobid = Column( Integer, index = True, primary_key = True )
+    torfname = Column( String( 65536 ), primary_key = True )
+    state = Column( String( 64 ) )
+    torrentids = Column( JSON )
+    remotefilename = Column( String( 65536 ) )
+    message = Column( String( 65536 ) )
+    updated = Column( DateTime )
+
 #
 ## commit all tables (implicit check on whether in READTHEDOCS variable is set
 create_all( )
@@ -104,9 +192,16 @@ def get_tvdb_api( ):
              'apikey' : data['apikey'],
              'userkey' : data['userkey'] }
 
+#
+## TVDB API tokens last 24 hours. Refresh them after 12 hours
+_tvdb_token_cache = { }
+_tvdb_token_lock = Lock( )
+_tvdb_token_refresh_age = datetime.timedelta( hours = 12 )
+_tvdb_token_max_age = datetime.timedelta( hours = 23 )
+
 def get_token( verify = True, data = None ):
     """
-    Returns the TVDB_ API token that allows access to the TVDB_ database. If there are errors, then returns ``None``.
+    Returns the TVDB_ API token that allows access to the TVDB_ database. If there are errors, then returns ``None``. When using the stored TVDB_ API credentials, the token is cached in this process. It is refreshed with :py:meth:`refresh_token <howdy.tv.refresh_token>` after 12 hours, and a new one is requested after 23 hours.
 
     :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
     :param dict data: optional argument. If provided, must be a dictionary containing the TVDB_ API credentials as described in :py:meth:`get_tvdb_api <howdy.tv.tv.get_tvdb_api>`.
@@ -114,9 +209,24 @@ def get_token( verify = True, data = None ):
     :returns: the TVDB_ API token, otherwise returns :py:class:`None` if there are errors.
     :rtype: str
     """
-    if data is None:
+    if data is not None: return _get_token_login( data, verify = verify )
+    with _tvdb_token_lock:
+        if verify in _tvdb_token_cache:
+            token, time_token = _tvdb_token_cache[ verify ]
+            age = datetime.datetime.now( ) - time_token
+            if age < _tvdb_token_refresh_age: return token
+            if age < _tvdb_token_max_age:
+                new_token = refresh_token( token, verify = verify )
+                if new_token is not None:
+                    _tvdb_token_cache[ verify ] = ( new_token, datetime.datetime.now( ) )
+                    return new_token
         try: data = get_tvdb_api( )
         except: return None
+        token = _get_token_login( data, verify = verify )
+        if token is not None: _tvdb_token_cache[ verify ] = ( token, datetime.datetime.now( ) )
+        return token
+
+def _get_token_login( data, verify = True ):
     import shlex, subprocess
     from distutils.spawn import find_executable
 
@@ -169,3 +279,264 @@ def refresh_token( token, verify = True ):
                              headers = headers, verify = verify )
     if response.status_code != 200: return None
     return response.json( )['token']
+
+_tvdb_default_ttl = datetime.timedelta( days = 1 )
+_tvdb_max_age = datetime.timedelta( days = 90 )
+
+class TVDBResponse( object ):
+    """
+    A minimal response returned by :py:meth:`TVDBClient.get <howdy.tv.TVDBClient.get>`, with the same ``status_code`` and ``json( )`` that a :py:class:`Response <requests.Response>` has.
+
+    :var int status_code: the HTTP status code. It is 200 for a response answered from the cache.
+    :var bool from_cache: ``True`` if this response was answered from the cache, ``False`` otherwise.
+    """
+    def __init__( self, status_code, data = None, from_cache = False ):
+        self.status_code = status_code
+        self.from_cache = from_cache
+        self._data = data
+
+    def json( self ):
+        """
+        :returns: the JSON body of the response.
+        """
+        return self._data
+
+class TVDBClient( object ):
+    """
+    A thread safe client to the TVDB_ API that reuses one keep-alive :py:class:`Session <requests.Session>`, and that caches responses in the ``tvdbresponsecache`` table (see :py:class:`TVDBResponseCache <howdy.tv.TVDBResponseCache>`). A response younger than its time to live is answered from the cache without a request. An older response is revalidated with its ETag, if it has one. New responses are held in memory until :py:meth:`flush <howdy.tv.TVDBClient.flush>` writes them to the SQLite3_ configuration database, which also happens when the process exits. The client reads and writes the cache through its own connection to the SQLite3_ configuration database, so that it can be created and flushed from any thread.
+
+    Use :py:meth:`get_tvdb_client <howdy.tv.get_tvdb_client>` to get the shared client of this process.
+
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param int num_threads: the maximum number of concurrent requests made through :py:meth:`map <howdy.tv.TVDBClient.map>`. Default is 16.
+    """
+    def __init__( self, verify = True, num_threads = 16 ):
+        assert( num_threads >= 1 )
+        self.verify = verify
+        self.num_threads = num_threads
+        self.session = requests.Session( )
+        for prefix in ( 'https://', 'http://' ):
+            self.session.mount( prefix, requests.adapters.HTTPAdapter(
+                pool_connections = num_threads,
+                pool_maxsize = num_threads ) )
+        self._lock = Lock( )
+        self._dirty = set( )
+        self._executor = ThreadPoolExecutor( max_workers = num_threads )
+        self._session = sessionmaker( bind = create_engine(
+            session.get_bind( ).url, connect_args = { 'check_same_thread' : False } ) )( )
+        #
+        ## load cache, drop rows that are too old to revalidate
+        time_now = datetime.datetime.now( )
+        self._cache = { }
+        with self._lock:
+            for val in self._session.query( TVDBResponseCache ):
+                if val.fetched is None or time_now - val.fetched > _tvdb_max_age:
+                    self._session.delete( val )
+                    continue
+                self._cache[ val.url ] = ( val.etag, val.data, val.fetched )
+            self._session.commit( )
+        atexit.register( self.flush )
+
+    def get( self, path, token, params = { }, ttl = _tvdb_default_ttl ):
+        """
+        Returns the response of a GET request to the TVDB_ API.
+
+        :param str path: the path of the TVDB_ API endpoint, such as ``/series/71663``.
+        :param str token: the TVDB_ API access token.
+        :param dict params: optional query parameters.
+        :param ttl: the :py:class:`timedelta <datetime.timedelta>` for which a cached response is used without revalidation. If ``None``, then neither use nor store the cache. Default is one day.
+
+        :returns: a :py:class:`TVDBResponse <howdy.tv.TVDBResponse>`.
+        :rtype: :py:class:`TVDBResponse <howdy.tv.TVDBResponse>`
+        """
+        key = path
+        if len( params ) != 0: key = '%s?%s' % ( path, urlencode( sorted( params.items( ) ) ) )
+        headers = { 'Content-Type' : 'application/json',
+                    'Authorization' : 'Bearer %s' % token }
+        if ttl is not None:
+            with self._lock: cached = self._cache.get( key )
+            if cached is not None:
+                etag, data, fetched = cached
+                if datetime.datetime.now( ) - fetched < ttl:
+                    return TVDBResponse( 200, data, from_cache = True )
+                if etag is not None: headers[ 'If-None-Match' ] = etag
+        response = self.session.get(
+            'https://api.thetvdb.com%s' % path, params = params, headers = headers,
+            verify = self.verify )
+        if ttl is None:
+            if response.status_code != 200: return TVDBResponse( response.status_code )
+            return TVDBResponse( 200, response.json( ) )
+        if response.status_code == 304 and cached is not None:
+            with self._lock:
+                self._cache[ key ] = ( etag, data, datetime.datetime.now( ) )
+                self._dirty.add( key )
+            return TVDBResponse( 200, data, from_cache = True )
+        if response.status_code != 200: return TVDBResponse( response.status_code )
+        data = response.json( )
+        with self._lock:
+            self._cache[ key ] = ( response.headers.get( 'ETag' ), data, datetime.datetime.now( ) )
+            self._dirty.add( key )
+        return TVDBResponse( 200, data )
+
+    def map( self, func, items ):
+        """
+        :param func: the function to apply to each item. It should make its requests through :py:meth:`get <howdy.tv.TVDBClient.get>`.
+        :param items: the iterable of items.
+        :returns: the :py:class:`list` of ``func`` applied to each item, concurrently and in the same order as ``items``.
+        :rtype: list
+        """
+        return list( self._executor.map( func, items ) )
+
+    def flush( self ):
+        """
+        Writes the new or revalidated responses into the ``tvdbresponsecache`` table. This is also called when the process exits.
+        """
+        with self._lock:
+            entries = dict(map(lambda key: ( key, self._cache[ key ] ), self._dirty ) )
+            self._dirty = set( )
+            if len( entries ) == 0: return
+            for key in entries:
+                etag, data, fetched = entries[ key ]
+                self._session.merge( TVDBResponseCache(
+                    url = key, etag = etag, data = data, fetched = fetched ) )
+            self._session.commit( )
+        logging.debug( 'stored %d TVDB responses.' % len( entries ) )
+
+_tvdb_clients = { }
+_tvdb_clients_lock = Lock( )
+
+def get_tvdb_client( verify = True ):
+    """
+    Returns the shared :py:class:`TVDBClient <howdy.tv.TVDBClient>` of this process. It can be called from any thread.
+
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :returns: the shared :py:class:`TVDBClient <howdy.tv.TVDBClient>`.
+    :rtype: :py:class:`TVDBClient <howdy.tv.TVDBClient>`
+    """
+    with _tvdb_clients_lock:
+        if verify not in _tvdb_clients: _tvdb_clients[ verify ] = TVDBClient( verify = verify )
+        return _tvdb_clients[ verify ]
+
+#
+## runs of get_tv_batch older than this are removed from the journal
+_tvbatch_max_age = datetime.timedelta( days = 30 )
+
+class TVBatchJournal( object ):
+    """
+    A persistent journal of one run of :ref:`get_tv_batch`. It stores the outputs of the slow stages (see :py:class:`TVBatchJob <howdy.tv.TVBatchJob>`) and the state of each missing episode (see :py:class:`TVBatchEpisode <howdy.tv.TVBatchEpisode>`) as soon as they change, so that if the run crashes or is killed, the next run can resume with :py:meth:`get_unfinished <howdy.tv.TVBatchJournal.get_unfinished>`. Each episode goes through these states.
+
+    * ``searching`` for Magnet links.
+    * ``downloading`` on the Deluge server, with the IDs of its torrents.
+    * ``tagged``, once the finished episode has been copied and tagged on the remote SSH server.
+    * ``transferred``, once the episode has been downloaded to the Plex_ server.
+    * ``done``, once the episode has been moved into the Plex_ TV library.
+    * ``failed``, if it could not be downloaded. A resumed run tries it again.
+
+    This journal is thread safe. It writes through its own connection to the SQLite3_ configuration database, so that the threads that download episodes can record their progress right away.
+
+    :param int jobid: optional argument, the ID of the run to resume. If ``None``, then start a new run, and remove runs older than 30 days.
+
+    :var int jobid: the ID of this run.
+    """
+    states = ( 'searching', 'downloading', 'tagged', 'transferred', 'done', 'failed' )
+
+    def __init__( self, jobid = None ):
+        self._lock = Lock( )
+        self._session = sessionmaker( bind = create_engine(
+            session.get_bind( ).url, connect_args = { 'check_same_thread' : False } ) )( )
+        if jobid is not None:
+            assert( self._session.query( TVBatchJob ).filter( TVBatchJob.jobid == jobid ).first( ) is not None ), \
+                "error, no get_tv_batch run with jobid = %d." % jobid
+            self.jobid = jobid
+            return
+        #
+        ## remove old runs
+        time_old = datetime.datetime.now( ) - _tvbatch_max_age
+        for job in self._session.query( TVBatchJob ).filter( TVBatchJob.started < time_old ):
+            self._session.query( TVBatchEpisode ).filter(
+                TVBatchEpisode.jobid == job.jobid ).delete( )
+            self._session.delete( job )
+        job = TVBatchJob( started = datetime.datetime.now( ), stages = { } )
+        self._session.add( job )
+        self._session.commit( )
+        self.jobid = job.jobid
+
+    @classmethod
+    def get_unfinished( cls ):
+        """
+        :returns: the journal of the most recent run of :ref:`get_tv_batch` that has not finished, or ``None`` if there is none.
+        :rtype: :py:class:`TVBatchJournal <howdy.tv.TVBatchJournal>`
+        """
+        job = session.query( TVBatchJob ).filter( TVBatchJob.finished == None ).order_by(
+            TVBatchJob.started.desc( ) ).first( )
+        if job is None: return None
+        return cls( jobid = job.jobid )
+
+    def _get_job( self ):
+        return self._session.query( TVBatchJob ).filter( TVBatchJob.jobid == self.jobid ).first( )
+
+    def get_stage( self, stage ):
+        """
+        :param str stage: the name of the stage, such as ``'remaining'``.
+        :returns: the output of the stage, or ``None`` if the stage has not finished.
+        """
+        with self._lock:
+            return self._get_job( ).stages.get( stage )
+
+    def set_stage( self, stage, data ):
+        """
+        Stores the output of a finished stage.
+
+        :param str stage: the name of the stage, such as ``'remaining'``.
+        :param data: the output of the stage. It must be picklable.
+        """
+        with self._lock:
+            job = self._get_job( )
+            stages = dict( job.stages )
+            stages[ stage ] = data
+            job.stages = stages
+            self._session.commit( )
+
+    def get_episode( self, torFname ):
+        """
+        :param str torFname: the episode's search string, such as ``'The Simpsons S31E01'``.
+        :returns: a :py:class:`dict` of ``state``, ``torrentids``, ``remotefilename``, and ``message`` of the episode, or ``None`` if the episode has no state yet.
+        :rtype: dict
+        """
+        with self._lock:
+            val = self._session.query( TVBatchEpisode ).filter(
+                TVBatchEpisode.jobid == self.jobid ).filter(
+                    TVBatchEpisode.torfname == torFname ).first( )
+            if val is None: return None
+            return { 'state' : val.state, 'torrentids' : list( val.torrentids or [ ] ),
+                     'remotefilename' : val.remotefilename, 'message' : val.message }
+
+    def set_episode( self, torFname, state, **kwargs ):
+        """
+        Stores the new state of an episode.
+
+        :param str torFname: the episode's search string, such as ``'The Simpsons S31E01'``.
+        :param str state: the new state, one of :py:attr:`states <howdy.tv.TVBatchJournal.states>`.
+        :param kwargs: optional new values of ``torrentids``, ``remotefilename``, or ``message``. Those not given keep their old values.
+        """
+        assert( state in self.states ), "error, state = %s not one of %s." % ( state, self.states )
+        assert( set( kwargs ) <= set([ 'torrentids', 'remotefilename', 'message' ]) )
+        with self._lock:
+            val = self._session.query( TVBatchEpisode ).filter(
+                TVBatchEpisode.jobid == self.jobid ).filter(
+                    TVBatchEpisode.torfname == torFname ).first( )
+            if val is None:
+                val = TVBatchEpisode( jobid = self.jobid, torfname = torFname )
+                self._session.add( val )
+            val.state = state
+            val.updated = datetime.datetime.now( )
+            for key in kwargs: setattr( val, key, kwargs[ key ] )
+            self._session.commit( )
+
+    def finish( self ):
+        """
+        Marks this run as finished, so that it is no longer resumed.
+        """
+        with self._lock:
+            self._get_job( ).finished = datetime.datetime.now( )
+            self._session.commit( )
@@ -5,53 +5,14 @@ import os, numpy, glob, time, datetime
 import multiprocessing, logging
 from argparse import ArgumentParser
 #
-from howdy.core import core
-from howdy.tv import tv, get_token
+from howdy.core import core, core_torrents
+from howdy.tv import tv, get_token, TVBatchJournal
 
 def finish_statement( step ):
     return '%d, finished on %s.' % ( step + 1, datetime.datetime.now( ).strftime(
         '%B %d, %Y @ %I:%M:%S %p' ) )
 
-def main( ):
-    time0 = time.time( )
-    default_time = 1000
-    default_iters = 2
-    default_num_threads = 2 * multiprocessing.cpu_count( )
-    #
-    parser = ArgumentParser( )
-    parser.add_argument('--maxtime', dest='maxtime_in_secs', type=int, action='store', default = default_time,
-                      help = ' '.join([
-                          'The maximum amount of time to spend (in seconds),',
-                          'per candidate magnet link,',
-                          'trying to download a TV show.',
-                          'Default is %d seconds.' % default_time ] ) )
-    parser.add_argument('--num', dest='num_iters', type=int, action='store', default = default_iters,
-                      help = ' '.join([ 
-                          'The maximum number of different magnet links to try',
-                          'before giving up. Default is %d.' % default_iters ]) )
-    parser.add_argument('--token', dest='token', type=str, action='store',
-                      help = 'Optional argument. If chosen, user provided Plex access token.')
-    parser.add_argument('--debuglevel', dest='debug_level', action='store', type=str, default = 'None',
-                    choices = [ 'None', 'info', 'debug' ], help = 'Choose the debug level for the system logger. Default is None (no logging). Can be one of None (no logging), info, or debug.' )
-    parser.add_argument('--numthreads', dest='numthreads', type=int, action='store', default = default_num_threads,
-                      help = 'Number of threads over which to search for TV shows in my library. Default is %d.' %
-                      default_num_threads )
-    parser.add_argument('--nomax', dest='do_restrict_maxsize', action='store_false', default=True,
-                      help = 'If chosen, do not restrict maximum size of downloaded file.' )
-    parser.add_argument('--nomin', dest='do_restrict_minsize', action='store_false', default=True,
-                      help = 'If chosen, do not restrict minimum size of downloaded file.' )
-    parser.add_argument('--raw', dest='do_raw', action='store_true', default = False,
-                      help = 'If chosen, then use the raw string to specify TV show torrents.' )    
-    args = parser.parse_args( )
-    #
-    logger = logging.getLogger( )
-    if args.debug_level == 'info':  logger.setLevel( logging.INFO )
-    if args.debug_level == 'debug': logger.setLevel( logging.DEBUG )
-    assert( args.maxtime_in_secs >= 60 ), 'error, max time must be >= 60 seconds.'
-    assert( args.num_iters >= 1 ), 'error, must have a positive number of maximum iterations.'
-    step = 0
-    print( '%d, started on %s' % ( step, datetime.datetime.now( ).strftime( '%B %d, %Y @ %I:%M:%S %p' ) ) )
-    step += 1
+def _get_remaining_episodes( args, step, time0 ):
     #
     ## get plex server token
     dat = core.checkServerCredentials( doLocal = True )
@@ -60,7 +21,7 @@ def main( ):
             '%d, error, could not access local Plex server in %0.3f seconds. Exiting...' % (
                 step, time.time( ) - time0 ),
             finish_statement( step )  ] ) )
-        return
+        return None, step
     fullURL, token = dat
     if args.token is not None: token = args.token
     #
@@ -71,7 +32,7 @@ def main( ):
         print('\n'.join([
             '%d, error, could not access libraries in plex server in %0.3f seconds. Exiting...' % (
                 step, time.time( ) - time0 ), finish_statement( step ) ]))
-        return
+        return None, step
     #
     valid_keys = list(filter(lambda key: library_dict[ key ][ -1 ] ==
                              'show', library_dict ) )
@@ -79,7 +40,7 @@ def main( ):
         print('\n'.join([
             '%d, Error, could not find a TV show library in %0.3f seconds. Exiting...' %
             ( time.time( ) - time0, step ), finish_statement( step ) ]))
-        return
+        return None, step
     tvlib_title = library_dict[ max( valid_keys ) ][ 0 ]
     print( '%d, found TV library: %s.' % ( step, tvlib_title ) )
     step += 1
@@ -87,7 +48,8 @@ def main( ):
     ## now get the TV shows
     time0 = time.time( )
     tvdata = core.get_library_data(
-        tvlib_title, token = token, num_threads = args.numthreads )
+        tvlib_title, token = token, num_threads = args.numthreads,
+        use_snapshot = True )
     print( '%d, found %d shows in the TV library, in %0.3f seconds.' % (
         step, len( tvdata ), time.time( ) - time0 ) )
     step += 1
@@ -101,30 +63,115 @@ def main( ):
         print( '\n'.join([
             '%d, error, could not access the TVDB API server in %0.3f seconds. Exiting...' % (
                 step, time.time( ) - time0 ) ] ) )
-        return
+        return None, step
     toGet = tv.get_remaining_episodes(
         tvdata, showSpecials = False,
         showsToExclude = showsToExclude,
         num_threads = args.numthreads )
-    if len( toGet ) == 0:
-        print('\n'.join([
-            '%d, no episodes to download in %0.3f seconds. Exiting...' % (
-                step, time.time( ) - time0 ), finish_statement( step ) ]))
-        return
+    if len( toGet ) == 0: return toGet, step
     print( '%d, took %0.3f seconds to get list of %d episodes to download.' % (
         step, time.time( ) - time0, sum(
             map(lambda tvshow: len(toGet[tvshow]['episodes']), toGet ) ) ) )
     step += 1
+    return toGet, step
+
+def main( ):
+    time0 = time.time( )
+    default_time = 1000
+    default_iters = 2
+    default_num_threads = 2 * multiprocessing.cpu_count( )
+    #
+    parser = ArgumentParser( )
+    parser.add_argument('--maxtime', dest='maxtime_in_secs', type=int, action='store', default = default_time,
+                      help = ' '.join([
+                          'The maximum amount of time to spend (in seconds),',
+                          'per candidate magnet link,',
+                          'trying to download a TV show.',
+                          'Default is %d seconds.' % default_time ] ) )
+    parser.add_argument('--num', dest='num_iters', type=int, action='store', default = default_iters,
+                      help = ' '.join([ 
+                          'The maximum number of different magnet links to try',
+                          'before giving up. Default is %d.' % default_iters ]) )
+    parser.add_argument('--token', dest='token', type=str, action='store',
+                      help = 'Optional argument. If chosen, user provided Plex access token.')
+    parser.add_argument('--debuglevel', dest='debug_level', action='store', type=str, default = 'None',
+                    choices = [ 'None', 'info', 'debug' ], help = 'Choose the debug level for the system logger. Default is None (no logging). Can be one of None (no logging), info, or debug.' )
+    parser.add_argument('--numthreads', dest='numthreads', type=int, action='store', default = default_num_threads,
+                      help = 'Number of threads over which to search for TV shows in my library. Default is %d.' %
+                      default_num_threads )
+    parser.add_argument('--nomax', dest='do_restrict_maxsize', action='store_false', default=True,
+                      help = 'If chosen, do not restrict maximum size of downloaded file.' )
+    parser.add_argument('--nomin', dest='do_restrict_minsize', action='store_false', default=True,
+                      help = 'If chosen, do not restrict minimum size of downloaded file.' )
+    parser.add_argument('--raw', dest='do_raw', action='store_true', default = False,
+                      help = 'If chosen, then use the raw string to specify TV show torrents.' )    
+    parser.add_argument('--offline', dest='do_offline', action='store_true', default = False,
+                      help = 'If chosen, then only replay cached torrent searches, and do not query the torrent services again.' )
+    parser.add_argument('--bwlimit', dest='bwlimit', type=float, action='store',
+                      help = 'Optional argument. If chosen, the maximum total rate, in kB/s, at which to download the finished episodes from the remote SSH server.' )
+    parser.add_argument('--resume', dest='do_resume', action='store_true', default = False,
+                      help = 'If chosen, then resume the last run that did not finish, skipping the work it already did.' )
+    parser.add_argument('--maxsearches', dest='max_searches', type=int, action='store', default = 4,
+                      help = 'The maximum number of episodes to search for at the same time. Default is 4.' )
+    parser.add_argument('--maxtorrents', dest='max_torrents', type=int, action='store', default = 8,
+                      help = 'The maximum number of torrents to download at the same time on the Deluge server. Default is 8.' )
+    parser.add_argument('--diskquota', dest='disk_quota', type=float, action='store', default = 50.0,
+                      help = 'The maximum disk space, in GB, to use on the seedbox. Default is 50 GB.' )
+    parser.add_argument('--maxtransfers', dest='max_transfers', type=int, action='store', default = 4,
+                      help = 'The maximum number of finished episodes to transfer at the same time from the remote SSH server. Default is 4.' )
+    args = parser.parse_args( )
+    #
+    logger = logging.getLogger( )
+    if args.debug_level == 'info':  logger.setLevel( logging.INFO )
+    if args.debug_level == 'debug': logger.setLevel( logging.DEBUG )
+    assert( args.maxtime_in_secs >= 60 ), 'error, max time must be >= 60 seconds.'
+    assert( args.num_iters >= 1 ), 'error, must have a positive number of maximum iterations.'
+    assert( min( args.max_searches, args.max_torrents, args.max_transfers ) >= 1 ), 'error, must have positive numbers of searches, torrents, and transfers.'
+    assert( args.disk_quota > 0 ), 'error, disk quota must be > 0 GB.'
+    if args.do_offline: core_torrents.set_torrent_search_offline( )
+    step = 0
+    print( '%d, started on %s' % ( step, datetime.datetime.now( ).strftime( '%B %d, %Y @ %I:%M:%S %p' ) ) )
+    step += 1
+    #
+    ## resume the last unfinished run, or start a new one
+    journal = None
+    if args.do_resume:
+        journal = TVBatchJournal.get_unfinished( )
+        if journal is None: print( '%d, no unfinished run to resume, starting a new one.' % step )
+        else: print( '%d, resuming the unfinished run #%d.' % ( step, journal.jobid ) )
+        step += 1
+    if journal is None: journal = TVBatchJournal( )
+    #
+    ## crawl the Plex and TVDB servers, unless an earlier run already did
+    stage_tvTorUnits = journal.get_stage( 'tvtorunits' )
+    toGet = journal.get_stage( 'remaining' )
+    if stage_tvTorUnits is None and toGet is None:
+        toGet, step = _get_remaining_episodes( args, step, time0 )
+        if toGet is None: return
+        journal.set_stage( 'remaining', toGet )
+    if stage_tvTorUnits is None and len( toGet ) == 0:
+        journal.finish( )
+        print('\n'.join([
+            '%d, no episodes to download in %0.3f seconds. Exiting...' % (
+                step, time.time( ) - time0 ), finish_statement( step ) ]))
+        return
     #
     ## now download these episodes
-    tvTorUnits, newdirs = tv.create_tvTorUnits(
-        toGet, restrictMaxSize = args.do_restrict_maxsize,
-        restrictMinSize = args.do_restrict_minsize, do_raw = args.do_raw )
+    if stage_tvTorUnits is None:
+        stage_tvTorUnits = tv.create_tvTorUnits(
+            toGet, restrictMaxSize = args.do_restrict_maxsize,
+            restrictMinSize = args.do_restrict_minsize, do_raw = args.do_raw )
+        journal.set_stage( 'tvtorunits', stage_tvTorUnits )
+    tvTorUnits, newdirs = stage_tvTorUnits
     print('%d, here are the %d episodes to get: %s.' % ( step,
         len( tvTorUnits ), ', '.join(map(lambda tvTorUnit: tvTorUnit[ 'torFname' ], tvTorUnits))))
     step += 1
     tv.download_batched_tvtorrent_shows(
         tvTorUnits, newdirs = newdirs, maxtime_in_secs = args.maxtime_in_secs,
-        num_iters = args.num_iters )
+        num_iters = args.num_iters, bwlimit = args.bwlimit, journal = journal,
+        scheduler = tv.TVBatchScheduler(
+            max_searches = args.max_searches, max_torrents = args.max_torrents,
+            disk_quota = 1024 * args.disk_quota, max_transfers = args.max_transfers ) )
+    journal.finish( )
     print( '\n'.join([ '%d, everything done in %0.3f seconds.' % ( step, time.time( ) - time0 ),
                        finish_statement( step ) ]))
@@ -2,11 +2,9 @@ import signal
 from howdy import signal_handler
 signal.signal( signal.SIGINT, signal_handler )
 import logging, os, re, time
-from itertools import chain
-from multiprocessing import Pool
 from argparse import ArgumentParser
 #
-from howdy.core import core_deluge, core
+from howdy.core import core_deluge, core_torrents, core
 from howdy.tv import tv_torrents, tv
 
 def get_items_eztv_io( name, maxnum = 10, verify = True ):
@@ -75,6 +73,10 @@ def get_items_kickass( name, maxnum = 10, verify = True ):
         return None
     return items
 
+def _get_items_status( items ):
+    if items is None: return None, 'FAILURE'
+    return items, 'SUCCESS'
+
 def get_tv_torrent_items(
         items, filename = None, to_torrent_server = False ):
     if len( items ) != 1:
@@ -118,23 +120,26 @@ def process_magnet_items( name, raw = False, verify = True, maxnum = 10 ):
     #
     ## check for jackett
     if core.get_jackett_credentials( ) is None:
-        pool = Pool( processes = 5 )
-        jobs = list(map(
-            lambda func: pool.apply_async( func, args = ( name, maxnum ) ),
-            ( get_items_zooqle, get_items_rarbg, #get_items_kickass,
-              get_items_torrentz, get_items_eztv_io ) ) )
-        jobs.append( pool.apply_async( get_items_tpb, args = (
-            name, maxnum, False, False ) ) ) # args.do_any = False
+        providers = {
+            'zooqle' : lambda session: tv_torrents.get_tv_torrent_zooqle(
+                name, maxnum = maxnum, session = session ),
+            'rarbg' : lambda session: tv_torrents.get_tv_torrent_rarbg(
+                name, maxnum = maxnum, session = session ),
+            'torrentz' : lambda session: _get_items_status( get_items_torrentz( name, maxnum ) ),
+            'eztv.io' : lambda session: tv_torrents.get_tv_torrent_eztv_io(
+                name, maxnum = maxnum, session = session ),
+            'tpb' : lambda session: _get_items_status( get_items_tpb( name, maxnum, False, False ) ) } # args.do_any = False
     else:
-        pool = Pool( processes = 3 )
-        jobs = list(map(
-            lambda func: pool.apply_async( func, args = ( name, maxnum, verify ) ),
-            ( get_items_zooqle, get_items_eztv_io ) ) )
-        jobs.append( pool.apply_async( get_items_jackett, args = ( name, maxnum, raw, verify ) ) )
-    items_all = list( chain.from_iterable( filter( None, map(lambda job: job.get( ), jobs ) ) ) )
+        providers = {
+            'zooqle' : lambda session: tv_torrents.get_tv_torrent_zooqle(
+                name, maxnum = maxnum, verify = verify, session = session ),
+            'eztv.io' : lambda session: tv_torrents.get_tv_torrent_eztv_io(
+                name, maxnum = maxnum, verify = verify, session = session ),
+            'jackett' : lambda session: tv_torrents.get_tv_torrent_jackett(
+                name, maxnum = maxnum, raw = raw, verify = verify, session = session ) }
+    with core_torrents.TorrentSearchAggregator( num_threads = len( providers ) ) as aggregator:
+        items_all, statuses = aggregator.search( providers )
     logging.info( 'search for torrents took %0.3f seconds.' % ( time.time( ) - time0 ) )
-    pool.close( )
-    pool.join( )
     if len( items_all ) != 0: return items_all
     return None
             
@@ -27,7 +27,8 @@ def get_tvdata( tvlibraryname, fullURL, token, doCheck = True ):
             return return_error_raw( "Error, %s library is not a TV library." % tvlibraryname )
     #
     ## now get data
-    tvdata = core.get_library_data( tvlibraryname, token = token, fullURL = fullURL )
+    tvdata = core.get_library_data(
+        tvlibraryname, token = token, fullURL = fullURL, use_snapshot = True )
     return tvdata, 'SUCCESS'
 
 def show_excluded_shows( tvdata ):
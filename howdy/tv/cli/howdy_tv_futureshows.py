@@ -72,7 +72,7 @@ def main( ):
     #
     ## now get the future TV shows
     tvdata = core.get_library_data(
-        tvlib_title, token = token, fullURL = fullURL )
+        tvlib_title, token = token, fullURL = fullURL, use_snapshot = True )
     showsToExclude = tv.get_shows_to_exclude( tvdata )
     if len( showsToExclude ) != 0:
         step += 1
@@ -87,7 +87,7 @@ def main( ):
     ## now get the TV shows
     tvdata = core.get_library_data(
         tvlib_title, token = token,
-        fullURL = fullURL, num_threads = 16 )
+        fullURL = fullURL, num_threads = 16, use_snapshot = True )
     showsToExclude = tv.get_shows_to_exclude( tvdata )
     if len( showsToExclude ) != 0:
         step += 1
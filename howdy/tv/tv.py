@@ -1,19 +1,25 @@
-import requests, os, sys, json, re, logging
+import os, sys, json, re, logging
 import datetime, time, numpy, copy, calendar, shutil
 import pathos.multiprocessing as multiprocessing
 from matplotlib.figure import Figure
 from matplotlib.patches import Rectangle, Ellipse
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Lock, Condition, Event, Thread
 from functools import reduce
 from dateutil.relativedelta import relativedelta
 from rapidfuzz.fuzz import ratio
 from nprstuff.core import autocrop_image
 #
-from howdy.tv import get_token, tv_torrents, ShowsToExclude, tv_attic
-from howdy.core import core_rsync, splitall, session, return_error_raw
+from howdy.tv import get_token, get_tvdb_client, tv_torrents, ShowsToExclude, tv_attic, TVDBSeriesCache
+from howdy.core import core_rsync, core_deluge, core_torrents, splitall, session, return_error_raw, get_image_cache
 from howdy.movie import movie
 
+_tvdb_image_ttl = datetime.timedelta( days = 30 )
+_tvdb_search_ttl = datetime.timedelta( days = 7 )
+
 class TVShow( object ):
     """
     A convenience object that stores TV show information for a TV show. This provides a higher level object oriented implementation of the lower level pure method implementation of manipulating TV show data.
@@ -23,6 +29,7 @@ class TVShow( object ):
     :param str token: the TVDB_ API access token.
     :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
     :param bool showSpecials: optional argument. If ``True``, then also collect information on TV specials associated with this TV show. Default is ``False``.
+    :param dict seriesCacheInfo: optional argument, the TVDB_ series ID and status of this show, as returned by :py:meth:`refresh_series_cache <howdy.tv.tv.refresh_series_cache>`. If ``None``, then they are found with :py:meth:`refresh_series_cache <howdy.tv.tv.refresh_series_cache>`.
     
     :var int seriesId:  the TVDB_ series ID.
     :var str seriesName: the series name,
@@ -47,7 +54,7 @@ class TVShow( object ):
         :param str token: optional argument. The TVDB_ API access token.
         :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
         :param debug False: optional argument. If ``True``, run with :py:const:`DEBUG <logging.DEBUG>` :py:mod:`logging` mode. Default is ``False``.
-        :param int num_threads: the number of threads over which to parallelize this calculation. The default is *twice* the number of cores on the CPU.
+        :param int num_threads: the maximum number of concurrent TVDB_ lookups. The default is *twice* the number of cores on the CPU.
 
         :returns: a :py:class:`dict`, whose keys are the TV show names and whose values are the :py:class:`TVShow <howdy.tv.tv.TVShow>` associated with that TV show.
         :rtype: dict
@@ -55,14 +62,18 @@ class TVShow( object ):
         time0 = time.time( )
         assert( num_threads > 0 )
         if token is None: token = get_token( verify = verify )
+        series_cache = refresh_series_cache(
+            tvdata, token = token, verify = verify, num_threads = num_threads )
         def _create_tvshow( seriesName ):
             try: return ( seriesName,
                           TVShow( seriesName, tvdata[ seriesName ],
-                                  token, verify = verify ) )
+                                  token, verify = verify,
+                                  seriesCacheInfo = series_cache[ seriesName ] ) )
             except: return None
-        with multiprocessing.Pool(
-                processes = max( num_threads, multiprocessing.cpu_count( ) ) ) as pool:
+        client = get_tvdb_client( verify )
+        with ThreadPoolExecutor( max_workers = num_threads ) as pool:
             tvshow_dict = dict(filter(None, pool.map(_create_tvshow, sorted( tvdata )[:60] ) ) )
+            client.flush( )
             mystr = 'took %0.3f seconds to get a dictionary of %d / %d TV Shows.' % (
                 time.time( ) - time0, len( tvshow_dict ), len( tvdata ) )
             logging.debug( mystr )
@@ -77,10 +88,8 @@ class TVShow( object ):
 
     @classmethod
     def _get_series_seasons( cls, seriesId, token, verify = True ):
-        headers = { 'Content-Type' : 'application/json',
-                    'Authorization' : 'Bearer %s' % token }
-        response = requests.get( 'https://api.thetvdb.com/series/%d/episodes/summary' % seriesId,
-                                 headers = headers, verify = verify )
+        response = get_tvdb_client( verify ).get(
+            '/series/%d/episodes/summary' % seriesId, token )
         if response.status_code != 200:
             return None
         data = response.json( )['data']
@@ -89,14 +98,17 @@ class TVShow( object ):
         return sorted( map(lambda tok: int(tok), data['airedSeasons'] ) )
         
     def __init__( self, seriesName, seriesInfo, token, verify = True,
-                  showSpecials = False ):
-        self.seriesId = get_series_id( seriesName, token, verify = verify )
+                  showSpecials = False, seriesCacheInfo = None ):
+        if seriesCacheInfo is None:
+            seriesCacheInfo = refresh_series_cache(
+                { seriesName : seriesInfo }, token = token, verify = verify )[ seriesName ]
+        self.seriesId = seriesCacheInfo[ 'seriesid' ]
         self.seriesName = seriesName
         if self.seriesId is None:
             raise ValueError("Error, could not find TV Show named %s." % seriesName )
         #
         ## check if status ended
-        self.statusEnded = did_series_end( self.seriesId, token, verify = verify )
+        self.statusEnded = seriesCacheInfo[ 'didend' ]
         if self.statusEnded is None:
             self.statusEnded = True # yes, show ended
             #raise ValueError("Error, could not find whether TV Show named %s ended or not." %
@@ -272,9 +284,8 @@ class TVSeason( object ):
         self.img = None
         if status == 'SUCCESS':
             try:
-                response = requests.get( self.imageURL )
-                if response.status_code == 200:
-                    self.img = PIL.Image.open( io.BytesIO( response.content ) )
+                self.img = PIL.Image.open( io.BytesIO(
+                    get_image_cache( ).get( self.imageURL, verify = verify ) ) )
             except: pass
         #
         ## now get the specific episodes for that season
@@ -582,11 +593,8 @@ def get_possible_ids( series_name, tvdb_token, verify = True ):
     .. _`The Simpsons`: https://en.wikipedia.org/wiki/The_Simpsons
     """
     params = { 'name' : series_name.replace("'", '') }
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/search/series',
-                             params = params, headers = headers,
-                             verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/search/series', tvdb_token, params = params, ttl = _tvdb_search_ttl )
     if response.status_code == 200:
         data = response.json( )[ 'data' ]
         return list(map(lambda dat: {
@@ -595,11 +603,8 @@ def get_possible_ids( series_name, tvdb_token, verify = True ):
     # quick hack to get this to work
     ## was a problem with show AQUA TEEN HUNGER FORCE FOREVER
     params = { 'name' : ' '.join( series_name.replace("'", '').split()[:-1] ) }
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/search/series',
-                             params = params, headers = headers,
-                             verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/search/series', tvdb_token, params = params, ttl = _tvdb_search_ttl )
     if response.status_code == 200:
         data = response.json( )[ 'data' ]
         return list(map(lambda dat: {
@@ -614,9 +619,8 @@ def get_possible_ids( series_name, tvdb_token, verify = True ):
         return return_error_raw( 'Error, could not find TMDB ids for %s.' % series_name )
     tot_data = [ ]
     for imdb_id in imdb_ids:
-        response = requests.get(
-            'https://api.thetvdb.com/search/series',
-            params = { 'imdbId' : imdb_id }, headers = headers, verify = verify )
+        response = get_tvdb_client( verify ).get(
+            '/search/series', tvdb_token, params = { 'imdbId' : imdb_id }, ttl = _tvdb_search_ttl )
         if response.status_code != 200: continue
         data = response.json( )[ 'data' ]
         for dat in data:
@@ -627,24 +631,9 @@ def get_possible_ids( series_name, tvdb_token, verify = True ):
     #
     return return_error_raw( 'Error, could not find series ids for %s.' % series_name )
 
-def did_series_end( series_id, tvdb_token, verify = True, date_now = None ):
-    """
-    Check on shows that have ended more than 365 days from the last day.
-    
-    :param int series_id: the TVDB_ database series ID.
-    :param str tvdb_token: the TVDB_ API access token.
-    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
-    :param date date_now: an optional specific last :py:class:`date <datetime.date>` to describe when a show was deemed to have ended. That is, if a show has not aired any episodes more than 365 days before ``date_now``, then define the show as ended. By default, ``date_now`` is the current date.
-
-    :returns: ``True`` if the show is "ended," otherwise ``False``.
-    :rtype: bool
-
-    :raise ValueError: if we get a 200 response, but the response does not contain JSON data.
-    """
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d' % series_id,
-                             headers = headers, verify = verify )
+def _get_series_status( series_id, tvdb_token, verify = True ):
+    response = get_tvdb_client( verify ).get(
+        '/series/%d' % series_id, tvdb_token )
     if response.status_code != 200:
       logging.debug( 'was not able to get series info. status_code = %d. tvdb_token = %s. series_id = %d.' % (
         response.status_code, tvdb_token, series_id ) )
@@ -652,18 +641,161 @@ def did_series_end( series_id, tvdb_token, verify = True, date_now = None ):
     try:
         data = response.json( )['data']
         
-        if data['status'] != 'Ended': return False
+        if data['status'] != 'Ended': return data['status'], None
         #
         ## now check when the last date of the show was
-        if date_now is None: date_now = datetime.datetime.now( ).date( )
         last_date = max(map(lambda epdata: datetime.datetime.strptime(
             epdata['firstAired'], '%Y-%m-%d' ).date( ),
                             get_episodes_series( series_id, tvdb_token, verify = verify, showSpecials = False ) ) )
-        td = date_now - last_date
-        return td.days > 365
+        return data['status'], last_date
     except:
         raise ValueError("Error, no JSON in the response for show with TVDB ID = %d." % series_id )
 
+def _did_series_end_status( status, last_date, date_now = None ):
+    if status != 'Ended': return False
+    if last_date is None: return True
+    if date_now is None: date_now = datetime.datetime.now( ).date( )
+    td = date_now - last_date
+    return td.days > 365
+
+def did_series_end( series_id, tvdb_token, verify = True, date_now = None ):
+    """
+    Check on shows that have ended more than 365 days from the last day.
+    
+    :param int series_id: the TVDB_ database series ID.
+    :param str tvdb_token: the TVDB_ API access token.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param date date_now: an optional specific last :py:class:`date <datetime.date>` to describe when a show was deemed to have ended. That is, if a show has not aired any episodes more than 365 days before ``date_now``, then define the show as ended. By default, ``date_now`` is the current date.
+
+    :returns: ``True`` if the show is "ended," otherwise ``False``.
+    :rtype: bool
+
+    :raise ValueError: if we get a 200 response, but the response does not contain JSON data.
+
+    .. seealso:: :py:meth:`refresh_series_cache <howdy.tv.tv.refresh_series_cache>`.
+    """
+    status_tup = _get_series_status( series_id, tvdb_token, verify = verify )
+    if status_tup is None: return None
+    status, last_date = status_tup
+    return _did_series_end_status( status, last_date, date_now = date_now )
+
+#
+## series IDs rarely change. Ended shows rarely come back, continuing shows may end any day
+_series_id_ttl = datetime.timedelta( days = 180 )
+_series_notfound_ttl = datetime.timedelta( days = 7 )
+_series_ended_ttl = datetime.timedelta( days = 90 )
+_series_continuing_ttl = datetime.timedelta( days = 1 )
+
+def get_series_cache( ):
+    """
+    Returns the TVDB_ series IDs and statuses of TV shows, stored in the ``tvdbseriescache`` table in the SQLite3_ configuration database (see :py:class:`TVDBSeriesCache <howdy.tv.TVDBSeriesCache>`). Some of these may be stale.
+
+    :returns: a :py:class:`dict` whose keys are the show names, and whose values are :py:class:`dict`\ s with keys ``seriesid``, ``idfetched``, ``status``, ``lastaired``, and ``statusfetched``, the columns of the ``tvdbseriescache`` table.
+    :rtype: dict
+
+    .. seealso:: :py:meth:`refresh_series_cache <howdy.tv.tv.refresh_series_cache>`.
+    """
+    return dict(map(lambda val: ( val.show, {
+        'seriesid' : val.seriesid,
+        'idfetched' : val.idfetched,
+        'status' : val.status,
+        'lastaired' : val.lastaired,
+        'statusfetched' : val.statusfetched } ),
+                    session.query( TVDBSeriesCache ) ) )
+
+def refresh_series_cache( tvdata, token = None, verify = True, num_threads = 2 * multiprocessing.cpu_count( ),
+                          do_status = True, force = False, date_now = None ):
+    """
+    Returns the TVDB_ series ID, and whether it ended, of each TV show in the Plex_ TV library. Only the stale entries in the ``tvdbseriescache`` table (see :py:class:`TVDBSeriesCache <howdy.tv.TVDBSeriesCache>`) are looked up again, concurrently, and then stored. A series ID is stale after 180 days (7 days if it was not found, or immediately if the Plex_ server now gives a different TVDB_ ID). A series ID lookup that fails leaves the stored entry alone, and the status of a series whose ID did not change is kept. A status is stale after 90 days if the series ended, otherwise after 1 day. This must be called from the main thread.
+
+    :param dict tvdata: the Plex_ TV library information returned by :py:meth:`get_library_data <howdy.core.core.get_library_data>`.
+    :param str token: optional TVDB_ API access token. If ``None``, then gets the TVDB_ API access token with :py:meth:`get_token <howdy.tv.get_token>`.
+    :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
+    :param int num_threads: the maximum number of concurrent TVDB_ lookups. The default is *twice* the number of cores on the CPU.
+    :param bool do_status: if ``True``, then also refresh whether each show ended. Default is ``True``.
+    :param bool force: if ``True``, then look up every show again. Default is ``False``.
+    :param date date_now: an optional specific last :py:class:`date <datetime.date>` to describe when a show was deemed to have ended. See :py:meth:`did_series_end <howdy.tv.tv.did_series_end>`.
+
+    :returns: a :py:class:`dict` whose keys are the show names in ``tvdata``, and whose values are :py:class:`dict`\ s with keys ``seriesid`` (the TVDB_ series ID, or ``None`` if not found), ``status``, ``lastaired``, and ``didend`` (``True`` if the show ended, ``None`` if that could not be found).
+    :rtype: dict
+    """
+    time0 = time.time( )
+    if token is None: token = get_token( verify = verify )
+    get_tvdb_client( verify )
+    cache = get_series_cache( )
+    time_now = datetime.datetime.now( )
+    def _is_id_stale( show ):
+        if force or show not in cache or cache[ show ][ 'idfetched' ] is None: return True
+        if 'tvdbid' in tvdata[ show ]: return cache[ show ][ 'seriesid' ] != tvdata[ show ][ 'tvdbid' ]
+        if cache[ show ][ 'seriesid' ] is None: return time_now - cache[ show ][ 'idfetched' ] > _series_notfound_ttl
+        return time_now - cache[ show ][ 'idfetched' ] > _series_id_ttl
+    def _is_status_stale( show ):
+        if show in shows_id_changed: return True
+        if cache[ show ][ 'seriesid' ] is None: return False
+        if cache[ show ][ 'statusfetched' ] is None: return True
+        if cache[ show ][ 'status' ] == 'Ended': ttl = _series_ended_ttl
+        else: ttl = _series_continuing_ttl
+        return time_now - cache[ show ][ 'statusfetched' ] > ttl
+    #
+    ## the last element is False if the lookup failed, rather than found no series
+    def _get_series_id( show ):
+        if 'tvdbid' in tvdata[ show ]: return show, tvdata[ show ][ 'tvdbid' ], True
+        try: return show, get_series_id( show, token, verify = verify ), True
+        except Exception as e:
+            logging.info( 'problem getting series id of %s, error = %s.' % ( show, str( e ) ) )
+            return show, None, False
+    def _get_status( show ):
+        try: return show, _get_series_status( cache[ show ][ 'seriesid' ], token, verify = verify )
+        except Exception as e:
+            logging.info( 'problem getting status of %s, error = %s.' % ( show, str( e ) ) )
+            return show, None
+    #
+    shows_id_stale = set( filter( _is_id_stale, tvdata ) )
+    shows_id_fetched = set( )
+    shows_id_changed = set( )
+    with ThreadPoolExecutor( max_workers = num_threads ) as pool:
+        for show, seriesid, did_fetch in pool.map( _get_series_id, shows_id_stale ):
+            #
+            ## a failed lookup keeps what is stored, so it is tried again next time
+            if not did_fetch:
+                if show not in cache: cache[ show ] = {
+                        'seriesid' : None, 'idfetched' : None,
+                        'status' : None, 'lastaired' : None, 'statusfetched' : None }
+                continue
+            shows_id_fetched.add( show )
+            if show in cache and cache[ show ][ 'seriesid' ] == seriesid:
+                cache[ show ][ 'idfetched' ] = time_now
+                continue
+            shows_id_changed.add( show )
+            cache[ show ] = {
+                'seriesid' : seriesid, 'idfetched' : time_now,
+                'status' : None, 'lastaired' : None, 'statusfetched' : None }
+        shows_status_stale = set( )
+        if do_status:
+            shows_status_stale = set( filter( _is_status_stale, tvdata ) )
+            for show, status_tup in pool.map(
+                    _get_status, filter(lambda show: cache[ show ][ 'seriesid' ] is not None,
+                                        shows_status_stale ) ):
+                if status_tup is None: continue
+                cache[ show ][ 'status' ], cache[ show ][ 'lastaired' ] = status_tup
+                cache[ show ][ 'statusfetched' ] = time_now
+    for show in shows_id_fetched | shows_status_stale:
+        session.merge( TVDBSeriesCache( show = show, **cache[ show ] ) )
+    session.commit( )
+    get_tvdb_client( verify ).flush( )
+    logging.debug( 'refreshed %d series IDs and %d statuses of %d series, in %0.3f seconds.' % (
+        len( shows_id_fetched ), len( shows_status_stale ), len( tvdata ), time.time( ) - time0 ) )
+    #
+    def _get_didend( show ):
+        if cache[ show ][ 'seriesid' ] is None: return None
+        if cache[ show ][ 'statusfetched' ] is None: return None
+        return _did_series_end_status( cache[ show ][ 'status' ], cache[ show ][ 'lastaired' ], date_now = date_now )
+    return dict(map(lambda show: ( show, {
+        'seriesid' : cache[ show ][ 'seriesid' ],
+        'status' : cache[ show ][ 'status' ],
+        'lastaired' : cache[ show ][ 'lastaired' ],
+        'didend' : _get_didend( show ) } ), tvdata ) )
+
 def get_imdb_id( series_id, tvdb_token, verify = True ):
     """
     Returns the IMDb_ string ID given a TVDB_ series ID, otherwise return ``None`` if show's IMDb_ ID cannot be found.
@@ -677,10 +809,8 @@ def get_imdb_id( series_id, tvdb_token, verify = True ):
     
     .. _IMDb: https://en.wikipedia.org/wiki/IMDb
     """
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d' % series_id,
-                             headers = headers, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d' % series_id, tvdb_token )
     logging.debug( 'STATUS CODE OF get_imdb_id( %d, %s, %s ) = %d.' % (
         series_id, tvdb_token, verify, response.status_code ) )
     if response.status_code != 200: return None
@@ -703,10 +833,8 @@ def get_episode_id( series_id, airedSeason, airedEpisode, tvdb_token, verify = T
     params = { 'page' : 1,
                'airedSeason' : '%d' % airedSeason,
                'airedEpisode' : '%d' % airedEpisode }
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d/episodes/query' % series_id,
-                             params = params, headers = headers, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d/episodes/query' % series_id, tvdb_token, params = params )
     if response.status_code != 200: return None
     data = max( response.json( )[ 'data' ] )
     return data[ 'id' ]
@@ -727,10 +855,8 @@ def get_episode_name( series_id, airedSeason, airedEpisode, tvdb_token, verify =
     params = { 'page' : 1,
                'airedSeason' : '%d' % airedSeason,
                'airedEpisode' : '%d' % airedEpisode }
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d/episodes/query' % series_id,
-                             params = params, headers = headers, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d/episodes/query' % series_id, tvdb_token, params = params )
     if response.status_code != 200: return None
     data = max( response.json( )[ 'data' ] )
     try:
@@ -784,10 +910,8 @@ def get_series_info( series_id, tvdb_token, verify = True ):
       Otherwise an error tuple returned by :py:meth:`return_error_raw <howdy.core.return_error_raw>`.
     :rtype: tuple
     """
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d' % series_id,
-                             headers = headers, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d' % series_id, tvdb_token )
     if response.status_code != 200: return return_error_raw( "COULD NOT ACCESS TV INFO SERIES" )
     data = response.json( )[ 'data' ]
     return data, 'SUCCESS'
@@ -812,10 +936,8 @@ def get_series_image( series_id, tvdb_token, verify = True ):
 
     .. seealso:: :py:meth:`get_series_season_image <howdy.tv.tv.get_series_season_image>`.
     """
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d/images/query/params' % series_id,
-                             headers = headers, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d/images/query/params' % series_id, tvdb_token, ttl = _tvdb_image_ttl )
     if response.status_code != 200: return return_error_raw( "COULD NOT ACCESS IMAGE URL FOR SERIES" )
     data = response.json( )['data']
     #
@@ -827,8 +949,8 @@ def get_series_image( series_id, tvdb_token, verify = True ):
         params = { 'keyType' : 'poster' }
         if 'resolution' in poster_one and len( poster_one['resolution'] ) != 0:
             params['resolution'] = poster_one['resolution'][0]
-        response = requests.get( 'https://api.thetvdb.com/series/%d/images/query' % series_id,
-                                 headers = headers, params = params, verify = verify )
+        response = get_tvdb_client( verify ).get(
+            '/series/%d/images/query' % series_id, tvdb_token, params = params, ttl = _tvdb_image_ttl )
         if response.status_code == 200:
             data = response.json( )['data']
             firstPoster = data[0]
@@ -844,8 +966,8 @@ def get_series_image( series_id, tvdb_token, verify = True ):
         params = { 'keyType' : 'fanart' }
         if 'resolution' in fanart_one and len( fanart_one['resolution'] ) != 0:
             params['resolution'] = fanart_one['resolution'][0]
-        response = requests.get( 'https://api.thetvdb.com/series/%d/images/query' % series_id,
-                                 headers = headers, params = params, verify = verify )
+        response = get_tvdb_client( verify ).get(
+            '/series/%d/images/query' % series_id, tvdb_token, params = params, ttl = _tvdb_image_ttl )
         if response.status_code == 200:
             data = response.json( )['data']
             firstFanart = data[0]
@@ -862,8 +984,8 @@ def get_series_image( series_id, tvdb_token, verify = True ):
         params = { 'keyType' : 'series' }
         if 'resolution' in series_one and len( series_one['resolution'] ) != 0:
             params['resolution'] = series_one['resolution'][0]
-        response = requests.get( 'https://api.thetvdb.com/series/%d/images/query' % series_id,
-                                 headers = headers, params = params, verify = verify )
+        response = get_tvdb_client( verify ).get(
+            '/series/%d/images/query' % series_id, tvdb_token, params = params, ttl = _tvdb_image_ttl )
         logging.info( 'response status code = %s. params = %s.' % (
             response.status_code, params ) )
         if response.status_code == 200:
@@ -898,10 +1020,8 @@ def get_series_season_image( series_id, airedSeason, tvdb_token, verify = True )
 
     .. _`The Simpsons, season 10`: https://en.wikipedia.org/wiki/The_Simpsons_(season_10)
     """
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d/images/query/params' % series_id,
-                             headers = headers, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d/images/query/params' % series_id, tvdb_token, ttl = _tvdb_image_ttl )
     if response.status_code != 200:
         return return_error_raw( "COULD NOT FIND IMAGES FOR SERIES_ID = %d" % series_id )
     data = response.json( )['data']
@@ -920,8 +1040,8 @@ def get_series_season_image( series_id, airedSeason, tvdb_token, verify = True )
     params = { 'keyType' : 'season', 'subKey' : '%d' % airedSeason }
     #if 'resolution' in season_one and len( season_one[ 'resolution' ] ) != 0:
     #    params[ 'resolution' ] = season_one[ 'resolution' ][ 0 ]
-    response = requests.get( 'https://api.thetvdb.com/series/%d/images/query' % series_id,
-                             headers = headers, params = params, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d/images/query' % series_id, tvdb_token, params = params, ttl = _tvdb_image_ttl )
     if response.status_code != 200:
         return return_error_raw(
             "COULD NOT GET PROPER IMAGE FROM VALID IMAGE QUERY FOR SERIES_ID = %d AND SEASON = %d" % (
@@ -956,24 +1076,23 @@ def get_episodes_series( series_id, tvdb_token, showSpecials = True, fromDate =
     .. _TVDB: https://api.thetvdb.com/swagger
     """
     params = { 'page' : 1 }
-    headers = { 'Content-Type' : 'application/json',
-                'Authorization' : 'Bearer %s' % tvdb_token }
-    response = requests.get( 'https://api.thetvdb.com/series/%d/episodes' % series_id,
-                             params = params, headers = headers, verify = verify )
+    response = get_tvdb_client( verify ).get(
+        '/series/%d/episodes' % series_id, tvdb_token, params = params )
     if response.status_code != 200:
         logging.debug( 'could not get episodes for series_id = %d.' % series_id )
         return None
     data = response.json( )
     links = data[ 'links' ]
     lastpage = links[ 'last' ]
-    seriesdata = data[ 'data' ]
-    for pageno in range( 2, lastpage + 1 ):
-        response = requests.get( 'https://api.thetvdb.com/series/%d/episodes' % series_id,
-                                 params = { 'page' : pageno }, headers = headers,
-                                 verify = verify )
-        if response.status_code != 200: continue
-        data = response.json( )
-        seriesdata += data[ 'data' ]
+    #
+    ## get the remaining pages concurrently
+    responses = get_tvdb_client( verify ).map(
+        lambda pageno: get_tvdb_client( verify ).get(
+            '/series/%d/episodes' % series_id, tvdb_token, params = { 'page' : pageno } ),
+        range( 2, lastpage + 1 ) )
+    seriesdata = list( chain.from_iterable(
+        [ data[ 'data' ] ] + list( map(lambda response: response.json( )[ 'data' ],
+                                       filter(lambda response: response.status_code == 200, responses ) ) ) ) )
     currentDate = datetime.datetime.now( ).date( )
     sData = [ ]
     logging.debug( 'get_episodes_series: %s' % seriesdata )
@@ -1198,97 +1317,68 @@ def get_all_series_didend(
 
     :param dict tvdata: the Plex_ TV library information returned by :py:meth:`get_library_data <howdy.core.core.get_library_data>`.
     :param bool verify: optional argument, whether to verify SSL connections. Default is ``True``.
-    :param int num_threads: the number of threads over which to parallelize this calculation. The default is *twice* the number of cores on the CPU.
+    :param int num_threads: the maximum number of concurrent TVDB_ lookups. The default is *twice* the number of cores on the CPU.
     :param str tvdb_token: optional TVDB_ API access token. If ``None``, then gets the TVDB_ API access token with :py:meth:`get_token <howdy.tv.get_token>`.
     
     :returns: the :py:class:`dict` of TV shows on the Plex_ server and whether each has ended or not.
     :type: dict
     """
     time0 = time.time( )
-    if tvdb_token is None: tvdb_token = get_token( verify = verify )
-    with multiprocessing.Pool(
-            processes = max(num_threads, multiprocessing.cpu_count( ) ) ) as pool:
-        date_now = datetime.datetime.now( ).date( )
-        tvshow_id_list = list(map(lambda seriesName: ( seriesName, tvdata[ seriesName ][ 'tvdbid' ] ),
-                                  filter(lambda seriesName: 'tvdbid' in tvdata[ seriesName ], tvdata ) ) )
-        tvshow_id_list_2 = list(filter(
-            None, pool.map(lambda seriesName: (
-                seriesName, get_series_id( seriesName, tvdb_token, verify = verify ) ),
-                           filter(lambda seriesName: 'tvdbid' not in tvdata[ seriesName ], tvdata ) ) ) )
-        tvshow_id_map = dict( tvshow_id_list + tvshow_id_list_2 )
-        tvshows_notfound = set( tvdata ) - set( tvshow_id_map )
-        tvid_didend_map = dict(filter(
-            lambda tup: tup is not None,
-            pool.map(lambda seriesName: (
-                tvshow_id_map[ seriesName ],
-                did_series_end( tvshow_id_map[ seriesName ], tvdb_token, verify = verify,
-                                date_now = date_now ) ),
-                     tvshow_id_map ) ) )
-        didend_map = { seriesName : tvid_didend_map[ tvshow_id_map[ seriesName ] ] for
-                       seriesName in tvshow_id_map }
-        for seriesName in tvshows_notfound:
-            didend_map[ seriesName ] = True
-        logging.debug( 'processed %d series to check if they ended, in %0.3f seconds.' % (
-            len( tvdata ), time.time( ) - time0 ) )
-        return didend_map                                
-    
-def _get_remaining_eps_perproc( input_tuple ):
-    time0 = time.time( )
-    name = input_tuple[ 'name' ]
-    series_id = input_tuple[ 'series_id' ]
-    epsForShow = input_tuple[ 'epsForShow' ]
-    token = input_tuple[ 'token' ]
-    showSpecials = input_tuple[ 'showSpecials' ]
-    fromDate = input_tuple[ 'fromDate' ]
-    verify = input_tuple[ 'verify' ]
-    showFuture = input_tuple[ 'showFuture' ]
-    mustHaveTitle = input_tuple[ 'mustHaveTitle' ]
+    series_cache = refresh_series_cache(
+        tvdata, token = tvdb_token, verify = verify, num_threads = num_threads )
     #
-    ## only record those episodes that have an episodeName that is not None
-    try:
-        if mustHaveTitle:
-            eps = list(
-                filter(lambda ep: 'episodeName' in ep and ep['episodeName'] is not None,
-                    get_episodes_series(
-                        series_id, token, showSpecials = showSpecials, verify = verify,
-                        fromDate = fromDate, showFuture = showFuture ) ) )
-        else:
-            eps = get_episodes_series(
-                series_id, token, showSpecials = showSpecials, verify = verify,
-                fromDate = fromDate, showFuture = showFuture )
-    except:
-        return None
-    tvdb_eps = set(map(lambda ep: ( ep['airedSeason'], ep['airedEpisodeNumber' ] ), eps ) )
-    tvdb_eps_dict = { ( ep['airedSeason'], ep['airedEpisodeNumber' ] ) :
-                      ( ep['airedSeason'], ep['airedEpisodeNumber' ], ep['episodeName'] ) for ep in eps }
-    here_eps = set([ ( seasno, epno ) for seasno in epsForShow for
-                     epno in epsForShow[ seasno ][ 'episodes' ] ] )
-    tuples_to_get = tvdb_eps - here_eps
-    if len( tuples_to_get ) == 0: return None
-    tuples_to_get_act = list(map(lambda tup: tvdb_eps_dict[ tup ], tuples_to_get ) )
-    logging.debug( 'finished processing %s in %0.3f seconds.' % ( name, time.time( ) - time0 ) )
-    return name, sorted( tuples_to_get_act, key = lambda tup: (tup[0], tup[1]))
-
-def _get_series_id_perproc( input_tuple ):
-    show = input_tuple[ 'show' ]
-    token = input_tuple[ 'token' ]
-    verify = input_tuple[ 'verify' ]
-    doShowEnded = input_tuple[ 'doShowEnded' ]
-    try:
-        if 'tvdbid' not in input_tuple:
-            series_id = get_series_id( show, token, verify = verify )
-        else: series_id = input_tuple[ 'tvdbid' ]
-        if series_id is None:
-            logging.info( 'something happened with show %s' % show )
-            return None
-        if not doShowEnded:
-            didEnd = did_series_end( series_id, token, verify = verify )
-            if didEnd is None or didEnd: return None
-        return show, series_id
-    except Exception as e:
-        print( 'problem getting %s, error = %s.' % ( show, str( e ) ) )
-        return None
+    ## shows not found count as ended
+    didend_map = dict(map(lambda seriesName: (
+        seriesName, series_cache[ seriesName ][ 'didend' ] if
+        series_cache[ seriesName ][ 'seriesid' ] is not None else True ), tvdata ) )
+    logging.debug( 'processed %d series to check if they ended, in %0.3f seconds.' % (
+        len( tvdata ), time.time( ) - time0 ) )
+    return didend_map
     
+def _pack_episode_keys( show_index, seasno_epnos ):
+    #
+    ## one int64 per episode: show index << 32 | season << 16 | episode. Episodes without
+    ## a season or episode number, such as some specials and unaired episodes, are skipped
+    seasno_epnos = numpy.array( list( filter(lambda tup: None not in tup, seasno_epnos ) ),
+                                dtype = numpy.int64 ).reshape( -1, 2 )
+    return ( numpy.int64( show_index ) << 32 ) | ( seasno_epnos[:,0] << 16 ) | seasno_epnos[:,1]
+
+def get_missing_episodes( plex_seasons_dict, tvdb_episodes_dict ):
+    """
+    Finds the episodes that TVDB_ has, but that are missing from the Plex_ TV library, for many TV shows in one vectorized pass. Each episode is packed into one 64-bit integer, from its show, season, and episode numbers, so that the difference is one :py:meth:`isin <numpy.isin>` over all shows.
+
+    :param dict plex_seasons_dict: a :py:class:`dict` whose keys are the TV shows, and whose values are their ``seasons`` in the Plex_ TV library information returned by :py:meth:`get_library_data <howdy.core.core.get_library_data>`.
+    :param dict tvdb_episodes_dict: a :py:class:`dict` whose keys are the TV shows, and whose values are the :py:class:`list` of their TVDB_ episodes, as returned by :py:meth:`get_episodes_series <howdy.tv.tv.get_episodes_series>`.
+
+    :returns: a :py:class:`dict` whose keys are the TV shows with missing episodes, and whose values are the sorted :py:class:`list` of missing episodes. Each missing episode is a :py:class:`tuple` of the form ``( SEASON #, EPISODE #, EPISODE NAME )``.
+    :rtype: dict
+    """
+    shows = sorted( set( plex_seasons_dict ) & set( tvdb_episodes_dict ) )
+    if len( shows ) == 0: return { }
+    episode_names = { }
+    tvdb_keys = [ ]
+    plex_keys = [ ]
+    for show_index, show in enumerate( shows ):
+        eps = list(filter(lambda ep: ep[ 'airedSeason' ] is not None and ep[ 'airedEpisodeNumber' ] is not None,
+                          tvdb_episodes_dict[ show ] ) )
+        keys = _pack_episode_keys( show_index, map(lambda ep: ( ep[ 'airedSeason' ], ep[ 'airedEpisodeNumber' ] ), eps ) )
+        episode_names.update( zip( keys.tolist( ), map(lambda ep: ep[ 'episodeName' ], eps ) ) )
+        tvdb_keys.append( keys )
+        seasons = plex_seasons_dict[ show ]
+        plex_keys.append( _pack_episode_keys( show_index, chain.from_iterable(
+            map(lambda seasno: map(lambda epno: ( seasno, epno ), seasons[ seasno ][ 'episodes' ] ),
+                seasons ) ) ) )
+    tvdb_keys = numpy.unique( numpy.concatenate( tvdb_keys ) )
+    plex_keys = numpy.concatenate( plex_keys )
+    missing_keys = tvdb_keys[ numpy.isin( tvdb_keys, plex_keys, invert = True ) ]
+    #
+    ## keys are sorted, so each show's missing episodes are sorted by season and episode
+    missing = { }
+    for key in missing_keys.tolist( ):
+        missing.setdefault( shows[ key >> 32 ], [ ] ).append(
+            ( ( key >> 16 ) & 0xffff, key & 0xffff, episode_names[ key ] ) )
+    return missing
+
 def get_remaining_episodes(
         tvdata, showSpecials = True, fromDate = None, verify = True,
         doShowEnded = False, showsToExclude = None, showFuture = False,
@@ -1307,7 +1397,7 @@ def get_remaining_episodes(
     :param bool doShowEnded: if ``True``, then also look for missing episodes from shows that have ended. Default is ``False``.
     :param list showsToExclude: the list of TV shows on the Plex_ server to ignore. Default is to not ignore any TV show.
     :param bool showFuture: if ``True``, then also include missing episodes that have not aired yet. Default is ``False``.
-    :param int num_threads: the number of threads over which to parallelize this calculation. The default is *twice* the number of cores on the CPU.
+    :param int num_threads: the maximum number of concurrent TVDB_ lookups. The default is *twice* the number of cores on the CPU.
     :param str token: optional TVDB_ API access token. If ``None``, then gets the TVDB_ API access token with :py:meth:`get_token <howdy.tv.get_token>`.
     :param bool mustHaveTitle: sometimes new episodes are registered in TVDB_ but without titles. Functionality to download missing episodes to the Plex_ server (see, e.g., :ref:`get_tv_batch`) fails if the episode does not have a name. If ``True``, then ignore new episodes that do not have titles. Default is ``True``.
     
@@ -1355,22 +1445,17 @@ def get_remaining_episodes(
     """
     assert( num_threads >= 1 )
     if token is None: token = get_token( verify = verify )
-    tvdata_copy = copy.deepcopy( tvdata )
-    if showsToExclude is not None:
-        showsExclude = set( showsToExclude ) & set( tvdata_copy.keys( ) )
-        for show in showsExclude: tvdata_copy.pop( show )
-    with multiprocessing.Pool( processes = max( num_threads, multiprocessing.cpu_count( ) ) ) as pool:
-        input_tuples = list(
-            map(lambda show: {
-                'show' : show, 'token' : token, 'verify' : verify, 'doShowEnded' : doShowEnded,
-                'tvdbid' : tvdata_copy[ show ][ 'tvdbid' ] },
-                filter(lambda show: 'tvdbid' in tvdata_copy[ show ], tvdata_copy ) ) )
-        input_tuples_2 = list(
-            map(lambda show: {
-                'show' : show, 'token' : token, 'verify' : verify, 'doShowEnded' : doShowEnded },
-                filter(lambda show: 'tvdbid' not in tvdata_copy[ show ], tvdata_copy ) ) )
-        tvshow_id_map = dict(filter(
-            None, pool.map( _get_series_id_perproc, input_tuples + input_tuples_2 ) ) )
+    client = get_tvdb_client( verify )
+    #
+    ## no copy of tvdata, only the names of the shows to look at
+    shows = set( tvdata )
+    if showsToExclude is not None: shows -= set( showsToExclude )
+    series_cache = refresh_series_cache(
+        dict(map(lambda show: ( show, tvdata[ show ] ), shows ) ), token = token, verify = verify,
+        num_threads = num_threads, do_status = not doShowEnded )
+    tvshow_id_map = dict(map(lambda show: ( show, series_cache[ show ][ 'seriesid' ] ), filter(
+        lambda show: series_cache[ show ][ 'seriesid' ] is not None and (
+            doShowEnded or series_cache[ show ][ 'didend' ] is False ), shows ) ) )
         
     #if fromDate is not None:
     #    series_ids = set( get_series_updated_fromdate( fromDate, token ) )
@@ -1379,22 +1464,30 @@ def get_remaining_episodes(
     #                           tvshow_id_map.items( ) ) )
     #    updated_ids = set( ids_tvshows.keys( ) ) & series_ids
     #    tvshow_id_map = dict(map(lambda series_id: ( ids_tvshows[ series_id ], series_id ), updated_ids ) )
-    tvshows = sorted( set( tvshow_id_map ) )
-    input_tuples = list(
-        map(lambda name:
-            { 'name' : name,
-              'token' : token,
-              'showSpecials' : showSpecials,
-              'fromDate' : fromDate,
-              'verify' : verify,
-              'series_id' : tvshow_id_map[ name ],
-              'showFuture' : showFuture,
-              'mustHaveTitle' : mustHaveTitle,
-              'epsForShow' : tvdata_copy[ name ][ 'seasons' ] }, tvshow_id_map ) )
-    with multiprocessing.Pool(
-            processes = max(num_threads, multiprocessing.cpu_count( ) ) ) as pool:
-        toGet_sub = dict( filter(
-            None, pool.map( _get_remaining_eps_perproc, input_tuples ) ) )
+    #
+    ## get the TVDB episodes concurrently, then find what is missing in one pass
+    def _get_tvdb_episodes( name ):
+        try:
+            eps = get_episodes_series(
+                tvshow_id_map[ name ], token, showSpecials = showSpecials, verify = verify,
+                fromDate = fromDate, showFuture = showFuture )
+        except: return None
+        if eps is None: return None
+        #
+        ## only record those episodes that have an episodeName that is not None
+        if mustHaveTitle:
+            eps = list( filter(lambda ep: 'episodeName' in ep and ep['episodeName'] is not None, eps ) )
+        return name, eps
+    time0 = time.time( )
+    with ThreadPoolExecutor( max_workers = num_threads ) as pool:
+        tvdb_episodes_dict = dict( filter(
+            None, pool.map( _get_tvdb_episodes, sorted( tvshow_id_map ) ) ) )
+    toGet_sub = get_missing_episodes(
+        dict(map(lambda show: ( show, tvdata[ show ][ 'seasons' ] ), tvdb_episodes_dict ) ),
+        tvdb_episodes_dict )
+    logging.debug( 'found missing episodes in %d of %d shows in %0.3f seconds.' % (
+        len( toGet_sub ), len( tvdb_episodes_dict ), time.time( ) - time0 ) )
+    client.flush( )
     #
     ## guard code for now -- only include those tv shows that have titles of new episodes to download
     if mustHaveTitle:
@@ -1467,7 +1560,7 @@ def get_future_info_shows( tvdata, verify = True, showsToExclude = None, token =
     :param list showsToExclude: the list of TV shows on the Plex_ server to ignore. Default is to not ignore any TV show.
     :param str token: optional TVDB_ API access token. If ``None``, then gets the TVDB_ API access token with :py:meth:`get_token <howdy.tv.get_token>`.
     :param date fromDate: optional start :py:class:`date <datetime.date>` *after* which to search for new episodes. That is, if defined then only look for future episodes aired on or after this date. If not defined, then look for *any* aired episode to be aired after the current date.
-    :param int num_threads: the number of threads over which to parallelize this calculation. The default is *twice* the number of cores on the CPU.
+    :param int num_threads: the maximum number of concurrent TVDB_ lookups. The default is *twice* the number of cores on the CPU.
     
     :returns: a :py:class:`dict` of TV shows that will start airing new episodes. An example output of this method is shown here,
     
@@ -1525,7 +1618,7 @@ def get_future_info_shows( tvdata, verify = True, showsToExclude = None, token =
             return show, max_last_season, min_next_season, date_min
         except: return None
 
-    with multiprocessing.Pool( processes = num_threads ) as pool:
+    with ThreadPoolExecutor( max_workers = num_threads ) as pool:
         future_shows_dict = dict(
             map(lambda tup:
                 ( tup[0], { 'max_last_season' : tup[1],
@@ -1535,6 +1628,7 @@ def get_future_info_shows( tvdata, verify = True, showsToExclude = None, token =
                        pool.map(
                         get_new_season_start, map(lambda show_max_min: (
                             show_max_min[0], show_max_min[1], show_max_min[2], verify ), shows_to_include ) ) ) ) )
+        get_tvdb_client( verify ).flush( )
         logging.info( 'found detailed info on %d shows with a new season: %s.' % (
             len( future_shows_dict ), sorted( future_shows_dict ) ) )
         return future_shows_dict
@@ -1605,6 +1699,7 @@ def create_tvTorUnits( toGet, restrictMaxSize = True, restrictMinSize = True,
       * ``maxSize`` is the maximum size, in MB, of the H264_ encoded MP4 or MKV episode file to search for.
       * ``maxSize_x265`` is the maximum size, in MB, of the `H265/HEVC`_ encoded MP4 or MKV episode file to search for. By default this is smaller than ``maxSize``.
       * ``tvshow`` is the name of the TV show to which this missing episode belongs.
+      * ``avg_length_mins`` is the average length, in minutes, of the episodes of this TV show. The size limits come from it through :py:meth:`get_torrent_size_limits <howdy.core.core_torrents.get_torrent_size_limits>`, and :py:class:`TorrentCandidateRanker <howdy.core.core_torrents.TorrentCandidateRanker>` uses it to rank candidates.
       * ``do_raw`` is a :py:class:`boolean <bool>` flag. If ``True``, then search for this missing episode through the Jackett_ server using available IMDb_ information. If ``False``, then do a raw text search on ``torFname`` to find episode Magnet links.
 
       For example, here is a representation of a missing episode that will be fed to the Deluge_ server for download.
@@ -1619,6 +1714,7 @@ def create_tvTorUnits( toGet, restrictMaxSize = True, restrictMinSize = True,
            'minSize_x265': 200,
            'maxSize_x265': 650,
            'tvshow': 'The Great British Bake Off',
+           'avg_length_mins': 52.0,
            'do_raw': False
            }
 
@@ -1659,17 +1755,9 @@ def create_tvTorUnits( toGet, restrictMaxSize = True, restrictMinSize = True,
         episode_number_length = mydict[ 'episode_number_length' ]
         avg_length_mins = mydict[ 'avg_length_mins']
         #
-        ## calc minsize from avg_length_mins
-        num_in_50 = int( avg_length_mins * 60.0 * 700 / 8.0 / 1024 / 50 + 1)
-        minSize = 50 * num_in_50
-        num_in_50 = int( avg_length_mins * 60.0 * 500 / 8.0 / 1024 / 50 + 1)
-        minSize_x265 = 50 * num_in_50
-        ##
-        ## calc maxsize from avg_length_mins
-        num_in_50 = int( avg_length_mins * 60.0 * 2000 / 8.0 / 1024 / 50 + 1 )
-        maxSize = 50 * num_in_50
-        num_in_50 = int( avg_length_mins * 60.0 * 1600 / 8.0 / 1024 / 50 + 1 )
-        maxSize_x265 = 50 * num_in_50
+        ## calc minsize and maxsize from avg_length_mins
+        minSize, maxSize, minSize_x265, maxSize_x265 = core_torrents.get_torrent_size_limits(
+            avg_length_mins )
         if not restrictMaxSize:
             maxSize *= 10
             maxSize_x265 *= 10
@@ -1693,6 +1781,7 @@ def create_tvTorUnits( toGet, restrictMaxSize = True, restrictMinSize = True,
                     'minSize' : minSize, 'maxSize' : maxSize,
                     'minSize_x265' : minSize_x265, 'maxSize_x265' : maxSize_x265,
                     'tvshow' : tvshow,
+                    'avg_length_mins' : avg_length_mins,
                     'do_raw' : do_raw }
                 
             if not os.path.isdir( candDir ):
@@ -1706,8 +1795,168 @@ def create_tvTorUnits( toGet, restrictMaxSize = True, restrictMinSize = True,
                  tv_torrent_gets[ 'newdirs' ] ) ) ) )
     return tvTorUnits, sorted( tv_torrent_gets[ 'newdirs' ].keys( ) )
 
+#
+## the maximum number of episodes in flight at once; the scheduler's budgets limit the actual work
+_max_batch_threads = 64
+
+class _ConcurrencyBudget( object ):
+    #
+    ## a counting budget that also tracks how many threads are waiting on it
+    def __init__( self, name, capacity ):
+        assert( capacity > 0 ), "error, capacity of %s budget must be > 0." % name
+        self.name = name
+        self.capacity = capacity
+        self.in_use = 0
+        self.waiting = 0
+        self._cond = Condition( )
+
+    def acquire( self, amount = 1, blocking = True ):
+        #
+        ## returns the amount reserved, which is at most the capacity, or 0 if not blocking and none is free
+        amount = min( amount, self.capacity )
+        with self._cond:
+            if not blocking and self.in_use + amount > self.capacity: return 0
+            self.waiting += 1
+            try:
+                while self.in_use + amount > self.capacity: self._cond.wait( )
+            finally: self.waiting -= 1
+            self.in_use += amount
+            return amount
+
+    def release( self, amount = 1 ):
+        with self._cond:
+            self.in_use = max( 0, self.in_use - amount )
+            self._cond.notify_all( )
+
+    @contextmanager
+    def __call__( self, amount = 1 ):
+        amount = self.acquire( amount )
+        try: yield amount
+        finally: self.release( amount )
+
+class TVBatchScheduler( object ):
+    """
+    Enforces separate concurrency budgets on the stages that batch TV downloads (see :py:meth:`download_batched_tvtorrent_shows <howdy.tv.tv.download_batched_tvtorrent_shows>`) go through, so that each episode moves through the stages on its own, and each stage runs only as much work as the resource behind it can take.
+
+    * searches for Magnet links on the torrent services.
+    * torrents downloading at the same time on the Deluge_ server.
+    * disk space used on the seedbox, in MB, by downloading torrents and finished episodes not yet transferred. Each torrent reserves its size, or the maximum size of its episode if unknown.
+    * transfers of finished episodes from the remote SSH server.
+
+    While running, it periodically prints how much of each budget is used, and how many episodes are waiting on each.
+
+    :param int max_searches: optional argument, the maximum number of episodes searching for Magnet links at the same time. Default is 4.
+    :param int max_torrents: optional argument, the maximum number of torrents downloading at the same time. Default is 8.
+    :param float disk_quota: optional argument, the maximum disk space, in MB, to use on the seedbox. Default is 50000 MB.
+    :param int max_transfers: optional argument, the maximum number of transfers at the same time. Default is 4.
+    :param float report_interval: optional argument, the number of seconds between reports. If ``None``, then do not report. Default is 60 seconds.
+
+    :var dict budgets: the budgets, keyed by ``search``, ``torrent``, ``disk``, and ``transfer``.
+
+    .. _Deluge: https://en.wikipedia.org/wiki/Deluge_(software)
+    """
+    def __init__( self, max_searches = 4, max_torrents = 8, disk_quota = 50000,
+                  max_transfers = 4, report_interval = 60 ):
+        self.budgets = {
+            'search'   : _ConcurrencyBudget( 'search', max_searches ),
+            'torrent'  : _ConcurrencyBudget( 'torrent', max_torrents ),
+            'disk'     : _ConcurrencyBudget( 'disk', disk_quota ),
+            'transfer' : _ConcurrencyBudget( 'transfer', max_transfers ) }
+        self.report_interval = report_interval
+        self.num_total = 0
+        self.num_finished = 0
+        self._lock = Lock( )
+        self._held_disk = { }
+        self._stop = Event( )
+        self._thread = None
+
+    def search( self ):
+        """
+        :returns: a context manager that holds one slot of the ``search`` budget.
+        """
+        return self.budgets[ 'search' ]( )
+
+    def transfer( self ):
+        """
+        :returns: a context manager that holds one slot of the ``transfer`` budget.
+        """
+        return self.budgets[ 'transfer' ]( )
+
+    def start_torrent( self, size, blocking = True ):
+        """
+        Reserves one slot of the ``torrent`` budget, and ``size`` MB of the ``disk`` budget, for a new torrent.
+
+        :param float size: the size, in MB, of the torrent.
+        :param bool blocking: optional argument. If ``True`` (the default), then wait until both are free. If ``False``, then reserve nothing and return if either is not free.
+
+        :returns: the disk space, in MB, that is reserved, to pass to :py:meth:`stop_torrent <howdy.tv.tv.TVBatchScheduler.stop_torrent>`. If nothing is reserved, then ``None``.
+        """
+        if self.budgets[ 'torrent' ].acquire( 1, blocking = blocking ) == 0: return None
+        disk = self.budgets[ 'disk' ].acquire( max( size, 1 ), blocking = blocking )
+        if disk == 0:
+            self.budgets[ 'torrent' ].release( 1 )
+            return None
+        return disk
+
+    def stop_torrent( self, disk, keep_disk_for = None ):
+        """
+        Releases the slot of the ``torrent`` budget, and the disk space, of a torrent that has finished or been removed.
+
+        :param float disk: the disk space, in MB, returned by :py:meth:`start_torrent <howdy.tv.tv.TVBatchScheduler.start_torrent>`.
+        :param str keep_disk_for: optional argument. If not ``None``, then keep the disk space reserved for this episode until :py:meth:`release_disk <howdy.tv.tv.TVBatchScheduler.release_disk>` is called, because its finished file is still on the seedbox.
+        """
+        self.budgets[ 'torrent' ].release( 1 )
+        if keep_disk_for is None:
+            self.budgets[ 'disk' ].release( disk )
+            return
+        with self._lock:
+            self._held_disk[ keep_disk_for ] = self._held_disk.get( keep_disk_for, 0 ) + disk
+
+    def release_disk( self, torFname ):
+        """
+        Releases the disk space kept for an episode, once its finished file has left the seedbox.
+
+        :param str torFname: the episode's search string, such as ``'The Simpsons S31E01'``.
+        """
+        with self._lock: disk = self._held_disk.pop( torFname, 0 )
+        if disk > 0: self.budgets[ 'disk' ].release( disk )
+
+    def finish_episode( self ):
+        """
+        Counts one more episode that has gone through all the stages, whether or not it succeeded.
+        """
+        with self._lock: self.num_finished += 1
+
+    def report( self ):
+        """
+        :returns: a one line summary of the finished episodes, and of the use of, and the episodes waiting on, each budget.
+        :rtype: str
+        """
+        budget_strings = list(map(lambda name: '%s: %s / %s used, %d waiting' % (
+            name, '%0.0f' % self.budgets[ name ].in_use, '%0.0f' % self.budgets[ name ].capacity,
+            self.budgets[ name ].waiting ), ( 'search', 'torrent', 'disk', 'transfer' ) ) )
+        return 'finished %d / %d episodes; %s.' % (
+            self.num_finished, self.num_total, '; '.join( budget_strings ) )
+
+    def _run( self ):
+        while not self._stop.wait( self.report_interval ):
+            print( self.report( ) )
+
+    def __enter__( self ):
+        if self.report_interval is not None:
+            self._stop.clear( )
+            self._thread = Thread( target = self._run, daemon = True )
+            self._thread.start( )
+        return self
+
+    def __exit__( self, *args ):
+        self._stop.set( )
+        if self._thread is not None: self._thread.join( )
+        self._thread = None
+
 def download_batched_tvtorrent_shows( tvTorUnits, newdirs = [ ], maxtime_in_secs = 240, num_iters = 10,
-                                      do_raw = False ):
+                                      do_raw = False, bwlimit = None, journal = None,
+                                      scheduler = None ):
     """
     Engine backend code, used by :ref:`get_tv_batch`, that searches for Magnet links for missing episodes on the Jackett_ server, downloads the Magnet links using the Deluge_ server, and finally copies the downloaded missing episodes to the appropriate locations in the Plex_ TV library. This expects the :py:class:`tuple` input returned by :py:meth:`create_tvTorUnits <howdy.tv.tv.create_tvTorUnits>` to run.
 
@@ -1716,6 +1965,9 @@ def download_batched_tvtorrent_shows( tvTorUnits, newdirs = [ ], maxtime_in_secs
     :param int maxtime_in_secs: optional argument, the maximum time to wait for a Magnet link found by the Jackett_ server to fully download through the Deluge_ server. Must be :math:`\ge 60` seconds. Default is 240 seconds.
     :param int num_iters: optional argument, the maximum number of Magnet links to try and fully download before giving up. The list of Magnet links to try for each missing episode is ordered from *most* seeders + leechers to *least*. Must be :math:`\ge 1`. Default is 10.
     :param bool do_raw: if ``False``, then search for Magnet links of missing episodes using their IMDb_ information. If ``True``, then search using the raw string. Default is ``False``.
+    :param float bwlimit: optional argument, the maximum total rate, in kB/s, at which to download the finished episodes from the remote SSH server. If ``None`` (the default), then there is no limit.
+    :param TVBatchJournal journal: optional argument, the :py:class:`TVBatchJournal <howdy.tv.TVBatchJournal>` into which to record the state of each episode as it changes. If it comes from an earlier run that did not finish, then those episodes that are ``done`` are skipped, those that are ``tagged`` or ``transferred`` are not downloaded again, and those that are ``downloading`` re-attach to their torrents on the Deluge_ server. If ``None`` (the default), then nothing is recorded.
+    :param TVBatchScheduler scheduler: optional argument, the :py:class:`TVBatchScheduler <howdy.tv.tv.TVBatchScheduler>` whose budgets limit the concurrent searches, torrents, seedbox disk space, and transfers. Each episode goes through searching, downloading, and transferring on its own, so that some episodes transfer while others still search or download. If ``None`` (the default), then use a :py:class:`TVBatchScheduler <howdy.tv.tv.TVBatchScheduler>` with its default budgets.
 
     .. seealso::
     
@@ -1729,33 +1981,115 @@ def download_batched_tvtorrent_shows( tvTorUnits, newdirs = [ ], maxtime_in_secs
     assert( data is not None ), "error, could not get rsync download settings."
     assert( maxtime_in_secs >= 60 ), "error, max time to download each torrent >= 60 seconds."
     assert( num_iters >= 1 ), "error, number of tries on different magnet links >= 1."
+    if scheduler is None: scheduler = TVBatchScheduler( )
+    #
+    ## the state of each episode from an earlier run, if resuming
+    episode_states = { }
+    if journal is not None:
+        episode_states = dict(filter(lambda tup: tup[ 1 ] is not None, map(
+            lambda tvTorUnit: ( tvTorUnit[ 'torFname' ], journal.get_episode( tvTorUnit[ 'torFname' ] ) ),
+            tvTorUnits ) ) )
+        tvTorUnits_done = list(filter(lambda tvTorUnit: episode_states.get(
+            tvTorUnit[ 'torFname' ], { } ).get( 'state' ) == 'done', tvTorUnits ) )
+        if len( tvTorUnits_done ) != 0:
+            print( 'already finished %d / %d episodes in an earlier run.' % (
+                len( tvTorUnits_done ), len( tvTorUnits ) ) )
+        tvTorUnits = list(filter(lambda tvTorUnit: tvTorUnit not in tvTorUnits_done, tvTorUnits ) )
     print( 'started downloading %d episodes on %s' % (
         len( tvTorUnits ), datetime.datetime.now( ).strftime(
             '%B %d, %Y @ %I:%M:%S %p' ) ) )
         
     for newdir in filter(lambda nd: not os.path.isdir( nd ), newdirs ):
         os.mkdir( newdir )
-    def worker_process_download_tvtorrent_perproc( tvTorUnit ):
+    #
+    ## one Deluge connection and one status poll, shared by all the episodes
+    client, status = core_deluge.get_deluge_client( )
+    assert( client is not None ), status
+    monitor = core_deluge.DelugeTorrentMonitor( client )
+    #
+    ## one pool of threads and HTTP connections for all the torrent searches
+    aggregator = core_torrents.TorrentSearchAggregator( )
+    #
+    ## read the ranking configuration here, not from the threads that rank the candidates
+    ranker = core_torrents.TorrentCandidateRanker(
+        config = core_torrents.get_torrent_ranking_config( ) )
+    #
+    ## one pool of persistent SSH connections for all the remote commands and file transfers
+    transfer_pool, status = core_rsync.get_transfer_pool(
+        num_connections = scheduler.budgets[ 'transfer' ].capacity, bwlimit = bwlimit )
+    assert( transfer_pool is not None ), status
+    local_dir = data[ 'local_dir' ].strip( )
+    remote_dir = data[ 'subdir' ] if data[ 'subdir' ] is not None else ''
+    def get_tvTorUnitFin( tvTorUnit, remoteFileName ):
+        tvTorUnitFin = copy.deepcopy( tvTorUnit )
+        tvTorUnitFin['remoteFileName'] = remoteFileName
+        suffix = remoteFileName.split('.')[-1].strip( )
+        tvTorUnitFin[ 'totFname' ] = '%s.%s' % ( tvTorUnit[ 'totFname' ], suffix )
+        return tvTorUnitFin
+    #
+    ## first stage: search, download, and tag the episode on the seedbox
+    def download_episode( tvTorUnit ):
+        torFname = tvTorUnit[ 'torFname' ]
+        episode = episode_states.get( torFname, { } )
+        #
+        ## already on the remote SSH server, or on the Plex server, from an earlier run
+        if episode.get( 'state' ) in ( 'tagged', 'transferred' ):
+            return get_tvTorUnitFin( tvTorUnit, episode[ 'remotefilename' ] )
+        torrent_ids = [ ]
+        if episode.get( 'state' ) == 'downloading': torrent_ids = episode[ 'torrentids' ]
+        dat, status_dict = tv_torrents.worker_process_download_tvtorrent(
+            tvTorUnit, maxtime_in_secs = maxtime_in_secs, num_iters = num_iters,
+            kill_if_fail = True, monitor = monitor, aggregator = aggregator,
+            transfer_pool = transfer_pool, torrent_ids = torrent_ids, journal = journal,
+            scheduler = scheduler, ranker = ranker )
+        if dat is None: # could not download this
+            if journal is not None:
+                journal.set_episode( torFname, 'failed', message = status_dict[ 'message' ] )
+            return None
+        if journal is not None:
+            journal.set_episode( torFname, 'tagged', remotefilename = dat )
+        return get_tvTorUnitFin( tvTorUnit, dat )
+    #
+    ## second stage: transfer the episode to the Plex server, and move it into the TV library
+    def transfer_episode( tvTorUnitFin ):
+        torFname = tvTorUnitFin[ 'torFname' ]
+        remote_path = os.path.join( remote_dir, tvTorUnitFin[ 'remoteFileName' ] )
+        lfilename = os.path.join( local_dir, tvTorUnitFin[ 'remoteFileName' ] )
+        state = episode_states.get( torFname, { } ).get( 'state' )
+        if state != 'transferred' or not os.path.isfile( lfilename ):
+            with scheduler.transfer( ):
+                status, message = transfer_pool.download( remote_path, lfilename, numtries = 10 )
+            logging.info( '%s: %s, %s' % ( remote_path, status, message ) )
+            if status != 'SUCCESS': return False
+        scheduler.release_disk( torFname )
+        if not os.path.isfile( lfilename ): return False
+        # modification time
+        mtime = os.path.getmtime( lfilename )
+        dat = datetime.datetime.fromtimestamp( mtime ).date( )
+        if dat.year == 1969: return False
+        if journal is not None: journal.set_episode( torFname, 'transferred' )
+        shutil.move( lfilename, tvTorUnitFin[ 'totFname' ] )
+        if journal is not None: journal.set_episode( torFname, 'done' )
+        return True
+    #
+    ## each episode goes through both stages on its own, limited only by the scheduler's budgets
+    def process_episode( tvTorUnit ):
         try:
-            dat, status_dict = tv_torrents.worker_process_download_tvtorrent(
-                tvTorUnit, maxtime_in_secs = maxtime_in_secs, num_iters = num_iters,
-                kill_if_fail = True )
-            if dat is None: return tvTorUnit[ 'torFname' ] # could not download this
-            tvTorUnitFin = copy.deepcopy( tvTorUnit )
-            tvTorUnitFin['remoteFileName'] = dat
-            suffix = dat.split('.')[-1].strip( )
-            tvTorUnitFin[ 'totFname' ] = '%s.%s' % ( tvTorUnit[ 'totFname' ], suffix )
+            tvTorUnitFin = download_episode( tvTorUnit )
+            if tvTorUnitFin is None: return tvTorUnit[ 'torFname' ]
+            if not transfer_episode( tvTorUnitFin ): return tvTorUnit[ 'torFname' ]
             return tvTorUnitFin
         except Exception as e:
             import traceback
             return 'filename = %s, error_message = %s, %s' % (
                 tvTorUnit[ 'torFname' ], str( e ), traceback.print_tb( e.__traceback__ ) )
-    #
-    ## now create a pool to multiprocess collect those episodes
-    with multiprocessing.Pool( processes = min(
-            multiprocessing.cpu_count( ), len( tvTorUnits ) ) ) as pool:
-        allTvTorUnits = list( pool.map(
-            worker_process_download_tvtorrent_perproc, tvTorUnits ) )
+        finally:
+            scheduler.release_disk( tvTorUnit[ 'torFname' ] )
+            scheduler.finish_episode( )
+    scheduler.num_total = len( tvTorUnits )
+    with transfer_pool, scheduler, monitor, aggregator, ThreadPoolExecutor(
+            max_workers = max( 1, min( _max_batch_threads, len( tvTorUnits ) ) ) ) as pool:
+        allTvTorUnits = list( pool.map( process_episode, tvTorUnits ) )
     successfulTvTorUnits = list(filter(lambda tup: not isinstance( tup, str ),
                                        allTvTorUnits ) )
     could_not_download = list(filter(lambda tup: isinstance( tup, str ),
@@ -1771,42 +2105,7 @@ def download_batched_tvtorrent_shows( tvTorUnits, newdirs = [ ], maxtime_in_secs
     else:
         print( 'successfully processed %d / %d episodes in %0.3f seconds.' % (
             len( successfulTvTorUnits ), len( tvTorUnits ), time.time( ) - time0 ) )
-        
-    #
-    ## now rsync those files over
-    if len( successfulTvTorUnits ) == 0:
-        print( 'processed from start to finish in %0.3f seconds.' % ( time.time( ) - time0 ) )
-        return
-    time1 = time.time( )
-    suffixes = set(map(lambda tvTorUnit: tvTorUnit[ 'remoteFileName' ].split('.')[-1].strip( ),
-                       successfulTvTorUnits ) )
-    all_glob_strings = list(map(lambda suffix: '*.%s' % suffix, suffixes ) )
-    for glob_string in all_glob_strings:
-        core_rsync.download_upload_files(
-            glob_string, numtries = 100, debug_string = True )
-    #
-    ## now check all the files downloaded
-    local_dir = data[ 'local_dir' ].strip( )
-    def did_cleanly_download( tvTorUnit ):
-        lfilename = os.path.join( local_dir, tvTorUnit[ 'remoteFileName' ] )
-        if not os.path.isfile( lfilename ): return False
-        # modification time
-        mtime = os.path.getmtime( lfilename )
-        dat = datetime.datetime.fromtimestamp( mtime ).date( )
-        if dat.year == 1969: return False
-        return True
-    successfulTvTorUnits = list(filter( did_cleanly_download, successfulTvTorUnits ) )
-    print( 'these %d / %d tv torrents cleanly downloaded in %0.3f seconds.' % (
-        len( successfulTvTorUnits ), len( tvTorUnits ), time.time( ) - time1 ) )
-    #
-    ## now move those files that have successfully downloaded into their final destinations
-    time2 = time.time( )
-    for tvTorUnit in successfulTvTorUnits:
-        shutil.move( os.path.join( local_dir, tvTorUnit[ 'remoteFileName' ] ),
-                     tvTorUnit[ 'totFname' ] )
-    print( 'these %d files moved to correct destinations in %0.3f seconds.' % (
-        len( successfulTvTorUnits ), time.time( ) - time2 ) )
-    print( 'processed from start to finish in %0.3f seconds.' % ( time.time( ) - time0 ) )
+    print( scheduler.report( ) )
     
 def get_tot_epdict_tvdb(
     showName, verify = True, showSpecials = False,
@@ -67,7 +67,7 @@ class HowdyTVGUIThread( ProgressDialogThread ):
         if self.tvdata_on_plex is None:
             self.tvdata_on_plex = core.get_library_data(
                 library_name, fullURL = self.fullURL, token = self.token,
-                num_threads = self.num_threads )
+                num_threads = self.num_threads, use_snapshot = True )
         if self.tvdata_on_plex is None:
             raise ValueError( 'Error, could not find TV shows on the server.' )
         mytxt = '2, loaded TV data from Plex server in %0.3f seconds.' % (
@@ -230,9 +230,9 @@ class HowdyTVGUI( QDialogWithPrinting ):
         return html.prettify( ), html2.prettify( )
 
     @classmethod
-    def getSummaryImg( cls, imageURL, token ):
+    def getSummaryImg( cls, imageURL, token, width = None ):
         if imageURL is None: return None
-        return core.get_pic_data( imageURL, token )
+        return core.get_pic_data( imageURL, token, width = width )
 
     def processTVShow( self, seriesName ):
         assert( seriesName in self.tvdata_on_plex )
@@ -242,9 +242,11 @@ class HowdyTVGUI( QDialogWithPrinting ):
                 seriesName, self.tvdata_on_plex, self.missing_eps )
             
         if seriesName not in self.showImages:
+            #
+            ## the width shown, so that the Plex server resizes the image
             self.showImages[ seriesName ] = HowdyTVGUI.getSummaryImg(
                 self.tvdata_on_plex[ seriesName ][ 'picurl' ],
-                self.token )
+                self.token, width = max( 1, int( self.size( ).width( ) * 0.95 ) ) )
 
         showSummary, showSummaryOverview = self.summaryShowInfo[ seriesName ]
         showImg = self.showImages[ seriesName ]
@@ -1,4 +1,4 @@
-import copy, numpy, sys, requests
+import copy, numpy, sys
 import logging, datetime
 import io, PIL.Image, base64
 from bs4 import BeautifulSoup
@@ -7,7 +7,7 @@ from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 #
 from howdy.tv import tv
-from howdy.core import core, QDialogWithPrinting, QLabelWithSave
+from howdy.core import core, QDialogWithPrinting, QLabelWithSave, get_image_cache
 from howdy.core import get_formatted_size, get_formatted_duration
 from howdy.movie import movie
 
@@ -140,8 +140,10 @@ class HowdyTVSeasonGUI( QDialogWithPrinting ):
         self.leftImageWidget.setFixedWidth( 200 )
         if seasonPICURL is not None:
             try:
+                #
+                ## twice the width shown, to leave room for rescaling
                 self.picData = core.get_pic_data(
-                    seasonPICURL, plex_token )
+                    seasonPICURL, plex_token, width = 400 )
                 qpm = QPixmap.fromImage(
                     QImage.fromData( self.picData ) )
                 qpm = qpm.scaledToWidth( 200 )
@@ -154,7 +156,7 @@ class HowdyTVSeasonGUI( QDialogWithPrinting ):
                     plex_tvd_data[ seriesName ][ 'tvdbid' ], 
                     seasno, tvdb_token, verify = verify )
                 if status == 'SUCCESS':
-                    self.picData = requests.get( imgURL, verify = verify ).content
+                    self.picData = get_image_cache( ).get( imgURL, verify = verify )
                     qpm = QPixmap.fromImage(
                         QImage.fromData( self.picData ) )
                     qpm = qpm.scaledToWidth( 200 )
@@ -243,13 +245,15 @@ class HowdyTVSeasonGUI( QDialogWithPrinting ):
             body_elem.append( siz_tag )
         if len(set([ 'picurl', 'plex_token' ]) -
                set( episode ) ) == 0: # not add in the picture
+            img_width = 7.0 / 9 * self.episodeSummaryArea.width( )
             img_content = core.get_pic_data(
-                episode[ 'picurl' ], token = episode[ 'plex_token' ] )
+                episode[ 'picurl' ], token = episode[ 'plex_token' ],
+                width = max( 1, int( img_width ) ) )
             img = PIL.Image.open( io.BytesIO( img_content ) )
             mimetype = PIL.Image.MIME[ img.format ]
             par_img_tag = html.new_tag('p')
             img_tag = html.new_tag( 'img' )
-            img_tag['width'] = 7.0 / 9 * self.episodeSummaryArea.width( )
+            img_tag['width'] = img_width
             img_tag['src'] = "data:%s;base64,%s" % (
                 mimetype, base64.b64encode( img_content ).decode('utf-8') )
             par_img_tag.append( img_tag )
@@ -1,16 +1,16 @@
 import requests, re, threading, cfscrape
-import os, time, numpy, logging, datetime, pickle, gzip
+import os, time, logging, datetime, pickle, gzip
 from bs4 import BeautifulSoup
 from tpb import CATEGORIES, ORDERS
-from itertools import chain
 from requests.compat import urljoin
-from multiprocessing import Process, Manager
-from pathos.multiprocessing import Pool
+from concurrent.futures import wait, FIRST_COMPLETED
+from contextlib import nullcontext
 #
-from howdy.core import core_deluge, get_formatted_size, get_maximum_matchval, return_error_raw, core, core_rsync
+from howdy.core import core_deluge, core_torrents, get_formatted_size, get_maximum_matchval, return_error_raw, core, core_rsync
 from howdy.tv import get_token, tv
 
 _num_to_quit = 10
+_num_to_race = 3
 
 def return_error_couldnotfind( name ):
     """
@@ -27,14 +27,16 @@ def return_error_couldnotfind( name ):
         'Failure, could not find any tv shows with search term %s.' % name )
 
 
+@core_torrents.cache_torrent_search
 def get_tv_torrent_eztv_io( name, maxnum = 10, verify = True, series_name = None,
-                            minsizes = None, maxsizes = None ):
+                            minsizes = None, maxsizes = None, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate episode Magnet links found using the `EZTV.IO`_ torrent service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the episode string on which to search.
     :param int maxnum: optional argument, the maximum number of magnet links to return. Default is 10. Must be :math:`\ge 5`.
     :param bool verify:  optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     :param str series_name: optional argument, the TV show for this episode.
     :param list minsizes: optional :py:class:`list` or :py:class:`tuple` of size at least 2. Here is its meaning if it is not ``None``:
 
@@ -86,7 +88,7 @@ def get_tv_torrent_eztv_io( name, maxnum = 10, verify = True, series_name = None
         return return_error_raw(
             'ERROR, COULD NOT FIND IMDB ID FOR SERIES %s. IMDB ID COULD NOT BE FOUND.' % series_name )
     try:
-      response = requests.get( 'https://eztv.io/api/get-torrents',
+      response = session.get( 'https://eztv.io/api/get-torrents',
                                params = {
                                  'imdb_id' : int( imdb_id.replace('t','')),
                                  'limit' : 100, 'page' : 0 },
@@ -105,7 +107,7 @@ def get_tv_torrent_eztv_io( name, maxnum = 10, verify = True, series_name = None
     all_torrents = alldat[ 'torrents' ]
     for pageno in range( 1, 101 ):
         if alldat[ 'torrents_count' ] < 100: break
-        response = requests.get( 'https://eztv.io/api/get-torrents',
+        response = session.get( 'https://eztv.io/api/get-torrents',
                              params = { 'imdb_id' : int( imdb_id.replace('t','')),
                                         'limit' : 100, 'page' : pageno },
                              verify = verify )
@@ -167,13 +169,15 @@ def get_tv_torrent_eztv_io( name, maxnum = 10, verify = True, series_name = None
                 int( tor['date_released_unix'] ) ).date( ) },
             all_torrents_mine ) ), 'SUCCESS'
 
-def get_tv_torrent_zooqle( name, maxnum = 100, verify = True ):
+@core_torrents.cache_torrent_search
+def get_tv_torrent_zooqle( name, maxnum = 100, verify = True, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate episode Magnet links found using the Zooqle_ torrent service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the episode string on which to search.
     :param int maxnum: optional argument, the maximum number of magnet links to return. Default is 100. Must be :math:`\ge 5`.
     :param bool verify:  optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     
     :returns: if successful, then returns a two member :py:class:`tuple` the first member is a :py:class:`list` of elements that match the searched episode, ordered from *most* seeds and leechers to least. The second element is the string ``"SUCCESS"``. The keys in each element of the list are,
 
@@ -215,7 +219,7 @@ def get_tv_torrent_zooqle( name, maxnum = 100, verify = True ):
     paramurl = '?' + '&'.join(map(lambda tok: '%s=%s' % ( tok, params[ tok ] ),
                                   params ) )
     fullurl = urljoin( url, paramurl )
-    response = requests.get( fullurl, verify = verify )
+    response = session.get( fullurl, verify = verify )
     if response.status_code != 200:
         return return_error_raw(
             'ERROR, COULD NOT FIND ZOOQLE TORRENTS FOR %s' % candname)
@@ -258,13 +262,15 @@ def get_tv_torrent_zooqle( name, maxnum = 100, verify = True ):
     items = sorted( items_toshow, key = lambda item: -item['seeders'] - item['leechers'] )[:maxnum]
     return items, 'SUCCESS'
 
-def get_tv_torrent_rarbg( name, maxnum = 10, verify = True ):
+@core_torrents.cache_torrent_search
+def get_tv_torrent_rarbg( name, maxnum = 10, verify = True, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate episode Magnet links found using the RARBG_ torrent service and the string ``"SUCCESS"``, if successful.
 
     :param str name: the episode string on which to search.
     :param int maxnum: optional argument, the maximum number of magnet links to return. Default is 10. Must be :math:`\ge 5`.
     :param bool verify:  optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     
     :returns: if successful, then returns a two member :py:class:`tuple` the first member is a :py:class:`list` of elements that match the searched episode, ordered from *most* seeds and leechers to least. The second element is the string ``"SUCCESS"``. The keys in each element of the list are,
 
@@ -314,7 +320,7 @@ def get_tv_torrent_rarbg( name, maxnum = 10, verify = True ):
     #
     ## got app_id and apiurl from https://www.rubydoc.info/github/epistrephein/rarbg/master/RARBG/API
     apiurl = "https://torrentapi.org/pubapi_v2.php"
-    response = requests.get(apiurl,
+    response = session.get(apiurl,
                             params={ "get_token": "get_token",
                                      "format": "json",
                                      "app_id": "rarbg-rubygem" }, verify = verify )
@@ -330,7 +336,7 @@ def get_tv_torrent_rarbg( name, maxnum = 10, verify = True ):
     ## wait 4 seconds
     ## this is a diamond hard limit for RARBG
     time.sleep( 4.0 )
-    response = requests.get( apiurl, params = params, verify = verify )
+    response = session.get( apiurl, params = params, verify = verify )
     if response.status_code != 200:
         status = '. '.join([ 'ERROR, problem with rarbg.to: %d' % response.status_code,
                              'Unable to connect to provider.' ])
@@ -363,6 +369,7 @@ def get_tv_torrent_rarbg( name, maxnum = 10, verify = True ):
                 filtered_data ) )
     return items, 'SUCCESS'
 
+@core_torrents.cache_torrent_search
 def get_tv_torrent_torrentz( name, maxnum = 10, verify = True ):
     """
     Returns a :py:class:`tuple` of candidate episode Magnet links found using the Torrentz_ torrent service and the string ``"SUCCESS"``, if successful.
@@ -449,9 +456,10 @@ def get_tv_torrent_torrentz( name, maxnum = 10, verify = True ):
     items = items[:maxnum]
     return items, 'SUCCESS'
 
+@core_torrents.cache_torrent_search
 def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None, keywords = [ ],
                             keywords_exc = [ ], must_have = [ ], verify = True, series_name = None,
-                            raw = False ):
+                            raw = False, session = requests ):
     """
     Returns a :py:class:`tuple` of candidate episode Magnet links found using the main Jackett_ torrent searching service and the string ``"SUCCESS"``, if successful.
 
@@ -471,6 +479,7 @@ def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None,
     :param list kewods_exc: optional argument. If not empty, then reject candidate element if title has any keyword in ``keywords_exc``.
     :param list must_have: optional argument. If not empty, then title of the candidate element must have *all* the keywords in ``must_have``.    
     :param bool verify:  optional argument, whether to verify SSL connections. Default is ``True``.
+    :param session: optional argument, the :py:class:`Session <requests.Session>` with which to make the requests. Default is the :py:mod:`requests` module.
     :param str series_name: optional argument. the TV show for this episode.
     :param bool raw: if ``True``, uses the IMDb_ information to search for the episode. Otherwise, uses the full string in ``name`` to search for the episode.
     
@@ -489,7 +498,6 @@ def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None,
     
     .. _Jackett: https://github.com/Jackett/Jackett
     """
-    import validators
     assert( maxnum >= 5 )
     data = core.get_jackett_credentials( )
     if data is None:
@@ -521,7 +529,7 @@ def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None,
 
     logging.info( 'URL ENDPOINT: %s, PARAMS = %s.' % (
         urljoin( url, endpoint ), _return_params( name ) ) )
-    response = requests.get(
+    response = session.get(
         urljoin( url, endpoint ),
         params = _return_params( name ), verify = verify ) # tv shows
     if response.status_code != 200:
@@ -531,25 +539,6 @@ def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None,
         return return_error_raw( 'FAILURE, NO TV SHOWS OR SERIES SATISFYING CRITERIA FOR GETTING %s' % name )
     items = [ ]
     
-    def _get_magnet_url( item ):
-        magnet_url = item.find( 'torznab:attr', { 'name' : 'magneturl' } )
-        if magnet_url is not None and 'magnet' in magnet_url['value']:
-            return magnet_url['value']
-        #
-        ## not found it here, must go into URL
-        url2 = item.find('guid')
-        if url2 is None: return None
-        url2 = url2.text
-        if not validators.url( url2 ): return None
-        resp2 = requests.get( url2, verify = verify )
-        if resp2.status_code != 200: return None
-        h2 = BeautifulSoup( resp2.content, 'lxml' )
-        valid_magnet_links = set(map(lambda elem: elem['href'],
-                                     filter(lambda elem: 'href' in elem.attrs and 'magnet' in elem['href'],
-                                            h2.find_all('a'))))
-        if len( valid_magnet_links ) == 0: return None
-        return max( valid_magnet_links )
-
     if status is None: last_tok = None
     for item in html('item'):
         title = item.find('title')
@@ -569,14 +558,15 @@ def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None,
         if leechers is None: leechers = -1
         else: leechers = int( leechers[ 'value' ] )
         #
-        ## now do one of two things to get the magnet URL
-        magnet_url = _get_magnet_url( item )
-        if magnet_url is None: continue
+        ## get the magnet URL, or else the page from which to get it later
+        magnet_url, guid = core_torrents.get_jackett_item_link( item )
+        if magnet_url is None and guid is None: continue
         myitem = { 'title' : title,
                    'rawtitle' : title,
                    'seeders' : seeders,
                    'leechers' : leechers,
                    'link' : magnet_url }
+        if magnet_url is None: myitem[ 'guid' ] = guid # resolved later, only if needed
         if torrent_size is not None:
             myitem[ 'title' ] = '%s (%0.1f MiB)' % ( title, torrent_size )
             myitem[ 'torrent_size' ] = torrent_size
@@ -601,7 +591,7 @@ def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None,
             return False
         if maxSize is not None and 'x265' not in item['rawtitle'].lower( ) and item['torrent_size'] >= maxSize:
             return False
-        if maxSize_x265 is not None and 'x265' in item['rawtitle'].lower( ) and item['torrent_size'] >= minSize_x265:
+        if maxSize_x265 is not None and 'x265' in item['rawtitle'].lower( ) and item['torrent_size'] >= maxSize_x265:
             return False
         return True
     
@@ -627,8 +617,14 @@ def get_tv_torrent_jackett( name, maxnum = 10, minsizes = None, maxsizes = None,
     if len( items ) == 0:
         return return_error_raw( 'FAILURE, NO TV SHOWS OR SERIES SATISFYING CRITERIA FOR GETTING %s' % name )
         
-    return items[:maxnum], 'SUCCESS'
+    #
+    ## only now get the magnet links of the top candidates
+    items = core_torrents.resolve_jackett_magnet_links( items, maxnum, session = session, verify = verify )
+    if len( items ) == 0:
+        return return_error_raw( 'FAILURE, NO TV SHOWS OR SERIES SATISFYING CRITERIA FOR GETTING %s' % name )
+    return items, 'SUCCESS'
 
+@core_torrents.cache_torrent_search
 def get_tv_torrent_kickass( name, maxnum = 10, verify = True ):
     """
     Returns a :py:class:`tuple` of candidate episode Magnet links found using the KickAssTorrents_ torrent service and the string ``"SUCCESS"``, if successful.
@@ -719,6 +715,7 @@ def get_tv_torrent_kickass( name, maxnum = 10, verify = True ):
     
     return items_toshow, 'SUCCESS'
 
+@core_torrents.cache_torrent_search
 def get_tv_torrent_tpb( name, maxnum = 10, doAny = False, verify = True ):
     """
     Returns a :py:class:`tuple` of candidate episode Magnet links found using the `The Pirate Bay`_ torrent service and the string ``"SUCCESS"``, if successful.
@@ -833,8 +830,9 @@ def get_tv_torrent_tpb( name, maxnum = 10, doAny = False, verify = True ):
                try_int(d.get('leechers')), reverse=True)
     return items[:maxnum], 'SUCCESS'
 
-def _finish_and_clean_working_tvtorrent_download( totFname, client, torrentId, tor_info ):
-    from fabric import Connection
+def _finish_and_clean_working_tvtorrent_download( totFname, monitor, torrentId, tor_info,
+                                                  transfer_pool = None ):
+    client = monitor.client
     mainDir = 'downloads'
     data = core_rsync.get_credentials( )
     if 'subdir' in data: mainDir = data['subdir']
@@ -842,41 +840,44 @@ def _finish_and_clean_working_tvtorrent_download( totFname, client, torrentId, t
     file_name = os.path.join( 'downloads', media_file[b'path'].decode('utf-8') )
     suffix = os.path.basename( file_name ).split('.')[-1].strip( )
     new_file = os.path.join( mainDir, '%s.%s' % ( os.path.basename( totFname ), suffix ) )
-    uname = client.username
-    password = client.password
-    host = client.host    
-    with Connection( host, user = uname, connect_kwargs =
-                     { 'password' : password } ) as conn:
-        if 'key_filename' in conn.connect_kwargs:
-            conn.connect_kwargs.pop( 'key_filename' )
-        #
-        ## first copy the file from src to destination
-        cmd = 'cp "%s" "%s"' % ( file_name, new_file )
-        try: r = conn.run( cmd, hide = True )
-        except: return return_error_raw(
-                'ERROR, could not properly run %s.' % cmd )
-        cmd = 'chmod 644 "%s"' % new_file
-        try: r = conn.run( cmd, hide = True )
-        except: return return_error_raw(
-                'ERROR, could not properly run %s.' % cmd )
-        #
-        ## if ends in mp4
-        if suffix == 'mp4':
-            cmd = '~/.local/bin/mp4tags -s "" "%s"' % new_file
+    #
+    ## reuse a pooled SSH connection only if it logs into the Deluge server's host as the Deluge user
+    own_pool = transfer_pool is None or ( transfer_pool.hostname, transfer_pool.username ) != (
+        client.host, client.username )
+    if own_pool:
+        transfer_pool = core_rsync.SSHTransferPool(
+            '%s@%s' % ( client.username, client.host ), client.password, num_connections = 1 )
+    try:
+        with transfer_pool.connection( ) as conn:
+            #
+            ## first copy the file from src to destination
+            cmd = 'cp "%s" "%s"' % ( file_name, new_file )
             try: r = conn.run( cmd, hide = True )
             except: return return_error_raw(
-                    'Error, could not properly run %s.' % cmd )
+                    'ERROR, could not properly run %s.' % cmd )
+            cmd = 'chmod 644 "%s"' % new_file
+            try: r = conn.run( cmd, hide = True )
+            except: return return_error_raw(
+                    'ERROR, could not properly run %s.' % cmd )
             #
-            ## check for some ENGLISH srt files. If found, then do the following
-            # 1) locate the SRT file with name ENGLISH in it
-            # 2) if found, then convert file to mkv. Delete old file.
-            # 3) mkvmerge out into a 'defaultXXXX.mkv', then copy over 'defaultXXXX.mkv' to new new file
-            # 4) remove the temporary 'defaultXXXX.mkv' file
-            
-        #
-        ## now delete the deluge connection
-        core_deluge.deluge_remove_torrent( client, [ torrentId ], remove_data = True )
-        return '%s.%s' % ( os.path.basename( totFname ), suffix ), 'SUCCESS'
+            ## if ends in mp4
+            if suffix == 'mp4':
+                cmd = '~/.local/bin/mp4tags -s "" "%s"' % new_file
+                try: r = conn.run( cmd, hide = True )
+                except: return return_error_raw(
+                        'Error, could not properly run %s.' % cmd )
+                #
+                ## check for some ENGLISH srt files. If found, then do the following
+                # 1) locate the SRT file with name ENGLISH in it
+                # 2) if found, then convert file to mkv. Delete old file.
+                # 3) mkvmerge out into a 'defaultXXXX.mkv', then copy over 'defaultXXXX.mkv' to new new file
+                # 4) remove the temporary 'defaultXXXX.mkv' file
+    finally:
+        if own_pool: transfer_pool.close( )
+    #
+    ## now delete the deluge connection
+    monitor.remove_torrent( [ torrentId ], remove_data = True )
+    return '%s.%s' % ( os.path.basename( totFname ), suffix ), 'SUCCESS'
 
 def _create_status_dict( status, status_message, time0 ):
     assert( status in ('SUCCESS', 'FAILURE' ) )
@@ -886,79 +887,132 @@ def _create_status_dict( status, status_message, time0 ):
         'time' : time.time( ) - time0
     }
     
-def _worker_process_tvtorrents( client, data, torFileName, totFname,
-                                maxtime_in_secs, num_iters, kill_if_fail ):
+def _worker_process_tvtorrents( monitor, data, torFileName, totFname,
+                                maxtime_in_secs, num_iters, kill_if_fail,
+                                num_race = _num_to_race, transfer_pool = None,
+                                torrent_ids = [ ], journal = None,
+                                scheduler = None, default_size = 0 ):
     time0 = time.time( )
     failing_reasons = [ ]
-    numiters, rem = divmod( maxtime_in_secs, 30 )
-    if rem != 0: numiters += 1
+    #
+    ## torrents already running on the Deluge server, from an earlier run, go first
+    candidates = list(map(lambda torrentId: {
+        'link' : 'torrent ID = %s' % torrentId, 'torrentId' : torrentId.encode( 'utf-8' ) },
+                          torrent_ids ) ) + data[:min( len( data ), num_iters ) ]
 
     def kill_failing( torrentId ):
         if not kill_if_fail: return
-        core_deluge.deluge_remove_torrent( client, [ torrentId ], remove_data = kill_if_fail )
+        monitor.remove_torrent( [ torrentId ], remove_data = kill_if_fail )
 
-    
-    def process_single_iteration( data, idx ):
-        mag_link = data[ idx ]['link']
+    def record_running( torrentIds ):
+        if journal is None: return
+        journal.set_episode( torFileName, 'downloading', torrentids = list(map(
+            lambda torrentId: torrentId.decode( 'utf-8' ) if isinstance( torrentId, bytes ) else torrentId,
+            torrentIds ) ) )
+
+    #
+    ## reserve and release the scheduler's torrent slots and seedbox disk space
+    def start_torrent( candidate, blocking ):
+        if scheduler is None: return 0
+        try: size = float( candidate.get( 'torrent_size' ) or default_size )
+        except ValueError: size = default_size
+        return scheduler.start_torrent( size, blocking = blocking )
+
+    def stop_torrent( disk, keep_disk_for = None ):
+        if scheduler is None: return
+        scheduler.stop_torrent( disk, keep_disk_for = keep_disk_for )
+
+    #
+    ## each running candidate: future -> ( idx, magnet link, torrent ID, start time, reserved disk )
+    running = { }
+    next_idx = 0
+    while True:
         #
-        ## download the top magnet link
-        torrentId = core_deluge.deluge_add_magnet_file( client, mag_link )
-        if torrentId is None:
-            return None, _create_status_dict(
-                'FAILURE',
-                'could not add idx = %s, magnet_link = %s, for candidate = %s' % (
-                    idx, mag_link, torFileName ), time0 )
-        time00 = time.time( )
-        progresses = [ ]
-        for jdx in range( numiters ):
-            time.sleep( 30 )
-            torrent_info = core_deluge.deluge_get_torrents_info( client )
-            if torrentId not in torrent_info:
-                kill_failing( torrentId )
-                return None, _create_status_dict( 'FAILURE', 'ERROR, COULD NOT GET IDX = %d, TORRENT ID = %s.' % (
-                    idx, torrentId.decode('utf-8').lower()[:6] ), time00 )
-            tor_info = torrent_info[ torrentId ]
-            status = tor_info[ b'state'].decode('utf-8').upper( )
-            progress = tor_info[ b'progress']
-            print( 'after %0.3f seconds, attempt #%d, for %s: status = %s, progress = %0.1f%%' % (
-                time.time( ) - time00, idx + 1, torFileName, status, progress ) )
-            progresses.append( progress )
-            # quit after too many no-progress iterations?
-            if len( progresses ) > _num_to_quit and numpy.allclose( progresses, [ 0.0 ] * len( progresses ) ):
-                kill_failing( torrentId )
-                return None, _create_status_dict(
-                    'FAILURE',
-                    'attempt #%d, magnet_link = %s, for candidate = %s, is probably not downloading' % (
-                        idx, mag_link, torFileName ), time00 )
-            if status in ( 'SEEDING', 'PAUSED' ): # now let's be ambitious and create the new file
-                fullFname, status = _finish_and_clean_working_tvtorrent_download(
-                    totFname, client, torrentId, tor_info )
-                if status != 'SUCCESS':
-                    kill_failing( torrentId )
-                    return None, _create_status_dict( 'FAILURE', status, time0 )
-                return fullFname, _create_status_dict(
-                    'SUCCESS',
-                    'attempt #%d successfully downloaded %s' % (
-                        idx + 1, torFileName ), time00 )
+        ## keep up to num_race candidates downloading at once, if the scheduler allows.
+        ## only wait on the scheduler for the first one, so that finished torrents are not left waiting.
+        num_running = len( running )
+        while len( running ) < max( 1, num_race ) and next_idx < len( candidates ):
+            disk = start_torrent( candidates[ next_idx ], blocking = len( running ) == 0 )
+            if disk is None: break
+            idx = next_idx
+            next_idx += 1
+            mag_link = candidates[ idx ][ 'link' ]
+            torrentId = candidates[ idx ].get( 'torrentId' )
+            if torrentId is None: torrentId = monitor.add_magnet_file( mag_link )
+            if torrentId is None:
+                stop_torrent( disk )
+                failing_reasons.append(
+                    'could not add idx = %s, magnet_link = %s, for candidate = %s' % (
+                        idx, mag_link, torFileName ) )
+                continue
+            fut = monitor.watch(
+                torrentId, name = 'attempt #%d for %s' % ( idx + 1, torFileName ),
+                max_stalled_polls = _num_to_quit )
+            running[ fut ] = ( idx, mag_link, torrentId, time.time( ), disk )
+        if len( running ) != num_running:
+            record_running(map(lambda tup: tup[ 2 ], running.values( ) ) )
+        if len( running ) == 0: break
         #
-        ## did not finish in time
-        kill_failing( torrentId )
-        return None, _create_status_dict(
-            'FAILURE',
-            'failed to download idx = %d, %s after %0.3f seconds' % (
-                idx, torFileName, time.time( ) - time00 ), time00 )
-    for idx in range( min( len( data ), num_iters ) ):
-        dat, status_dict = process_single_iteration( data, idx )
-        if dat is not None:
-            return dat, status_dict
-        failing_reasons.append( status_dict[ 'message' ] )
+        ## wait until one candidate finishes, or the earliest one runs out of time
+        timeout = max( 0.0, min(map(lambda tup: tup[ 3 ] + maxtime_in_secs,
+                                    running.values( ) ) ) - time.time( ) )
+        done, _ = wait( list( running ), timeout = timeout, return_when = FIRST_COMPLETED )
+        winner = None
+        for fut in done:
+            idx, mag_link, torrentId, time00, disk = running.pop( fut )
+            tor_info, status = fut.result( )
+            if status == 'SUCCESS' and winner is None:
+                winner = ( idx, torrentId, tor_info, time00, disk )
+                continue
+            stop_torrent( disk )
+            if status == 'SUCCESS': # a second finished candidate is a loser
+                monitor.remove_torrent( [ torrentId ], remove_data = True )
+                continue
+            kill_failing( torrentId )
+            failing_reasons.append( 'attempt #%d, magnet_link = %s, for candidate = %s: %s' % (
+                idx + 1, mag_link, torFileName, status ) )
+        #
+        ## cancel those candidates that ran out of time
+        for fut in list( running ):
+            idx, mag_link, torrentId, time00, disk = running[ fut ]
+            if winner is None and time.time( ) - time00 < maxtime_in_secs: continue
+            running.pop( fut )
+            fut.cancel( )
+            stop_torrent( disk )
+            if winner is not None: # losing the race
+                monitor.remove_torrent( [ torrentId ], remove_data = True )
+                continue
+            monitor.unwatch( torrentId )
+            kill_failing( torrentId )
+            failing_reasons.append( 'failed to download idx = %d, %s after %0.3f seconds' % (
+                idx, torFileName, time.time( ) - time00 ) )
+        if winner is None: continue
+        #
+        ## now let's be ambitious and create the new file
+        idx, torrentId, tor_info, time00, disk = winner
+        record_running( [ torrentId ] )
+        fullFname, status = _finish_and_clean_working_tvtorrent_download(
+            totFname, monitor, torrentId, tor_info, transfer_pool = transfer_pool )
+        if status != 'SUCCESS':
+            stop_torrent( disk )
+            kill_failing( torrentId )
+            return None, _create_status_dict( 'FAILURE', status, time0 )
+        #
+        ## the finished episode stays on the seedbox until it is transferred
+        stop_torrent( disk, keep_disk_for = torFileName )
+        return fullFname, _create_status_dict(
+            'SUCCESS',
+            'attempt #%d successfully downloaded %s' % (
+                idx + 1, torFileName ), time00 )
     #
     ## final failing condition
     return None, _create_status_dict( 'FAILURE','\n'.join( failing_reasons ), time0 )
     
 def worker_process_download_tvtorrent(
         tvTorUnit, client = None, maxtime_in_secs = 14400, 
-        num_iters = 1, kill_if_fail = False ):
+        num_iters = 1, kill_if_fail = False, monitor = None,
+        num_race = _num_to_race, aggregator = None, transfer_pool = None,
+        torrent_ids = [ ], journal = None, scheduler = None, ranker = None ):
     """
     Used by, e.g., :ref:`get_tv_batch`, to download missing episodes on the Plex_ TV library. Attempts to use the Deluge_ server, specified in :numref:`Seedhost Services Setup`, to download an episode. If successful then uploads the finished episode from the remote SSH server to the Plex_ server and local directory, specified in :numref:`Local and Remote (Seedhost) SSH Setup`.
 
@@ -967,6 +1021,14 @@ def worker_process_download_tvtorrent(
     :param int maxtime_in_secs: optional argument, the maximum time to wait for a Magnet link found by the Jackett_ server to fully download through the Deluge_ server. Must be :math:`\ge 60` seconds. Default is 14400 seconds.
     :param int num_iters: optional argument, the maximum number of Magnet links to try and fully download before giving up. The list of Magnet links to try for each missing episode is ordered from *most* seeders + leechers to *least*. Must be :math:`\ge 1`. Default is 1.
     :param bool kill_if_fail: optional argument. If ``True``, then on failing operation kill the torrent download on the Deluge_ server and delete any files associated with it. If ``False``, then keep the torrent download on failure.
+    :param DelugeTorrentMonitor monitor: optional argument, the :py:class:`DelugeTorrentMonitor <howdy.core.core_deluge.DelugeTorrentMonitor>` that tracks the downloads on the Deluge_ server. Share one among many episodes to make a single status request per poll for all of them. If ``None``, then one is created from ``client`` for this episode only.
+    :param int num_race: optional argument, the maximum number of Magnet links to download at the same time. The first one to finish wins, and the others are removed from the Deluge_ server. Default is 3.
+    :param TorrentSearchAggregator aggregator: optional argument, the :py:class:`TorrentSearchAggregator <howdy.core.core_torrents.TorrentSearchAggregator>` that searches the Jackett_, `EZTV.IO`_, and Zooqle_ torrent services at the same time. Share one among many episodes to reuse its threads and HTTP connections. If ``None``, then one is created for this episode only.
+    :param SSHTransferPool transfer_pool: optional argument, the :py:class:`SSHTransferPool <howdy.core.core_rsync.SSHTransferPool>` whose persistent SSH connections run the commands that copy the finished episode on the remote SSH server. If ``None``, or if it connects to a different host, or as a different user, than the Deluge_ server, then a new SSH connection is made for this episode only.
+    :param list torrent_ids: optional argument, the :py:class:`list` of IDs of torrents for this episode that are already running on the Deluge_ server, such as those left by a run of :ref:`get_tv_batch` that crashed. These are watched again before any new Magnet links are tried.
+    :param TVBatchJournal journal: optional argument, the :py:class:`TVBatchJournal <howdy.tv.TVBatchJournal>` into which to record the ``searching`` and ``downloading`` states of this episode, and the IDs of its torrents on the Deluge_ server. If ``None``, then nothing is recorded.
+    :param TVBatchScheduler scheduler: optional argument, the :py:class:`TVBatchScheduler <howdy.tv.tv.TVBatchScheduler>` whose budgets limit the searches for Magnet links, and the torrents and seedbox disk space on the Deluge_ server, shared with other episodes. If the episode downloads, then its disk space stays reserved until :py:meth:`release_disk <howdy.tv.tv.TVBatchScheduler.release_disk>` is called. If ``None``, then there are no limits beyond ``num_race``.
+    :param TorrentCandidateRanker ranker: optional argument, the :py:class:`TorrentCandidateRanker <howdy.core.core_torrents.TorrentCandidateRanker>` that orders the candidate Magnet links. Share one, created in the main thread, among many episodes so that the ranking configuration is read from the configuration database once. If ``None``, then one is created for this episode only.
 
     :returns: If successful, creates a two element :py:class:`tuple`: the first element is the base name of the episode that is uploaded to the Plex_ server, and the second element is a status :py:class:`dictionary <dict>` with three keys.
 
@@ -996,18 +1058,19 @@ def worker_process_download_tvtorrent(
     time0 = time.time( )
         
     assert( maxtime_in_secs > 0 )
+    if journal is not None and len( torrent_ids ) == 0:
+        journal.set_episode( tvTorUnit[ 'torFname' ], 'searching' )
     #
-    if client is None:
+    if monitor is None and client is None:
         client, status = core_deluge.get_deluge_client( )
         if client is None:
             return None, _create_status_dict(
                 'FAILURE', 'cannot create or run a valid deluge RPC client.', time0 )
     #
     ## now get list of torrents, choose "top" one
-    def _process_jackett_items( tvTorUnit, shared_list ):
+    def _process_jackett_items( tvTorUnit, session ):
         t0 = time.time( )
         torFileName = tvTorUnit[ 'torFname' ]
-        totFname = tvTorUnit[ 'totFname' ]
         minSize = tvTorUnit[ 'minSize' ]
         maxSize = tvTorUnit[ 'maxSize' ]
         minSize_x265 = tvTorUnit[ 'minSize_x265' ]
@@ -1030,105 +1093,98 @@ def worker_process_download_tvtorrent(
                 minsizes = [ minSize, minSize_x265 ],
                 maxsizes = [ maxSize, maxSize_x265 ],
                 keywords_exc = [ 'xvid' ], raw = do_raw,
-                must_have = [ mustHaveString ] )
+                must_have = [ mustHaveString ], session = session )
             if status == 'SUCCESS': break
-        if status != 'SUCCESS':
-            shared_list.append( ( 'jackett', _create_status_dict( 'FAILURE', status, t0 ), 'FAILURE' ) )
-            return
+        if status != 'SUCCESS': return data, status
         logging.info( 'successfully processed jackett on %s in %0.3f seconds.' % (
             torFileName, time.time( ) - t0 ) )
-        shared_list.append( ( 'jackett', data, 'SUCCESS' ) )
+        return data, 'SUCCESS'
     #
-    def _process_eztv_io_items( tvTorUnit, shared_list ):
+    def _process_eztv_io_items( tvTorUnit, session ):
         t0 = time.time( )
         torFileName = tvTorUnit[ 'torFname' ]
-        totFname = tvTorUnit[ 'totFname' ]
         minSize = tvTorUnit[ 'minSize' ]
         maxSize = tvTorUnit[ 'maxSize' ]
         minSize_x265 = tvTorUnit[ 'minSize_x265' ]
         maxSize_x265 = tvTorUnit[ 'maxSize_x265' ]
         series_name = tvTorUnit[ 'tvshow' ]
-        mustHaveString = torFileName.split( )[ -1 ]
         logging.info( 'eztv.io start: %s' % torFileName )
         #
         data, status = get_tv_torrent_eztv_io(
             torFileName, maxnum = 100, series_name = series_name,
             minsizes = [ minSize, minSize_x265],
-            maxsizes = [ maxSize, maxSize_x265] )
-        if status != 'SUCCESS':
-            shared_list.append(
-                ( 'eztv.io', _create_status_dict( 'FAILURE', status, time0 ), 'FAILURE' ) )
-            return
+            maxsizes = [ maxSize, maxSize_x265], session = session )
+        if status != 'SUCCESS': return data, status
         data_filt = list(filter(
             lambda elem: any(map(lambda tok: tok in elem['title'].lower( ),
                                  ( 'x264', 'x265', '720p' ) ) ) and
             'xvid' not in elem['title'].lower( ), data ) )
         if len( data_filt ) == 0:
-            shared_list.append(
-                ( 'eztv.io', _create_status_dict(
-                    'FAILURE', 'ERROR, COULD NOT FIND %s IN EZTV.IO.' % torFileName, t0 ), 'FAILURE' ) )
-            return
+            return return_error_raw( 'ERROR, COULD NOT FIND %s IN EZTV.IO.' % torFileName )
         logging.info( 'successfully processed eztv.io on %s in %0.3f seconds.' % (
             torFileName, time.time( ) - t0 ) )
-        shared_list.append( ( 'eztv.io', data_filt, 'SUCCESS' ) )
+        return data_filt, 'SUCCESS'
     #
-    def _process_zooqle_items( tvTorUnit, shared_list ):
+    def _process_zooqle_items( tvTorUnit, session ):
         t0 = time.time( )
         torFileName = tvTorUnit[ 'torFname' ]
-        totFname = tvTorUnit[ 'totFname' ]
         minSize = tvTorUnit[ 'minSize' ]
         maxSize = tvTorUnit[ 'maxSize' ]
-        minSize_x265 = tvTorUnit[ 'minSize_x265' ]
-        maxSize_x265 = tvTorUnit[ 'maxSize_x265' ]
-        series_name = tvTorUnit[ 'tvshow' ]
-        mustHaveString = torFileName.split( )[ -1 ]
         logging.info( 'zooqle start: %s' % torFileName )
         #
-        data, status = get_tv_torrent_zooqle( torFileName, maxnum = 100 )
-        if status != 'SUCCESS':
-            shared_list.append( ( 'zooqle', _create_status_dict( 'FAILURE', status, t0 ), 'FAILURE' ) )
-            return
+        data, status = get_tv_torrent_zooqle( torFileName, maxnum = 100, session = session )
+        if status != 'SUCCESS': return data, status
         data_filt = list(filter(
             lambda elem: any(map(lambda tok: tok in elem['title'].lower( ),
                                  ( 'x264', 'x265', '720p' ) ) ) and
             'xvid' not in elem['title'].lower( ) and
-            elem['torrent_size'] >= minSize*1e6 and
-            elem['torrent_size'] <= maxSize*1e6, data ) )
+            elem['torrent_size'] >= minSize and
+            elem['torrent_size'] <= maxSize, data ) )
         if len( data_filt ) == 0:
-            shared_list.append(
-                ( 'zooqle', _create_status_dict(
-                    'FAILURE', 'ERROR, COULD NOT FIND %s IN ZOOQLE.' % torFileName, t0 ), 'FAILURE' ) )
+            return return_error_raw( 'ERROR, COULD NOT FIND %s IN ZOOQLE.' % torFileName )
         logging.info( 'successfully processed zooqle on %s in %0.3f seconds.' % (
             torFileName, time.time( ) - t0 ) )
-        shared_list.append( ( 'zooqle', data_filt, 'SUCCESS' ) )
+        return data_filt, 'SUCCESS'
 
-    m = Manager( )
-    shared_list = m.list( )
-    jobs = [ ]
-    for targ in ( _process_jackett_items, _process_eztv_io_items, _process_zooqle_items ):
-        job = Process( target = targ, args = ( tvTorUnit, shared_list ) )
-        job.daemon = False
-        jobs.append( job )
-        job.start( )
-    for job in jobs: job.join( )
-    for job in jobs: job.close( )
-    #shared_list = list(map(
-    #    lambda proc: proc( tvTorUnit ),
-    #    ( _process_jackett_items, _process_eztv_io_items, _process_zooqle_items ) ) )
-    error_tup = list(map(
-        lambda dat: ( dat[0], dat[1] ), filter(lambda dat: dat[-1] == 'FAILURE', shared_list ) ) )
-    data = list( chain.from_iterable( map(lambda dat: dat[1],
-                                          filter(lambda dat: dat[-1] == 'SUCCESS', shared_list ) ) ) )
+    providers = {
+        'jackett' : lambda session: _process_jackett_items( tvTorUnit, session ),
+        'eztv.io' : lambda session: _process_eztv_io_items( tvTorUnit, session ),
+        'zooqle'  : lambda session: _process_zooqle_items( tvTorUnit, session ) }
+    #
+    ## wait for every service, up to the aggregator's timeout for each, so that the candidates of all of them are ranked together
+    with ( scheduler.search( ) if scheduler is not None else nullcontext( ) ):
+        if aggregator is not None:
+            data, statuses = aggregator.search( providers )
+        else:
+            with core_torrents.TorrentSearchAggregator( num_threads = len( providers ) ) as aggregator:
+                data, statuses = aggregator.search( providers )
     #
     ## status of downloaded elements
     torFileName = tvTorUnit[ 'torFname' ]
     totFname = tvTorUnit[ 'totFname' ]
-    if len( data ) == 0:
-        return None, dict( error_tup )
+    if len( data ) == 0 and len( torrent_ids ) == 0:
+        return None, _create_status_dict(
+            'FAILURE', '\n'.join(map(lambda name: '%s: %s' % ( name, statuses[ name ] ),
+                                     sorted( statuses ) ) ), time0 )
+    #
+    ## try the best candidates first
+    if len( data ) != 0:
+        if ranker is None: ranker = core_torrents.TorrentCandidateRanker( )
+        data = ranker.rank(
+            data, name = torFileName, runtime_mins = tvTorUnit.get( 'avg_length_mins' ) )
     print( 'got %d candidates for %s in %0.3f seconds.' % (
         len(data), torFileName, time.time( ) - time0 ) )
     #
     ## wrapped away in another method
-    return _worker_process_tvtorrents(
-        client, data, torFileName, totFname,
-        maxtime_in_secs, num_iters, kill_if_fail )
+    if monitor is not None:
+        return _worker_process_tvtorrents(
+            monitor, data, torFileName, totFname,
+            maxtime_in_secs, num_iters, kill_if_fail, num_race = num_race,
+            transfer_pool = transfer_pool, torrent_ids = torrent_ids, journal = journal,
+            scheduler = scheduler, default_size = tvTorUnit[ 'maxSize' ] )
+    with core_deluge.DelugeTorrentMonitor( client ) as monitor:
+        return _worker_process_tvtorrents(
+            monitor, data, torFileName, totFname,
+            maxtime_in_secs, num_iters, kill_if_fail, num_race = num_race,
+            transfer_pool = transfer_pool, torrent_ids = torrent_ids, journal = journal,
+            scheduler = scheduler, default_size = tvTorUnit[ 'maxSize' ] )
@@ -1,4 +1,5 @@
-import pytest
+import threading, pytest
+from http.server import ThreadingHTTPServer
 
 def pytest_addoption( parser ):
     parser.addoption('--local', dest='do_local', action='store_true', default = False,
@@ -12,3 +13,49 @@ def pytest_addoption( parser ):
     parser.addoption('--rebuild', dest='do_rebuild', action='store_true',
                      default = False, help = 'If chosen, then rebuild the local store of data used in the tests.' )
 
+#
+## one MPEG-1 layer III frame, 128 kbps at 44.1 kHz, with all-zero (silent) content
+SILENT_MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+def get_album( num_tracks, album_url = '' ):
+    """
+    Returns the album and track metadata, in the format used by :py:mod:`howdy.music.music`, of a test album with ``num_tracks`` songs.
+    """
+    album_data_dict = { 'artist' : 'Air', 'album' : 'Moon Safari', 'year' : 1998,
+                        'total tracks' : num_tracks, 'album url' : album_url }
+    track_data_dicts = list(map(lambda idx: { 'song' : 'Song %d' % ( idx + 1 ), 'tracknumber' : idx + 1 },
+                                range( num_tracks ) ) )
+    return album_data_dict, track_data_dicts
+
+@pytest.fixture
+def http_server( ):
+    """
+    A function that starts a local multithreaded HTTP server, on its own thread, with the given request handler class, and returns its URL. The servers are shut down after the test.
+    """
+    servers = [ ]
+    def start( handler_class ):
+        server = ThreadingHTTPServer( ( '127.0.0.1', 0 ), handler_class )
+        thread = threading.Thread( target = server.serve_forever, daemon = True )
+        thread.start( )
+        servers.append( server )
+        return 'http://127.0.0.1:%d' % server.server_address[ 1 ]
+    yield start
+    for server in servers:
+        server.shutdown( )
+        server.server_close( )
+
+
+@pytest.fixture
+def tmp_session( tmp_path ):
+    """
+    A SQLAlchemy session on a temporary SQLite3 configuration database, with all the tables.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from howdy.core import Base
+    import howdy.tv
+    engine = create_engine( 'sqlite:///%s' % str( tmp_path / 'app.db' ) )
+    Base.metadata.create_all( engine )
+    session = sessionmaker( bind = engine )( )
+    yield session
+    session.close( )
@@ -0,0 +1,201 @@
+import os, time, hashlib, pytest
+from threading import Lock, Thread
+from howdy.core import core_deluge
+
+#
+## local fake Deluge daemon: holds torrents and answers the RPC methods used by core_deluge
+class _FakeDelugeDaemon( object ):
+    def __init__( self, num_torrents = 20, has_remove_torrents = True ):
+        self.has_remove_torrents = has_remove_torrents
+        self.num_connects = 0
+        self.generation = 0
+        self.calls = [ ]
+        self.num_bytes_sent = 0
+        self.num_remove_failures = { }
+        self._in_call = Lock( )
+        self.torrents = dict(map(lambda idx: (
+            hashlib.sha1( b'%d' % idx ).hexdigest( ).encode( 'utf-8' ),
+            self._create_status( idx ) ), range( num_torrents ) ) )
+
+    def _create_status( self, idx ):
+        status = dict(map(lambda key: ( key.encode( 'utf-8' ), 0 ), core_deluge._status_keys ) )
+        status.update( {
+            b'name' : ( 'torrent%02d' % idx ).encode( 'utf-8' ), b'state' : b'Downloading',
+            b'tracker_status' : b'tracker.example.com: Announce OK', b'progress' : 50.0,
+            b'distributed_copies' : 1.5, b'ratio' : 0.0, b'is_finished' : False,
+            b'files' : [ { b'path' : b'episode.mkv', b'size' : 200 << 20 } ] * 40,
+            b'peers' : [ { b'ip' : b'127.0.0.1:6881', b'client' : b'Deluge' } ] * 40 } )
+        return status
+
+    def connect( self, host, port, username, password ):
+        self.num_connects += 1
+        return _FakeDelugeRPCClient( self )
+
+    def drop_connections( self ): self.generation += 1
+
+    def call( self, method, *args ):
+        #
+        ## the real daemon serializes calls on one connection; a second caller at the same time is an error
+        assert( self._in_call.acquire( blocking = False ) )
+        try:
+            time.sleep( 1e-4 )
+            self.calls.append( ( method, args ) )
+            if method == 'core.get_session_state': reply = list( self.torrents )
+            elif method == 'core.get_torrents_status':
+                filter_dict, status_keys = args
+                torrent_ids = filter_dict.get( 'id', list( self.torrents ) )
+                reply = dict(map(lambda torrentId: ( torrentId, dict(map(lambda key: (
+                    key.encode( 'utf-8' ), self.torrents[ torrentId ][ key.encode( 'utf-8' ) ] ), status_keys ) ) ),
+                                 filter(lambda torrentId: torrentId in self.torrents, torrent_ids ) ) )
+            elif method == 'core.remove_torrents' and self.has_remove_torrents:
+                torrent_ids, remove_data = args
+                reply = [ ]
+                for torrentId in torrent_ids:
+                    if self._fail_remove( torrentId ): reply.append( [ torrentId, b'Torrent is busy' ] )
+                    else: self.torrents.pop( torrentId, None )
+            elif method == 'core.remove_torrent':
+                torrentId, remove_data = args
+                if self._fail_remove( torrentId ): raise ValueError( 'Torrent is busy' )
+                reply = self.torrents.pop( torrentId, None ) is not None
+            else: raise ValueError( 'unknown method %s' % method )
+            self.num_bytes_sent += len( repr( reply ) )
+            return reply
+        finally: self._in_call.release( )
+
+    def _fail_remove( self, torrentId ):
+        #
+        ## the torrent cannot be removed the next num_remove_failures[ torrentId ] times
+        if self.num_remove_failures.get( torrentId, 0 ) == 0: return False
+        self.num_remove_failures[ torrentId ] -= 1
+        return True
+
+class _FakeDelugeRPCClient( object ):
+    def __init__( self, daemon ):
+        self.daemon = daemon
+        self.generation = daemon.generation
+        self.connected = False
+
+    def connect( self ): self.connected = True
+
+    def disconnect( self ): self.connected = False
+
+    def call( self, method, *args ):
+        if not self.connected: raise ConnectionResetError( 'not connected' )
+        if self.generation != self.daemon.generation: raise ConnectionResetError( 'connection dropped' )
+        return self.daemon.call( method, *args )
+
+@pytest.fixture
+def daemon( ):
+    return _FakeDelugeDaemon( )
+
+def _create_client( daemon ):
+    return core_deluge.DelugeClient(
+        'localhost', 58846, 'admin', 'admin',
+        client_factory = lambda host, port, username, password: daemon.connect( host, port, username, password ) )
+
+def test_one_connection( daemon ):
+    client = _create_client( daemon )
+    for idx in range( 50 ):
+        core_deluge.deluge_get_torrents_info( client, status_keys = [ 'name' ] )
+    assert( daemon.num_connects == 1 )
+    assert( client.num_connects == 1 )
+    assert( len( daemon.calls ) == 50 )
+
+def test_reconnect( daemon ):
+    client = _create_client( daemon )
+    torrentIds = core_deluge.deluge_get_matching_torrents( client, [ '*' ] )
+    #
+    ## the daemon drops the connection: the next call reconnects once, and succeeds
+    daemon.drop_connections( )
+    assert( core_deluge.deluge_get_matching_torrents( client, [ '*' ] ) == torrentIds )
+    assert( daemon.num_connects == 2 )
+
+def test_server_error_not_retried( daemon ):
+    client = _create_client( daemon )
+    with pytest.raises( ValueError ):
+        client.call( 'core.no_such_method' )
+    assert( daemon.num_connects == 1 )
+
+def test_thread_safe( daemon ):
+    client = _create_client( daemon )
+    def _worker( ):
+        for idx in range( 20 ): core_deluge.deluge_get_torrents_info( client, status_keys = [ 'state' ] )
+    threads = list(map(lambda idx: Thread( target = _worker ), range( 8 ) ) )
+    for thread in threads: thread.start( )
+    for thread in threads: thread.join( )
+    assert( len( daemon.calls ) == 160 )
+    assert( daemon.num_connects == 1 )
+
+def test_matching_torrents( daemon ):
+    client = _create_client( daemon )
+    torrentIds = list( daemon.torrents )
+    assert( core_deluge.deluge_get_matching_torrents( client, [ '*' ] ) == torrentIds )
+    prefixes = list(map(lambda torrentId: torrentId.decode( 'utf-8' ).upper( )[:6], torrentIds[:3] ) )
+    assert( set( core_deluge.deluge_get_matching_torrents( client, prefixes ) ) == set( torrentIds[:3] ) )
+    #
+    ## no status is requested just to find the torrent IDs
+    assert( all(map(lambda call: call[ 0 ] != 'core.get_torrents_status', daemon.calls ) ) )
+
+@pytest.mark.parametrize( 'has_remove_torrents', [ True, False ] )
+def test_remove_torrents( has_remove_torrents ):
+    daemon = _FakeDelugeDaemon( has_remove_torrents = has_remove_torrents )
+    client = _create_client( daemon )
+    torrentIds = list( daemon.torrents )[:10]
+    core_deluge.deluge_remove_torrent( client, torrentIds, remove_data = True )
+    assert( len( daemon.torrents ) == 10 )
+    assert( all(map(lambda torrentId: torrentId not in daemon.torrents, torrentIds ) ) )
+    num_calls = len(list(filter(lambda call: call[ 0 ].startswith( 'core.remove_torrent' ), daemon.calls ) ) )
+    if has_remove_torrents: assert( num_calls == 1 )
+    else: assert( num_calls == 11 )
+
+def test_remove_torrents_errors( daemon, caplog ):
+    client = _create_client( daemon )
+    torrentIds = list( daemon.torrents )[:4]
+    daemon.num_remove_failures = { torrentIds[ 0 ] : 1, torrentIds[ 1 ] : 2 }
+    #
+    ## those Deluge could not remove are tried again one at a time, and those that still fail are logged
+    core_deluge.deluge_remove_torrent( client, torrentIds )
+    assert( list(map(lambda call: call[ 0 ], daemon.calls ) ) == [
+        'core.remove_torrents', 'core.remove_torrent', 'core.remove_torrent' ] )
+    assert( list(filter(lambda torrentId: torrentId in daemon.torrents, torrentIds ) ) == [ torrentIds[ 1 ] ] )
+    assert( 'could not remove torrent ID = %s: Torrent is busy.' % torrentIds[ 1 ].decode( 'utf-8' )[:6] in caplog.text )
+
+def test_format_info_keys( daemon, monkeypatch ):
+    monkeypatch.setattr( os, 'get_terminal_size', lambda *args: os.terminal_size( ( 120, 40 ) ) )
+    client = _create_client( daemon )
+    torrentIds = list( daemon.torrents )
+    core_deluge.deluge_get_torrents_info( client, torrent_ids = torrentIds )
+    num_bytes_all = daemon.num_bytes_sent
+    torrentInfo = core_deluge.deluge_get_torrents_info(
+        client, torrent_ids = torrentIds, status_keys = core_deluge._format_info_keys )
+    num_bytes_reduced = daemon.num_bytes_sent - num_bytes_all
+    for torrentId in torrentIds:
+        info = core_deluge.deluge_format_info( torrentInfo[ torrentId ], torrentId )
+        assert( info.startswith( 'Name: torrent' ) )
+    #
+    ## far less is sent without the file and peer lists
+    assert( num_bytes_reduced * 10 < num_bytes_all )
+
+def test_monitor( daemon ):
+    client = _create_client( daemon )
+    torrentIds = list( daemon.torrents )[:4]
+    for torrentId in torrentIds[:2]: daemon.torrents[ torrentId ][ b'state' ] = b'Seeding'
+    daemon.torrents[ torrentIds[ 2 ] ][ b'state' ] = b'Error'
+    #
+    ## the polling thread stays asleep, so that each poll is made here
+    with core_deluge.DelugeTorrentMonitor( client, poll_interval = 3600 ) as monitor:
+        futures = list(map(lambda idx: monitor.watch( torrentIds[ idx ], name = 'torrent%02d' % idx ), range( 4 ) ) )
+        monitor.poll( )
+        #
+        ## one status request for all watched torrents, and one for the file listings of those that finished
+        assert( list(map(lambda call: call[ 0 ], daemon.calls ) ) == [ 'core.get_torrents_status' ] * 2 )
+        assert( set( daemon.calls[ 1 ][ 1 ][ 0 ][ 'id' ] ) == set( torrentIds[:2] ) )
+        for fut in futures[:2]:
+            tor_info, status = fut.result( timeout = 0 )
+            assert( status == 'SUCCESS' and b'files' in tor_info )
+        tor_info, status = futures[ 2 ].result( timeout = 0 )
+        assert( tor_info is None and status == 'ERROR, torrent02 FAILED ON THE DELUGE SERVER.' )
+        assert( not futures[ 3 ].done( ) )
+    #
+    ## torrents still downloading at shutdown resolve as failures
+    assert( futures[ 3 ].result( timeout = 0 )[ 1 ].startswith( 'ERROR, STOPPED WATCHING' ) )
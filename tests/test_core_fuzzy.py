@@ -0,0 +1,34 @@
+from howdy.core import FuzzyMatchIndex, get_match_string
+from rapidfuzz.fuzz import ratio
+
+_songs = [ 'La Femme D’argent', 'Sexy Boy', 'All I Need', 'Kelly, Watch the Stars!',
+           'Love', 'Love Me Do' ]
+
+def test_get_match_string( ):
+    assert( get_match_string( 'Kelly, Watch the Stars!' ) == 'kelly watch the stars' )
+    assert( get_match_string( '  Sexy   Boy ' ) == 'sexy boy' )
+
+def test_match( ):
+    song_index = FuzzyMatchIndex( _songs, keys = list( range( 1, len( _songs ) + 1 ) ) )
+    matches = song_index.match(
+        [ 'Kelly Watch the Stars', 'love', 'sexy boy', 'Nothing Like It At All' ], score_cutoff = 85 )
+    assert( matches[ 0 ] == ( 'Kelly, Watch the Stars!', 100.0, 4 ) )
+    #
+    ## an exact title wins over a title that contains the query
+    assert( matches[ 1 ] == ( 'Love', 100.0, 5 ) )
+    assert( matches[ 2 ] == ( 'Sexy Boy', 100.0, 2 ) )
+    assert( matches[ 3 ] is None )
+    assert( FuzzyMatchIndex( [ ] ).match( [ 'Love' ] ) == [ None ] )
+
+def test_extract( ):
+    song_index = FuzzyMatchIndex( _songs )
+    matches = song_index.extract( 'love', limit = None, score_cutoff = 90 )
+    assert( sorted( map(lambda match: match[ 0 ], matches ) ) == [ 'Love', 'Love Me Do' ] )
+    #
+    ## whole title ratio, for movie titles
+    movie_index = FuzzyMatchIndex( [ 'Alien', 'Aliens', 'Star Wars: Episode IV' ], scorer = ratio )
+    assert( movie_index.match( [ 'Star Wars - Episode IV' ], score_cutoff = 95 )[ 0 ][ 0 ] ==
+            'Star Wars: Episode IV' )
+    scores = movie_index.scores( [ 'Aliens', 'Alien' ] )
+    assert( scores.shape == ( 2, 3 ) )
+    assert( scores[ 0, 1 ] == 100 and scores[ 0, 0 ] < 95 )
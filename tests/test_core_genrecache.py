@@ -0,0 +1,46 @@
+import pytest, requests
+from howdy.core import core
+from howdy.core.core import PlexXMLRecord
+
+def _get_movie( ratingkey, title ):
+    return PlexXMLRecord( 'video', { 'ratingkey' : ratingkey, 'title' : title, 'year' : '2000' } )
+
+@pytest.fixture
+def genre_env( monkeypatch, tmp_session ):
+    """
+    Runs prewarm_movie_genre_cache against a fake Plex server with one movie library, and a fake TMDB whose answers are in env[ "genres" ]: a genre, None (no genre found), or an exception to raise.
+    """
+    monkeypatch.setattr( core, 'session', tmp_session )
+    env = { 'movies' : [ ], 'genres' : { }, 'looked_up' : [ ] }
+    monkeypatch.setattr( core, 'get_movies_libraries', lambda token, fullURL = None: [ 1 ] )
+    monkeypatch.setattr( core, 'iter_plex_xml_records', lambda *args, **kwargs: iter( env[ 'movies' ] ) )
+    def get_genre_movie( title, verify = True, raise_errors = False ):
+        env[ 'looked_up' ].append( title )
+        val = env[ 'genres' ][ title ]
+        if isinstance( val, Exception ): raise val
+        return val
+    monkeypatch.setattr( core.movie, 'get_genre_movie', get_genre_movie )
+    yield env
+
+def test_prewarm_errors( genre_env ):
+    genre_env[ 'movies' ] = list(map(lambda tup: _get_movie( *tup ), (
+        ( '1', 'Serenity' ), ( '2', 'Unknown Movie' ), ( '3', 'Rate Limited' ), ( '4', 'Dropped' ) ) ) )
+    genre_env[ 'genres' ] = {
+        'Serenity' : 'science fiction', 'Unknown Movie' : None,
+        'Rate Limited' : ValueError( 'TMDB search for Rate Limited failed with status 429.' ),
+        'Dropped' : requests.ConnectionError( 'connection reset.' ) }
+    #
+    ## failed lookups do not stop the run, and are not cached; real answers, including "no genre", are
+    assert( core.prewarm_movie_genre_cache( 'token' ) == 4 )
+    genre_cache = core.get_movie_genre_cache( )
+    assert( genre_cache[ 'ratingkey:1' ] == 'science fiction' )
+    assert( 'ratingkey:2' in genre_cache and genre_cache[ 'ratingkey:2' ] is None )
+    assert( not any(map(lambda cachekey: cachekey in genre_cache, (
+        'ratingkey:3', 'ratingkey:4', 'title:rate limited:2000', 'title:dropped:2000' ) ) ) )
+    #
+    ## so the next run only looks up the movies that failed
+    genre_env[ 'looked_up' ] = [ ]
+    genre_env[ 'genres' ][ 'Rate Limited' ] = 'comedy'
+    assert( core.prewarm_movie_genre_cache( 'token' ) == 2 )
+    assert( sorted( genre_env[ 'looked_up' ] ) == [ 'Dropped', 'Rate Limited' ] )
+    assert( core.get_movie_genre_cache( )[ 'ratingkey:3' ] == 'comedy' )
@@ -0,0 +1,131 @@
+import os, time, threading, pytest, requests
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from howdy.core import ImageCache
+
+#
+## local HTTP server, a stand-in for Plex and TVDB, that counts requests. "/slow/..." images take
+## 0.2 seconds, "/missing/..." images do not exist, and only "/library/..." images can be resized
+class _ImageHandler( BaseHTTPRequestHandler ):
+    num_requests = Counter( )
+    queries = [ ]
+
+    def do_GET( self ):
+        parsed = urlparse( self.path )
+        type( self ).num_requests[ parsed.path ] += 1
+        type( self ).queries.append( parse_qs( parsed.query ) )
+        if parsed.path.startswith( '/missing/' ):
+            self.send_error( 404 )
+            return
+        if parsed.path.startswith( '/slow/' ): time.sleep( 0.2 )
+        if parsed.path == '/photo/:/transcode':
+            url = parse_qs( parsed.query )[ 'url' ][ 0 ]
+            if not url.startswith( '/library/' ):
+                self.send_error( 400 )
+                return
+            content = ( 'small image of %s' % url ).encode( 'utf-8' )
+        elif parsed.path.startswith( '/same/' ): content = b'the same image' * 10
+        else: content = ( 'image of %s' % parsed.path ).encode( 'utf-8' ) * 10
+        self.send_response( 200 )
+        self.send_header( 'Content-Type', 'image/png' )
+        self.send_header( 'Content-Length', str( len( content ) ) )
+        self.end_headers( )
+        self.wfile.write( content )
+
+    def log_message( self, *args ): pass
+
+@pytest.fixture
+def image_server( http_server ):
+    _ImageHandler.num_requests = Counter( )
+    _ImageHandler.queries = [ ]
+    return http_server( _ImageHandler )
+
+def test_memory_and_disk( tmp_path, image_server ):
+    cache = ImageCache( cache_dir = str( tmp_path ), max_memory_bytes = 400 )
+    data = cache.get( '%s/posters/1.jpg' % image_server )
+    assert( data == b'image of /posters/1.jpg' * 10 )
+    assert( cache.get( '%s/posters/1.jpg' % image_server ) == data )
+    assert( cache.num_requests == 1 )
+    for idx in range( 2, 6 ): cache.get( '%s/posters/%d.jpg' % ( image_server, idx ) )
+    assert( cache._memory_bytes <= 400 )
+    assert( len( os.listdir( str( tmp_path / 'objects' ) ) ) == 5 )
+    #
+    ## a new process gets the images from disk
+    cache2 = ImageCache( cache_dir = str( tmp_path ) )
+    assert( cache2.get( '%s/posters/1.jpg' % image_server ) == data )
+    assert( cache2.num_requests == 0 )
+    assert( _ImageHandler.num_requests[ '/posters/1.jpg' ] == 1 )
+
+def test_content_addressed_eviction( tmp_path, image_server ):
+    cache = ImageCache( cache_dir = str( tmp_path ), max_disk_bytes = 500 )
+    cache.get( '%s/same/1.jpg' % image_server )
+    cache.get( '%s/same/2.jpg' % image_server )
+    assert( len( os.listdir( str( tmp_path / 'objects' ) ) ) == 1 )
+    assert( len( os.listdir( str( tmp_path / 'keys' ) ) ) == 2 )
+    #
+    ## the least recently used images, and their keys, are removed
+    for idx in range( 3 ):
+        time.sleep( 0.01 )
+        cache.put( 'https://example.com/%d.png' % idx, b'%d' % idx * 200 )
+    assert( len( os.listdir( str( tmp_path / 'objects' ) ) ) == 2 )
+    assert( len( os.listdir( str( tmp_path / 'keys' ) ) ) == 2 )
+    cache2 = ImageCache( cache_dir = str( tmp_path ) )
+    assert( cache2.get( 'https://example.com/2.png' ) == b'2' * 200 )
+    assert( cache2.num_requests == 0 )
+
+def test_disk_scans( tmp_path, monkeypatch ):
+    cache = ImageCache( cache_dir = str( tmp_path ), max_disk_bytes = 1000 )
+    scans = [ 0 ]
+    get_disk_objects = cache._get_disk_objects
+    def _get_disk_objects( ):
+        scans[ 0 ] += 1
+        return get_disk_objects( )
+    monkeypatch.setattr( cache, '_get_disk_objects', _get_disk_objects )
+    #
+    ## the image directory is scanned once for its total size, and again only when over budget
+    for idx in range( 4 ): cache.put( 'https://example.com/%d.png' % idx, b'%d' % idx * 200 )
+    assert( scans[ 0 ] == 1 and cache._disk_bytes == 800 )
+    cache.put( 'https://example.com/4.png', b'4' * 400 )
+    assert( scans[ 0 ] == 2 and cache._disk_bytes <= 1000 )
+    assert( cache._disk_bytes == sum(map(lambda name: os.path.getsize( str( tmp_path / 'objects' / name ) ),
+                                         os.listdir( str( tmp_path / 'objects' ) ) ) ) )
+
+def test_coalesce( tmp_path, image_server ):
+    cache = ImageCache( cache_dir = str( tmp_path ) )
+    results = [ ]
+    threads = list(map(lambda idx: threading.Thread( target = lambda: results.append(
+        cache.get( '%s/slow/1.jpg' % image_server ) ) ), range( 8 ) ) )
+    for thread in threads: thread.start( )
+    for thread in threads: thread.join( )
+    assert( _ImageHandler.num_requests[ '/slow/1.jpg' ] == 1 )
+    assert( len( results ) == 8 )
+    assert( all(map(lambda result: result == results[ 0 ], results ) ) )
+
+def test_failures( tmp_path, image_server ):
+    cache = ImageCache( cache_dir = str( tmp_path ) )
+    for _ in range( 2 ):
+        with pytest.raises( requests.HTTPError ):
+            cache.get( '%s/missing/1.jpg' % image_server )
+    assert( _ImageHandler.num_requests[ '/missing/1.jpg' ] == 2 )
+
+def test_plex_transcode( tmp_path, image_server ):
+    cache = ImageCache( cache_dir = str( tmp_path ) )
+    data = cache.get_plex_image(
+        '%s/library/metadata/1/thumb/2' % image_server, token = 'token1', width = 200 )
+    assert( data == b'small image of /library/metadata/1/thumb/2' )
+    query = _ImageHandler.queries[ -1 ]
+    assert( query[ 'width' ] == [ '200' ] and query[ 'height' ] == [ '2000' ] )
+    assert( query[ 'X-Plex-Token' ] == [ 'token1' ] )
+    #
+    ## the token is not part of the key, nor stored on disk
+    assert( cache.get_plex_image(
+        '%s/library/metadata/1/thumb/2' % image_server, token = 'token2', width = 200 ) == data )
+    assert( cache.num_requests == 1 )
+    assert( not any(map(lambda name: b'token1' in ( tmp_path / 'keys' / name ).read_bytes( ),
+                        os.listdir( str( tmp_path / 'keys' ) ) ) ) )
+    #
+    ## falls back to the full image when the server cannot resize it
+    data = cache.get_plex_image( '%s/posters/1.jpg' % image_server, token = 'token1', height = 300 )
+    assert( data == b'image of /posters/1.jpg' * 10 )
+    assert( _ImageHandler.num_requests[ '/posters/1.jpg' ] == 1 )
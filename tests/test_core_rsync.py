@@ -0,0 +1,114 @@
+import os, io, shutil, subprocess, pytest
+from howdy.core import core_rsync
+
+#
+## loopback stand-in for a fabric Connection: "remote" files are local files, and commands run locally
+class _LoopbackFile( io.FileIO ):
+    def prefetch( self, file_size = None ): pass
+
+class _LoopbackSFTP( object ):
+    def stat( self, path ): return os.stat( path )
+    def open( self, path, mode = 'r' ): return _LoopbackFile( path, mode )
+    def remove( self, path ): os.remove( path )
+    def posix_rename( self, src, dst ): os.replace( src, dst )
+
+class _LoopbackResult( object ):
+    def __init__( self, proc ):
+        self.ok = proc.returncode == 0
+        self.stdout = proc.stdout.decode( 'utf-8' )
+
+class _LoopbackConnection( object ):
+    num_opened = 0
+    def __init__( self ):
+        _LoopbackConnection.num_opened += 1
+        self.is_connected = True
+    def sftp( self ): return _LoopbackSFTP( )
+    def run( self, cmd, hide = True, warn = False ):
+        proc = subprocess.run( cmd, shell = True, stdout = subprocess.PIPE, stderr = subprocess.PIPE )
+        if proc.returncode != 0 and not warn: raise ValueError( proc.stderr.decode( 'utf-8' ) )
+        return _LoopbackResult( proc )
+    def close( self ): self.is_connected = False
+
+@pytest.fixture
+def dirs( tmp_path ):
+    if shutil.which( 'md5sum' ) is None: pytest.skip( 'md5sum is not on this system.' )
+    remote_dir = tmp_path / 'remote'
+    local_dir = tmp_path / 'local'
+    remote_dir.mkdir( )
+    local_dir.mkdir( )
+    return str( remote_dir ), str( local_dir )
+
+def _create_pool( **kwargs ):
+    return core_rsync.SSHTransferPool(
+        'user@localhost', num_connections = 3, connection_factory = _LoopbackConnection, **kwargs )
+
+def test_download_files( dirs ):
+    remote_dir, local_dir = dirs
+    contents = dict(map(lambda idx: ( 'episode%02d.mkv' % idx, os.urandom( 3000000 + idx ) ), range( 8 ) ) )
+    for fname in contents:
+        with open( os.path.join( remote_dir, fname ), 'wb' ) as openfile: openfile.write( contents[ fname ] )
+    _LoopbackConnection.num_opened = 0
+    with _create_pool( ) as pool:
+        statuses = pool.download_files(
+            list(map(lambda fname: os.path.join( remote_dir, fname ), contents ) ), local_dir )
+    assert( all(map(lambda tup: tup[ 0 ] == 'SUCCESS', statuses.values( ) ) ) )
+    assert( _LoopbackConnection.num_opened <= 3 )
+    assert( len( os.listdir( remote_dir ) ) == 0 )
+    for fname in contents:
+        with open( os.path.join( local_dir, fname ), 'rb' ) as openfile:
+            assert( openfile.read( ) == contents[ fname ] )
+
+def test_download_resume( dirs ):
+    remote_dir, local_dir = dirs
+    content = os.urandom( 5000000 )
+    remote_path = os.path.join( remote_dir, 'episode.mkv' )
+    local_path = os.path.join( local_dir, 'episode.mkv' )
+    with open( remote_path, 'wb' ) as openfile: openfile.write( content )
+    with open( local_path + core_rsync._partial_suffix, 'wb' ) as openfile: openfile.write( content[:2000000] )
+    with _create_pool( ) as pool:
+        status, message = pool.download( remote_path, local_path )
+    assert( status == 'SUCCESS' )
+    assert( 'RESUMED AT 2000000' in message )
+    with open( local_path, 'rb' ) as openfile: assert( openfile.read( ) == content )
+    assert( not os.path.exists( remote_path ) )
+
+def test_download_bad_partial( dirs ):
+    remote_dir, local_dir = dirs
+    content = os.urandom( 1000000 )
+    remote_path = os.path.join( remote_dir, 'episode.mkv' )
+    local_path = os.path.join( local_dir, 'episode.mkv' )
+    with open( remote_path, 'wb' ) as openfile: openfile.write( content )
+    #
+    ## corrupted partial file: first attempt fails the checksum, second starts over
+    with open( local_path + core_rsync._partial_suffix, 'wb' ) as openfile: openfile.write( b'\0' * 1000 )
+    with _create_pool( ) as pool:
+        status, message = pool.download( remote_path, local_path, numtries = 1 )
+        assert( status == 'FAILURE' )
+        assert( os.path.exists( remote_path ) )
+        status, message = pool.download( remote_path, local_path, numtries = 1 )
+    assert( status == 'SUCCESS' )
+    with open( local_path, 'rb' ) as openfile: assert( openfile.read( ) == content )
+
+def test_upload_files( dirs ):
+    remote_dir, local_dir = dirs
+    content = os.urandom( 2500000 )
+    local_path = os.path.join( local_dir, 'episode.mkv' )
+    with open( local_path, 'wb' ) as openfile: openfile.write( content )
+    with _create_pool( ) as pool:
+        statuses = pool.upload_files( [ local_path ], remote_dir, remove_source = False )
+    assert( statuses[ local_path ][ 0 ] == 'SUCCESS' )
+    assert( os.path.exists( local_path ) )
+    with open( os.path.join( remote_dir, 'episode.mkv' ), 'rb' ) as openfile:
+        assert( openfile.read( ) == content )
+
+def test_bwlimit( dirs ):
+    remote_dir, local_dir = dirs
+    remote_path = os.path.join( remote_dir, 'episode.mkv' )
+    with open( remote_path, 'wb' ) as openfile: openfile.write( os.urandom( 3 << 20 ) )
+    with _create_pool( bwlimit = 4096 ) as pool:
+        status, message = pool.download( remote_path, os.path.join( local_dir, 'episode.mkv' ) )
+    assert( status == 'SUCCESS' )
+    #
+    ## three 1 MB chunks at 4 MB/s: the last two wait for 0.25 seconds each
+    time_secs = float( message.split( ' IN ' )[ -1 ].split( )[ 0 ] )
+    assert( time_secs >= 0.45 )
@@ -0,0 +1,190 @@
+import time, base64, datetime, numpy, pytest
+from howdy.core import core_torrents, TorrentSearchCache
+
+#
+## candidate 22 minute episodes, in the format returned by the torrent searches
+_episode_items = [
+    { 'title' : 'The Simpsons S31E01 720p HDTV x264-GRP', 'seeders' : 40, 'leechers' : 10, 'torrent_size' : 250.0 },
+    { 'title' : 'The Simpsons S31E01 XviD-AFG', 'seeders' : 400, 'leechers' : 50, 'torrent_size' : 180.0 },
+    { 'title' : 'The Simpsons S31E01 1080p WEB x265-BAD', 'seeders' : 30, 'leechers' : 5, 'torrent_size' : 2500.0 },
+    { 'title' : 'The Simpsons S31E01 720p HEVC x265-GRP', 'seeders' : 20, 'leechers' : 2, 'torrent_size' : 150.0 },
+    { 'title' : 'The Simpsons S31E01 720p HDTV x264-DEAD', 'seeders' : 0, 'leechers' : 30, 'torrent_size' : 250.0 },
+    { 'title' : 'Family Guy S18E01 720p HDTV x264-GRP', 'seeders' : 90, 'leechers' : 10, 'torrent_size' : 250.0 } ]
+
+def _ranked_titles( ranker, items = _episode_items ):
+    return list(map(lambda item: item[ 'title' ], ranker.rank(
+        items, name = 'The Simpsons S31E01', runtime_mins = 22.0 ) ) )
+
+def test_size_limits( ):
+    assert( core_torrents.get_torrent_size_limits( 22.0 ) == ( 150, 350, 100, 300 ) )
+    minSize, maxSize, minSize_x265, maxSize_x265 = core_torrents.get_torrent_size_limits( 44.0 )
+    assert( minSize_x265 < minSize < maxSize )
+    assert( minSize_x265 < maxSize_x265 < maxSize )
+
+def test_rank_default( ):
+    titles = _ranked_titles( core_torrents.TorrentCandidateRanker( config = { } ) )
+    assert( titles[ 0 ] == 'The Simpsons S31E01 720p HDTV x264-GRP' )
+    #
+    ## wrong show, no seeders, wrong size all go last
+    assert( set( titles[ -3: ] ) == set([
+        'Family Guy S18E01 720p HDTV x264-GRP',
+        'The Simpsons S31E01 720p HDTV x264-DEAD',
+        'The Simpsons S31E01 1080p WEB x265-BAD' ] ) )
+
+def test_rank_scores( ):
+    ranked = core_torrents.TorrentCandidateRanker( config = { } ).rank(
+        _episode_items, name = 'The Simpsons S31E01', runtime_mins = 22.0 )
+    scores = numpy.array(list(map(lambda item: item[ 'score' ], ranked ) ) )
+    assert( numpy.all( scores >= 0 ) and numpy.all( scores <= 1 ) )
+    assert( numpy.all( numpy.diff( scores ) <= 0 ) )
+    #
+    ## the input is not changed
+    assert( all(map(lambda item: 'score' not in item, _episode_items ) ) )
+
+def test_rank_seeders_only( ):
+    weights = dict(map(lambda key: ( key, 0.0 ), ( 'size', 'codec', 'resolution', 'group', 'match' ) ) )
+    weights[ 'seeders' ] = 1.0
+    titles = _ranked_titles( core_torrents.TorrentCandidateRanker( config = { 'weights' : weights } ) )
+    assert( titles[ 0 ] == 'The Simpsons S31E01 XviD-AFG' )
+    assert( titles[ -1 ] == 'The Simpsons S31E01 720p HDTV x264-DEAD' )
+
+def test_rank_groups( ):
+    weights = dict(map(lambda key: ( key, 0.0 ), ( 'size', 'codec', 'resolution', 'seeders', 'match' ) ) )
+    weights[ 'group' ] = 1.0
+    ranker = core_torrents.TorrentCandidateRanker( config = {
+        'weights' : weights, 'preferred_groups' : [ '-BAD' ], 'avoided_groups' : [ '-GRP' ] } )
+    titles = _ranked_titles( ranker )
+    assert( titles[ 0 ] == 'The Simpsons S31E01 1080p WEB x265-BAD' )
+    assert( all(map(lambda title: title.endswith( '-GRP' ), titles[ -3: ] ) ) )
+
+def test_rank_codecs( ):
+    weights = dict(map(lambda key: ( key, 0.0 ), ( 'size', 'resolution', 'seeders', 'group', 'match' ) ) )
+    weights[ 'codec' ] = 1.0
+    ranker = core_torrents.TorrentCandidateRanker( config = {
+        'weights' : weights, 'codecs' : { 'x264' : 1.0, 'x265' : 0.2, 'hevc' : 0.2 } } )
+    titles = _ranked_titles( ranker )
+    assert( titles[ -1 ] == 'The Simpsons S31E01 XviD-AFG' )
+    assert( all(map(lambda title: 'x264' in title, titles[ :3 ] ) ) )
+
+def test_rank_unknown_runtime( ):
+    items = [ { 'title' : 'The Simpsons S31E01 720p x264', 'seeders' : 10, 'leechers' : 0 },
+              { 'title' : 'The Simpsons S31E01 720p x264', 'seeders' : 10, 'leechers' : 0, 'torrent_size' : 1.0e5 } ]
+    scores = core_torrents.TorrentCandidateRanker( config = { } ).score(
+        items, name = 'The Simpsons S31E01' )
+    assert( numpy.allclose( scores[ 0 ], scores[ 1 ] ) )
+
+def test_add_scorer( ):
+    ranker = core_torrents.TorrentCandidateRanker( config = {
+        'weights' : dict(map(lambda key: ( key, 0.0 ), core_torrents._default_ranking_config[ 'weights' ] ) ) } )
+    ranker.add_scorer( 'family', lambda features, config: numpy.char.find(
+        features[ 'titles' ], 'family guy' ).astype( float ) >= 0 )
+    assert( _ranked_titles( ranker )[ 0 ] == 'Family Guy S18E01 720p HDTV x264-GRP' )
+
+def test_rank_speed( ):
+    items = list(map(lambda idx: {
+        'title' : 'The Simpsons S31E%02d %s %s-GRP%d' % (
+            idx % 30, ( '720p', '1080p', '' )[ idx % 3 ], ( 'x264', 'x265', 'xvid', '' )[ idx % 4 ], idx % 7 ),
+        'seeders' : idx % 500, 'leechers' : idx % 100, 'torrent_size' : 50.0 + idx % 3000 }, range( 5000 ) ) )
+    ranker = core_torrents.TorrentCandidateRanker( config = { } )
+    time0 = time.time( )
+    ranked = ranker.rank( items, name = 'The Simpsons S31E01', runtime_mins = 22.0 )
+    assert( len( ranked ) == len( items ) )
+    assert( time.time( ) - time0 < 1.0 )
+
+def test_merge_torrent_items( ):
+    info_hash = '0123456789abcdef0123456789abcdef01234567'
+    info_hash_b32 = base64.b32encode( bytes.fromhex( info_hash ) ).decode( 'utf-8' )
+    assert( core_torrents.get_magnet_info_hash( 'magnet:?xt=urn:btih:%s&dn=a' % info_hash_b32 ) == info_hash )
+    items = core_torrents.merge_torrent_items( [
+        { 'title' : 'a', 'link' : 'magnet:?xt=urn:btih:%s&dn=a' % info_hash.upper( ), 'seeders' : 1, 'leechers' : 1 },
+        { 'title' : 'b', 'link' : 'magnet:?xt=urn:btih:%s&dn=b' % info_hash_b32, 'seeders' : 5, 'leechers' : 0 },
+        { 'title' : 'c', 'link' : 'https://example.com/c.torrent', 'seeders' : 2, 'leechers' : 0 } ] )
+    assert( list(map(lambda item: item[ 'title' ], items ) ) == [ 'b', 'c' ] )
+
+#
+## a torrent search that counts how often it queries the "torrent service"
+_num_searches = [ 0 ]
+
+@core_torrents.cache_torrent_search
+def _search_fake( name, maxnum = 10, verify = True ):
+    _num_searches[ 0 ] += 1
+    return [ { 'title' : name, 'link' : 'magnet:?xt=urn:btih:%040x' % maxnum,
+               'seeders' : 1, 'leechers' : 0 } ], 'SUCCESS'
+
+@pytest.fixture
+def search_cache( monkeypatch, tmp_session ):
+    _num_searches[ 0 ] = 0
+    monkeypatch.setattr( core_torrents, 'session', tmp_session )
+    monkeypatch.setattr( core_torrents, '_torrent_search_cache', None )
+    monkeypatch.setattr( core_torrents, '_torrent_search_dirty', set( ) )
+    monkeypatch.setattr( core_torrents, '_torrent_search_offline', False )
+    core_torrents.load_torrent_search_cache( )
+    yield tmp_session
+
+def test_search_cache_hit( search_cache ):
+    items, status = _search_fake( "Marvel's Daredevil S01E02", maxnum = 5 )
+    assert( status == 'SUCCESS' )
+    assert( _search_fake( "marvels  daredevil s01e02", maxnum = 5, verify = False ) == ( items, 'SUCCESS' ) )
+    assert( _num_searches[ 0 ] == 1 )
+    _search_fake( "Marvel's Daredevil S01E02", maxnum = 6 )
+    _search_fake( "Marvel's Daredevil S01E02", maxnum = 5, use_cache = False )
+    assert( _num_searches[ 0 ] == 3 )
+    #
+    ## a new process reads the cached searches from the database
+    core_torrents.flush_torrent_search_cache( )
+    assert( search_cache.query( TorrentSearchCache ).count( ) == 2 )
+    core_torrents._torrent_search_cache = None
+    core_torrents.load_torrent_search_cache( )
+    assert( _search_fake( "Marvel's Daredevil S01E02", maxnum = 5 ) == ( items, 'SUCCESS' ) )
+    assert( _num_searches[ 0 ] == 3 )
+
+def test_search_cache_expiry( search_cache ):
+    _search_fake( 'The Simpsons S31E01' )
+    key = list( core_torrents._torrent_search_cache )[ 0 ]
+    items, _ = core_torrents._torrent_search_cache[ key ]
+    core_torrents._torrent_search_cache[ key ] = ( items, datetime.datetime.now( ) - datetime.timedelta( hours = 3 ) )
+    _search_fake( 'The Simpsons S31E01' )
+    assert( _num_searches[ 0 ] == 2 )
+    #
+    ## searches older than a week are deleted when the cache is loaded
+    search_cache.add( TorrentSearchCache(
+        cachekey = 'test_core_torrents._search_fake|old|', provider = 'test_core_torrents._search_fake',
+        items = [ ], fetched = datetime.datetime.now( ) - datetime.timedelta( days = 8 ) ) )
+    search_cache.commit( )
+    core_torrents.flush_torrent_search_cache( )
+    core_torrents._torrent_search_cache = None
+    core_torrents.load_torrent_search_cache( )
+    assert( list( core_torrents._torrent_search_cache ) == [ key ] )
+    search_cache.expire_all( )
+    assert( search_cache.query( TorrentSearchCache ).count( ) == 1 )
+
+def test_search_cache_offline( search_cache ):
+    items, _ = _search_fake( 'The Simpsons S31E01' )
+    key = list( core_torrents._torrent_search_cache )[ 0 ]
+    core_torrents._torrent_search_cache[ key ] = ( items, datetime.datetime.now( ) - datetime.timedelta( days = 3 ) )
+    core_torrents.set_torrent_search_offline( )
+    #
+    ## old searches are replayed, and new ones fail without a query
+    assert( _search_fake( 'The Simpsons S31E01' ) == ( items, 'SUCCESS' ) )
+    _, status = _search_fake( 'The Simpsons S31E02' )
+    assert( status.startswith( 'ERROR, NO CACHED TORRENT SEARCH' ) )
+    assert( _num_searches[ 0 ] == 1 )
+
+def test_aggregator_merges_providers( search_cache ):
+    def _provider( name, num_items, delay ):
+        def search( session ):
+            time.sleep( delay )
+            return list(map(lambda idx: {
+                'title' : '%s %d' % ( name, idx ), 'link' : 'magnet:?xt=urn:btih:%s%039x' % ( name[ 0 ], idx ),
+                'seeders' : idx, 'leechers' : 0 }, range( num_items ) ) ), 'SUCCESS'
+        return search
+    #
+    ## a fast service with plenty of candidates does not cut off a slower one, but a hung one times out
+    providers = {
+        'a' : _provider( 'a', 5, 0.0 ), 'b' : _provider( 'b', 2, 0.2 ), 'c' : _provider( 'c', 1, 5.0 ) }
+    with core_torrents.TorrentSearchAggregator( num_threads = 3, timeout = 1.0 ) as aggregator:
+        items, statuses = aggregator.search( providers )
+    assert( statuses[ 'a' ] == 'SUCCESS' and statuses[ 'b' ] == 'SUCCESS' )
+    assert( 'TIMED OUT' in statuses[ 'c' ] )
+    assert( sorted(map(lambda item: item[ 'title' ], items ) ) == [
+        'a 0', 'a 1', 'a 2', 'a 3', 'a 4', 'b 0', 'b 1' ] )
@@ -0,0 +1,110 @@
+import socket, pytest
+from collections import Counter
+from email.mime.text import MIMEText
+from email.utils import formataddr
+import howdy.email
+from howdy.email import EmailSendQueue, get_newsletter_id
+
+aiosmtpd_controller = pytest.importorskip( 'aiosmtpd.controller' )
+
+#
+## local SMTP server: rejects "bad" addresses for good, and "flaky" addresses twice before accepting them
+class _Handler( object ):
+    def __init__( self ):
+        self.delivered = [ ]
+        self.sessions = set( )
+        self.num_refused = Counter( )
+
+    async def handle_RCPT( self, server, session, envelope, address, rcpt_options ):
+        self.sessions.add( id( session ) )
+        if address.startswith( 'bad' ): return '550 no such user here'
+        if address.startswith( 'flaky' ) and self.num_refused[ address ] < 2:
+            self.num_refused[ address ] += 1
+            return '451 try again later'
+        envelope.rcpt_tos.append( address )
+        return '250 OK'
+
+    async def handle_DATA( self, server, session, envelope ):
+        self.delivered += envelope.rcpt_tos
+        return '250 Message accepted for delivery'
+
+def _get_free_port( ):
+    with socket.socket( ) as sock:
+        sock.bind( ( '127.0.0.1', 0 ) )
+        return sock.getsockname( )[ 1 ]
+
+@pytest.fixture
+def smtpd( ):
+    handler = _Handler( )
+    port = _get_free_port( )
+    controller = aiosmtpd_controller.Controller( handler, hostname = '127.0.0.1', port = port )
+    controller.start( )
+    yield handler, port
+    controller.stop( )
+
+def _create_msg( recipient ):
+    msg = MIMEText( 'Hello Friend,', 'html', 'utf-8' )
+    msg[ 'From' ] = formataddr( ( 'Howdy', 'howdy@example.com' ) )
+    msg[ 'To' ] = recipient
+    msg[ 'Subject' ] = 'test newsletter'
+    return msg
+
+def test_send_all( smtpd ):
+    handler, port = smtpd
+    recipients = list(map(lambda idx: 'friend%03d@example.com' % idx, range( 60 ) ) )
+    with EmailSendQueue( use_smtp = True, smtp_host = '127.0.0.1', smtp_port = port,
+                         max_workers = 3, backoff = 0.01 ) as queue:
+        for recipient in recipients: queue.put( _create_msg( recipient ) )
+        statuses = queue.send_all( )
+    assert( len( queue ) == 0 )
+    assert( all(map(lambda recipient: statuses[ recipient ][ 0 ] == 'SUCCESS', recipients ) ) )
+    assert( sorted( handler.delivered ) == recipients )
+    #
+    ## one SMTP connection per thread, not per email
+    assert( len( handler.sessions ) <= 3 )
+
+def test_bad_and_flaky( smtpd ):
+    handler, port = smtpd
+    with EmailSendQueue( use_smtp = True, smtp_host = '127.0.0.1', smtp_port = port,
+                         max_workers = 2, max_attempts = 3, backoff = 0.01 ) as queue:
+        for recipient in ( 'bad@example.com', 'flaky@example.com', 'friend@example.com' ):
+            queue.put( _create_msg( recipient ) )
+        statuses = queue.send_all( )
+    assert( statuses[ 'bad@example.com' ][ 0 ] == 'FAILURE' )
+    assert( 'SMTPRecipientsRefused' in statuses[ 'bad@example.com' ][ 1 ] )
+    assert( statuses[ 'flaky@example.com' ] == ( 'SUCCESS', 'SENT AFTER 3 ATTEMPTS.' ) )
+    assert( statuses[ 'friend@example.com' ] == ( 'SUCCESS', 'SENT AFTER 1 ATTEMPTS.' ) )
+    assert( sorted( handler.delivered ) == [ 'flaky@example.com', 'friend@example.com' ] )
+
+def test_no_server( ):
+    #
+    ## nothing listens on this port: every email fails after max_attempts, instead of hanging
+    port = _get_free_port( )
+    with EmailSendQueue( use_smtp = True, smtp_host = '127.0.0.1', smtp_port = port,
+                         max_attempts = 3, backoff = 0.01 ) as queue:
+        queue.put( _create_msg( 'friend@example.com' ) )
+        status, message = queue.send_all( )[ 'friend@example.com' ]
+    assert( status == 'FAILURE' )
+    assert( 'ConnectionRefusedError' in message )
+
+def test_newsletter_resend( smtpd, monkeypatch, tmp_session ):
+    handler, port = smtpd
+    monkeypatch.setattr( howdy.email, 'session', tmp_session )
+    newsletter = get_newsletter_id( 'test newsletter', 'Hello Friend,' )
+    def send( recipients, resend = False ):
+        with EmailSendQueue( newsletter = newsletter, use_smtp = True, smtp_host = '127.0.0.1',
+                             smtp_port = port, backoff = 0.01, resend = resend ) as queue:
+            for recipient in recipients: queue.put( _create_msg( recipient ) )
+            return queue.send_all( )
+    send( [ 'friend@example.com' ] )
+    #
+    ## those who already got this newsletter are skipped, and reported apart from those sent
+    statuses = send( [ 'friend@example.com', 'other@example.com' ] )
+    assert( statuses[ 'friend@example.com' ] == ( 'SKIPPED', 'ALREADY SENT.' ) )
+    assert( statuses[ 'other@example.com' ][ 0 ] == 'SUCCESS' )
+    assert( sorted( handler.delivered ) == [ 'friend@example.com', 'other@example.com' ] )
+    #
+    ## unless asked to resend, or the newsletter's content changes
+    assert( send( [ 'friend@example.com' ], resend = True )[ 'friend@example.com' ][ 0 ] == 'SUCCESS' )
+    assert( get_newsletter_id( 'test newsletter', 'Hello Friends,' ) != newsletter )
+    assert( handler.delivered.count( 'friend@example.com' ) == 2 )
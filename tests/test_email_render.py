@@ -0,0 +1,45 @@
+import os, glob
+import howdy.core
+from howdy.email import email
+
+def test_personalize_html( ):
+    mainHTML = '<p>Hello Friend,</p><p>news</p><p>Hello Friend,</p>'
+    assert( email.personalize_html( mainHTML ) == mainHTML )
+    assert( email.personalize_html( mainHTML, name = 'Jane Q. Public' ) ==
+            '<p>Hello Jane,</p><p>news</p><p>Hello Jane,</p>' )
+    assert( email.personalize_html( mainHTML, name = 'John Doe' ) ==
+            '<p>Hello John,</p><p>news</p><p>Hello John,</p>' )
+
+def test_get_template( ):
+    #
+    ## each template, file or string, is compiled only once
+    assert( email.get_template( 'summary_data_tv_template.rst' ) is
+            email.get_template( 'summary_data_tv_template.rst' ) )
+    template = email.get_template( 'Hello {{ name }}!' )
+    assert( template is email.get_template( 'Hello {{ name }}!' ) )
+    assert( template.render( name = 'Friend' ) == 'Hello Friend!' )
+
+def test_get_rst_html( tmp_path, monkeypatch ):
+    monkeypatch.setattr( howdy.core, '_rst_html_cache_dir', str( tmp_path ) )
+    monkeypatch.setattr( howdy.core, '_rst_html_cache', howdy.core.OrderedDict( ) )
+    rstString = '\n'.join([ 'Hello Friend,', '', 'This is a *test*.' ])
+    parts = howdy.core.get_rst_html( rstString )
+    assert( '<em>test</em>' in parts[ 'body' ] )
+    assert( howdy.core.get_rst_html( rstString ) is parts )
+    assert( len( glob.glob( os.path.join( str( tmp_path ), '*.json' ) ) ) == 1 )
+    #
+    ## a new process reads the conversion from disk
+    howdy.core._rst_html_cache.clear( )
+    assert( howdy.core.get_rst_html( rstString ) == parts )
+    assert( howdy.core.convert_string_RST( rstString ) == parts[ 'pretty' ] )
+
+def test_summary_data_no_libraries( monkeypatch ):
+    #
+    ## every library fails to be crawled, as with an empty or unreachable Plex server
+    monkeypatch.setattr( email.core, 'get_libraries', lambda token, fullURL, do_full: {
+        1 : ( 'Music', 'artist' ), 2 : ( 'TV Shows', 'show' ) } )
+    monkeypatch.setattr( email.core, 'get_library_stats_windows', lambda *args, **kwargs: None )
+    musicstring = email.get_summary_data_music_remote( 'token' )
+    assert( 'there are 0 songs made by 0 artists in 0 albums' in musicstring )
+    tvstring = email.get_summary_data_television_remote( 'token' )
+    assert( '0 TV episodes in 0 TV shows' in tvstring )
@@ -0,0 +1,68 @@
+import time, pytest, musicbrainzngs
+from threading import Thread
+from urllib.error import HTTPError
+from howdy.music import MusicBrainzClient
+
+#
+## fake MusicBrainz endpoint: records when it was called, and can be made to throttle the first few calls
+class _FakeEndpoint( object ):
+    def __init__( self, num_throttled = 0, delay = 0.0 ):
+        self.num_throttled = num_throttled
+        self.delay = delay
+        self.call_times = [ ]
+
+    def __call__( self, mbid, includes = [ ] ):
+        self.call_times.append( time.time( ) )
+        time.sleep( self.delay )
+        if len( self.call_times ) <= self.num_throttled:
+            raise musicbrainzngs.ResponseError( cause = HTTPError(
+                'https://musicbrainz.org', 503, 'Service Unavailable', { }, None ) )
+        return { 'release' : { 'id' : mbid, 'includes' : includes } }
+
+def test_rate_limit( tmp_path ):
+    endpoint = _FakeEndpoint( )
+    mbc = MusicBrainzClient( rate = 20.0, cache_dir = str( tmp_path ) )
+    for idx in range( 10 ): mbc.call( 'release', 'mbid%d' % idx, endpoint, 'mbid%d' % idx )
+    assert( mbc.num_requests == 10 )
+    intervals = list(map(lambda tup: tup[1] - tup[0], zip( endpoint.call_times[:-1], endpoint.call_times[1:] ) ) )
+    assert( min( intervals ) >= 0.9 / 20.0 )
+
+def test_disk_cache( tmp_path ):
+    endpoint = _FakeEndpoint( )
+    mbc = MusicBrainzClient( rate = 100.0, cache_dir = str( tmp_path ) )
+    key = MusicBrainzClient._get_key( 'mbid0', [ 'recordings' ] )
+    data = mbc.call( 'release', key, endpoint, 'mbid0', includes = [ 'recordings' ] )
+    assert( data == { 'release' : { 'id' : 'mbid0', 'includes' : [ 'recordings' ] } } )
+    assert( ( tmp_path / 'release' / ( '%s.json' % key ) ).is_file( ) )
+    #
+    ## a new client, as in a new process, answers from disk
+    mbc2 = MusicBrainzClient( rate = 100.0, cache_dir = str( tmp_path ) )
+    assert( mbc2.call( 'release', key, endpoint, 'mbid0', includes = [ 'recordings' ] ) == data )
+    assert( len( endpoint.call_times ) == 1 )
+    assert( mbc2.num_requests == 0 )
+
+def test_coalesce( tmp_path ):
+    endpoint = _FakeEndpoint( delay = 0.2 )
+    mbc = MusicBrainzClient( rate = 100.0, burst = 8, cache_dir = str( tmp_path ) )
+    results = [ ]
+    threads = list(map(lambda idx: Thread( target = lambda: results.append(
+        mbc.call( 'release', 'mbid0', endpoint, 'mbid0' ) ) ), range( 8 ) ) )
+    for thread in threads: thread.start( )
+    for thread in threads: thread.join( )
+    assert( len( endpoint.call_times ) == 1 )
+    assert( len( results ) == 8 )
+    assert( all(map(lambda result: result == results[ 0 ], results ) ) )
+
+def test_throttled( tmp_path ):
+    endpoint = _FakeEndpoint( num_throttled = 2 )
+    mbc = MusicBrainzClient( rate = 100.0, cache_dir = str( tmp_path ), backoff = 0.01 )
+    assert( mbc.call( 'release', 'mbid0', endpoint, 'mbid0' )[ 'release' ][ 'id' ] == 'mbid0' )
+    assert( len( endpoint.call_times ) == 3 )
+    #
+    ## not cached, and gives up after max_attempts
+    endpoint = _FakeEndpoint( num_throttled = 10 )
+    mbc = MusicBrainzClient( rate = 100.0, cache_dir = str( tmp_path ), backoff = 0.01, max_attempts = 3 )
+    with pytest.raises( musicbrainzngs.ResponseError ):
+        mbc.call( 'release', 'mbid1', endpoint, 'mbid1' )
+    assert( len( endpoint.call_times ) == 3 )
+    assert( not ( tmp_path / 'release' / 'mbid1.json' ).exists( ) )
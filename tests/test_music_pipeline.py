@@ -0,0 +1,79 @@
+import os, pytest, mutagen.mp4
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from distutils.spawn import find_executable
+from howdy.music import music
+from tests.conftest import SILENT_MP3_FRAME, get_album
+
+#
+## local HTTP server, a stand-in for YouTube: serves a silent MP3 clip for each song.
+## "/flaky/..." clips fail the first download attempt, a HEAD and a GET request, and "/missing/..." clips do not exist
+class _ClipHandler( BaseHTTPRequestHandler ):
+    num_requests = Counter( )
+    content = SILENT_MP3_FRAME * 40
+
+    def _respond( self, send_body ):
+        type( self ).num_requests[ self.path ] += 1
+        if self.path.startswith( '/missing/' ):
+            self.send_error( 404 )
+            return
+        if self.path.startswith( '/flaky/' ) and type( self ).num_requests[ self.path ] <= 2:
+            self.send_error( 503 )
+            return
+        self.send_response( 200 )
+        self.send_header( 'Content-Type', 'audio/mpeg' )
+        self.send_header( 'Content-Length', str( len( self.content ) ) )
+        self.end_headers( )
+        if send_body: self.wfile.write( self.content )
+
+    def do_GET( self ): self._respond( True )
+
+    def do_HEAD( self ): self._respond( False )
+
+    def log_message( self, *args ): pass
+
+@pytest.fixture
+def clip_server( http_server ):
+    _ClipHandler.num_requests = Counter( )
+    return http_server( _ClipHandler )
+
+def test_pipeline( tmp_path, clip_server ):
+    if find_executable( 'ffmpeg' ) is None: pytest.skip( 'ffmpeg is needed to transcode into M4A files.' )
+    album_data_dict, track_data_dicts = get_album( 8 )
+    def search_func( data_dict ):
+        if data_dict[ 'tracknumber' ] == 3: return '%s/flaky/song3.mp3' % clip_server
+        return '%s/clips/song%d.mp3' % ( clip_server, data_dict[ 'tracknumber' ] )
+    pipeline = music.YouTubeAlbumPipeline(
+        album_data_dict, outputdir = str( tmp_path ), queue_size = 2,
+        backoff = 0.01, search_func = search_func )
+    results = pipeline.run( track_data_dicts )
+    assert( all(map(lambda result: result[ 1 ] == 'SUCCESS', results ) ) )
+    for idx, ( filename, _ ) in enumerate( results ):
+        assert( filename == str( tmp_path / ( 'Air.Song %d.m4a' % ( idx + 1 ) ) ) )
+        mp4tags = mutagen.mp4.MP4( filename )
+        assert( mp4tags[ '\xa9nam' ] == [ 'Song %d' % ( idx + 1 ) ] )
+        assert( mp4tags[ 'trkn' ] == [ ( idx + 1, 8 ) ] )
+    assert( pipeline.stats[ 'download' ][ 'retries' ] == 1 )
+    assert( all(map(lambda stage: pipeline.stats[ stage ][ 'done' ] == 8, pipeline.stages ) ) )
+    assert( 'download' in pipeline.get_summary( ) )
+    #
+    ## no temporary files are left behind
+    assert( sorted( os.listdir( str( tmp_path ) ) ) == sorted(map(lambda result: os.path.basename( result[ 0 ] ), results ) ) )
+
+def test_pipeline_failures( tmp_path, clip_server ):
+    album_data_dict, track_data_dicts = get_album( 3 )
+    def search_func( data_dict ):
+        if data_dict[ 'tracknumber' ] == 1: return None
+        return '%s/missing/song%d.mp3' % ( clip_server, data_dict[ 'tracknumber' ] )
+    pipeline = music.YouTubeAlbumPipeline(
+        album_data_dict, outputdir = str( tmp_path ), max_attempts = 2,
+        backoff = 0.01, search_func = search_func )
+    results = pipeline.run( track_data_dicts )
+    assert( results[ 0 ] == ( None, 'ERROR, could not find a YouTube clip for Song 1.' ) )
+    assert( all(map(lambda result: result[ 0 ] is None and result[ 1 ].startswith( 'ERROR, download failed' ),
+                    results[ 1: ] ) ) )
+    assert( pipeline.stats[ 'search' ] == { 'done' : 2, 'failed' : 1, 'retries' : 0, 'busy' : pipeline.stats[ 'search' ][ 'busy' ] } )
+    assert( pipeline.stats[ 'download' ][ 'failed' ] == 2 )
+    assert( pipeline.stats[ 'download' ][ 'retries' ] == 2 )
+    assert( pipeline.stats[ 'transcode' ][ 'done' ] == 0 )
+    assert( os.listdir( str( tmp_path ) ) == [ ] )
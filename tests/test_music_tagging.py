@@ -0,0 +1,115 @@
+import os, io, time, threading, pytest, mutagen.mp3, mutagen.mp4
+from http.server import BaseHTTPRequestHandler
+from distutils.spawn import find_executable
+from PIL import Image
+from howdy.music import music
+from tests.conftest import SILENT_MP3_FRAME, get_album
+
+#
+## local HTTP server for the album image, that counts how many times it was downloaded. "/slow/..." images take 0.3 seconds
+class _CoverArtHandler( BaseHTTPRequestHandler ):
+    num_downloads = 0
+    _lock = threading.Lock( )
+    def do_GET( self ):
+        with self._lock: type( self ).num_downloads += 1
+        if self.path.startswith( '/slow/' ): time.sleep( 0.3 )
+        with io.BytesIO( ) as csio:
+            Image.new( 'RGB', ( 64, 64 ), color = ( 200, 30, 30 ) ).save( csio, format = 'jpeg' )
+            content = csio.getvalue( )
+        self.send_response( 200 )
+        self.send_header( 'Content-Type', 'image/jpeg' )
+        self.send_header( 'Content-Length', str( len( content ) ) )
+        self.end_headers( )
+        self.wfile.write( content )
+
+    def log_message( self, *args ): pass
+
+@pytest.fixture
+def album_url( http_server ):
+    _CoverArtHandler.num_downloads = 0
+    return '%s/cover.jpg' % http_server( _CoverArtHandler )
+
+@pytest.fixture
+def cover_art_cache( tmp_path, monkeypatch ):
+    monkeypatch.setattr( music, '_cover_art_cache_dir', str( tmp_path / 'coverart' ) )
+    monkeypatch.setattr( music, '_cover_art_cache', music.OrderedDict( ) )
+    return tmp_path / 'coverart'
+
+def _create_silent_mp3( filename, num_frames = 40 ):
+    with open( filename, 'wb' ) as openfile:
+        openfile.write( SILENT_MP3_FRAME * num_frames )
+
+def _create_silent_m4a( filename ):
+    ffmpeg_exec = find_executable( 'ffmpeg' )
+    if ffmpeg_exec is None: pytest.skip( 'ffmpeg is needed to create M4A files.' )
+    os.system( '%s -loglevel error -y -f lavfi -i anullsrc=r=44100:cl=mono -t 1 -c:a aac "%s"' % (
+        ffmpeg_exec, filename ) )
+
+def test_fill_album_metadata_mp3( tmp_path, album_url, cover_art_cache ):
+    filenames = list(map(lambda idx: str( tmp_path / ( 'song%02d.mp3' % idx ) ), range( 10 ) ) )
+    for filename in filenames: _create_silent_mp3( filename )
+    album_data_dict, track_data_dicts = get_album( len( filenames ), album_url )
+    statuses = music.fill_album_metadata(
+        filenames, album_data_dict, track_data_dicts = track_data_dicts, max_workers = 4 )
+    assert( all(map(lambda filename: statuses[ filename ] == 'SUCCESS', filenames ) ) )
+    assert( _CoverArtHandler.num_downloads == 1 )
+    assert( len( list( cover_art_cache.iterdir( ) ) ) == 1 )
+    for idx, filename in enumerate( filenames ):
+        mp3tags = mutagen.mp3.MP3( filename ).tags
+        assert( str( mp3tags[ 'TIT2' ] ) == 'Song %d' % ( idx + 1 ) )
+        assert( str( mp3tags[ 'TALB' ] ) == 'Moon Safari' )
+        assert( str( mp3tags[ 'TRCK' ] ) == '%d/10' % ( idx + 1 ) )
+        assert( mp3tags.getall( 'APIC' )[ 0 ].mime == 'image/png' )
+    #
+    ## a new process gets the album image from disk
+    music._cover_art_cache.clear( )
+    statuses = music.fill_album_metadata(
+        filenames, album_data_dict, track_data_dicts = track_data_dicts )
+    assert( all(map(lambda filename: statuses[ filename ] == 'SUCCESS', filenames ) ) )
+    assert( _CoverArtHandler.num_downloads == 1 )
+
+def test_fill_album_metadata_m4a( tmp_path, album_url, cover_art_cache ):
+    filenames = list(map(lambda idx: str( tmp_path / ( 'song%02d.m4a' % idx ) ), range( 3 ) ) )
+    for filename in filenames: _create_silent_m4a( filename )
+    album_data_dict, track_data_dicts = get_album( len( filenames ), album_url )
+    statuses = music.fill_album_metadata(
+        filenames, album_data_dict, track_data_dicts = track_data_dicts )
+    assert( all(map(lambda filename: statuses[ filename ] == 'SUCCESS', filenames ) ) )
+    assert( _CoverArtHandler.num_downloads == 1 )
+    for idx, filename in enumerate( filenames ):
+        mp4tags = mutagen.mp4.MP4( filename )
+        assert( mp4tags[ '\xa9nam' ] == [ 'Song %d' % ( idx + 1 ) ] )
+        assert( mp4tags[ 'trkn' ] == [ ( idx + 1, 3 ) ] )
+        assert( mp4tags[ 'covr' ][ 0 ].imageformat == mutagen.mp4.MP4Cover.FORMAT_PNG )
+
+def test_fill_album_metadata_errors( tmp_path, album_url, cover_art_cache ):
+    good_filename = str( tmp_path / 'good.mp3' )
+    _create_silent_mp3( good_filename )
+    bad_filename = str( tmp_path / 'bad.mp3' )
+    with open( bad_filename, 'wb' ) as openfile: openfile.write( b'not an mp3 file' )
+    text_filename = str( tmp_path / 'notes.txt' )
+    with open( text_filename, 'w' ) as openfile: openfile.write( 'notes' )
+    filenames = [ good_filename, bad_filename, text_filename, str( tmp_path / 'missing.mp3' ) ]
+    album_data_dict, track_data_dicts = get_album( len( filenames ), album_url )
+    statuses = music.fill_album_metadata(
+        filenames, album_data_dict, track_data_dicts = track_data_dicts )
+    assert( statuses[ good_filename ] == 'SUCCESS' )
+    assert( statuses[ bad_filename ].startswith( 'ERROR' ) )
+    assert( statuses[ text_filename ] == 'ERROR, %s is not an M4A or MP3 file.' % text_filename )
+    assert( statuses[ filenames[ -1 ] ].startswith( 'ERROR' ) )
+
+def test_get_cover_art_concurrent( album_url, cover_art_cache ):
+    server_url = album_url.replace( '/cover.jpg', '' )
+    album_urls = list(map(lambda idx: '%s/slow/cover%d.jpg' % ( server_url, idx % 4 ), range( 16 ) ) )
+    results = { }
+    def get_cover_art( idx ): results[ idx ] = music.get_cover_art( album_urls[ idx ] )
+    threads = list(map(lambda idx: threading.Thread( target = get_cover_art, args = ( idx, ) ), range( 16 ) ) )
+    time0 = time.time( )
+    for thread in threads: thread.start( )
+    for thread in threads: thread.join( )
+    #
+    ## each image is downloaded once, and different images are downloaded at the same time
+    assert( _CoverArtHandler.num_downloads == 4 )
+    assert( time.time( ) - time0 < 1.0 )
+    assert( all(map(lambda idx: results[ idx ] is not None and results[ idx ] == results[ idx % 4 ], range( 16 ) ) ) )
+    assert( len( music._cover_art_pending ) == 0 )
@@ -72,3 +72,43 @@ def test_have_music( get_token_fullURL, get_libraries_dict ):
     library_name = libraries_dict[ key ][ 0 ]
     musicdata = plexcore.get_library_data( library_name, token = token, fullURL = fullURL )
     assert( musicdata is not None )
+
+@pytest.mark.dependency(depends=["test_have_libraries"])
+def test_tv_bulk_parity( get_token_fullURL, get_libraries_dict ):
+    fullURL, token = get_token_fullURL
+    libraries_dict = get_libraries_dict
+    key = list(filter(lambda k: libraries_dict[k][-1] == 'show',
+                      libraries_dict))
+    assert( len( key ) != 0 )
+    key = max( key )
+    _, tvdata_crawl = plexcore._get_library_data_show(
+        key, token, fullURL = fullURL, bulk = False )
+    _, tvdata_bulk = plexcore._get_library_data_show(
+        key, token, fullURL = fullURL, bulk = True )
+    assert( set( tvdata_bulk ) == set( tvdata_crawl ) )
+    for show in tvdata_crawl:
+        assert( tvdata_bulk[ show ] == tvdata_crawl[ show ] ), "error, bulk data differs for %s." % show
+
+@pytest.mark.dependency(depends=["test_have_libraries"])
+def test_crawl_speedup( get_token_fullURL, get_libraries_dict ):
+    fullURL, token = get_token_fullURL
+    libraries_dict = get_libraries_dict
+    key = list(filter(lambda k: libraries_dict[k][-1] == 'artist',
+                      libraries_dict))
+    assert( len( key ) != 0 )
+    key = min( key )
+    times = { }
+    musicdatas = { }
+    for num_threads in ( 1, 16 ):
+        time0 = time.time( )
+        _, musicdatas[ num_threads ] = plexcore._get_library_data_artist(
+            key, token, fullURL = fullURL, num_threads = num_threads )
+        times[ num_threads ] = time.time( ) - time0
+        print( 'crawled %d artists with %d threads in %0.3f seconds.' % (
+            len( musicdatas[ num_threads ] ), num_threads, times[ num_threads ] ) )
+    print( 'speedup with 16 threads = %0.2f.' % ( times[ 1 ] / times[ 16 ] ) )
+    #
+    ## the speedup depends on the server and network, so only check that the threaded crawl finds the same music
+    assert( set( musicdatas[ 16 ] ) == set( musicdatas[ 1 ] ) )
+    for artist in musicdatas[ 1 ]:
+        assert( musicdatas[ 16 ][ artist ] == musicdatas[ 1 ][ artist ] ), "error, threaded data differs for %s." % artist
@@ -0,0 +1,182 @@
+import os, time, datetime, threading, pytest
+import howdy.tv
+from howdy.tv import tv, TVBatchJournal, TVBatchJob
+
+class _FakeContext( object ):
+    def __init__( self, *args, **kwargs ): pass
+
+    def __enter__( self ): return self
+
+    def __exit__( self, *args ): pass
+
+class _FakeTransferPool( _FakeContext ):
+    #
+    ## "downloads" an episode by writing it locally; episodes named in failures do not transfer,
+    ## and those named in errors raise an exception
+    def __init__( self, failures = ( ), errors = ( ) ):
+        self.failures = set( failures )
+        self.errors = set( errors )
+        self.downloaded = [ ]
+        self._lock = threading.Lock( )
+
+    def download( self, remote_path, lfilename, numtries = 10 ):
+        with self._lock: self.downloaded.append( os.path.basename( remote_path ) )
+        if os.path.basename( remote_path ) in self.errors:
+            raise RuntimeError( 'lost connection to the SSH server.' )
+        if os.path.basename( remote_path ) in self.failures:
+            return 'FAILURE', 'could not transfer %s.' % remote_path
+        with open( lfilename, 'w' ) as openfile: openfile.write( remote_path )
+        return 'SUCCESS', 'transferred %s.' % remote_path
+
+@pytest.fixture
+def batch_env( monkeypatch, tmp_path, tmp_session ):
+    """
+    Runs download_batched_tvtorrent_shows against fake Deluge, torrent search, and SSH servers. Every search and download succeeds, unless the episode is in env[ "failures" ].
+    """
+    monkeypatch.setattr( howdy.tv, 'session', tmp_session )
+    local_dir = tmp_path / 'local'
+    local_dir.mkdir( )
+    monkeypatch.setattr( tv.core_rsync, 'get_credentials', lambda: {
+        'local_dir' : str( local_dir ), 'subdir' : 'downloads' } )
+    monkeypatch.setattr( tv.core_deluge, 'get_deluge_client', lambda: ( object( ), 'SUCCESS' ) )
+    monkeypatch.setattr( tv.core_deluge, 'DelugeTorrentMonitor', _FakeContext )
+    monkeypatch.setattr( tv.core_torrents, 'TorrentSearchAggregator', _FakeContext )
+    monkeypatch.setattr( tv.core_torrents, 'get_torrent_ranking_config', lambda: { } )
+    env = { 'searched' : [ ], 'failures' : set( ), 'pool' : _FakeTransferPool( ) }
+    lock = threading.Lock( )
+    monkeypatch.setattr( tv.core_rsync, 'get_transfer_pool', lambda num_connections = 1, bwlimit = None: (
+        env[ 'pool' ], 'SUCCESS' ) )
+    def worker_process_download_tvtorrent( tvTorUnit, **kwargs ):
+        with lock: env[ 'searched' ].append( tvTorUnit[ 'torFname' ] )
+        if tvTorUnit[ 'torFname' ] in env[ 'failures' ]:
+            return None, { 'status' : 'FAILURE', 'message' : 'no candidates.', 'time' : 0.0 }
+        return '%s.mkv' % tvTorUnit[ 'torFname' ], { 'status' : 'SUCCESS', 'message' : '', 'time' : 0.0 }
+    monkeypatch.setattr( tv.tv_torrents, 'worker_process_download_tvtorrent', worker_process_download_tvtorrent )
+    library_dir = tmp_path / 'library'
+    library_dir.mkdir( )
+    env[ 'tvTorUnits' ] = list(map(lambda torFname: {
+        'torFname' : torFname, 'totFname' : str( library_dir / torFname ), 'maxSize' : 350 },
+                                   ( 'Firefly S01E01', 'Firefly S01E02', 'Firefly S01E03', 'Firefly S01E04' ) ) )
+    env[ 'library_dir' ] = library_dir
+    yield env
+
+def test_journal( monkeypatch, tmp_session ):
+    monkeypatch.setattr( howdy.tv, 'session', tmp_session )
+    assert( TVBatchJournal.get_unfinished( ) is None )
+    journal = TVBatchJournal( )
+    journal.set_stage( 'remaining', { 'Firefly' : [ ( 1, 1, 'Serenity' ) ] } )
+    journal.set_episode( 'Firefly S01E01', 'done' )
+    journal.set_episode( 'Firefly S01E02', 'downloading', torrentids = [ 'abc' ] )
+    journal.set_episode( 'Firefly S01E02', 'downloading', message = 'still downloading.' )
+    with pytest.raises( AssertionError ): journal.set_episode( 'Firefly S01E03', 'lost' )
+    #
+    ## a new process picks up where this one stopped
+    journal2 = TVBatchJournal.get_unfinished( )
+    assert( journal2.jobid == journal.jobid )
+    assert( journal2.get_stage( 'remaining' ) == { 'Firefly' : [ ( 1, 1, 'Serenity' ) ] } )
+    assert( journal2.get_stage( 'tvtorunits' ) is None )
+    assert( journal2.get_episode( 'Firefly S01E01' )[ 'state' ] == 'done' )
+    assert( journal2.get_episode( 'Firefly S01E02' ) == {
+        'state' : 'downloading', 'torrentids' : [ 'abc' ], 'remotefilename' : None,
+        'message' : 'still downloading.' } )
+    assert( journal2.get_episode( 'Firefly S01E03' ) is None )
+    #
+    ## a finished run is not resumed
+    journal2.finish( )
+    assert( TVBatchJournal.get_unfinished( ) is None )
+
+def test_journal_old_runs( monkeypatch, tmp_session ):
+    monkeypatch.setattr( howdy.tv, 'session', tmp_session )
+    journal_old = TVBatchJournal( )
+    journal_old.set_episode( 'Firefly S01E01', 'failed' )
+    job = tmp_session.query( TVBatchJob ).filter( TVBatchJob.jobid == journal_old.jobid ).first( )
+    job.started = datetime.datetime.now( ) - datetime.timedelta( days = 31 )
+    tmp_session.commit( )
+    #
+    ## runs older than 30 days are removed when a new run starts
+    journal = TVBatchJournal( )
+    tmp_session.expire_all( )
+    assert( list(map(lambda job: job.jobid, tmp_session.query( TVBatchJob ) ) ) == [ journal.jobid ] )
+    assert( TVBatchJournal.get_unfinished( ).jobid == journal.jobid )
+
+def test_batch_resume( batch_env ):
+    journal = TVBatchJournal( )
+    journal.set_episode( 'Firefly S01E01', 'done' )
+    journal.set_episode( 'Firefly S01E02', 'tagged', remotefilename = 'Firefly S01E02.mkv' )
+    journal.set_episode( 'Firefly S01E03', 'failed', message = 'no candidates.' )
+    #
+    ## only the unfinished episodes run again, and those already on the seedbox are not downloaded again
+    journal = TVBatchJournal.get_unfinished( )
+    tv.download_batched_tvtorrent_shows(
+        batch_env[ 'tvTorUnits' ], journal = journal,
+        scheduler = tv.TVBatchScheduler( report_interval = None ) )
+    assert( sorted( batch_env[ 'searched' ] ) == [ 'Firefly S01E03', 'Firefly S01E04' ] )
+    assert( sorted( batch_env[ 'pool' ].downloaded ) == [
+        'Firefly S01E02.mkv', 'Firefly S01E03.mkv', 'Firefly S01E04.mkv' ] )
+    assert( all(map(lambda idx: journal.get_episode( 'Firefly S01E%02d' % idx )[ 'state' ] == 'done', range( 1, 5 ) ) ) )
+    assert( sorted( os.listdir( str( batch_env[ 'library_dir' ] ) ) ) == [
+        'Firefly S01E02.mkv', 'Firefly S01E03.mkv', 'Firefly S01E04.mkv' ] )
+
+def test_budget_limit( ):
+    budget = tv._ConcurrencyBudget( 'torrent', 3 )
+    lock = threading.Lock( )
+    counts = { 'now' : 0, 'max' : 0 }
+    def work( ):
+        with budget( ):
+            with lock:
+                counts[ 'now' ] += 1
+                counts[ 'max' ] = max( counts[ 'max' ], counts[ 'now' ] )
+            time.sleep( 0.005 )
+            with lock: counts[ 'now' ] -= 1
+    threads = list(map(lambda idx: threading.Thread( target = work ), range( 64 ) ) )
+    for thread in threads: thread.start( )
+    for thread in threads: thread.join( )
+    assert( counts[ 'max' ] == 3 )
+    assert( budget.in_use == 0 and budget.waiting == 0 )
+    #
+    ## a request larger than the budget is capped, and a full budget does not block if asked not to
+    assert( budget.acquire( 5 ) == 3 )
+    assert( budget.acquire( 1, blocking = False ) == 0 )
+    budget.release( 3 )
+    assert( budget.in_use == 0 )
+
+def test_disk_quota( ):
+    scheduler = tv.TVBatchScheduler( max_torrents = 4, disk_quota = 1000, report_interval = None )
+    disk = scheduler.start_torrent( 800 )
+    assert( disk == 800 )
+    assert( scheduler.start_torrent( 400, blocking = False ) is None )
+    assert( scheduler.budgets[ 'torrent' ].in_use == 1 )
+    started = [ ]
+    thread = threading.Thread( target = lambda: started.append( scheduler.start_torrent( 400 ) ) )
+    thread.start( )
+    time.sleep( 0.1 )
+    assert( started == [ ] and scheduler.budgets[ 'disk' ].waiting == 1 )
+    #
+    ## the finished episode keeps its disk space until it leaves the seedbox
+    scheduler.stop_torrent( disk, keep_disk_for = 'Firefly S01E01' )
+    time.sleep( 0.1 )
+    assert( started == [ ] )
+    scheduler.release_disk( 'Firefly S01E01' )
+    thread.join( 5 )
+    assert( started == [ 400 ] )
+    assert( scheduler.budgets[ 'disk' ].in_use == 400 and scheduler.budgets[ 'torrent' ].in_use == 1 )
+
+def test_batch_failures( batch_env, capsys ):
+    batch_env[ 'failures' ] = set([ 'Firefly S01E01' ])
+    batch_env[ 'pool' ] = _FakeTransferPool( failures = [ 'Firefly S01E02.mkv' ], errors = [ 'Firefly S01E03.mkv' ] )
+    journal = TVBatchJournal( )
+    scheduler = tv.TVBatchScheduler( report_interval = None )
+    tv.download_batched_tvtorrent_shows(
+        batch_env[ 'tvTorUnits' ], journal = journal, scheduler = scheduler )
+    #
+    ## failed searches and failed transfers are reported, and do not stop the other episodes
+    out = capsys.readouterr( ).out
+    assert( 'successfully processed 1 / 4 episodes' in out )
+    assert( 'could not download ' in out )
+    for torFname in ( 'Firefly S01E01', 'Firefly S01E02', 'Firefly S01E03' ): assert( torFname in out )
+    assert( journal.get_episode( 'Firefly S01E01' )[ 'state' ] == 'failed' )
+    assert( journal.get_episode( 'Firefly S01E02' )[ 'state' ] == 'tagged' )
+    assert( journal.get_episode( 'Firefly S01E04' )[ 'state' ] == 'done' )
+    assert( os.listdir( str( batch_env[ 'library_dir' ] ) ) == [ 'Firefly S01E04.mkv' ] )
+    assert( scheduler.num_finished == 4 )
+    assert( all(map(lambda name: scheduler.budgets[ name ].in_use == 0, scheduler.budgets ) ) )
@@ -0,0 +1,22 @@
+from howdy.tv import tv
+
+def test_get_missing_episodes( ):
+    plex_seasons_dict = {
+        'The Simpsons' : { 1 : { 'episodes' : { 1 : { }, 2 : { } } } },
+        'Firefly' : { 1 : { 'episodes' : { 1 : { } } } } }
+    tvdb_episodes_dict = {
+        'The Simpsons' : [
+            { 'airedSeason' : 1, 'airedEpisodeNumber' : 1, 'episodeName' : 'Simpsons Roasting on an Open Fire' },
+            { 'airedSeason' : 1, 'airedEpisodeNumber' : 2, 'episodeName' : 'Bart the Genius' },
+            { 'airedSeason' : 1, 'airedEpisodeNumber' : 3, 'episodeName' : "Homer's Odyssey" },
+            { 'airedSeason' : 0, 'airedEpisodeNumber' : None, 'episodeName' : 'Unaired Pilot' },
+            { 'airedSeason' : None, 'airedEpisodeNumber' : None, 'episodeName' : 'Special' } ],
+        'Firefly' : [
+            { 'airedSeason' : 1, 'airedEpisodeNumber' : 1, 'episodeName' : 'Serenity' } ],
+        'Lost' : [
+            { 'airedSeason' : 1, 'airedEpisodeNumber' : 1, 'episodeName' : 'Pilot (1)' } ] }
+    #
+    ## episodes without a season or episode number are skipped
+    assert( tv.get_missing_episodes( plex_seasons_dict, tvdb_episodes_dict ) == {
+        'The Simpsons' : [ ( 1, 3, "Homer's Odyssey" ) ] } )
+    assert( tv.get_missing_episodes( { }, tvdb_episodes_dict ) == { } )
@@ -0,0 +1,75 @@
+import datetime, requests
+from collections import Counter
+from howdy.tv import tv
+
+_series_ids = { 'The Simpsons' : 71663, 'Firefly' : 78874 }
+_series_statuses = {
+    71663 : ( 'Continuing', None ),
+    78874 : ( 'Ended', datetime.date( 2003, 7, 28 ) ),
+    73739 : ( 'Ended', datetime.date( 2010, 5, 23 ) ) }
+
+class _FakeClient( object ):
+    def flush( self ): pass
+
+def test_refresh_series_cache( tmp_session, monkeypatch ):
+    monkeypatch.setattr( tv, 'session', tmp_session )
+    monkeypatch.setattr( tv, 'get_tvdb_client', lambda verify = True: _FakeClient( ) )
+    lookups = Counter( )
+    def get_series_id( series_name, token, verify = True ):
+        lookups[ series_name ] += 1
+        return _series_ids.get( series_name )
+    def get_series_status( series_id, token, verify = True ):
+        lookups[ series_id ] += 1
+        return _series_statuses[ series_id ]
+    monkeypatch.setattr( tv, 'get_series_id', get_series_id )
+    monkeypatch.setattr( tv, '_get_series_status', get_series_status )
+    tvdata = { 'The Simpsons' : { }, 'Firefly' : { }, 'Unknown Show' : { }, 'Lost' : { 'tvdbid' : 73739 } }
+    series = tv.refresh_series_cache( tvdata, token = 'token', num_threads = 2 )
+    assert( series[ 'The Simpsons' ] == { 'seriesid' : 71663, 'status' : 'Continuing', 'lastaired' : None, 'didend' : False } )
+    assert( series[ 'Firefly' ][ 'didend' ] is True )
+    assert( series[ 'Lost' ][ 'seriesid' ] == 73739 and series[ 'Lost' ][ 'didend' ] is True )
+    assert( series[ 'Unknown Show' ] == { 'seriesid' : None, 'status' : None, 'lastaired' : None, 'didend' : None } )
+    #
+    ## the series IDs and statuses are stored in the tvdbseriescache table
+    cache = tv.get_series_cache( )
+    assert( set( cache ) == set( tvdata ) )
+    assert( cache[ 'Firefly' ][ 'seriesid' ] == 78874 )
+    assert( cache[ 'Firefly' ][ 'lastaired' ] == datetime.date( 2003, 7, 28 ) )
+    assert( cache[ 'Unknown Show' ][ 'idfetched' ] is not None )
+    #
+    ## fresh entries are not looked up again
+    num_lookups = sum( lookups.values( ) )
+    assert( tv.refresh_series_cache( tvdata, token = 'token', num_threads = 2 ) == series )
+    assert( sum( lookups.values( ) ) == num_lookups )
+    #
+    ## unless forced
+    tv.refresh_series_cache( tvdata, token = 'token', num_threads = 2, force = True )
+    assert( lookups[ 'Firefly' ] == 2 )
+
+def test_refresh_series_cache_stale_ids( tmp_session, monkeypatch ):
+    monkeypatch.setattr( tv, 'session', tmp_session )
+    monkeypatch.setattr( tv, 'get_tvdb_client', lambda verify = True: _FakeClient( ) )
+    failing = set( )
+    def get_series_id( series_name, token, verify = True ):
+        if series_name in failing: raise requests.ConnectionError( 'TVDB is down.' )
+        return _series_ids.get( series_name )
+    monkeypatch.setattr( tv, 'get_series_id', get_series_id )
+    monkeypatch.setattr( tv, '_get_series_status', lambda series_id, token, verify = True: _series_statuses[ series_id ] )
+    tvdata = { 'The Simpsons' : { }, 'Firefly' : { } }
+    tv.refresh_series_cache( tvdata, token = 'token', num_threads = 2 )
+    #
+    ## an ID that did not change keeps its status, even if statuses are not refreshed
+    series = tv.refresh_series_cache( tvdata, token = 'token', num_threads = 2, do_status = False, force = True )
+    assert( series[ 'Firefly' ][ 'didend' ] is True )
+    assert( tv.get_series_cache( )[ 'Firefly' ][ 'status' ] == 'Ended' )
+    #
+    ## a failed lookup does not overwrite the stored ID, nor mark it as fetched
+    idfetched = tv.get_series_cache( )[ 'Firefly' ][ 'idfetched' ]
+    failing.add( 'Firefly' )
+    failing.add( 'Lost' )
+    series = tv.refresh_series_cache( dict( tvdata, Lost = { } ), token = 'token', num_threads = 2, force = True )
+    assert( series[ 'Firefly' ][ 'seriesid' ] == 78874 and series[ 'Firefly' ][ 'didend' ] is True )
+    assert( series[ 'Lost' ] == { 'seriesid' : None, 'status' : None, 'lastaired' : None, 'didend' : None } )
+    cache = tv.get_series_cache( )
+    assert( cache[ 'Firefly' ][ 'seriesid' ] == 78874 and cache[ 'Firefly' ][ 'idfetched' ] == idfetched )
+    assert( 'Lost' not in cache )